@@ -6,10 +6,12 @@ Orquesta:
   - Planner: crear plan + buckets + tareas (reutiliza planner_import.py)
   - SharePoint: crear carpeta de proyecto + 5 subcarpetas + subir 2 plantillas + _AYUDA_PM
   - Persistencia: guardar project_config.json con IDs y URLs del entorno
+  - Diario: cada paso anotado en journals/*.jsonl; --resume <diario> continúa sin repetir
 
 Uso:
   python create_environment.py --csv templates/default_init/csv1_template.csv [--dry-run]
   python create_environment.py --csv <ruta> --group-id <guid>
+  python create_environment.py --csv <ruta> --resume journals/<diario>.jsonl
 """
 from __future__ import annotations
 
@@ -18,6 +20,7 @@ import asyncio
 import csv
 import json
 import sys
+from dataclasses import replace
 from pathlib import Path
 from typing import Any
 
@@ -30,24 +33,55 @@ from planner_import import (
     GROUP_ID,
     GRAPH_BASE,
     SHAREPOINT_SITE_URL,
+    ImportResult,
     MicrosoftAuthManager,
     Settings,
+    adopt_unfinished_tasks,
     create_bucket,
     create_plan,
     configure_plan_labels,
-    create_task_full,
+    create_tasks_pipeline,
     extract_ordered_unique,
+    find_named,
     get_site_id,
     graph_request,
+    list_buckets,
+    list_plans,
     parse_csv,
+    prefetch_assignees,
     resolve_email_to_guid,
 )
+from graph_auth import AsyncTokenProvider, TokenLike, resolve_token
+from graph_batch import BatchConfig, configure_batching
+from graph_client import (
+    THROTTLE_STATUS,
+    classify_workload,
+    is_idempotent,
+    run_with_graph_client,
+    send_with_retry,
+    shared_graph_client,
+)
+from graph_cassette import CassetteConfig, configure_cassette
+from graph_deadline import (
+    DeadlineConfig,
+    DeadlineExceeded,
+    check_deadline,
+    configure_deadlines,
+    deadline_config,
+    parse_duration,
+)
+from graph_directory import DirectoryConfig, configure_directory_cache
+from graph_emulator import emulator_requested, install_emulator
+from graph_journal import JournalMismatch, configure_journal, journal_config, open_journal, resume_hint
+from graph_metrics import configure_metrics
 
 # ── Constantes ────────────────────────────────────────────────────────────────
 PROJECT_CONFIG_PATH = Path("project_config.json")
 
 SUBCARPETAS = ["01_INICIO", "02_PLANIFICACION", "03_EJECUCION", "04_CONTROL", "05_CIERRE"]
 HELP_DIR_NAME = "_AYUDA_PM"
+# Espera tras crear un canal para que Teams lo propague antes de añadir miembros y tabs
+CHANNEL_PROPAGATION_WAIT: float = 60.0
 
 TEMPLATES_DIR = Path(__file__).parent / "templates" / "default_init"
 TEMPLATE_FICHA = TEMPLATES_DIR / "Ficha_de_Proyecto_Nueva_Iniciativa.docx"
@@ -103,42 +137,48 @@ async def graph_request_bytes(
     client: httpx.AsyncClient,
     method: str,
     endpoint: str,
-    token: str,
+    token: TokenLike,
     data: bytes,
     content_type: str = "application/octet-stream",
 ) -> Any:
     """PUT/POST con body binario (upload de archivos a SharePoint).
 
-    Maneja throttling 429 con Retry-After igual que graph_request().
-    No acepta JSON — usa content= para bytes.
+    Misma RetryPolicy y ThrottleController global que graph_request() (429/503 → pausa
+    compartida; en PUT, 502/504/timeouts → backoff). No acepta JSON — usa content= para bytes.
+    Igual que graph_request(), `token` puede ser un AsyncTokenProvider (401 → invalida y reintenta).
     """
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": content_type,
-    }
-    for attempt in range(3):
-        resp = await client.request(
+    headers = {"Content-Type": content_type}
+
+    async def _send() -> httpx.Response:
+        return await client.request(
             method,
             f"{GRAPH_BASE}{endpoint}",
-            headers=headers,
+            headers={"Authorization": f"Bearer {await resolve_token(token)}", **headers},
             content=data,
         )
-        if resp.status_code == 429:
-            wait = int(resp.headers.get("Retry-After", 60))
-            print(f"      [throttle] esperando {wait}s...")
-            await asyncio.sleep(wait)
-            continue
-        resp.raise_for_status()
-        return resp.json()
 
-    raise RuntimeError(f"Máximo de reintentos para {method} {endpoint}")
+    async def _send_with_retry() -> httpx.Response:
+        return await send_with_retry(
+            _send, f"{method} {endpoint}",
+            idempotent=is_idempotent(method, headers),
+            workload=classify_workload(endpoint),
+        )
+
+    resp = await _send_with_retry()
+    if resp.status_code == 401 and isinstance(token, AsyncTokenProvider):
+        token.invalidate()
+        resp = await _send_with_retry()
+    if resp.status_code in THROTTLE_STATUS:
+        raise RuntimeError(f"Máximo de reintentos para {method} {endpoint}")
+    resp.raise_for_status()
+    return resp.json()
 
 
 # ── Teams ─────────────────────────────────────────────────────────────────────
 
 async def create_team_channel(
     client: httpx.AsyncClient,
-    token: str,
+    token: TokenLike,
     group_id: str,
     name: str,
 ) -> dict[str, Any]:
@@ -155,7 +195,7 @@ async def create_team_channel(
 
 async def get_channel_by_name(
     client: httpx.AsyncClient,
-    token: str,
+    token: TokenLike,
     group_id: str,
     name: str,
 ) -> tuple[str, str]:
@@ -175,7 +215,7 @@ async def get_channel_by_name(
 
 async def add_channel_member(
     client: httpx.AsyncClient,
-    token: str,
+    token: TokenLike,
     group_id: str,
     channel_id: str,
     user_id: str,
@@ -201,7 +241,7 @@ async def add_channel_member(
 
 async def add_team_member(
     client: httpx.AsyncClient,
-    token: str,
+    token: TokenLike,
     group_id: str,
     user_id: str,
     role: str = "owner",
@@ -226,7 +266,7 @@ async def add_team_member(
 
 async def add_planner_tab(
     client: httpx.AsyncClient,
-    token: str,
+    token: TokenLike,
     group_id: str,
     channel_id: str,
     plan_id: str,
@@ -267,7 +307,7 @@ async def add_planner_tab(
 
 async def create_sp_folder(
     client: httpx.AsyncClient,
-    token: str,
+    token: TokenLike,
     site_id: str,
     parent_id: str,
     name: str,
@@ -290,7 +330,7 @@ async def create_sp_folder(
 
 async def upload_file(
     client: httpx.AsyncClient,
-    token: str,
+    token: TokenLike,
     site_id: str,
     folder_id: str,
     local_path: Path,
@@ -311,7 +351,7 @@ async def upload_file(
 
 async def ensure_help_dir(
     client: httpx.AsyncClient,
-    token: str,
+    token: TokenLike,
     site_id: str,
     root_id: str,
 ) -> str:
@@ -361,8 +401,10 @@ async def run_create_environment(
     """Etapa 1: para cada proyecto en CSV1 crea canal Teams + Planner + carpetas SharePoint.
 
     Maneja 409 (recursos ya existentes) como idempotente en todos los pasos.
-    Refresca token antes de bloques de operaciones pesadas (scripts > 1h).
+    El token lo renueva AsyncTokenProvider antes de caducar y tras un 401 (scripts > 1h).
     Persiste project_config.json tras cada proyecto (tolerante a interrupciones).
+    Anota cada paso en el diario de operaciones (graph_journal): con --resume, los pasos
+    y proyectos ya hechos se saltan, incluida la espera de propagación del canal.
     """
     projects = parse_csv1(csv_path)
     print(f"Proyectos encontrados: {len(projects)}")
@@ -382,6 +424,11 @@ async def run_create_environment(
             print()
         return {}
 
+    journal = open_journal("environment", csv_path, group_id=group_id)
+    if journal.path is not None:
+        resumed = f" — reanudando, {journal.completed} operaciones ya hechas" if journal.completed else ""
+        print(f"Diario: {journal.path}{resumed}")
+
     settings = Settings()
     auth = MicrosoftAuthManager(
         tenant_id=settings.azure_tenant_id,
@@ -392,10 +439,12 @@ async def run_create_environment(
 
     config = load_project_config()
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    async with shared_graph_client() as client:
 
         # ── Preparación global (una vez por ejecución) ─────────────────────────
-        token = auth.get_token()
+        token = AsyncTokenProvider.from_auth_manager(
+            auth, tenant_id=settings.azure_tenant_id, client_id=settings.azure_client_id,
+        )
 
         print("Obteniendo site_id de SharePoint...")
         site_id = await get_site_id(client, token, SHAREPOINT_SITE_URL)
@@ -408,14 +457,29 @@ async def run_create_environment(
         print("\n  Verificando directorio _AYUDA_PM (idempotente)...")
         await ensure_help_dir(client, token, site_id, root_id)
 
+        # ── Emails de todos los proyectos pendientes, antes de crear nada ─────
+        pending = [
+            p for p in projects
+            if journal.result(f"{p['project_id']}/project") is None or p["project_id"] not in config
+        ]
+        plan_csvs = {p["project_id"]: parse_csv(p["planner_csv"]) for p in pending}
+        print("\n  Resolviendo emails de PM, Líder y asignados...")
+        guid_cache: dict[str, str | None] = {}
+        await prefetch_assignees(client, token, [
+            *(email for p in pending for email in (p["pm_email"], p["lider_email"])),
+            *(t["assignee_email"] for tasks, _ in plan_csvs.values() for t in tasks),
+        ], guid_cache)
+
         # ── Procesamiento por proyecto ─────────────────────────────────────────
         for proj_idx, proj in enumerate(projects, 1):
             print(f"\n{'='*60}")
             print(f"[{proj_idx}/{len(projects)}] {proj['project_id']} — {proj['project_name']}")
             print(f"{'='*60}")
 
-            # Refrescar token al inicio de cada proyecto (scripts largos)
-            token = auth.get_token()
+            pid: str = proj["project_id"]
+            if pid not in plan_csvs:
+                print("\n  [diario] Proyecto ya completado — se omite")
+                continue
 
             project_entry: dict[str, Any] = {
                 "group_id": group_id,
@@ -424,7 +488,6 @@ async def run_create_environment(
 
             # ── [RESOLVE] ──────────────────────────────────────────────────────
             print("\n  [RESOLVE] Resolviendo emails a GUIDs...")
-            guid_cache: dict[str, str | None] = {}
             pm_guid = await resolve_email_to_guid(client, token, proj["pm_email"], guid_cache)
             lider_guid = await resolve_email_to_guid(client, token, proj["lider_email"], guid_cache)
 
@@ -441,39 +504,50 @@ async def run_create_environment(
             print("\n  [TEAMS] Creando canal de proyecto...")
             channel_id = ""
             channel_url = ""
-            try:
-                channel = await create_team_channel(client, token, group_id, proj["project_name"])
-                channel_id = channel["id"]
-                channel_url = channel.get("webUrl", "")
-                print(f"    channel_id : {channel_id}")
-                print(f"    channel_url: {channel_url}")
-            except httpx.HTTPStatusError as exc:
-                if exc.response.status_code == 404:
-                    raise RuntimeError(
-                        f"El grupo '{group_id}' no tiene Teams habilitado. "
-                        "Ejecuta PUT /groups/{group_id}/team para habilitarlo "
-                        "y vuelve a ejecutar el script."
-                    ) from exc
-                elif exc.response.status_code in (400, 409):
-                    print(f"    [skip] Canal ya existe ({exc.response.status_code}) — recuperando ID...")
-                    channel_id, channel_url = await get_channel_by_name(
-                        client, token, group_id, proj["project_name"]
-                    )
-                    if channel_id:
-                        print(f"    channel_id (existing): {channel_id}")
-                        print(f"    channel_url          : {channel_url}")
+            stored_channel = journal.result(f"{pid}/channel")
+            if stored_channel is not None:
+                # Creado en una ejecución anterior: ya propagó, no hace falta esperar
+                channel_id, channel_url = stored_channel["id"], stored_channel.get("webUrl", "")
+                print(f"    [diario] channel_id: {channel_id}")
+            else:
+                try:
+                    channel = await create_team_channel(client, token, group_id, proj["project_name"])
+                    channel_id = channel["id"]
+                    channel_url = channel.get("webUrl", "")
+                    print(f"    channel_id : {channel_id}")
+                    print(f"    channel_url: {channel_url}")
+                except httpx.HTTPStatusError as exc:
+                    if exc.response.status_code == 404:
+                        raise RuntimeError(
+                            f"El grupo '{group_id}' no tiene Teams habilitado. "
+                            "Ejecuta PUT /groups/{group_id}/team para habilitarlo "
+                            "y vuelve a ejecutar el script."
+                        ) from exc
+                    elif exc.response.status_code in (400, 409):
+                        print(f"    [skip] Canal ya existe ({exc.response.status_code}) — recuperando ID...")
+                        channel_id, channel_url = await get_channel_by_name(
+                            client, token, group_id, proj["project_name"]
+                        )
+                        if channel_id:
+                            print(f"    channel_id (existing): {channel_id}")
+                            print(f"    channel_url          : {channel_url}")
+                        else:
+                            print(f"    [WARN] No se pudo recuperar channel_id del canal existente")
                     else:
-                        print(f"    [WARN] No se pudo recuperar channel_id del canal existente")
-                else:
-                    raise
-            print("    [wait] Esperando 60s para propagación del canal en Teams...")
-            await asyncio.sleep(60)
+                        raise
+                if channel_id:
+                    journal.done(f"{pid}/channel", {"id": channel_id, "webUrl": channel_url})
+                if CHANNEL_PROPAGATION_WAIT:
+                    print(f"    [wait] Esperando {CHANNEL_PROPAGATION_WAIT:g}s para propagación del canal en Teams...")
+                    # Con --deadline: si la espera no cabe en el plazo restante, se corta ya
+                    check_deadline(CHANNEL_PROPAGATION_WAIT, "propagación del canal")
+                    await asyncio.sleep(CHANNEL_PROPAGATION_WAIT)
 
             project_entry["channel_id"] = channel_id
             project_entry["channel_url"] = channel_url
 
             # ── [TEAMS — Members] ──────────────────────────────────────────────
-            if channel_id:
+            if channel_id and journal.result(f"{pid}/members") is None:
                 print("\n  [TEAMS] Agregando PM y Líder como Owners...")
                 for role_label, user_guid, user_email in [
                     ("PM",    pm_guid,    proj["pm_email"]),
@@ -490,11 +564,11 @@ async def run_create_environment(
                             print(f"    [skip] {role_label} ya es miembro (409)")
                         else:
                             raise
-                    await asyncio.sleep(0.5)
+                journal.done(f"{pid}/members", {})
 
             # ── [PLANNER] ──────────────────────────────────────────────────────
             print(f"\n  [PLANNER] Importando desde {proj['planner_csv']}...")
-            tasks, date_warnings = parse_csv(proj["planner_csv"])
+            tasks, date_warnings = plan_csvs[pid]
             for w in date_warnings:
                 print(f"    {w}")
 
@@ -510,12 +584,14 @@ async def run_create_environment(
             # Limpiar LABEL_MAP global antes de configurar nuevas categorías
             _pi.LABEL_MAP.clear()
 
-            token = auth.get_token()  # Refrescar antes del bloque de Planner
             print(f"    Creando plan '{proj['project_name']}'...")
-            plan = await create_plan(client, token, group_id, proj["project_name"])
+            plan = await journal.step(
+                f"{pid}/plan",
+                lambda: create_plan(client, token, group_id, proj["project_name"]),
+                find=lambda: find_named(list_plans(client, token, group_id), "title", proj["project_name"]),
+            )
             plan_id: str = plan["id"]
             print(f"    plan_id: {plan_id}")
-            await asyncio.sleep(2)
 
             print(f"    Configurando labels: {all_labels}")
             await configure_plan_labels(client, token, plan_id, all_labels)
@@ -523,30 +599,25 @@ async def run_create_environment(
             bucket_ids: dict[str, str] = {}
             print(f"    Creando {len(buckets_ordered)} buckets...")
             for bucket_name in buckets_ordered:
-                bucket = await create_bucket(client, token, plan_id, bucket_name)
+                bucket = await journal.step(
+                    f"{pid}/bucket:{bucket_name}",
+                    lambda: create_bucket(client, token, plan_id, bucket_name),
+                    find=lambda: find_named(list_buckets(client, token, plan_id), "name", bucket_name),
+                )
                 bucket_ids[bucket_name] = bucket["id"]
                 print(f"      ✓ '{bucket_name}'")
-                await asyncio.sleep(0.5)
 
-            task_ids: list[str] = []
-            task_guid_cache: dict[str, str | None] = {}
+            def placement(task: dict[str, Any]) -> tuple[str, str]:
+                return plan_id, bucket_ids[task["bucket_name"]]
+
+            imported = ImportResult(plan_id=plan_id, bucket_ids=bucket_ids)
             print(f"    Creando {len(tasks)} tareas...")
-            for i, task in enumerate(tasks, 1):
-                try:
-                    email = task.get("assignee_email", "")
-                    assignee_guid = (
-                        await resolve_email_to_guid(client, token, email, task_guid_cache)
-                        if email else None
-                    )
-                    bucket_id = bucket_ids[task["bucket_name"]]
-                    task_id = await create_task_full(
-                        client, token, plan_id, bucket_id, task, assignee_guid
-                    )
-                    task_ids.append(task_id)
-                    print(f"      [{i:02d}/{len(tasks)}] ✓ {task['title']}")
-                    await asyncio.sleep(0.3)
-                except Exception as exc:
-                    print(f"      [{i:02d}/{len(tasks)}] ✗ '{task['title']}': {exc}")
+            await adopt_unfinished_tasks(client, token, journal, tasks, placement, f"{pid}/")
+            await create_tasks_pipeline(
+                client, token, tasks, imported, placement,
+                journal=journal, op_prefix=f"{pid}/", guid_cache=guid_cache,
+            )
+            task_ids = imported.task_ids
 
             plan_url = f"https://tasks.office.com/{tenant_id}/Home/PlanViews/{plan_id}"
             project_entry["plan_id"] = plan_id
@@ -555,7 +626,10 @@ async def run_create_environment(
             project_entry["task_count"] = len(task_ids)
 
             # ── [TEAMS — Tab Planner] ──────────────────────────────────────────
-            if channel_id and plan_id:
+            stored_tab = journal.result(f"{pid}/tab")
+            if stored_tab is not None:
+                project_entry["tab_id"] = stored_tab["id"]
+            elif channel_id and plan_id:
                 print("\n  [TEAMS] Anclando tab Planner al canal...")
                 try:
                     tab = await add_planner_tab(
@@ -564,12 +638,12 @@ async def run_create_environment(
                     tab_id = tab.get("id", "")
                     print(f"    tab_id: {tab_id}")
                     project_entry["tab_id"] = tab_id
+                    journal.done(f"{pid}/tab", {"id": tab_id})
                 except httpx.HTTPStatusError as exc:
                     if exc.response.status_code == 409:
                         print(f"    [skip] Tab Planner ya existe (409)")
                     else:
                         print(f"    [WARN] No se pudo anclar tab Planner: {exc}")
-                await asyncio.sleep(0.5)
 
             # ── [SHAREPOINT — Carpetas] ────────────────────────────────────────
             print("\n  [SHAREPOINT] Creando carpetas de proyecto...")
@@ -577,16 +651,22 @@ async def run_create_environment(
             folder_id = ""
             folder_url = ""
 
-            try:
-                proj_folder = await create_sp_folder(client, token, site_id, root_id, folder_name)
-                folder_id = proj_folder["id"]
-                folder_url = proj_folder.get("webUrl", "")
-                print(f"    ✓ Carpeta principal: {folder_name}")
-            except httpx.HTTPStatusError as exc:
-                if exc.response.status_code == 409:
-                    print(f"    [skip] Carpeta '{folder_name}' ya existe (409)")
-                else:
-                    raise
+            stored_folder = journal.result(f"{pid}/folder")
+            if stored_folder is not None:
+                folder_id, folder_url = stored_folder["id"], stored_folder.get("webUrl", "")
+                print(f"    [diario] Carpeta principal: {folder_name}")
+            else:
+                try:
+                    proj_folder = await create_sp_folder(client, token, site_id, root_id, folder_name)
+                    folder_id = proj_folder["id"]
+                    folder_url = proj_folder.get("webUrl", "")
+                    print(f"    ✓ Carpeta principal: {folder_name}")
+                    journal.done(f"{pid}/folder", {"id": folder_id, "webUrl": folder_url})
+                except httpx.HTTPStatusError as exc:
+                    if exc.response.status_code == 409:
+                        print(f"    [skip] Carpeta '{folder_name}' ya existe (409)")
+                    else:
+                        raise
 
             project_entry["folder_id"] = folder_id
             project_entry["folder_url"] = folder_url
@@ -596,45 +676,57 @@ async def run_create_environment(
 
             if folder_id:
                 for sub in SUBCARPETAS:
+                    stored_sub = journal.result(f"{pid}/folder:{sub}")
+                    if stored_sub is not None:
+                        subfolder_ids[sub] = stored_sub["id"]
+                        if sub == "01_INICIO":
+                            inicio_folder_id = stored_sub["id"]
+                        continue
                     try:
                         sf = await create_sp_folder(client, token, site_id, folder_id, sub)
                         subfolder_ids[sub] = sf["id"]
                         if sub == "01_INICIO":
                             inicio_folder_id = sf["id"]
                         print(f"    ✓ Subcarpeta: {sub}")
+                        journal.done(f"{pid}/folder:{sub}", {"id": sf["id"]})
                     except httpx.HTTPStatusError as exc:
                         if exc.response.status_code == 409:
                             print(f"    [skip] Subcarpeta '{sub}' ya existe (409)")
                         else:
                             raise
-                    await asyncio.sleep(0.3)
 
             project_entry["subfolder_ids"] = subfolder_ids
 
             # ── [SHAREPOINT — Upload plantillas] ──────────────────────────────
             if inicio_folder_id:
                 print("\n  [SHAREPOINT] Subiendo plantillas a 01_INICIO...")
-                token = auth.get_token()  # Refrescar antes del upload
                 for template in [TEMPLATE_FICHA, TEMPLATE_ACTA]:
                     if not template.exists():
                         print(f"    [WARN] Plantilla no encontrada: {template}")
                         continue
+                    if journal.result(f"{pid}/upload:{template.name}") is not None:
+                        print(f"    [diario] {template.name} ya subida")
+                        continue
                     try:
                         await upload_file(client, token, site_id, inicio_folder_id, template)
                         print(f"    ✓ {template.name}")
+                        journal.done(f"{pid}/upload:{template.name}", {})
+                    except DeadlineExceeded:
+                        raise
                     except Exception as exc:
                         print(f"    [WARN] Error subiendo '{template.name}': {exc}")
-                    await asyncio.sleep(0.5)
 
             # ── [PERSISTENCIA] ────────────────────────────────────────────────
             config[proj["project_id"]] = project_entry
             save_project_config(config)
+            journal.done(f"{pid}/project", {})
             print(f"\n  ✓ '{proj['project_id']}' guardado en project_config.json")
 
     print(f"\n{'='*60}")
     print(f"Entornos creados: {len(projects)}")
     print(f"Config guardada en: {PROJECT_CONFIG_PATH.resolve()}")
     print(f"{'='*60}")
+    journal.close()
     return config
 
 
@@ -657,7 +749,62 @@ def main() -> None:
         "--dry-run", action="store_true",
         help="Simula sin llamar a la API — parsea CSV y muestra plan de acción",
     )
+    parser.add_argument(
+        "--batch", action="store_true",
+        help="Agrupa llamadas concurrentes en POST /$batch (equivale a GRAPH_BATCH=1)",
+    )
+    parser.add_argument(
+        "--directory-cache", action="store_true",
+        help="Guarda en disco email ↔ GUID ↔ nombre entre ejecuciones, con TTL (equivale a GRAPH_DIRECTORY_CACHE=1).",
+    )
+    parser.add_argument(
+        "--metrics-file", type=Path, default=None, metavar="RUTA",
+        help="Guarda métricas de Graph por endpoint al terminar (.json o texto Prometheus; equivale a GRAPH_METRICS_FILE).",
+    )
+    parser.add_argument(
+        "--deadline", type=parse_duration, default=None, metavar="DURACIÓN",
+        help="Plazo total de la ejecución, p. ej. 15m o 1h30m (equivale a GRAPH_DEADLINE).",
+    )
+    parser.add_argument(
+        "--resume", type=Path, default=None, metavar="DIARIO",
+        help="Continúa una ejecución interrumpida desde su diario (journals/*.jsonl); los "
+             "pasos y proyectos ya hechos no se repiten (equivale a GRAPH_RESUME).",
+    )
+    parser.add_argument(
+        "--emulator", action="store_true",
+        help="Habla con el emulador local de Graph en memoria, sin tenant ni token (equivale a GRAPH_EMULATOR=1).",
+    )
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument(
+        "--record", type=Path, default=None, metavar="DIR",
+        help="Graba todo el tráfico con Graph en DIR/cassette.jsonl.gz (equivale a GRAPH_RECORD).",
+    )
+    cassette.add_argument(
+        "--replay", type=Path, default=None, metavar="DIR",
+        help="Reproduce un cassette grabado con --record, sin red ni token (equivale a GRAPH_REPLAY).",
+    )
+    parser.add_argument(
+        "--replay-speed", type=float, default=None, metavar="X",
+        help="Con --replay: divide la latencia grabada por X (0 = sin esperas; equivale a GRAPH_REPLAY_SPEED).",
+    )
     args = parser.parse_args()
+    if args.emulator or emulator_requested():
+        install_emulator()
+    if args.record:
+        configure_cassette(CassetteConfig(mode="record", directory=args.record))
+    elif args.replay:
+        speed = args.replay_speed if args.replay_speed is not None else CassetteConfig.from_env().speed
+        configure_cassette(CassetteConfig(mode="replay", directory=args.replay, speed=speed))
+    if args.batch:
+        configure_batching(BatchConfig(enabled=True, window=BatchConfig.from_env().window))
+    if args.directory_cache:
+        configure_directory_cache(replace(DirectoryConfig.from_env(), enabled=True))
+    if args.metrics_file:
+        configure_metrics(args.metrics_file)
+    if args.resume:
+        configure_journal(replace(journal_config(), resume=args.resume))
+    if args.deadline is not None:
+        configure_deadlines(DeadlineConfig(run=args.deadline, phases=deadline_config().phases))
 
     print("-" * 41)
     print("  create_environment.py -- Etapa 1")
@@ -666,10 +813,19 @@ def main() -> None:
     print(f"Group ID : {args.group_id}")
     if args.dry_run:
         print("Modo     : Simulación — sin llamadas a Graph API")
+    if args.resume:
+        print(f"Reanudar : {args.resume}")
     print()
 
-    asyncio.run(run_create_environment(args.csv, args.group_id, args.dry_run))
+    run_with_graph_client(run_create_environment(args.csv, args.group_id, args.dry_run))
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except JournalMismatch as exc:
+        sys.exit(f"[ERROR] {exc}")
+    except DeadlineExceeded as exc:
+        sys.exit(f"[ERROR] {exc}{resume_hint()}")
+    except KeyboardInterrupt:
+        sys.exit(f"\n[INTERRUMPIDO]{resume_hint()}")
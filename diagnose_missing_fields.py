@@ -35,6 +35,8 @@ load_dotenv(MCP_PATH / ".env")
 from src.auth.microsoft import MicrosoftAuthManager
 from src.config import Settings
 
+from graph_auth import cached_token
+
 # Importar httpx para raw requests
 import httpx
 
@@ -58,7 +60,7 @@ async def diagnose_fields(group_id: str, plan_id: str) -> None:
     )
 
     # Obtener token
-    token = auth.get_token()
+    token = cached_token(auth, settings.azure_tenant_id, settings.azure_client_id)
     headers = {
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json"
@@ -0,0 +1,416 @@
+"""
+graph_auth.py — Proveedor asíncrono de tokens para Microsoft Graph.
+
+Los orquestadores llamaban a MicrosoftAuthManager.get_token() (síncrono, MSAL) en el
+propio event loop y re-pedían el token "por si acaso" en scripts largos. Ahora crean
+un AsyncTokenProvider y lo pasan en lugar del string del token; graph_request()
+lo resuelve en cada intento:
+
+  - el token se cachea hasta poco antes de su expiración (claim `exp` del JWT);
+  - dentro del margen de refresco se sigue usando el token vigente mientras se
+    renueva en segundo plano, así ninguna petición espera al refresco;
+  - la llamada bloqueante a MSAL corre en un executor, nunca en el event loop;
+  - todas las peticiones concurrentes comparten un único refresco en vuelo;
+  - invalidate() descarta el token (graph_request() lo usa ante un 401).
+
+Además, DiskTokenCache comparte el token entre procesos: planner_import, create_environment,
+los scripts de diagnóstico y hooks/session-start.py reutilizan el token vigente en disco
+(cifrado, con bloqueo de archivo, por tenant + client + scope) en vez de pedir uno nuevo
+a AAD en cada arranque.
+
+Uso:
+  token = AsyncTokenProvider.from_auth_manager(auth, tenant_id=..., client_id=...)
+  await graph_request(client, "GET", "/planner/plans/...", token)
+
+  token = cached_token(auth, tenant_id, client_id)      # scripts síncronos
+
+FUTURO MCP: src/auth/microsoft.py → MicrosoftAuthManager.get_token_async()
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterator, Protocol, Union
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken  # extra opcional fuera de Windows
+    FERNET_AVAILABLE = True
+except ImportError:
+    FERNET_AVAILABLE = False
+
+# Margen antes de `exp` en el que se renueva el token en segundo plano
+REFRESH_MARGIN = 300.0
+# Vida supuesta si el token no es un JWT con `exp` (los de client-credentials duran ~60-90 min)
+DEFAULT_LIFETIME = 3000.0
+GRAPH_SCOPE = "https://graph.microsoft.com/.default"
+DEFAULT_CACHE_DIR = Path.home() / ".fornado-planner" / "token-cache"
+
+
+def _offline_token() -> str | None:
+    """Token fijo si hay un cassette en reproducción (graph_cassette) o un emulador
+    instalado (graph_emulator). Sólo pueden estar activos si el CLI ya importó su módulo,
+    así que aquí no se importan: hooks/session-start.py sólo carga lo necesario para el token."""
+    cassette = sys.modules.get("graph_cassette")
+    if cassette is not None and cassette.replaying():
+        return cassette.REPLAY_TOKEN
+    emulator = sys.modules.get("graph_emulator")
+    if emulator is not None and emulator.emulating():
+        return emulator.EMULATOR_TOKEN
+    return None
+
+
+def _jwt_claims(token: str) -> dict[str, Any] | None:
+    """Claims de un JWT, sin verificar firma. None si no es un JWT."""
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    payload = parts[1] + "=" * (-len(parts[1]) % 4)
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+    except ValueError:
+        return None
+    return claims if isinstance(claims, dict) else None
+
+
+def token_expiry(token: str) -> float | None:
+    """Epoch de expiración (`exp`) de un JWT, sin verificar firma. None si no es un JWT."""
+    try:
+        return float((_jwt_claims(token) or {})["exp"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def token_identity(token: str) -> str:
+    """Identidad estable entre renovaciones del token (tenant + app/usuario), para claves
+    de caché. Si no es un JWT con esos claims, hash del propio token.
+    """
+    claims = _jwt_claims(token) or {}
+    tid = claims.get("tid")
+    principal = claims.get("oid") or claims.get("appid") or claims.get("azp")
+    if tid and principal:
+        return f"{tid}:{principal}"
+    return hashlib.sha256(token.encode()).hexdigest()[:32]
+
+
+class AsyncTokenProvider:
+    """Token de Graph cacheado con refresco proactivo y no bloqueante."""
+
+    def __init__(
+        self,
+        fetch: Callable[[], str],
+        *,
+        refresh_margin: float = REFRESH_MARGIN,
+        default_lifetime: float = DEFAULT_LIFETIME,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.default_lifetime = default_lifetime
+        self._clock = clock
+        self._token: str | None = None
+        self._expires_at: float = 0.0
+        self._refresh: asyncio.Task | None = None
+        self.refresh_count: int = 0
+
+    @classmethod
+    def from_auth_manager(
+        cls,
+        auth: Any,
+        *,
+        tenant_id: str | None = None,
+        client_id: str | None = None,
+        scope: str = GRAPH_SCOPE,
+        **kwargs: Any,
+    ) -> AsyncTokenProvider:
+        """Envuelve un MicrosoftAuthManager (o cualquier objeto con get_token()).
+        Con tenant_id y client_id el token pasa además por la caché en disco compartida.
+        """
+        fetch: Callable[[], str]
+        offline = _offline_token()
+        if offline is not None:
+            # Cassette en reproducción o emulador: no se contacta Entra ID
+            fetch = lambda: offline  # noqa: E731
+        elif tenant_id and client_id:
+            fetch = token_fetcher(auth, tenant_id, client_id, scope)
+        else:
+            fetch = auth.get_token
+        return cls(fetch, **kwargs)
+
+    async def get(self) -> str:
+        now = self._clock()
+        if self._token is not None and now < self._expires_at:
+            if now >= self._expires_at - self.refresh_margin:
+                self._start_refresh()   # en segundo plano; se sigue usando el vigente
+            return self._token
+        return await asyncio.shield(self._start_refresh())
+
+    def invalidate(self) -> None:
+        """Descarta el token actual (y su copia en disco): la próxima get() espera a uno nuevo."""
+        self._token = None
+        self._expires_at = 0.0
+        if isinstance(self._fetch, CachedTokenFetch):
+            self._fetch.invalidate()
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.create_task(self._do_refresh())
+        return self._refresh
+
+    async def _do_refresh(self) -> str:
+        loop = asyncio.get_running_loop()
+        token = await loop.run_in_executor(None, self._fetch)
+        exp = token_expiry(token)
+        self._token = token
+        self._expires_at = exp if exp is not None else self._clock() + self.default_lifetime
+        self.refresh_count += 1
+        return token
+
+
+TokenLike = Union[str, AsyncTokenProvider]
+
+
+# ── Caché de tokens en disco ──────────────────────────────────────────────────
+
+class TokenCipher(Protocol):
+    def encrypt(self, data: bytes) -> bytes: ...
+    def decrypt(self, data: bytes) -> bytes: ...
+
+
+class DpapiCipher:
+    """Cifrado con DPAPI de Windows: sólo el mismo usuario en la misma máquina descifra."""
+
+    def encrypt(self, data: bytes) -> bytes:
+        return _dpapi("CryptProtectData", data)
+
+    def decrypt(self, data: bytes) -> bytes:
+        return _dpapi("CryptUnprotectData", data)
+
+
+def _dpapi(func_name: str, data: bytes) -> bytes:
+    import ctypes
+    from ctypes import wintypes
+
+    class _Blob(ctypes.Structure):
+        _fields_ = [("cbData", wintypes.DWORD), ("pbData", ctypes.POINTER(ctypes.c_char))]
+
+    buf = ctypes.create_string_buffer(data, len(data))
+    blob_in = _Blob(len(data), ctypes.cast(buf, ctypes.POINTER(ctypes.c_char)))
+    blob_out = _Blob()
+    func = getattr(ctypes.windll.crypt32, func_name)
+    # CRYPTPROTECT_UI_FORBIDDEN = 0x01: nunca mostrar diálogos (hooks sin consola)
+    if not func(ctypes.byref(blob_in), None, None, None, None, 0x01, ctypes.byref(blob_out)):
+        raise OSError(f"{func_name} falló")
+    try:
+        return ctypes.string_at(blob_out.pbData, blob_out.cbData)
+    finally:
+        ctypes.windll.kernel32.LocalFree(blob_out.pbData)
+
+
+class FernetCipher:
+    """Cifrado Fernet (paquete cryptography) con clave local de permisos 0600."""
+
+    def __init__(self, key_path: Path) -> None:
+        self._fernet = Fernet(_read_or_create_key(key_path))
+
+    def encrypt(self, data: bytes) -> bytes:
+        return self._fernet.encrypt(data)
+
+    def decrypt(self, data: bytes) -> bytes:
+        try:
+            return self._fernet.decrypt(data)
+        except InvalidToken as exc:
+            raise ValueError("token cifrado inválido") from exc
+
+
+def _read_or_create_key(key_path: Path) -> bytes:
+    """Clave Fernet de la caché; la crea si no existe. La clave se escribe completa en un
+    temporal y se enlaza en su sitio: otro proceso que arranque a la vez lee la clave
+    entera o la del primero que la publicó, nunca un archivo a medio escribir."""
+    key_path.parent.mkdir(parents=True, exist_ok=True)
+    if key_path.exists():
+        return key_path.read_bytes().strip()
+    key = Fernet.generate_key()
+    fd, tmp = tempfile.mkstemp(dir=key_path.parent, prefix=".key-")   # 0600
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(key)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.link(tmp, key_path)
+        except FileExistsError:
+            return key_path.read_bytes().strip()    # ganó otro proceso: se usa su clave
+        except OSError:
+            os.replace(tmp, key_path)               # sistema de archivos sin enlaces duros
+        return key
+    finally:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+
+
+def default_cipher(directory: Path) -> TokenCipher | None:
+    """DPAPI en Windows, Fernet si cryptography está instalado; None → sin caché en disco."""
+    if sys.platform == "win32":
+        return DpapiCipher()
+    if FERNET_AVAILABLE:
+        return FernetCipher(directory / "key")
+    return None
+
+
+@contextlib.contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Bloqueo exclusivo entre procesos sobre `path` (msvcrt en Windows, flock en POSIX)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        if sys.platform == "win32":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class DiskTokenCache:
+    """Tokens cifrados en disco, un archivo por (tenant, client, scope).
+
+    Sólo se reutiliza un token al que le quedan más de `min_validity` segundos, para
+    que el AsyncTokenProvider no tenga que refrescarlo nada más arrancar. Cualquier
+    fallo de lectura, descifrado o escritura se trata como "no hay caché": el token
+    se pide a AAD como siempre.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        cipher: TokenCipher,
+        *,
+        min_validity: float = REFRESH_MARGIN,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.directory = directory
+        self.cipher = cipher
+        self.min_validity = min_validity
+        self._clock = clock
+
+    @classmethod
+    def from_env(cls) -> DiskTokenCache | None:
+        """GRAPH_TOKEN_CACHE=0 la desactiva; GRAPH_TOKEN_CACHE_DIR cambia la carpeta."""
+        if os.environ.get("GRAPH_TOKEN_CACHE", "").strip().lower() in ("0", "false", "no"):
+            return None
+        directory = Path(os.environ.get("GRAPH_TOKEN_CACHE_DIR", "").strip() or DEFAULT_CACHE_DIR)
+        try:
+            cipher = default_cipher(directory)
+        except (OSError, ValueError):
+            # ValueError: clave ilegible (p. ej. vacía) — se sigue sin caché en disco
+            return None
+        return cls(directory, cipher) if cipher is not None else None
+
+    def path(self, tenant_id: str, client_id: str, scope: str = GRAPH_SCOPE) -> Path:
+        digest = hashlib.sha256(f"{tenant_id}|{client_id}|{scope}".encode()).hexdigest()[:32]
+        return self.directory / f"{digest}.bin"
+
+    def load(self, tenant_id: str, client_id: str, scope: str = GRAPH_SCOPE) -> str | None:
+        try:
+            raw = self.path(tenant_id, client_id, scope).read_bytes()
+            entry = json.loads(self.cipher.decrypt(raw))
+            token, expires_at = entry["token"], float(entry["expires_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if expires_at - self._clock() <= self.min_validity:
+            return None
+        return token
+
+    def store(self, tenant_id: str, client_id: str, token: str, scope: str = GRAPH_SCOPE) -> None:
+        expires_at = token_expiry(token) or self._clock() + DEFAULT_LIFETIME
+        path = self.path(tenant_id, client_id, scope)
+        tmp = path.with_suffix(".tmp")
+        try:
+            data = self.cipher.encrypt(json.dumps({"token": token, "expires_at": expires_at}).encode())
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except (OSError, ValueError):
+            pass
+
+    def discard(self, tenant_id: str, client_id: str, scope: str = GRAPH_SCOPE) -> None:
+        with contextlib.suppress(OSError):
+            self.path(tenant_id, client_id, scope).unlink()
+
+    def get_or_fetch(
+        self, tenant_id: str, client_id: str, fetch: Callable[[], str], scope: str = GRAPH_SCOPE,
+    ) -> str:
+        """Token de la caché o, si no hay uno vigente, de `fetch()`.
+        El bloqueo se mantiene durante fetch(): dos procesos que arrancan a la vez
+        hacen un solo viaje a AAD y el segundo lee el token del primero.
+        """
+        with contextlib.ExitStack() as stack:
+            try:
+                stack.enter_context(_file_lock(self.path(tenant_id, client_id, scope).with_suffix(".lock")))
+            except OSError:
+                return fetch()
+            token = self.load(tenant_id, client_id, scope)
+            if token is None:
+                token = fetch()
+                self.store(tenant_id, client_id, token, scope)
+            return token
+
+
+class CachedTokenFetch:
+    """fetch() síncrono que pasa por DiskTokenCache (lo que usa AsyncTokenProvider)."""
+
+    def __init__(
+        self, fetch: Callable[[], str], cache: DiskTokenCache,
+        tenant_id: str, client_id: str, scope: str = GRAPH_SCOPE,
+    ) -> None:
+        self._fetch = fetch
+        self.cache = cache
+        self.key = (tenant_id, client_id)
+        self.scope = scope
+
+    def __call__(self) -> str:
+        return self.cache.get_or_fetch(*self.key, self._fetch, self.scope)
+
+    def invalidate(self) -> None:
+        self.cache.discard(*self.key, self.scope)
+
+
+def token_fetcher(
+    auth: Any, tenant_id: str, client_id: str, scope: str = GRAPH_SCOPE,
+) -> Callable[[], str]:
+    """auth.get_token envuelto en la caché en disco (o tal cual si está desactivada)."""
+    cache = DiskTokenCache.from_env()
+    if cache is None:
+        return auth.get_token
+    return CachedTokenFetch(auth.get_token, cache, tenant_id, client_id, scope)
+
+
+def cached_token(auth: Any, tenant_id: str, client_id: str, scope: str = GRAPH_SCOPE) -> str:
+    """Versión síncrona para scripts cortos y hooks: token de la caché en disco o de AAD."""
+    return token_fetcher(auth, tenant_id, client_id, scope)()
+
+
+async def resolve_token(token: TokenLike) -> str:
+    """String del bearer token, tanto si se recibe el token como un proveedor."""
+    if isinstance(token, str):
+        return token
+    return await token.get()
@@ -0,0 +1,250 @@
+"""
+graph_batch.py — Micro-batching transparente de graph_request() sobre POST /$batch.
+
+Junta las llamadas concurrentes que llegan dentro de una ventana corta (por defecto
+10 ms) y las envía como un único POST /$batch de hasta 20 peticiones. Cada respuesta
+del lote —incluidos los 429 por ítem con su propio Retry-After— se devuelve al
+coroutine que la originó como un httpx.Response normal, de modo que graph_request()
+aplica exactamente el mismo manejo de errores y reintentos que sin batching.
+
+Sólo agrupa peticiones que ya eran concurrentes (asyncio.gather, semáforos de los
+reportes); un bucle secuencial sigue enviando una petición por vez.
+
+Activación (desactivado por defecto):
+  GRAPH_BATCH=1                               variable de entorno
+  python planner_import.py --batch ...        flag CLI
+  graph_batch.configure_batching(BatchConfig(enabled=True))
+
+Cada ítem ocupa su cupo de concurrencia del workload (send_with_retry, con su prioridad)
+antes de encolarse, así que un lote nunca supera el presupuesto del servicio y las
+lecturas BACKGROUND esperan detrás de las INTERACTIVE igual que sin batching. Las
+peticiones se encolan ANTES de pasar por el throttle: al vaciar la cola, el batcher
+reserva un hueco del ThrottleController del workload de cada ítem y luego envía el lote.
+Así el AIMD sigue contando cada ítem por separado (Graph evalúa los límites por
+petición individual, no por lote) sin que el espaciado impida juntar peticiones.
+
+FUTURO MCP: graph/client.py → GraphAPIClient.batch()
+"""
+from __future__ import annotations
+
+import asyncio
+import json as jsonlib
+import os
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+
+from graph_client import classify_workload, throttle_controller
+
+BATCH_MAX_REQUESTS = 20  # límite de Graph por POST /$batch
+BATCHABLE_METHODS = frozenset({"GET", "POST", "PATCH", "PUT", "DELETE"})
+
+# Cabeceras que van en el POST /$batch externo, no en cada ítem
+_OUTER_HEADERS = frozenset({"authorization", "accept"})
+
+
+@dataclass
+class BatchConfig:
+    enabled: bool = False
+    window: float = 0.01            # segundos que se espera a juntar peticiones concurrentes
+    max_size: int = BATCH_MAX_REQUESTS
+
+    @classmethod
+    def from_env(cls) -> BatchConfig:
+        enabled = os.environ.get("GRAPH_BATCH", "").strip().lower() in ("1", "true", "yes", "si", "sí")
+        window_ms = os.environ.get("GRAPH_BATCH_WINDOW_MS", "").strip()
+        return cls(
+            enabled=enabled,
+            window=float(window_ms) / 1000 if window_ms else cls.window,
+        )
+
+
+@dataclass
+class _PendingItem:
+    method: str
+    graph_base: str
+    endpoint: str
+    headers: dict[str, str]
+    json: Any
+    future: asyncio.Future = field(repr=False)
+
+
+class GraphBatcher:
+    """Cola de peticiones por (cliente, token) que se vacía en lotes /$batch."""
+
+    def __init__(self, config: BatchConfig | None = None) -> None:
+        self.config = config or BatchConfig.from_env()
+        self._pending: dict[tuple[int, str, str], list[_PendingItem]] = {}
+        self._clients: dict[tuple[int, str, str], httpx.AsyncClient] = {}
+        self._tasks: set[asyncio.Task] = set()   # referencias fuertes: evita que el GC cancele flushes
+        self.batches_sent: int = 0
+        self.items_sent: int = 0
+
+    def is_batchable(self, method: str, endpoint: str) -> bool:
+        return (
+            self.config.enabled
+            and method.upper() in BATCHABLE_METHODS
+            and endpoint.startswith("/")
+            and not endpoint.startswith("/$batch")
+        )
+
+    async def send(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        graph_base: str,
+        endpoint: str,
+        headers: dict[str, str],
+        json: Any = None,
+    ) -> httpx.Response:
+        """Encola la petición y espera su respuesta individual."""
+        key = (id(client), graph_base, headers.get("Authorization", ""))
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        queue = self._pending.setdefault(key, [])
+        queue.append(_PendingItem(method.upper(), graph_base, endpoint, headers, json, future))
+        self._clients[key] = client
+        if len(queue) >= self.config.max_size:
+            self._start_flush(key)
+        elif len(queue) == 1:
+            self._spawn(self._flush_after_window(key, queue))
+        return await future
+
+    def _spawn(self, coro: Any) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_after_window(self, key: tuple[int, str, str], queue: list[_PendingItem]) -> None:
+        try:
+            await asyncio.sleep(self.config.window)
+        except asyncio.CancelledError:
+            if self._pending.get(key) is queue:
+                self._pending.pop(key)
+                self._clients.pop(key, None)
+                _fail(queue, None)
+            raise
+        # La cola pudo haberse vaciado ya por llegar a max_size
+        if self._pending.get(key) is queue:
+            self._start_flush(key)
+
+    def _start_flush(self, key: tuple[int, str, str]) -> None:
+        items = self._pending.pop(key, [])
+        client = self._clients.pop(key)
+        if items:
+            self._spawn(self._flush(client, items))
+
+    async def _flush(self, client: httpx.AsyncClient, items: list[_PendingItem]) -> None:
+        try:
+            for item in items:
+                await throttle_controller(classify_workload(item.endpoint)).acquire()
+            if len(items) == 1:
+                item = items[0]
+                resp = await client.request(
+                    item.method,
+                    f"{item.graph_base}{item.endpoint}",
+                    headers=item.headers,
+                    json=item.json,
+                )
+                _resolve(item, resp)
+                return
+            await self._flush_batch(client, items)
+        except BaseException as exc:
+            # También si se cancela el flush: ningún llamador puede quedarse esperando
+            _fail(items, exc if isinstance(exc, Exception) else None)
+            if not isinstance(exc, Exception):
+                raise
+
+    async def _flush_batch(self, client: httpx.AsyncClient, items: list[_PendingItem]) -> None:
+        outer_headers = {
+            k: v for k, v in items[0].headers.items() if k.lower() in _OUTER_HEADERS
+        }
+        outer_headers["Content-Type"] = "application/json"
+        payload = {
+            "requests": [
+                _batch_entry(str(i), item) for i, item in enumerate(items, 1)
+            ]
+        }
+        resp = await client.request(
+            "POST", f"{items[0].graph_base}/$batch", headers=outer_headers, json=payload,
+        )
+        self.batches_sent += 1
+        self.items_sent += len(items)
+
+        if resp.status_code >= 400:
+            # Fallo del lote completo (p. ej. 429 global): cada llamador ve esa respuesta
+            for item in items:
+                _resolve(item, resp)
+            return
+
+        by_id = {r.get("id"): r for r in (resp.json() or {}).get("responses", [])}
+        for i, item in enumerate(items, 1):
+            data = by_id.get(str(i))
+            if data is None:
+                data = {"status": 500, "body": {"error": {"message": "Respuesta ausente en $batch"}}}
+            _resolve(item, self._item_response(item, data))
+
+    def _item_response(self, item: _PendingItem, data: dict[str, Any]) -> httpx.Response:
+        """Convierte un ítem de `responses` en un httpx.Response equivalente al directo."""
+        headers = dict(data.get("headers") or {})
+        body = data.get("body")
+        if body is None:
+            content = b""
+        elif isinstance(body, (dict, list)):
+            content = jsonlib.dumps(body).encode("utf-8")
+            headers.setdefault("Content-Type", "application/json")
+        else:
+            content = str(body).encode("utf-8")
+        return httpx.Response(
+            int(data.get("status", 500)),
+            headers=headers,
+            content=content,
+            request=httpx.Request(item.method, f"{item.graph_base}{item.endpoint}"),
+        )
+
+
+def _batch_entry(request_id: str, item: _PendingItem) -> dict[str, Any]:
+    entry: dict[str, Any] = {"id": request_id, "method": item.method, "url": item.endpoint}
+    inner = {k: v for k, v in item.headers.items() if k.lower() not in _OUTER_HEADERS}
+    if item.json is None:
+        inner.pop("Content-Type", None)
+    else:
+        entry["body"] = item.json
+        inner["Content-Type"] = "application/json"
+    if inner:
+        entry["headers"] = inner
+    return entry
+
+
+def _resolve(item: _PendingItem, resp: httpx.Response) -> None:
+    if not item.future.done():
+        item.future.set_result(resp)
+
+
+def _fail(items: list[_PendingItem], exc: Exception | None) -> None:
+    """Termina los ítems aún sin respuesta con `exc` (None = cancelados)."""
+    for item in items:
+        if item.future.done():
+            continue
+        if exc is None:
+            item.future.cancel()
+        else:
+            item.future.set_exception(exc)
+
+
+_BATCHER: GraphBatcher | None = None
+
+
+def graph_batcher() -> GraphBatcher:
+    """Batcher de proceso (configurado desde el entorno la primera vez)."""
+    global _BATCHER
+    if _BATCHER is None:
+        _BATCHER = GraphBatcher()
+    return _BATCHER
+
+
+def configure_batching(config: BatchConfig) -> GraphBatcher:
+    """Reemplaza el batcher de proceso (p. ej. al activar --batch)."""
+    global _BATCHER
+    _BATCHER = GraphBatcher(config)
+    return _BATCHER
@@ -0,0 +1,176 @@
+"""
+graph_cache.py — Caché HTTP en disco para lecturas de Graph (GET condicional con ETag).
+
+graph_request() consulta esta caché en cada GET. Si hay una copia guardada, la petición
+sale con If-None-Match: <etag>. Si Graph responde 304 Not Modified, se devuelve el
+cuerpo guardado sin descargarlo de nuevo. Si responde 200, la copia se reemplaza.
+Siempre se revalida con Graph, así que nunca se sirve un dato que haya cambiado.
+
+Sólo se guardan respuestas que traen ETag (cabecera ETag o @odata.etag en el cuerpo):
+tareas, detalles, planes y buckets individuales de Planner. Las colecciones sin ETag
+(listados paginados) no se cachean.
+
+Cada entrada es un JSON (permisos 0600) bajo GRAPH_CACHE_DIR, con clave por identidad
+del token (tenant + aplicación/usuario) y URL. Al superar el tamaño o el número máximo
+de entradas se descartan las usadas hace más tiempo (LRU por fecha de acceso).
+
+Activación (desactivada por defecto):
+  GRAPH_CACHE=1                                variable de entorno
+  python planner_import.py --cache ...         flag CLI
+  graph_cache.configure_cache(CacheConfig(enabled=True))
+
+FUTURO MCP: graph/client.py → GraphAPIClient (caché de lecturas)
+"""
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+DEFAULT_CACHE_DIR = Path.home() / ".fornado-planner" / "graph-cache"
+
+
+@dataclass
+class CacheConfig:
+    enabled: bool = False
+    directory: Path = field(default_factory=lambda: DEFAULT_CACHE_DIR)
+    max_bytes: int = 64 * 1024 * 1024
+    max_entries: int = 20_000
+
+    @classmethod
+    def from_env(cls) -> CacheConfig:
+        enabled = os.environ.get("GRAPH_CACHE", "").strip().lower() in ("1", "true", "yes", "si", "sí")
+        directory = os.environ.get("GRAPH_CACHE_DIR", "").strip()
+        max_mb = os.environ.get("GRAPH_CACHE_MAX_MB", "").strip()
+        return cls(
+            enabled=enabled,
+            directory=Path(directory) if directory else DEFAULT_CACHE_DIR,
+            max_bytes=int(float(max_mb) * 1024 * 1024) if max_mb else cls.max_bytes,
+        )
+
+
+@dataclass
+class CachedResponse:
+    etag: str
+    body: Any
+
+
+class ResponseCache:
+    """Respuestas GET con ETag en disco, con expulsión LRU por tamaño y número de entradas."""
+
+    def __init__(self, config: CacheConfig | None = None) -> None:
+        self.config = config or CacheConfig.from_env()
+        # clave de archivo → (bytes, último acceso); se carga del disco la primera vez
+        self._index: dict[str, tuple[int, float]] | None = None
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    @staticmethod
+    def key(identity: str, url: str) -> str:
+        return hashlib.sha256(f"{identity}\n{url}".encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.config.directory / f"{key}.json"
+
+    def _load_index(self) -> dict[str, tuple[int, float]]:
+        if self._index is None:
+            self._index = {}
+            with contextlib.suppress(OSError):
+                for entry in os.scandir(self.config.directory):
+                    if entry.name.endswith(".json"):
+                        st = entry.stat()
+                        self._index[entry.name[:-5]] = (st.st_size, st.st_mtime)
+        return self._index
+
+    def lookup(self, key: str) -> CachedResponse | None:
+        """Copia guardada (para enviar If-None-Match) o None."""
+        if key not in self._load_index():
+            self.misses += 1
+            return None
+        try:
+            data = json.loads(self._path(key).read_text(encoding="utf-8"))
+            return CachedResponse(etag=data["etag"], body=data["body"])
+        except (OSError, ValueError, KeyError):
+            self._discard(key)
+            self.misses += 1
+            return None
+
+    def touch(self, key: str) -> None:
+        """Graph confirmó la copia (304): cuenta como uso reciente para el LRU."""
+        self.hits += 1
+        now = time.time()
+        with contextlib.suppress(OSError):
+            os.utime(self._path(key), (now, now))
+        index = self._load_index()
+        if key in index:
+            index[key] = (index[key][0], now)
+
+    def store(self, key: str, etag: str, body: Any) -> None:
+        payload = json.dumps({"etag": etag, "body": body}, ensure_ascii=False).encode("utf-8")
+        if len(payload) > self.config.max_bytes:
+            return
+        path = self._path(key)
+        tmp = path.with_suffix(".tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        self._load_index()[key] = (len(payload), time.time())
+        self._evict()
+
+    def _discard(self, key: str) -> None:
+        self._load_index().pop(key, None)
+        with contextlib.suppress(OSError):
+            self._path(key).unlink()
+
+    def _evict(self) -> None:
+        index = self._load_index()
+        total = sum(size for size, _ in index.values())
+        if total <= self.config.max_bytes and len(index) <= self.config.max_entries:
+            return
+        for key, (size, _) in sorted(index.items(), key=lambda kv: kv[1][1]):
+            if total <= self.config.max_bytes and len(index) <= self.config.max_entries:
+                break
+            self._discard(key)
+            total -= size
+            self.evictions += 1
+
+
+def response_etag(resp_headers: Any, body: Any) -> str | None:
+    """ETag de una respuesta: cabecera ETag o, en Planner, @odata.etag del cuerpo."""
+    etag = resp_headers.get("ETag")
+    if not etag and isinstance(body, dict):
+        etag = body.get("@odata.etag")
+    return etag or None
+
+
+_CACHE: ResponseCache | None = None
+
+
+def response_cache() -> ResponseCache:
+    """Caché de proceso (configurada desde el entorno la primera vez)."""
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = ResponseCache()
+    return _CACHE
+
+
+def configure_cache(config: CacheConfig) -> ResponseCache:
+    """Reemplaza la caché de proceso (p. ej. al activar --cache)."""
+    global _CACHE
+    _CACHE = ResponseCache(config)
+    return _CACHE
@@ -0,0 +1,290 @@
+"""
+graph_cassette.py — Grabación y reproducción del tráfico con Graph ("cassettes").
+
+Permite medir y probar cualquier modo de planner_import.py / create_environment.py
+sin el tenant real:
+
+  python planner_import.py --mode report --record cassettes/report      graba
+  python planner_import.py --mode report --replay cassettes/report      reproduce
+  python planner_import.py --mode report --replay cassettes/report --replay-speed 0
+
+La grabación se hace en el transporte httpx del pool compartido (graph_client), así que
+queda todo lo que sale a la red: cada intento (también los 429/503 con su Retry-After),
+las llamadas POST /$batch y las descargas binarias. Cada intercambio guarda método, URL,
+huella del cuerpo enviado, status, cabeceras útiles, cuerpo recibido, instante de inicio
+y latencia. El archivo es <dir>/cassette.jsonl.gz. Nunca se graban Authorization ni
+otras cabeceras de la petición.
+
+Al reproducir, cada petición se empareja con la siguiente grabada con mismo método, URL
+y cuerpo; si el cuerpo cambió (p. ej. fechas calculadas al ejecutar) se acepta la
+siguiente con mismo método y URL. La respuesta se entrega tras la latencia original
+dividida por la velocidad (GRAPH_REPLAY_SPEED / --replay-speed; 0 = sin espera). Una
+petición sin pareja lanza CassetteMiss. En reproducción no se pide token a Entra ID.
+
+Las esperas por Retry-After de la RetryPolicy son del propio cliente y no se aceleran.
+
+Equivalentes por entorno: GRAPH_RECORD=<dir>, GRAPH_REPLAY=<dir>.
+
+FUTURO MCP: tests de integración de graph/client.py
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+CASSETTE_FILE = "cassette.jsonl.gz"
+REPLAY_TOKEN = "cassette-replay-token"
+
+# Cabeceras de respuesta que el cliente usa (reintentos, ETag, paginación, uploads)
+_KEPT_HEADERS = ("content-type", "etag", "retry-after", "location", "x-ms-throttle-limit-percentage")
+
+
+class CassetteMiss(RuntimeError):
+    """La petición no está en el cassette (el flujo divergió de la grabación)."""
+
+
+def body_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()[:16] if content else ""
+
+
+@dataclass
+class Interaction:
+    method: str
+    url: str
+    request_hash: str
+    status: int
+    headers: dict[str, str]
+    body: bytes
+    started: float
+    elapsed: float
+
+    def to_json(self) -> dict[str, Any]:
+        data: dict[str, Any] = {
+            "method": self.method,
+            "url": self.url,
+            "req": self.request_hash,
+            "status": self.status,
+            "headers": self.headers,
+            "t": round(self.started, 4),
+            "elapsed": round(self.elapsed, 4),
+        }
+        try:
+            data["text"] = self.body.decode("utf-8")
+        except UnicodeDecodeError:
+            data["b64"] = base64.b64encode(self.body).decode("ascii")
+        return data
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> Interaction:
+        if "b64" in data:
+            body = base64.b64decode(data["b64"])
+        else:
+            body = data.get("text", "").encode("utf-8")
+        return cls(
+            method=data["method"],
+            url=data["url"],
+            request_hash=data.get("req", ""),
+            status=data["status"],
+            headers=data.get("headers", {}),
+            body=body,
+            started=data.get("t", 0.0),
+            elapsed=data.get("elapsed", 0.0),
+        )
+
+    def response(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(self.status, headers=self.headers, content=self.body, request=request)
+
+
+class Cassette:
+    """Lista ordenada de intercambios, con lectura/escritura en <dir>/cassette.jsonl.gz."""
+
+    def __init__(self, directory: Path, interactions: list[Interaction] | None = None) -> None:
+        self.directory = directory
+        self.interactions: list[Interaction] = interactions or []
+        self._queues: dict[tuple[str, str, str], deque[Interaction]] | None = None
+        self._loose: dict[tuple[str, str], deque[Interaction]] | None = None
+
+    @property
+    def path(self) -> Path:
+        return self.directory / CASSETTE_FILE
+
+    @classmethod
+    def load(cls, directory: Path) -> Cassette:
+        path = directory / CASSETTE_FILE
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            interactions = [Interaction.from_json(json.loads(line)) for line in f if line.strip()]
+        return cls(directory, interactions)
+
+    def save(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            for interaction in self.interactions:
+                f.write(json.dumps(interaction.to_json(), ensure_ascii=False, separators=(",", ":")))
+                f.write("\n")
+        os.replace(tmp, self.path)
+
+    def take(self, method: str, url: str, request_hash: str) -> Interaction:
+        """Siguiente intercambio grabado para la petición (cada uno se entrega una vez)."""
+        if self._queues is None:
+            self._queues, self._loose = {}, {}
+            for interaction in self.interactions:
+                exact = (interaction.method, interaction.url, interaction.request_hash)
+                self._queues.setdefault(exact, deque()).append(interaction)
+                self._loose.setdefault((interaction.method, interaction.url), deque()).append(interaction)
+        assert self._loose is not None
+        exact_queue = self._queues.get((method, url, request_hash))
+        loose_queue = self._loose.get((method, url))
+        chosen = exact_queue[0] if exact_queue else (loose_queue[0] if loose_queue else None)
+        if chosen is None:
+            raise CassetteMiss(f"{method} {url} no está en {self.path}")
+        self._queues[(chosen.method, chosen.url, chosen.request_hash)].remove(chosen)
+        self._loose[(chosen.method, chosen.url)].remove(chosen)
+        return chosen
+
+    @property
+    def remaining(self) -> int:
+        if self._loose is None:
+            return len(self.interactions)
+        return sum(len(q) for q in self._loose.values())
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Reenvía al transporte real y anota cada intercambio en el cassette."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, cassette: Cassette, clock=time.perf_counter) -> None:
+        self._inner = inner
+        self._cassette = cassette
+        self._clock = clock
+        self._origin = clock()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = self._clock()
+        response = await self._inner.handle_async_request(request)
+        try:
+            raw = b"".join([chunk async for chunk in response.stream])
+        finally:
+            await response.aclose()
+        elapsed = self._clock() - started
+        # El cassette guarda el cuerpo ya descomprimido; al cliente le llega tal cual
+        body = httpx.Response(response.status_code, headers=response.headers, content=raw).content
+        self._cassette.interactions.append(Interaction(
+            method=request.method,
+            url=str(request.url),
+            request_hash=body_hash(request.content),
+            status=response.status_code,
+            headers={k: v for k, v in response.headers.items() if k.lower() in _KEPT_HEADERS},
+            body=body,
+            started=started - self._origin,
+            elapsed=elapsed,
+        ))
+        return httpx.Response(
+            response.status_code, headers=response.headers, content=raw,
+            request=request, extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+        self._cassette.save()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Responde desde el cassette, con la latencia grabada dividida por `speed`."""
+
+    def __init__(self, cassette: Cassette, speed: float = 1.0) -> None:
+        self._cassette = cassette
+        self.speed = speed
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        interaction = self._cassette.take(request.method, str(request.url), body_hash(request.content))
+        if self.speed > 0 and interaction.elapsed > 0:
+            await asyncio.sleep(interaction.elapsed / self.speed)
+        return interaction.response(request)
+
+
+# ── Configuración de proceso ──────────────────────────────────────────────────
+
+@dataclass
+class CassetteConfig:
+    mode: str | None = None          # None | "record" | "replay"
+    directory: Path | None = None
+    speed: float = 1.0
+
+    @classmethod
+    def from_env(cls) -> CassetteConfig:
+        record = os.environ.get("GRAPH_RECORD", "").strip()
+        replay = os.environ.get("GRAPH_REPLAY", "").strip()
+        speed = os.environ.get("GRAPH_REPLAY_SPEED", "").strip()
+        if record and replay:
+            raise ValueError("GRAPH_RECORD y GRAPH_REPLAY no pueden usarse a la vez")
+        if record:
+            return cls(mode="record", directory=Path(record))
+        if replay:
+            return cls(mode="replay", directory=Path(replay), speed=float(speed) if speed else 1.0)
+        return cls()
+
+
+class CassetteSession:
+    """Cassette de proceso: lo comparten todos los pools que abra graph_client."""
+
+    def __init__(self, config: CassetteConfig | None = None) -> None:
+        self.config = config or CassetteConfig.from_env()
+        self._cassette: Cassette | None = None
+
+    @property
+    def mode(self) -> str | None:
+        return self.config.mode
+
+    @property
+    def cassette(self) -> Cassette:
+        if self._cassette is None:
+            assert self.config.directory is not None
+            if self.config.mode == "replay":
+                self._cassette = Cassette.load(self.config.directory)
+            else:
+                self._cassette = Cassette(self.config.directory)
+        return self._cassette
+
+    def transport(self, client_kwargs: dict[str, Any]) -> httpx.AsyncBaseTransport | None:
+        """Transporte para un pool nuevo (None = el de httpx por defecto)."""
+        if self.mode == "replay":
+            return ReplayTransport(self.cassette, self.config.speed)
+        if self.mode == "record":
+            inner = client_kwargs.get("transport") or httpx.AsyncHTTPTransport(
+                http2=client_kwargs.get("http2", False), limits=client_kwargs["limits"],
+            )
+            return RecordingTransport(inner, self.cassette)
+        return None
+
+
+_SESSION: CassetteSession | None = None
+
+
+def cassette_session() -> CassetteSession:
+    """Sesión de proceso (GRAPH_RECORD / GRAPH_REPLAY del entorno la primera vez)."""
+    global _SESSION
+    if _SESSION is None:
+        _SESSION = CassetteSession()
+    return _SESSION
+
+
+def configure_cassette(config: CassetteConfig) -> CassetteSession:
+    """Reemplaza la sesión de proceso (p. ej. desde --record / --replay)."""
+    global _SESSION
+    _SESSION = CassetteSession(config)
+    return _SESSION
+
+
+def replaying() -> bool:
+    return cassette_session().mode == "replay"
@@ -0,0 +1,815 @@
+"""
+graph_client.py — Infraestructura compartida de transporte hacia Microsoft Graph.
+
+Un único pool httpx.AsyncClient (HTTP/2 + keep-alive) reutilizado por todos los
+orquestadores de planner_import.py y create_environment.py, en lugar de abrir un
+cliente HTTP/1.1 nuevo por cada run_*.
+
+Incluye además el control de ritmo (ThrottleController, AIMD) y de concurrencia por
+servicio de Graph (WorkloadRegistry: planner, users, threads, mail, drive, teams) por
+el que pasa cada llamada de graph_request(), sustituyendo los asyncio.sleep fijos, y la
+política de reintentos (RetryPolicy) para 429/5xx transitorios, timeouts y cortes de red.
+Cada intento queda registrado en graph_metrics (latencia, colas, bytes, reintentos).
+Los GET idénticos concurrentes comparten una sola llamada (SingleFlight). Los cupos
+de concurrencia se reparten por prioridad (Priority): una lectura interactiva adelanta
+a las de enriquecimiento en segundo plano que ya esperaban.
+Con --record / --replay el pool graba o reproduce el tráfico (graph_cassette).
+Con --deadline / --enrichment-budget cada llamada respeta el plazo activo (graph_deadline).
+
+Diseñado para migración futura al MCP fornado-planner-mcp:
+  GraphClient / GraphClientConfig → graph/client.py (GraphAPIClient)
+  ThrottleController             → graph/client.py (_make_request)
+  RetryPolicy / send_with_retry  → graph/client.py (_make_request)
+
+Uso:
+  async with shared_graph_client() as client:
+      await graph_request(client, "GET", "/planner/plans/...", token)
+
+  run_with_graph_client(run_report(...))   # asyncio.run + cierre ordenado del pool
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Any, AsyncIterator, Awaitable, Callable, Coroutine, Iterator, Mapping, TypeVar
+
+import httpx
+
+from graph_cassette import cassette_session
+from graph_deadline import DeadlineExceeded, check_deadline, deadline_config, deadline_scope, run_within_deadline
+from graph_metrics import graph_metrics, report_metrics
+
+try:
+    import h2  # noqa: F401 — extra opcional: pip install "httpx[http2]"
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+T = TypeVar("T")
+
+
+# ── Configuración del pool ────────────────────────────────────────────────────
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.environ.get(name, "").strip()
+    return float(raw) if raw else default
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.environ.get(name, "").strip()
+    return int(raw) if raw else default
+
+
+@dataclass
+class GraphClientConfig:
+    """Parámetros del pool de conexiones hacia Graph.
+
+    Con HTTP/2 una sola conexión TLS multiplexa muchas peticiones concurrentes;
+    max_connections sólo limita cuántas conexiones físicas se abren como máximo.
+    """
+    http2: bool = True
+    max_connections: int = 64
+    max_keepalive_connections: int = 32
+    keepalive_expiry: float = 90.0
+    connect_timeout: float = 10.0
+    read_timeout: float = 60.0
+    write_timeout: float = 60.0
+    pool_timeout: float = 30.0
+    # Transporte httpx alternativo (p. ej. graph_emulator); None = red real
+    transport: httpx.AsyncBaseTransport | None = None
+
+    @classmethod
+    def from_env(cls) -> GraphClientConfig:
+        """Lee overrides GRAPH_* del entorno (vacío → valor por defecto)."""
+        base = cls()
+        return cls(
+            http2=os.environ.get("GRAPH_HTTP2", "1").strip().lower() not in ("0", "false", "no"),
+            max_connections=_env_int("GRAPH_MAX_CONNECTIONS", base.max_connections),
+            max_keepalive_connections=_env_int("GRAPH_MAX_KEEPALIVE", base.max_keepalive_connections),
+            keepalive_expiry=_env_float("GRAPH_KEEPALIVE_EXPIRY", base.keepalive_expiry),
+            connect_timeout=_env_float("GRAPH_CONNECT_TIMEOUT", base.connect_timeout),
+            read_timeout=_env_float("GRAPH_READ_TIMEOUT", base.read_timeout),
+            write_timeout=_env_float("GRAPH_WRITE_TIMEOUT", base.write_timeout),
+            pool_timeout=_env_float("GRAPH_POOL_TIMEOUT", base.pool_timeout),
+        )
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout,
+        )
+
+    def client_kwargs(self) -> dict[str, Any]:
+        """kwargs para httpx.AsyncClient. HTTP/2 sólo si el paquete h2 está instalado."""
+        kwargs: dict[str, Any] = {
+            "http2": self.http2 and HTTP2_AVAILABLE,
+            "limits": self.limits(),
+            "timeout": self.timeout(),
+        }
+        if self.transport is not None:
+            kwargs["transport"] = self.transport
+        return kwargs
+
+
+# ── Cliente compartido ────────────────────────────────────────────────────────
+
+class GraphClient:
+    """Dueño del pool httpx.AsyncClient compartido.
+
+    El pool se crea de forma perezosa en el primer `async with` y se mantiene vivo
+    entre orquestadores del mismo event loop (salir del `async with` NO lo cierra).
+    Si cambia el loop (otro asyncio.run), se abre un pool nuevo: las conexiones
+    httpx no son transferibles entre loops.
+    """
+
+    def __init__(self, config: GraphClientConfig | None = None) -> None:
+        self.config = config or GraphClientConfig.from_env()
+        self._raw: Any = None
+        self._client: httpx.AsyncClient | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def get(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            kwargs = self.config.client_kwargs()
+            transport = cassette_session().transport(kwargs)   # --record / --replay
+            if transport is not None:
+                kwargs["transport"] = transport
+            self._raw = httpx.AsyncClient(**kwargs)
+            self._client = await self._raw.__aenter__()
+            self._loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        """Cierra el pool si pertenece al loop actual; en otro caso sólo lo descarta."""
+        raw, loop = self._raw, self._loop
+        self._raw = self._client = self._loop = None
+        if raw is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if loop is running:
+            await raw.__aexit__(None, None, None)
+
+    async def __aenter__(self) -> httpx.AsyncClient:
+        return await self.get()
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_SHARED_CLIENT: GraphClient | None = None
+
+
+def shared_graph_client() -> GraphClient:
+    """Devuelve el GraphClient de proceso (lo crea con GraphClientConfig.from_env())."""
+    global _SHARED_CLIENT
+    if _SHARED_CLIENT is None:
+        _SHARED_CLIENT = GraphClient()
+    return _SHARED_CLIENT
+
+
+def configure_graph_client(config: GraphClientConfig) -> GraphClient:
+    """Reemplaza el cliente de proceso por uno con `config`. El pool anterior se descarta."""
+    global _SHARED_CLIENT
+    _SHARED_CLIENT = GraphClient(config)
+    return _SHARED_CLIENT
+
+
+async def aclose_graph_client() -> None:
+    """Cierra el pool compartido (llamar al final del event loop)."""
+    if _SHARED_CLIENT is not None:
+        await _SHARED_CLIENT.aclose()
+
+
+def run_with_graph_client(coro: Coroutine[Any, Any, T]) -> T:
+    """asyncio.run(coro) cerrando el pool compartido antes de que termine el loop.
+    Al terminar imprime el resumen de graph_metrics (y escribe su archivo, si se pidió).
+    Con plazo de ejecución (--deadline / GRAPH_DEADLINE) la corrutina se cancela al
+    vencer y se lanza graph_deadline.DeadlineExceeded.
+    """
+    async def _main() -> T:
+        try:
+            with deadline_scope(deadline_config().run, "ejecución"):
+                return await run_within_deadline(coro)
+        finally:
+            await aclose_graph_client()
+            report_metrics()
+
+    return asyncio.run(_main())
+
+
+# ── Control de ritmo adaptativo (AIMD) ────────────────────────────────────────
+
+# Códigos con los que Graph indica throttling (503 suele traer Retry-After también)
+THROTTLE_STATUS: frozenset[int] = frozenset({429, 503})
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Retry-After en segundos (entero, decimal o fecha HTTP). None si falta o es inválido."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class ThrottleConfig:
+    """Parámetros del controlador AIMD (ritmos en peticiones/segundo)."""
+    initial_rate: float = 20.0
+    min_rate: float = 0.5
+    max_rate: float = 100.0
+    slow_start: bool = True          # hasta el primer 429/503: +1 req/s por respuesta (≈ ×2 por segundo)
+    additive_increase: float = 1.0   # tras el primer throttling: ≈ +1 req/s por segundo
+    decrease_factor: float = 0.5     # ritmo × 0.5 ante 429/503
+    decrease_cooldown: float = 1.0   # una ráfaga de 429 concurrentes recorta sólo una vez
+    burst: float = 10.0              # peticiones que pueden salir juntas sin espaciar
+    default_pause: float = 5.0       # pausa global si el 429/503 no trae Retry-After
+
+
+class ThrottleController:
+    """Ritmo global de peticiones a Graph con AIMD y pausa compartida.
+
+    - acquire(): espacia las peticiones al ritmo actual (GCRA / token bucket
+      virtual) y espera si hay una pausa global activa.
+    - on_success(): arranque rápido (slow start) hasta el primer throttling y
+      después incremento aditivo del ritmo.
+    - on_throttled(): recorte multiplicativo del ritmo y pausa de TODAS las
+      peticiones hasta que venza el Retry-After.
+    Cada acquire() calcula su espera una sola vez (sin bucles sobre el reloj), de
+    modo que con asyncio.sleep mockeado los tests no quedan colgados.
+    """
+
+    def __init__(self, config: ThrottleConfig | None = None) -> None:
+        self.config = config or ThrottleConfig()
+        self.rate: float = self.config.initial_rate
+        self._tat: float = 0.0              # theoretical arrival time (GCRA)
+        self._paused_until: float = 0.0
+        self._pause_gen: int = 0
+        self._last_decrease: float = float("-inf")
+        self.throttled_count: int = 0
+
+    def _reserve(self, now: float) -> float:
+        """Reserva el siguiente hueco y devuelve cuántos segundos esperar."""
+        interval = 1.0 / self.rate
+        tolerance = max(self.config.burst - 1.0, 0.0) * interval
+        start = max(now, self._paused_until)
+        tat = max(self._tat, start)
+        send_at = max(start, tat - tolerance)
+        self._tat = max(tat, send_at) + interval
+        return send_at - now
+
+    async def acquire(self) -> None:
+        while True:
+            gen = self._pause_gen
+            delay = self._reserve(time.monotonic())
+            if delay > 0:
+                # Una pausa que no cabe en el plazo activo falla ya en lugar de dormir
+                check_deadline(delay, "pausa de throttling")
+                await asyncio.sleep(delay)
+            # Si otra petición recibió un 429 mientras esperábamos, respetar la nueva pausa
+            if self._pause_gen == gen:
+                return
+
+    def on_success(self) -> None:
+        """Respuesta 2xx/3xx de Graph. Los 4xx no dicen nada del límite y no se cuentan."""
+        if self.config.slow_start and self.throttled_count == 0:
+            step = 1.0
+        else:
+            step = self.config.additive_increase / self.rate
+        self.rate = min(self.config.max_rate, self.rate + step)
+
+    def on_throttled(self, retry_after: float | None) -> float:
+        """Registra un 429/503. Devuelve la pausa global aplicada (segundos)."""
+        now = time.monotonic()
+        self.throttled_count += 1
+        if now - self._last_decrease >= self.config.decrease_cooldown:
+            self.rate = max(self.config.min_rate, self.rate * self.config.decrease_factor)
+            self._last_decrease = now
+        wait = retry_after if retry_after is not None else self.config.default_pause
+        self._paused_until = max(self._paused_until, now + wait)
+        self._pause_gen += 1
+        return wait
+
+    @property
+    def paused_for(self) -> float:
+        return max(self._paused_until - time.monotonic(), 0.0)
+
+
+# ── Presupuestos por servicio (workloads) ─────────────────────────────────────
+
+# Graph limita cada servicio por separado: Planner, directorio, hilos de grupo, correo,
+# SharePoint y Teams tienen cuotas independientes. Cada endpoint se clasifica en un
+# workload con su propio ThrottleController y su propio límite de concurrencia, de modo
+# que un 429 de Planner no frena las búsquedas de usuarios ni viceversa.
+# El orden importa: la primera regla que coincide gana.
+WORKLOAD_RULES: tuple[tuple[str, re.Pattern[str]], ...] = (
+    ("threads", re.compile(r"^/groups/[^/]+/(threads|conversations)")),
+    ("mail", re.compile(r"^/(me|users/[^/]+)/sendMail")),
+    ("planner", re.compile(r"^/(planner|groups/[^/]+/planner)")),
+    ("users", re.compile(r"^/(users|directoryObjects|me)(/|\?|$)")),
+    ("drive", re.compile(r"^/(sites|drives)(/|$)")),
+    ("teams", re.compile(r"^/(teams|groups/[^/]+/team)(/|$)")),
+)
+DEFAULT_WORKLOAD = "graph"
+
+
+def classify_workload(endpoint: str) -> str:
+    """Workload de un endpoint relativo a GRAPH_BASE (p. ej. '/planner/tasks/x' → 'planner')."""
+    for name, pattern in WORKLOAD_RULES:
+        if pattern.match(endpoint):
+            return name
+    return DEFAULT_WORKLOAD
+
+
+@dataclass
+class WorkloadLimits:
+    """Límite de peticiones simultáneas y ritmo AIMD de un workload."""
+    concurrency: int
+    throttle: ThrottleConfig = field(default_factory=ThrottleConfig)
+
+
+def default_workload_limits() -> dict[str, WorkloadLimits]:
+    """Configuración única de presupuestos. sendMail: Exchange admite ~30 mensajes/min."""
+    return {
+        "planner": WorkloadLimits(8, ThrottleConfig()),
+        "users": WorkloadLimits(16, ThrottleConfig(initial_rate=30.0, max_rate=150.0)),
+        "threads": WorkloadLimits(4, ThrottleConfig(initial_rate=5.0, max_rate=20.0, burst=4.0)),
+        "mail": WorkloadLimits(2, ThrottleConfig(
+            initial_rate=0.5, min_rate=0.1, max_rate=0.5, burst=3.0, slow_start=False,
+        )),
+        "drive": WorkloadLimits(8, ThrottleConfig()),
+        "teams": WorkloadLimits(4, ThrottleConfig(initial_rate=5.0, max_rate=20.0, burst=4.0)),
+        DEFAULT_WORKLOAD: WorkloadLimits(8, ThrottleConfig()),
+    }
+
+
+def workload_limits_from_env() -> dict[str, WorkloadLimits]:
+    """Defaults con overrides GRAPH_<WORKLOAD>_CONCURRENCY / GRAPH_<WORKLOAD>_RATE."""
+    limits = default_workload_limits()
+    for name, lim in limits.items():
+        prefix = f"GRAPH_{name.upper()}"
+        lim.concurrency = _env_int(f"{prefix}_CONCURRENCY", lim.concurrency)
+        rate = _env_float(f"{prefix}_RATE", 0.0)
+        if rate > 0:
+            lim.throttle.initial_rate = rate
+            lim.throttle.max_rate = max(lim.throttle.max_rate, rate)
+    return limits
+
+
+# ── Prioridades ───────────────────────────────────────────────────────────────
+
+class Priority(IntEnum):
+    """Clase de prioridad de una llamada: menor valor = se atiende antes."""
+    CRITICAL = 0       # escrituras: otras llamadas dependen de su resultado
+    INTERACTIVE = 1    # lecturas cuyo resultado espera el usuario (listados de planes/tareas)
+    BACKGROUND = 2     # enriquecimiento: checklists, comentarios, nombres
+
+
+_PRIORITY: contextvars.ContextVar[Priority | None] = contextvars.ContextVar("graph_priority", default=None)
+
+
+def default_priority(method: str) -> Priority:
+    """Prioridad activa (request_priority) o, si no hay, la del método: escritura → CRITICAL."""
+    current = _PRIORITY.get()
+    if current is not None:
+        return current
+    return Priority.INTERACTIVE if method.upper() in ("GET", "HEAD") else Priority.CRITICAL
+
+
+@contextlib.contextmanager
+def request_priority(priority: Priority) -> Iterator[None]:
+    """Prioridad de las llamadas a Graph hechas dentro del bloque (y de las tareas creadas en él).
+
+    with request_priority(Priority.BACKGROUND):
+        await asyncio.gather(*[get_task_details(client, token, t) for t in ids])
+    """
+    reset = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(reset)
+
+
+class PrioritySemaphore:
+    """Semáforo que entrega cada cupo libre al que espera con mejor prioridad (FIFO a igualdad).
+
+    No expulsa a nadie: una llamada BACKGROUND ya enviada termina; lo que cambia es quién
+    entra cuando se libera un cupo. Con tráfico interactivo continuo el segundo plano espera.
+    """
+
+    def __init__(self, value: int) -> None:
+        self._value = value
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._seq = itertools.count()
+
+    def locked(self) -> bool:
+        return self._value == 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE) -> None:
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+        fut: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        entry = (int(priority), next(self._seq), fut)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Se le asignó el cupo justo al cancelarse: pasarlo al siguiente
+                self.release()
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._value += 1
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: Priority = Priority.INTERACTIVE) -> AsyncIterator[None]:
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, *exc: object) -> None:
+        self.release()
+
+
+class WorkloadRegistry:
+    """ThrottleController + semáforo por workload, compartidos por todo el proceso.
+
+    Los semáforos se recrean si cambia el event loop (otro asyncio.run), igual que
+    el pool de GraphClient. Un workload desconocido usa los límites de DEFAULT_WORKLOAD.
+    """
+
+    def __init__(self, limits: dict[str, WorkloadLimits] | None = None) -> None:
+        self.limits = limits or workload_limits_from_env()
+        self._throttles: dict[str, ThrottleController] = {}
+        self._semaphores: dict[str, PrioritySemaphore] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _limits_for(self, workload: str) -> WorkloadLimits:
+        return self.limits.get(workload) or self.limits[DEFAULT_WORKLOAD]
+
+    def throttle(self, workload: str = DEFAULT_WORKLOAD) -> ThrottleController:
+        if workload not in self._throttles:
+            self._throttles[workload] = ThrottleController(self._limits_for(workload).throttle)
+        return self._throttles[workload]
+
+    def semaphore(self, workload: str = DEFAULT_WORKLOAD) -> PrioritySemaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphores.clear()
+            self._loop = loop
+        if workload not in self._semaphores:
+            self._semaphores[workload] = PrioritySemaphore(self._limits_for(workload).concurrency)
+        return self._semaphores[workload]
+
+
+_WORKLOADS: WorkloadRegistry | None = None
+
+
+def workload_registry() -> WorkloadRegistry:
+    """Registro de workloads de proceso (GRAPH_<WORKLOAD>_* del entorno la primera vez)."""
+    global _WORKLOADS
+    if _WORKLOADS is None:
+        _WORKLOADS = WorkloadRegistry()
+    return _WORKLOADS
+
+
+def configure_workloads(limits: dict[str, WorkloadLimits]) -> WorkloadRegistry:
+    """Reemplaza el registro de proceso con otros presupuestos."""
+    global _WORKLOADS
+    _WORKLOADS = WorkloadRegistry(limits)
+    return _WORKLOADS
+
+
+def throttle_controller(workload: str = DEFAULT_WORKLOAD) -> ThrottleController:
+    """Controlador de ritmo del workload indicado (ver classify_workload())."""
+    return workload_registry().throttle(workload)
+
+
+def configure_throttle(config: ThrottleConfig, workload: str | None = None) -> ThrottleController:
+    """Reemplaza el ritmo de un workload, o de todos si workload es None (p. ej. benchmarks)."""
+    registry = workload_registry()
+    targets = [workload] if workload else list(registry.limits)
+    for name in targets:
+        registry.limits.setdefault(name, WorkloadLimits(registry._limits_for(name).concurrency))
+        registry.limits[name].throttle = config
+        registry._throttles.pop(name, None)
+    return registry.throttle(workload or DEFAULT_WORKLOAD)
+
+
+# ── Política de reintentos ────────────────────────────────────────────────────
+
+# 429/503 pasan además por el ThrottleController (pausa global); 502/504 son fallos
+# transitorios de gateway. 500 no se reintenta: en Planner suele ser un error real.
+RETRY_STATUS: frozenset[int] = THROTTLE_STATUS | {502, 504}
+RETRY_EXCEPTIONS: tuple[type[Exception], ...] = (
+    httpx.TimeoutException,
+    httpx.NetworkError,
+    httpx.RemoteProtocolError,
+)
+# Errores en los que la petición no llegó al servidor: seguros incluso para POST
+CONNECT_EXCEPTIONS: tuple[type[Exception], ...] = (httpx.ConnectError, httpx.ConnectTimeout)
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+def is_idempotent(method: str, headers: Mapping[str, str] | None = None) -> bool:
+    """GET/PUT/DELETE siempre; PATCH sólo con If-Match (un segundo PATCH falla con 412)."""
+    method = method.upper()
+    if method in IDEMPOTENT_METHODS:
+        return True
+    return method == "PATCH" and any(k.lower() == "if-match" for k in (headers or {}))
+
+
+@dataclass
+class RetryPolicy:
+    """Qué se reintenta, cuántas veces y cuánto tiempo como máximo por llamada.
+
+    La espera entre intentos usa decorrelated jitter (sleep = U(base, 3·anterior),
+    con tope max_delay); si Graph envía Retry-After, manda Retry-After. `budget`
+    limita el tiempo total de una llamada, esperas incluidas: si el siguiente
+    intento lo excedería, se abandona y se propaga el último error.
+
+    Las peticiones no idempotentes (POST, PATCH sin If-Match) sólo se reintentan
+    ante 429/503 y errores de conexión: un timeout o un 502/504 no garantiza que
+    Graph no haya creado ya la tarea/bucket/plan, y repetir duplicaría el recurso.
+    """
+    max_attempts: int = 6
+    budget: float = 300.0
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    retry_status: frozenset[int] = RETRY_STATUS
+    retry_exceptions: tuple[type[Exception], ...] = RETRY_EXCEPTIONS
+    retries: Counter = field(default_factory=Counter, compare=False)   # motivo → reintentos
+    exhausted: int = field(default=0, compare=False)                   # llamadas que agotaron la política
+
+    def __post_init__(self) -> None:
+        if self.max_attempts < 1:
+            raise ValueError(f"max_attempts debe ser >= 1 (recibido {self.max_attempts})")
+
+    @classmethod
+    def from_env(cls) -> RetryPolicy:
+        base = cls()
+        return cls(
+            max_attempts=_env_int("GRAPH_RETRY_MAX_ATTEMPTS", base.max_attempts),
+            budget=_env_float("GRAPH_RETRY_BUDGET", base.budget),
+            base_delay=_env_float("GRAPH_RETRY_BASE_DELAY", base.base_delay),
+            max_delay=_env_float("GRAPH_RETRY_MAX_DELAY", base.max_delay),
+        )
+
+    def backoff(self, previous: float) -> float:
+        """Siguiente espera con decorrelated jitter a partir de la anterior."""
+        upper = max(previous, self.base_delay) * 3
+        return min(self.max_delay, random.uniform(self.base_delay, upper))
+
+    def should_retry(
+        self,
+        resp: httpx.Response | None,
+        error: Exception | None,
+        idempotent: bool,
+    ) -> bool:
+        if resp is not None:
+            if resp.status_code in THROTTLE_STATUS:
+                return resp.status_code in self.retry_status
+            return idempotent and resp.status_code in self.retry_status
+        if isinstance(error, CONNECT_EXCEPTIONS):
+            return isinstance(error, self.retry_exceptions)
+        return idempotent and isinstance(error, self.retry_exceptions)
+
+
+_RETRY_POLICY: RetryPolicy | None = None
+
+
+def retry_policy() -> RetryPolicy:
+    """Política de reintentos de proceso (GRAPH_RETRY_* del entorno la primera vez)."""
+    global _RETRY_POLICY
+    if _RETRY_POLICY is None:
+        _RETRY_POLICY = RetryPolicy.from_env()
+    return _RETRY_POLICY
+
+
+def configure_retry(policy: RetryPolicy) -> RetryPolicy:
+    """Reemplaza la política de proceso."""
+    global _RETRY_POLICY
+    _RETRY_POLICY = policy
+    return _RETRY_POLICY
+
+
+async def send_with_retry(
+    send: Callable[[], Awaitable[httpx.Response]],
+    label: str,
+    *,
+    idempotent: bool,
+    workload: str = DEFAULT_WORKLOAD,
+    acquire: bool = True,
+    priority: Priority = Priority.INTERACTIVE,
+) -> httpx.Response:
+    """Ejecuta `send()` bajo el ThrottleController y la RetryPolicy de proceso.
+
+    Devuelve la primera respuesta no reintentable o, si la política se agota, la
+    última respuesta recibida (el llamador decide cómo reportarla). Si el último
+    intento terminó en excepción de red/timeout, la relanza. Ritmo y concurrencia son
+    los del `workload`. `acquire=False` cuando `send()` ya reserva su hueco del
+    throttle (p. ej. vía GraphBatcher); el cupo de concurrencia se ocupa siempre, también
+    por cada ítem de un lote. `priority` decide el orden en que las llamadas en cola
+    reciben cupo del workload.
+    """
+    policy = retry_policy()
+    registry = workload_registry()
+    throttle = registry.throttle(workload)
+    metrics = graph_metrics()
+    metrics.record_call(label)
+    start = time.monotonic()
+    delay = policy.base_delay
+
+    for attempt in range(1, policy.max_attempts + 1):
+        resp: httpx.Response | None = None
+        error: Exception | None = None
+        queued_at = sent_at = time.monotonic()
+
+        async def _attempt() -> httpx.Response:
+            nonlocal sent_at
+            async with registry.semaphore(workload).slot(priority):
+                if acquire:
+                    await throttle.acquire()
+                sent_at = time.monotonic()
+                return await send()
+
+        try:
+            resp = await run_within_deadline(_attempt(), label)
+        except DeadlineExceeded:
+            raise
+        except Exception as exc:
+            metrics.record_attempt(
+                label, type(exc).__name__, time.monotonic() - sent_at, queue_wait=sent_at - queued_at,
+            )
+            if not isinstance(exc, (*policy.retry_exceptions, *CONNECT_EXCEPTIONS)):
+                raise
+            error = exc
+        else:
+            metrics.record_attempt(
+                label, resp.status_code, time.monotonic() - sent_at, queue_wait=sent_at - queued_at,
+                bytes_out=_request_size(resp), bytes_in=_response_size(resp),
+            )
+        if not policy.should_retry(resp, error, idempotent):
+            if error is not None:
+                raise error
+            if resp.status_code < 400:
+                throttle.on_success()
+            return resp
+        if attempt == policy.max_attempts:
+            break
+
+        reason = type(error).__name__ if resp is None else str(resp.status_code)
+        retry_after = None if resp is None else parse_retry_after(resp.headers.get("Retry-After"))
+        if resp is not None and resp.status_code in THROTTLE_STATUS:
+            # La espera la aplica el próximo acquire() (propio o del batcher) como pausa global
+            wait = throttle.on_throttled(retry_after)
+            sleep_for = 0.0
+        else:
+            delay = policy.backoff(delay)
+            wait = sleep_for = retry_after if retry_after is not None else delay
+        check_deadline(wait, f"reintento de {label}")
+        if time.monotonic() - start + wait > policy.budget:
+            print(f"      [retry] {label}: presupuesto de {policy.budget:g}s agotado")
+            break
+
+        policy.retries[reason] += 1
+        metrics.record_retry(label, wait)
+        if resp is not None and resp.status_code in THROTTLE_STATUS:
+            print(f"      [throttle] {reason} — pausa {workload} {wait:g}s, ritmo {throttle.rate:.1f} req/s")
+        else:
+            print(f"      [retry] {label}: {reason} — reintento {attempt + 1}/{policy.max_attempts} en {wait:.1f}s")
+        if sleep_for:
+            await asyncio.sleep(sleep_for)
+
+    policy.exhausted += 1
+    if error is not None:
+        raise error
+    return resp
+
+
+def _request_size(resp: httpx.Response) -> int:
+    """Bytes del cuerpo enviado (0 si la respuesta no tiene request asociada, p. ej. en tests)."""
+    try:
+        return len(resp.request.content)
+    except (RuntimeError, httpx.RequestNotRead):
+        return 0
+
+
+def _response_size(resp: httpx.Response) -> int:
+    try:
+        return len(resp.content)
+    except httpx.ResponseNotRead:
+        return 0
+
+
+# ── Lecturas en vuelo compartidas (single-flight) ─────────────────────────────
+
+class SingleFlight:
+    """Comparte una única ejecución entre las llamadas concurrentes con la misma clave.
+
+    La primera llamada ejecuta `fn()`; las que llegan mientras sigue en vuelo esperan
+    su resultado y reciben el mismo objeto (o la misma excepción). Al terminar, la clave
+    se libera: la siguiente llamada vuelve a ir a la red. Si se cancela la llamada que
+    ejecuta `fn()`, las que esperaban no se cancelan: una de ellas toma el relevo.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: dict[Any, asyncio.Future] = {}
+        self.calls: int = 0
+        self.shared: int = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Any, fn: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        waited = False
+        while (fut := self._inflight.get(key)) is not None:
+            if not waited:
+                self.shared += 1
+                waited = True
+            try:
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                if not fut.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                # Se canceló quien hacía la llamada, no este llamador: se reintenta
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as exc:
+            fut.set_exception(exc)
+            fut.exception()   # marcada como leída aunque nadie más la esperara
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+
+
+_SINGLE_FLIGHT: SingleFlight | None = None
+
+
+def single_flight() -> SingleFlight:
+    """Mapa de proceso de lecturas GET en vuelo (usado por graph_request())."""
+    global _SINGLE_FLIGHT
+    if _SINGLE_FLIGHT is None:
+        _SINGLE_FLIGHT = SingleFlight()
+    return _SINGLE_FLIGHT
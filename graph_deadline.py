@@ -0,0 +1,174 @@
+"""
+graph_deadline.py — Plazos de ejecución y de fase, propagados hasta cada llamada a Graph.
+
+Un plazo es un instante absoluto (reloj monotónico) guardado en una variable de
+contexto: lo heredan las tareas asyncio creadas dentro del bloque, así que llega a
+graph_request() sin pasar parámetros. Los plazos anidados sólo pueden acortar: una fase
+de 2 min dentro de una ejecución a la que le quedan 30 s termina en 30 s.
+
+  Ejecución   --deadline 15m / GRAPH_DEADLINE=15m          run_with_graph_client()
+  Fase        --enrichment-budget 2m / GRAPH_ENRICHMENT_BUDGET=2m
+              with within(start_phase("enrichment")): ...  (por plan en report/email-report)
+
+Con un plazo activo, send_with_retry() no empieza un intento si ya venció, no duerme una
+pausa de throttling ni un backoff que no cabe (un Retry-After: 600 falla al momento con
+DeadlineExceeded en lugar de detener el script 10 minutos) y cancela el intento en curso
+al vencer, incluida la espera de cupo. Quien llama decide cómo degradar: los reportes
+capturan DeadlineExceeded en el enriquecimiento y dibujan la tabla sin esos datos.
+Al vencer el plazo de ejecución se cancela todo y el script termina con error.
+
+FUTURO MCP: graph/client.py (timeouts por operación)
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)?", re.IGNORECASE)
+_UNIT_SECONDS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001, "": 1.0}
+
+
+class DeadlineExceeded(TimeoutError):
+    """El plazo de la ejecución o de la fase venció, o la espera necesaria no cabe en él."""
+
+
+def parse_duration(text: str) -> float:
+    """'15m', '90s', '1h30m', '500ms' o '45' (segundos) → segundos."""
+    raw = text.strip().replace(" ", "")
+    if not raw:
+        raise ValueError("Duración vacía")
+    total, pos = 0.0, 0
+    for match in _DURATION.finditer(raw):
+        if match.start() != pos:
+            break
+        total += float(match.group(1)) * _UNIT_SECONDS[(match.group(2) or "").lower()]
+        pos = match.end()
+    if pos != len(raw):
+        raise ValueError(f"Duración no válida: '{text}' (ejemplos: 15m, 90s, 1h30m)")
+    return total
+
+
+@dataclass(frozen=True)
+class Deadline:
+    at: float        # time.monotonic() en que vence
+    label: str       # "ejecución", "enrichment"…
+
+    def remaining(self) -> float:
+        return self.at - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_DEADLINE: contextvars.ContextVar[Deadline | None] = contextvars.ContextVar("graph_deadline", default=None)
+
+
+def time_left() -> float | None:
+    """Segundos hasta el plazo activo (None = sin plazo)."""
+    deadline = _DEADLINE.get()
+    return None if deadline is None else deadline.remaining()
+
+
+@contextlib.contextmanager
+def within(deadline: Deadline | None) -> Iterator[Deadline | None]:
+    """Activa `deadline` para el bloque (None = sin cambio). Nunca alarga el plazo exterior;
+    el mismo Deadline puede activarse en varios bloques para repartir un único presupuesto."""
+    outer = _DEADLINE.get()
+    if deadline is None or (outer is not None and outer.at <= deadline.at):
+        yield outer
+        return
+    reset = _DEADLINE.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _DEADLINE.reset(reset)
+
+
+def deadline_scope(seconds: float | None, label: str) -> contextlib.AbstractContextManager[Deadline | None]:
+    """Plazo de `seconds` a partir de ahora para el bloque; None = sin cambio."""
+    return within(None if seconds is None else Deadline(time.monotonic() + seconds, label))
+
+
+def check_deadline(wait: float = 0.0, what: str = "") -> None:
+    """Lanza DeadlineExceeded si el plazo activo venció o si `wait` segundos no caben en él."""
+    deadline = _DEADLINE.get()
+    if deadline is None:
+        return
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise DeadlineExceeded(f"Plazo de {deadline.label} agotado{f' ({what})' if what else ''}")
+    if wait > remaining:
+        raise DeadlineExceeded(
+            f"{what or 'Espera'} de {wait:g}s no cabe en el plazo de {deadline.label} "
+            f"(quedan {remaining:.1f}s)"
+        )
+
+
+async def run_within_deadline(aw: Awaitable[T], what: str = "") -> T:
+    """Espera `aw` cancelándolo al vencer el plazo activo (DeadlineExceeded)."""
+    deadline = _DEADLINE.get()
+    if deadline is None:
+        return await aw
+    try:
+        check_deadline(what=what)
+    except DeadlineExceeded:
+        if asyncio.iscoroutine(aw):
+            aw.close()
+        raise
+    try:
+        return await asyncio.wait_for(aw, deadline.remaining())
+    except asyncio.TimeoutError:
+        if deadline.expired:
+            raise DeadlineExceeded(f"Plazo de {deadline.label} agotado{f' ({what})' if what else ''}") from None
+        raise
+
+
+# ── Configuración de proceso ──────────────────────────────────────────────────
+
+@dataclass
+class DeadlineConfig:
+    run: float | None = None                               # plazo total de la ejecución (s)
+    phases: dict[str, float] = field(default_factory=dict)   # fase → presupuesto (s)
+
+    @classmethod
+    def from_env(cls) -> DeadlineConfig:
+        run = os.environ.get("GRAPH_DEADLINE", "").strip()
+        enrichment = os.environ.get("GRAPH_ENRICHMENT_BUDGET", "").strip()
+        return cls(
+            run=parse_duration(run) if run else None,
+            phases={"enrichment": parse_duration(enrichment)} if enrichment else {},
+        )
+
+
+_CONFIG: DeadlineConfig | None = None
+
+
+def deadline_config() -> DeadlineConfig:
+    """Plazos de proceso (GRAPH_DEADLINE / GRAPH_ENRICHMENT_BUDGET del entorno la primera vez)."""
+    global _CONFIG
+    if _CONFIG is None:
+        _CONFIG = DeadlineConfig.from_env()
+    return _CONFIG
+
+
+def configure_deadlines(config: DeadlineConfig) -> DeadlineConfig:
+    """Reemplaza los plazos de proceso (p. ej. desde --deadline / --enrichment-budget)."""
+    global _CONFIG
+    _CONFIG = config
+    return _CONFIG
+
+
+def start_phase(phase: str) -> Deadline | None:
+    """Plazo de la fase `phase` contando desde ahora (None si no tiene presupuesto).
+    Activarlo con within() en cada bloque de la fase."""
+    budget = deadline_config().phases.get(phase)
+    return None if budget is None else Deadline(time.monotonic() + budget, phase)
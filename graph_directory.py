@@ -0,0 +1,164 @@
+"""
+graph_directory.py — Caché persistente del directorio (email ↔ GUID ↔ nombre) con TTL.
+
+Los mismos PMs, líderes y asignados se consultan en cada importación, reporte y
+email-report. Con esta caché, resolve_email_to_guid(), resolve_emails_bulk(),
+resolve_guid_to_email() y resolve_guid_to_display_name() miran primero en un SQLite
+local y sólo llaman a /users con lo que falta o ha caducado:
+
+  email → GUID          ("guid")
+  GUID  → mail / UPN    ("mail")
+  GUID  → displayName   ("name")
+
+Cada entrada caduca a las GRAPH_DIRECTORY_TTL (default 7 días). Un usuario que Graph
+confirma que no existe (404, o ausente en un $filter) se guarda como negativo con un TTL
+más corto (GRAPH_DIRECTORY_NEGATIVE_TTL, default 6 h), así un alta reciente se detecta
+el mismo día. Los fallos transitorios (429, 5xx, red) no se guardan.
+
+Las claves van por tenant (claim tid del token): el mismo archivo sirve para varios
+tenants sin mezclarlos. El archivo se crea con permisos 0600.
+
+Activación (desactivada por defecto):
+  GRAPH_DIRECTORY_CACHE=1                               variable de entorno
+  python planner_import.py --directory-cache ...        flag CLI
+  GRAPH_DIRECTORY_CACHE_PATH=<archivo>                  default ~/.fornado-planner/directory.sqlite
+  GRAPH_DIRECTORY_TTL=168h / GRAPH_DIRECTORY_NEGATIVE_TTL=6h
+
+FUTURO MCP: graph/client.py → GraphAPIClient (resolución de usuarios)
+"""
+from __future__ import annotations
+
+import contextlib
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from graph_deadline import parse_duration
+
+DEFAULT_DIRECTORY_PATH = Path.home() / ".fornado-planner" / "directory.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS directory (
+    tenant  TEXT NOT NULL,
+    kind    TEXT NOT NULL,
+    key     TEXT NOT NULL,
+    value   TEXT,
+    expires REAL NOT NULL,
+    PRIMARY KEY (tenant, kind, key)
+)
+"""
+
+
+@dataclass
+class DirectoryConfig:
+    enabled: bool = False
+    path: Path = field(default_factory=lambda: DEFAULT_DIRECTORY_PATH)
+    ttl: float = 7 * 24 * 3600.0             # entradas encontradas (s)
+    negative_ttl: float = 6 * 3600.0         # usuarios inexistentes (s)
+
+    @classmethod
+    def from_env(cls) -> DirectoryConfig:
+        enabled = os.environ.get("GRAPH_DIRECTORY_CACHE", "").strip().lower() in ("1", "true", "yes", "si", "sí")
+        path = os.environ.get("GRAPH_DIRECTORY_CACHE_PATH", "").strip()
+        ttl = os.environ.get("GRAPH_DIRECTORY_TTL", "").strip()
+        negative_ttl = os.environ.get("GRAPH_DIRECTORY_NEGATIVE_TTL", "").strip()
+        return cls(
+            enabled=enabled,
+            path=Path(path) if path else DEFAULT_DIRECTORY_PATH,
+            ttl=parse_duration(ttl) if ttl else cls.ttl,
+            negative_ttl=parse_duration(negative_ttl) if negative_ttl else cls.negative_ttl,
+        )
+
+
+class DirectoryCache:
+    """Entradas (tenant, tipo, clave) → valor en SQLite; valor None = no existe en el directorio."""
+
+    def __init__(self, config: DirectoryConfig | None = None) -> None:
+        self.config = config or DirectoryConfig.from_env()
+        self._db: sqlite3.Connection | None = None
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    def _connect(self) -> sqlite3.Connection | None:
+        if self._db is None and self.enabled:
+            path = self.config.path
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                if not path.exists():
+                    os.close(os.open(path, os.O_WRONLY | os.O_CREAT, 0o600))
+                db = sqlite3.connect(path, timeout=5.0)
+                db.execute(_SCHEMA)
+                db.execute("DELETE FROM directory WHERE expires < ?", (time.time(),))
+                db.commit()
+            except (OSError, sqlite3.Error) as exc:
+                print(f"      [WARN] Caché de directorio no disponible ({path}): {exc}")
+                self.config = DirectoryConfig(enabled=False)
+                return None
+            self._db = db
+        return self._db
+
+    def get(self, tenant: str, kind: str, key: str) -> tuple[bool, str | None]:
+        """(encontrado, valor). (True, None) = guardado como inexistente; (False, None) = no consta."""
+        db = self._connect()
+        if db is None:
+            return False, None
+        row = None
+        with contextlib.suppress(sqlite3.Error):
+            row = db.execute(
+                "SELECT value FROM directory WHERE tenant = ? AND kind = ? AND key = ? AND expires >= ?",
+                (tenant, kind, key.lower(), time.time()),
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, row[0]
+
+    def put(self, tenant: str, kind: str, key: str, value: str | None) -> None:
+        self.put_many(tenant, kind, {key: value})
+
+    def put_many(self, tenant: str, kind: str, values: dict[str, str | None]) -> None:
+        """Guarda varias entradas en una transacción; None = el usuario no existe (TTL negativo)."""
+        db = self._connect()
+        if db is None or not values:
+            return
+        now = time.time()
+        rows = [
+            (tenant, kind, key.lower(), value,
+             now + (self.config.ttl if value is not None else self.config.negative_ttl))
+            for key, value in values.items()
+        ]
+        with contextlib.suppress(sqlite3.Error):
+            db.executemany("INSERT OR REPLACE INTO directory VALUES (?, ?, ?, ?, ?)", rows)
+            db.commit()
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+_DIRECTORY: DirectoryCache | None = None
+
+
+def directory_cache() -> DirectoryCache:
+    """Caché de proceso (configurada desde el entorno la primera vez)."""
+    global _DIRECTORY
+    if _DIRECTORY is None:
+        _DIRECTORY = DirectoryCache()
+    return _DIRECTORY
+
+
+def configure_directory_cache(config: DirectoryConfig) -> DirectoryCache:
+    """Reemplaza la caché de proceso (p. ej. al activar --directory-cache)."""
+    global _DIRECTORY
+    if _DIRECTORY is not None:
+        _DIRECTORY.close()
+    _DIRECTORY = DirectoryCache(config)
+    return _DIRECTORY
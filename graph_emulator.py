@@ -0,0 +1,825 @@
+"""
+graph_emulator.py — Emulador local de Microsoft Graph para pruebas de carga sin tenant.
+
+Implementa en memoria los endpoints que usan planner_import.py y create_environment.py:
+
+  Planner   /planner/plans, /planner/buckets, /planner/tasks (+ /details),
+            /groups/{id}/planner/plans, /planner/plans/{id}/buckets|tasks
+  Usuarios  /users/{id|upn}, /users?$filter=mail|userPrincipalName in (…) / eq '…',
+            POST /directoryObjects/getByIds
+  Teams     /teams/{id}/channels (+ members, tabs), /teams/{id}/members
+  Grupos    /groups/{id}/threads/{id}/posts
+  Drive     /sites/{host}:{ruta}, /sites/{id}/drive/root (+ :/ruta, /children),
+            /sites/{id}/drive/items/{id}/children, PUT …/items/{id}:/{nombre}:/content
+  Correo    /me/sendMail
+  Lotes     /$batch
+
+con la semántica que importa al cliente: @odata.etag por entidad, If-Match obligatorio
+en PATCH/DELETE de Planner (412 si está desfasado), If-None-Match → 304, 409 al crear
+canales o carpetas duplicadas, paginación con @odata.nextLink y $top/$select, y
+$expand=details en el listado de tareas de un plan. Los grupos, usuarios y sitios se
+crean al vuelo la primera vez que se consultan.
+
+Opcionalmente simula latencia, un límite de peticiones por segundo por servicio
+(mismos workloads que graph_client: planner, users, threads, mail, drive, teams) con
+429 + Retry-After, 429 aleatorios y el retraso de replicación de Planner (404 al leer
+un recurso recién creado).
+
+Uso en proceso (transporte httpx del pool compartido, sin red):
+  python planner_import.py --emulator --csv grande.csv
+  GRAPH_EMULATOR=1 python create_environment.py --csv proyectos.csv
+
+Uso como servidor local (requiere uvicorn):
+  uvicorn graph_emulator:app --port 8765
+  GRAPH_BASE=http://127.0.0.1:8765/v1.0 python planner_import.py ...
+
+Con el emulador no se pide token a Entra ID.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import copy
+import json as jsonlib
+import math
+import os
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable
+from urllib.parse import parse_qsl, unquote
+
+import httpx
+
+from graph_client import GraphClientConfig, classify_workload, configure_graph_client
+
+EMULATOR_TOKEN = "graph-emulator-token"
+DEFAULT_PAGE_SIZE = 100
+PLANNER_PAGE_MAX = 400      # Planner ignora $top mayores
+
+
+@dataclass
+class EmulatorConfig:
+    latency: float = 0.0                # segundos por petición
+    jitter: float = 0.0                 # ± aleatorio sobre la latencia
+    rates: dict[str, float] = field(default_factory=dict)   # workload → peticiones/s
+    inject_429: float = 0.0             # probabilidad de 429 aleatorio
+    retry_after: float = 1.0            # Retry-After de los 429 aleatorios
+    replication_lag: float = 0.0        # s en que un recurso nuevo aún da 404 al leerlo
+    page_size: int = DEFAULT_PAGE_SIZE
+    seed: int = 0
+
+    @classmethod
+    def from_env(cls) -> EmulatorConfig:
+        """GRAPH_EMULATOR_LATENCY_MS, _JITTER_MS, _RATES ("planner=20,users=50" o "20"),
+        _429 (probabilidad), _REPLICATION_MS, _PAGE_SIZE."""
+        def _ms(name: str) -> float:
+            raw = os.environ.get(name, "").strip()
+            return float(raw) / 1000 if raw else 0.0
+
+        rates: dict[str, float] = {}
+        raw_rates = os.environ.get("GRAPH_EMULATOR_RATES", "").strip()
+        for part in filter(None, (p.strip() for p in raw_rates.split(","))):
+            name, _, value = part.rpartition("=")
+            rates[name or "*"] = float(value)
+        inject = os.environ.get("GRAPH_EMULATOR_429", "").strip()
+        page = os.environ.get("GRAPH_EMULATOR_PAGE_SIZE", "").strip()
+        return cls(
+            latency=_ms("GRAPH_EMULATOR_LATENCY_MS"),
+            jitter=_ms("GRAPH_EMULATOR_JITTER_MS"),
+            rates=rates,
+            inject_429=float(inject) if inject else 0.0,
+            replication_lag=_ms("GRAPH_EMULATOR_REPLICATION_MS"),
+            page_size=int(page) if page else DEFAULT_PAGE_SIZE,
+        )
+
+
+@dataclass
+class _Request:
+    method: str
+    path: str                           # sin GRAPH_BASE ni query: /planner/tasks/abc
+    query: dict[str, str]
+    headers: dict[str, str]             # claves en minúsculas
+    body: Any                           # JSON decodificado, bytes (uploads) o None
+    base: str                           # https://host/v1.0 — para @odata.nextLink
+
+
+@dataclass
+class _Response:
+    status: int
+    body: Any = None
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+class GraphError(Exception):
+    def __init__(self, status: int, code: str, message: str, headers: dict[str, str] | None = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.headers = headers or {}
+
+    def response(self) -> _Response:
+        return _Response(self.status, {"error": {"code": self.code, "message": str(self)}}, self.headers)
+
+
+class _RateLimiter:
+    """Token bucket por workload: ráfaga de un segundo, recarga a `rate` por segundo."""
+
+    def __init__(self, rate: float, clock: Callable[[], float]) -> None:
+        self.rate = rate
+        self._clock = clock
+        self._tokens = rate
+        self._last = clock()
+
+    def take(self) -> float | None:
+        """None si hay cupo; si no, los segundos hasta el siguiente (para Retry-After)."""
+        now = self._clock()
+        self._tokens = min(self.rate, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return None
+        return (1 - self._tokens) / self.rate
+
+
+_Route = tuple[str, re.Pattern, Callable[..., _Response]]
+
+
+class GraphEmulator:
+    """Estado en memoria y enrutado de las peticiones emuladas."""
+
+    def __init__(self, config: EmulatorConfig | None = None, clock: Callable[[], float] = time.monotonic) -> None:
+        self.config = config or EmulatorConfig()
+        self._clock = clock
+        self._rng = random.Random(self.config.seed)
+        self._limiters: dict[str, _RateLimiter] = {}
+        self.plans: dict[str, dict[str, Any]] = {}
+        self.plan_details: dict[str, dict[str, Any]] = {}
+        self.buckets: dict[str, dict[str, Any]] = {}
+        self.tasks: dict[str, dict[str, Any]] = {}
+        self.task_details: dict[str, dict[str, Any]] = {}
+        self.users: dict[str, dict[str, Any]] = {}
+        self.channels: dict[str, list[dict[str, Any]]] = {}
+        self.team_members: dict[str, list[dict[str, Any]]] = {}
+        self.sites: dict[str, dict[str, Any]] = {}
+        self.drive_items: dict[str, dict[str, Any]] = {}
+        self.sent_mail: list[dict[str, Any]] = []
+        self._versions: dict[str, int] = {}
+        self._created_at: dict[str, float] = {}
+        self.requests: int = 0
+        self.throttled: int = 0
+        self._routes: list[_Route] = []
+        self._build_routes()
+
+    # ── Transporte ────────────────────────────────────────────────────────────
+
+    def transport(self) -> httpx.AsyncBaseTransport:
+        """Transporte httpx en proceso (para GraphClientConfig.transport)."""
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        req = self._parse(request)
+        delay = self.config.latency
+        if self.config.jitter:
+            delay = max(0.0, delay + self._rng.uniform(-self.config.jitter, self.config.jitter))
+        if delay:
+            await asyncio.sleep(delay)
+        if req.method == "POST" and req.path == "/$batch":
+            resp = self._batch(req)
+        else:
+            resp = self.dispatch(req)
+        return _to_httpx(resp, request)
+
+    def _parse(self, request: httpx.Request) -> _Request:
+        raw_path = unquote(request.url.raw_path.decode("ascii").split("?", 1)[0])
+        prefix, sep, path = raw_path.partition("/v1.0")
+        if not sep:
+            prefix, path = "", raw_path
+        base = f"{request.url.scheme}://{request.url.netloc.decode('ascii')}{prefix}{sep}"
+        query = dict(parse_qsl(request.url.query.decode("ascii"), keep_blank_values=True))
+        headers = {k.lower(): v for k, v in request.headers.items()}
+        content = request.content
+        body: Any = None
+        if content:
+            if headers.get("content-type", "").startswith("application/json"):
+                body = jsonlib.loads(content)
+            else:
+                body = bytes(content)
+        return _Request(request.method.upper(), path or "/", query, headers, body, base)
+
+    def dispatch(self, req: _Request) -> _Response:
+        """Una petición individual: throttling, enrutado y errores OData."""
+        self.requests += 1
+        throttled = self._throttle(req.path)
+        if throttled is not None:
+            self.throttled += 1
+            return throttled
+        for method, pattern, handler in self._routes:
+            if method != req.method:
+                continue
+            match = pattern.fullmatch(req.path)
+            if match:
+                try:
+                    return handler(req, *match.groups())
+                except GraphError as exc:
+                    return exc.response()
+        return GraphError(404, "UnknownResource", f"{req.method} {req.path} no está emulado").response()
+
+    def _throttle(self, path: str) -> _Response | None:
+        workload = classify_workload(path)
+        rate = self.config.rates.get(workload, self.config.rates.get("*"))
+        wait: float | None = None
+        if rate:
+            limiter = self._limiters.get(workload)
+            if limiter is None:
+                limiter = self._limiters[workload] = _RateLimiter(rate, self._clock)
+            wait = limiter.take()
+        if wait is None and self.config.inject_429 and self._rng.random() < self.config.inject_429:
+            wait = self.config.retry_after
+        if wait is None:
+            return None
+        return GraphError(
+            429, "TooManyRequests", f"Límite emulado de {workload}",
+            {"Retry-After": str(max(1, math.ceil(wait)))},
+        ).response()
+
+    def _batch(self, req: _Request) -> _Response:
+        items = (req.body or {}).get("requests", [])
+        if len(items) > 20:
+            return GraphError(400, "BadRequest", "Un $batch admite como máximo 20 peticiones").response()
+        responses = []
+        for item in items:
+            url = item.get("url", "")
+            path, _, query = url.partition("?")
+            sub = _Request(
+                method=item.get("method", "GET").upper(),
+                path=unquote(path if path.startswith("/") else f"/{path}"),
+                query=dict(parse_qsl(query, keep_blank_values=True)),
+                headers={k.lower(): v for k, v in (item.get("headers") or {}).items()},
+                body=item.get("body"),
+                base=req.base,
+            )
+            resp = self.dispatch(sub)
+            entry: dict[str, Any] = {"id": item.get("id"), "status": resp.status, "headers": resp.headers}
+            if resp.body is not None:
+                entry["body"] = resp.body
+            responses.append(entry)
+        return _Response(200, {"responses": responses})
+
+    # ── Utilidades de entidades ───────────────────────────────────────────────
+
+    def _new_id(self, length: int = 28) -> str:
+        alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+        return "".join(self._rng.choice(alphabet) for _ in range(length))
+
+    def _guid(self) -> str:
+        return str(uuid.UUID(int=self._rng.getrandbits(128), version=4))
+
+    def _etag(self, key: str) -> str:
+        token = base64.b64encode(f"{key}:{self._versions.get(key, 1)}".encode()).decode("ascii")
+        return f'W/"{token}"'
+
+    def _born(self, key: str) -> None:
+        self._versions[key] = 1
+        self._created_at[key] = self._clock()
+
+    def _bump(self, key: str) -> None:
+        self._versions[key] = self._versions.get(key, 1) + 1
+
+    def _visible(self, key: str) -> bool:
+        lag = self.config.replication_lag
+        return not lag or self._clock() - self._created_at.get(key, -math.inf) >= lag
+
+    def _get(self, store: dict[str, dict[str, Any]], key: str, etag_key: str, kind: str) -> dict[str, Any]:
+        if key not in store or not self._visible(etag_key):
+            raise GraphError(404, "NotFound", f"{kind} {key} no existe")
+        return store[key]
+
+    def _check_if_match(self, req: _Request, etag_key: str) -> None:
+        if_match = req.headers.get("if-match")
+        if not if_match:
+            raise GraphError(400, "BadRequest", "Planner exige la cabecera If-Match")
+        if if_match != "*" and if_match != self._etag(etag_key):
+            raise GraphError(412, "PreconditionFailed", "El ETag no coincide con la versión actual")
+
+    def _entity(self, req: _Request, entity: dict[str, Any], etag_key: str | None = None, status: int = 200) -> _Response:
+        body = copy.deepcopy(entity)
+        headers: dict[str, str] = {}
+        if etag_key is not None:
+            etag = self._etag(etag_key)
+            if req.method == "GET" and req.headers.get("if-none-match") == etag:
+                return _Response(304, None, {"ETag": etag})
+            body["@odata.etag"] = etag
+            headers["ETag"] = etag
+        return _Response(status, _select(body, req.query.get("$select")), headers)
+
+    def _collection(self, req: _Request, items: list[dict[str, Any]], etag_keys: list[str] | None = None) -> _Response:
+        top = int(req.query.get("$top") or self.config.page_size)
+        top = max(1, min(top, PLANNER_PAGE_MAX))
+        skip = int(req.query.get("$skiptoken") or 0)
+        page = items[skip:skip + top]
+        values = []
+        for i, item in enumerate(page):
+            body = copy.deepcopy(item)
+            if etag_keys is not None:
+                body["@odata.etag"] = self._etag(etag_keys[skip + i])
+            values.append(_select(body, req.query.get("$select")))
+        result: dict[str, Any] = {"value": values}
+        if skip + top < len(items):
+            params = {k: v for k, v in req.query.items() if k != "$skiptoken"}
+            params["$top"] = str(top)
+            params["$skiptoken"] = str(skip + top)
+            query = "&".join(f"{k}={v}" for k, v in params.items())
+            result["@odata.nextLink"] = f"{req.base}{req.path}?{query}"
+        return _Response(200, result)
+
+    @staticmethod
+    def _merge(target: dict[str, Any], patch: dict[str, Any]) -> None:
+        """PATCH de Planner: los diccionarios abiertos (checklist, assignments…) se fusionan
+        y un valor null elimina la clave."""
+        for key, value in patch.items():
+            if isinstance(value, dict) and isinstance(target.get(key), dict):
+                for sub_key, sub_value in value.items():
+                    if sub_value is None:
+                        target[key].pop(sub_key, None)
+                    else:
+                        target[key][sub_key] = sub_value
+            else:
+                target[key] = value
+
+    # ── Rutas ─────────────────────────────────────────────────────────────────
+
+    def _build_routes(self) -> None:
+        seg = r"([^/:]+)"
+        table: list[tuple[str, str, Callable[..., _Response]]] = [
+            ("GET", rf"/groups/{seg}/planner/plans", self._list_group_plans),
+            ("POST", r"/planner/plans", self._create_plan),
+            ("GET", rf"/planner/plans/{seg}", self._get_plan),
+            ("PATCH", rf"/planner/plans/{seg}", self._patch_plan),
+            ("DELETE", rf"/planner/plans/{seg}", self._delete_plan),
+            ("GET", rf"/planner/plans/{seg}/details", self._get_plan_details),
+            ("PATCH", rf"/planner/plans/{seg}/details", self._patch_plan_details),
+            ("GET", rf"/planner/plans/{seg}/buckets", self._list_buckets),
+            ("GET", rf"/planner/plans/{seg}/tasks", self._list_tasks),
+            ("POST", r"/planner/buckets", self._create_bucket),
+            ("GET", rf"/planner/buckets/{seg}", self._get_bucket),
+            ("POST", r"/planner/tasks", self._create_task),
+            ("GET", rf"/planner/tasks/{seg}", self._get_task),
+            ("PATCH", rf"/planner/tasks/{seg}", self._patch_task),
+            ("DELETE", rf"/planner/tasks/{seg}", self._delete_task),
+            ("GET", rf"/planner/tasks/{seg}/details", self._get_task_details),
+            ("PATCH", rf"/planner/tasks/{seg}/details", self._patch_task_details),
+            ("GET", r"/users", self._list_users),
+            ("GET", rf"/users/{seg}", self._get_user),
+            ("POST", r"/directoryObjects/getByIds", self._get_by_ids),
+            ("GET", rf"/groups/{seg}/threads/{seg}/posts", self._list_posts),
+            ("GET", rf"/teams/{seg}/channels", self._list_channels),
+            ("POST", rf"/teams/{seg}/channels", self._create_channel),
+            ("POST", rf"/teams/{seg}/members", self._add_team_member),
+            ("POST", rf"/teams/{seg}/channels/{seg}/members", self._add_channel_member),
+            ("POST", rf"/teams/{seg}/channels/{seg}/tabs", self._add_tab),
+            ("GET", r"/sites/([^/:]+):(/[^:]*)", self._get_site_by_path),
+            ("GET", rf"/sites/{seg}/drive/root", self._get_drive_root),
+            ("GET", rf"/sites/{seg}/drive/root/children", self._list_root_children),
+            ("GET", r"/sites/([^/:]+)/drive/root:(/[^:]+):/children", self._list_path_children),
+            ("GET", r"/sites/([^/:]+)/drive/root:(/[^:]+)", self._get_item_by_path),
+            ("POST", rf"/sites/{seg}/drive/items/{seg}/children", self._create_drive_child),
+            ("PUT", r"/sites/([^/:]+)/drive/items/([^/:]+):/([^:/]+):/content", self._upload),
+            ("POST", r"/me/sendMail", self._send_mail),
+        ]
+        self._routes = [(method, re.compile(pattern), handler) for method, pattern, handler in table]
+
+    # Planner: planes
+
+    def _list_group_plans(self, req: _Request, group_id: str) -> _Response:
+        keys = [pid for pid, p in self.plans.items() if p["owner"] == group_id and self._visible(pid)]
+        return self._collection(req, [self.plans[k] for k in keys], keys)
+
+    def _create_plan(self, req: _Request) -> _Response:
+        body = req.body or {}
+        if not body.get("title") or not (body.get("owner") or body.get("container")):
+            raise GraphError(400, "BadRequest", "title y owner son obligatorios")
+        plan_id = self._new_id()
+        owner = body.get("owner") or body["container"].get("containerId", "")
+        self.plans[plan_id] = {
+            "id": plan_id, "title": body["title"], "owner": owner,
+            "createdDateTime": _now(), "container": {"containerId": owner, "type": "group"},
+        }
+        self.plan_details[plan_id] = {"id": plan_id, "categoryDescriptions": {}, "sharedWith": {}}
+        self._born(plan_id)
+        self._born(f"{plan_id}/details")
+        return self._entity(req, self.plans[plan_id], plan_id, status=201)
+
+    def _get_plan(self, req: _Request, plan_id: str) -> _Response:
+        return self._entity(req, self._get(self.plans, plan_id, plan_id, "Plan"), plan_id)
+
+    def _patch_plan(self, req: _Request, plan_id: str) -> _Response:
+        plan = self._get(self.plans, plan_id, plan_id, "Plan")
+        self._check_if_match(req, plan_id)
+        self._merge(plan, {k: v for k, v in (req.body or {}).items() if k in ("title",)})
+        self._bump(plan_id)
+        return _Response(204)
+
+    def _delete_plan(self, req: _Request, plan_id: str) -> _Response:
+        self._get(self.plans, plan_id, plan_id, "Plan")
+        self._check_if_match(req, plan_id)
+        del self.plans[plan_id]
+        self.plan_details.pop(plan_id, None)
+        for bucket_id in [b for b, v in self.buckets.items() if v["planId"] == plan_id]:
+            del self.buckets[bucket_id]
+        for task_id in [t for t, v in self.tasks.items() if v["planId"] == plan_id]:
+            del self.tasks[task_id]
+            self.task_details.pop(task_id, None)
+        return _Response(204)
+
+    def _get_plan_details(self, req: _Request, plan_id: str) -> _Response:
+        key = f"{plan_id}/details"
+        return self._entity(req, self._get(self.plan_details, plan_id, key, "Plan"), key)
+
+    def _patch_plan_details(self, req: _Request, plan_id: str) -> _Response:
+        key = f"{plan_id}/details"
+        details = self._get(self.plan_details, plan_id, key, "Plan")
+        self._check_if_match(req, key)
+        self._merge(details, req.body or {})
+        self._bump(key)
+        return _Response(204)
+
+    # Planner: buckets
+
+    def _list_buckets(self, req: _Request, plan_id: str) -> _Response:
+        self._get(self.plans, plan_id, plan_id, "Plan")
+        keys = [b for b, v in self.buckets.items() if v["planId"] == plan_id]
+        return self._collection(req, [self.buckets[k] for k in keys], keys)
+
+    def _create_bucket(self, req: _Request) -> _Response:
+        body = req.body or {}
+        if body.get("planId") not in self.plans:
+            raise GraphError(400, "BadRequest", "planId no válido")
+        bucket_id = self._new_id()
+        self.buckets[bucket_id] = {
+            "id": bucket_id, "name": body.get("name", ""), "planId": body["planId"],
+            "orderHint": body.get("orderHint", " !"),
+        }
+        self._born(bucket_id)
+        return self._entity(req, self.buckets[bucket_id], bucket_id, status=201)
+
+    def _get_bucket(self, req: _Request, bucket_id: str) -> _Response:
+        return self._entity(req, self._get(self.buckets, bucket_id, bucket_id, "Bucket"), bucket_id)
+
+    # Planner: tareas
+
+    def _list_tasks(self, req: _Request, plan_id: str) -> _Response:
+        self._get(self.plans, plan_id, plan_id, "Plan")
+        keys = [t for t, v in self.tasks.items() if v["planId"] == plan_id and self._visible(t)]
+        items = [self.tasks[k] for k in keys]
+        if req.query.get("$expand") == "details":
+            items = [
+                {**self.tasks[k], "details": {**self.task_details[k], "@odata.etag": self._etag(f"{k}/details")}}
+                for k in keys
+            ]
+        return self._collection(req, items, keys)
+
+    def _create_task(self, req: _Request) -> _Response:
+        body = dict(req.body or {})
+        if body.get("planId") not in self.plans:
+            raise GraphError(400, "BadRequest", "planId no válido")
+        if body.get("bucketId") and body["bucketId"] not in self.buckets:
+            raise GraphError(400, "BadRequest", "bucketId no válido")
+        if not body.get("title"):
+            raise GraphError(400, "BadRequest", "title es obligatorio")
+        details = body.pop("details", None) or {}
+        task_id = self._new_id()
+        task: dict[str, Any] = {
+            "id": task_id, "planId": body["planId"], "bucketId": body.get("bucketId"),
+            "title": body["title"], "percentComplete": 0, "priority": 5,
+            "startDateTime": None, "dueDateTime": None, "completedDateTime": None,
+            "createdDateTime": _now(), "orderHint": " !", "conversationThreadId": None,
+            "assignments": {}, "appliedCategories": {}, "hasDescription": False,
+            "checklistItemCount": 0, "activeChecklistItemCount": 0,
+        }
+        self._merge(task, body)
+        self.tasks[task_id] = task
+        self.task_details[task_id] = {
+            "id": task_id, "description": "", "previewType": "automatic",
+            "checklist": {}, "references": {},
+        }
+        self._merge(self.task_details[task_id], details)
+        self._sync_task_counters(task_id)
+        self._born(task_id)
+        self._born(f"{task_id}/details")
+        return self._entity(req, task, task_id, status=201)
+
+    def _sync_task_counters(self, task_id: str) -> None:
+        details, task = self.task_details[task_id], self.tasks[task_id]
+        checklist = details.get("checklist") or {}
+        task["hasDescription"] = bool(details.get("description"))
+        task["checklistItemCount"] = len(checklist)
+        task["activeChecklistItemCount"] = sum(1 for item in checklist.values() if not item.get("isChecked"))
+
+    def _get_task(self, req: _Request, task_id: str) -> _Response:
+        return self._entity(req, self._get(self.tasks, task_id, task_id, "Task"), task_id)
+
+    def _patch_task(self, req: _Request, task_id: str) -> _Response:
+        task = self._get(self.tasks, task_id, task_id, "Task")
+        self._check_if_match(req, task_id)
+        bucket_id = (req.body or {}).get("bucketId")
+        if bucket_id is not None and bucket_id not in self.buckets:
+            raise GraphError(400, "BadRequest", "bucketId no válido")
+        self._merge(task, {k: v for k, v in (req.body or {}).items() if k not in ("id", "planId")})
+        self._bump(task_id)
+        return _Response(204)
+
+    def _delete_task(self, req: _Request, task_id: str) -> _Response:
+        self._get(self.tasks, task_id, task_id, "Task")
+        self._check_if_match(req, task_id)
+        del self.tasks[task_id]
+        self.task_details.pop(task_id, None)
+        return _Response(204)
+
+    def _get_task_details(self, req: _Request, task_id: str) -> _Response:
+        key = f"{task_id}/details"
+        return self._entity(req, self._get(self.task_details, task_id, key, "Task"), key)
+
+    def _patch_task_details(self, req: _Request, task_id: str) -> _Response:
+        key = f"{task_id}/details"
+        details = self._get(self.task_details, task_id, key, "Task")
+        self._check_if_match(req, key)
+        self._merge(details, req.body or {})
+        self._sync_task_counters(task_id)
+        self._bump(key)
+        self._bump(task_id)
+        return _Response(204)
+
+    # Usuarios y grupos
+
+    def add_user(self, email: str, display_name: str | None = None) -> dict[str, Any]:
+        """Da de alta un usuario (los no registrados se crean al consultarlos)."""
+        local = email.split("@", 1)[0]
+        given, _, surname = local.replace(".", " ").partition(" ")
+        user = {
+            "id": str(uuid.uuid5(uuid.NAMESPACE_DNS, email.lower())),
+            "mail": email, "userPrincipalName": email,
+            "displayName": display_name or local.replace(".", " ").title(),
+            "givenName": given.title(), "surname": surname.title(),
+        }
+        self.users[user["id"]] = user
+        self.users[email.lower()] = user
+        return user
+
+    def _get_user(self, req: _Request, key: str) -> _Response:
+        user = self.users.get(key.lower())
+        if user is None:
+            if "@" not in key:
+                raise GraphError(404, "Request_ResourceNotFound", f"Usuario {key} no existe")
+            user = self.add_user(key)
+        return self._entity(req, user)
+
+    def _list_users(self, req: _Request) -> _Response:
+        """Sólo el $filter que usa resolve_emails_bulk(): cláusulas `mail|userPrincipalName
+        in ('a','b')` o `eq 'a'` unidas por `or`. Como en _get_user, los emails se dan de alta
+        al consultarlos."""
+        raw = req.query.get("$filter", "")
+        clauses = list(_USER_FILTER.finditer(raw))
+        if not clauses or _USER_FILTER.sub("", raw).replace(" or ", "").strip():
+            raise GraphError(400, "BadRequest", f"$filter no soportado por el emulador: {raw}")
+        users: dict[str, dict[str, Any]] = {}
+        for clause in clauses:
+            for value in re.findall(r"'((?:[^']|'')*)'", clause.group(2) or clause.group(3)):
+                email = value.replace("''", "'")
+                user = self.users.get(email.lower())
+                if user is None and "@" in email:
+                    user = self.add_user(email)
+                if user is not None:
+                    users.setdefault(user["id"], user)
+        return self._collection(req, list(users.values()))
+
+    def _get_by_ids(self, req: _Request) -> _Response:
+        """Como Graph: hasta 1000 ids, sin paginar; los ids que no existen no aparecen."""
+        ids = (req.body or {}).get("ids") or []
+        if not ids or len(ids) > 1000:
+            raise GraphError(400, "Request_BadRequest", "ids debe tener entre 1 y 1000 elementos")
+        values = [
+            {"@odata.type": "#microsoft.graph.user", **copy.deepcopy(self.users[i])}
+            for i in dict.fromkeys(ids) if i in self.users and "@" not in i
+        ]
+        return _Response(200, {"value": values})
+
+    def _list_posts(self, req: _Request, group_id: str, thread_id: str) -> _Response:
+        return self._collection(req, [])
+
+    # Teams
+
+    def _list_channels(self, req: _Request, team_id: str) -> _Response:
+        return self._collection(req, self.channels.setdefault(team_id, []))
+
+    def _create_channel(self, req: _Request, team_id: str) -> _Response:
+        name = (req.body or {}).get("displayName", "")
+        channels = self.channels.setdefault(team_id, [])
+        if any(ch["displayName"] == name for ch in channels):
+            raise GraphError(409, "NameAlreadyExists", f"Channel name already existed: {name}")
+        channel_id = f"19:{uuid.UUID(int=self._rng.getrandbits(128)).hex}@thread.tacv2"
+        channel = {
+            "id": channel_id, "displayName": name,
+            "membershipType": (req.body or {}).get("membershipType", "standard"),
+            "webUrl": f"https://teams.microsoft.com/l/channel/{channel_id}",
+        }
+        channels.append(channel)
+        return self._entity(req, channel, status=201)
+
+    def _member(self, req: _Request, members: list[dict[str, Any]]) -> _Response:
+        bind = (req.body or {}).get("user@odata.bind", "")
+        user_id = bind.rstrip("/").rsplit("/", 1)[-1].strip("'()")
+        if any(m["userId"] == user_id for m in members):
+            raise GraphError(409, "Conflict", f"El usuario {user_id} ya es miembro")
+        member = {"id": self._guid(), "userId": user_id, "roles": (req.body or {}).get("roles", [])}
+        members.append(member)
+        return self._entity(req, member, status=201)
+
+    def _add_team_member(self, req: _Request, team_id: str) -> _Response:
+        return self._member(req, self.team_members.setdefault(team_id, []))
+
+    def _add_channel_member(self, req: _Request, team_id: str, channel_id: str) -> _Response:
+        return self._member(req, self.team_members.setdefault(f"{team_id}/{channel_id}", []))
+
+    def _add_tab(self, req: _Request, team_id: str, channel_id: str) -> _Response:
+        tab = {"id": self._guid(), **(req.body or {})}
+        return self._entity(req, tab, status=201)
+
+    # SharePoint / OneDrive
+
+    def _site(self, site_id: str) -> dict[str, Any]:
+        site = self.sites.get(site_id)
+        if site is None:
+            raise GraphError(404, "itemNotFound", f"Sitio {site_id} no existe")
+        return site
+
+    def _get_site_by_path(self, req: _Request, hostname: str, site_path: str) -> _Response:
+        key = f"{hostname}:{site_path.rstrip('/')}"
+        site = next((s for s in self.sites.values() if s["key"] == key), None)
+        if site is None:
+            site_id = f"{hostname},{self._guid()},{self._guid()}"
+            root_id = self._new_id(34)
+            site = {"id": site_id, "key": key, "webUrl": f"https://{hostname}{site_path}", "root": root_id}
+            self.sites[site_id] = site
+            self.drive_items[root_id] = {"id": root_id, "name": "root", "folder": {"childCount": 0},
+                                         "parentId": None, "siteId": site_id}
+        return self._entity(req, {k: site[k] for k in ("id", "webUrl")})
+
+    def _children(self, parent_id: str) -> list[dict[str, Any]]:
+        return [item for item in self.drive_items.values() if item["parentId"] == parent_id]
+
+    def _public_item(self, item: dict[str, Any]) -> dict[str, Any]:
+        return {k: v for k, v in item.items() if k not in ("parentId", "siteId", "content")}
+
+    def _get_drive_root(self, req: _Request, site_id: str) -> _Response:
+        return self._entity(req, self._public_item(self.drive_items[self._site(site_id)["root"]]))
+
+    def _list_root_children(self, req: _Request, site_id: str) -> _Response:
+        root = self._site(site_id)["root"]
+        return self._collection(req, [self._public_item(i) for i in self._children(root)])
+
+    def _resolve_path(self, site_id: str, path: str) -> dict[str, Any]:
+        item = self.drive_items[self._site(site_id)["root"]]
+        for name in filter(None, path.split("/")):
+            item = next((c for c in self._children(item["id"]) if c["name"] == name), None)
+            if item is None:
+                raise GraphError(404, "itemNotFound", f"{path} no existe")
+        return item
+
+    def _get_item_by_path(self, req: _Request, site_id: str, path: str) -> _Response:
+        return self._entity(req, self._public_item(self._resolve_path(site_id, path)))
+
+    def _list_path_children(self, req: _Request, site_id: str, path: str) -> _Response:
+        parent = self._resolve_path(site_id, path)
+        return self._collection(req, [self._public_item(i) for i in self._children(parent["id"])])
+
+    def _new_drive_item(self, site_id: str, parent_id: str, name: str, **extra: Any) -> dict[str, Any]:
+        item_id = self._new_id(34)
+        item = {"id": item_id, "name": name, "parentId": parent_id, "siteId": site_id,
+                "webUrl": f"{self._site(site_id)['webUrl']}/{name}", **extra}
+        self.drive_items[item_id] = item
+        return item
+
+    def _create_drive_child(self, req: _Request, site_id: str, parent_id: str) -> _Response:
+        self._site(site_id)
+        if parent_id not in self.drive_items:
+            raise GraphError(404, "itemNotFound", f"Carpeta {parent_id} no existe")
+        body = req.body or {}
+        name = body.get("name", "")
+        if any(c["name"] == name for c in self._children(parent_id)):
+            if body.get("@microsoft.graph.conflictBehavior", "fail") == "fail":
+                raise GraphError(409, "nameAlreadyExists", f"Ya existe un elemento llamado {name}")
+        item = self._new_drive_item(site_id, parent_id, name, folder={"childCount": 0})
+        return self._entity(req, self._public_item(item), status=201)
+
+    def _upload(self, req: _Request, site_id: str, folder_id: str, name: str) -> _Response:
+        self._site(site_id)
+        if folder_id not in self.drive_items:
+            raise GraphError(404, "itemNotFound", f"Carpeta {folder_id} no existe")
+        content = req.body if isinstance(req.body, bytes) else b""
+        existing = next((c for c in self._children(folder_id) if c["name"] == name), None)
+        if existing is not None:
+            existing.update(size=len(content), content=content)
+            return self._entity(req, self._public_item(existing))
+        item = self._new_drive_item(site_id, folder_id, name, file={}, size=len(content), content=content)
+        return self._entity(req, self._public_item(item), status=201)
+
+    # Correo
+
+    def _send_mail(self, req: _Request) -> _Response:
+        if not (req.body or {}).get("message"):
+            raise GraphError(400, "ErrorInvalidRequest", "message es obligatorio")
+        self.sent_mail.append(req.body)
+        return _Response(202)
+
+    # ── ASGI (servidor local) ─────────────────────────────────────────────────
+
+    async def asgi(self, scope: dict[str, Any], receive: Callable, send: Callable) -> None:
+        """Aplicación ASGI mínima sobre handle(), para uvicorn u otro servidor."""
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        body, more = b"", True
+        while more:
+            message = await receive()
+            body += message.get("body", b"")
+            more = message.get("more_body", False)
+        headers = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in scope["headers"]]
+        host = next((v for k, v in headers if k.lower() == "host"), "localhost")
+        query = scope.get("query_string", b"").decode("ascii")
+        path = scope.get("raw_path", scope["path"].encode()).decode("ascii")
+        url = f"{scope.get('scheme', 'http')}://{host}{path}" + (f"?{query}" if query else "")
+        response = await self.handle(httpx.Request(scope["method"], url, headers=headers, content=body))
+        await send({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in response.headers.items()],
+        })
+        await send({"type": "http.response.body", "body": response.content})
+
+
+_USER_FILTER = re.compile(r"(mail|userPrincipalName)\s+(?:in\s+\(([^)]*)\)|eq\s+('(?:[^']|'')*'))")
+
+
+def _select(body: dict[str, Any], select: str | None) -> dict[str, Any]:
+    if not select:
+        return body
+    # Lo pedido con $expand (details de las tareas) llega aunque no esté en $select
+    keep = {f.strip() for f in select.split(",")} | {"id", "@odata.etag", "details"}
+    return {k: v for k, v in body.items() if k in keep}
+
+
+def _to_httpx(resp: _Response, request: httpx.Request) -> httpx.Response:
+    if resp.body is None:
+        return httpx.Response(resp.status, headers=resp.headers, request=request)
+    if isinstance(resp.body, bytes):
+        return httpx.Response(resp.status, headers=resp.headers, content=resp.body, request=request)
+    return httpx.Response(resp.status, headers=resp.headers, json=resp.body, request=request)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+# ── Instalación ───────────────────────────────────────────────────────────────
+
+_EMULATOR: GraphEmulator | None = None
+
+
+def install_emulator(config: EmulatorConfig | None = None) -> GraphEmulator:
+    """Crea un emulador y hace que el pool compartido de graph_client hable con él."""
+    global _EMULATOR
+    _EMULATOR = GraphEmulator(config or EmulatorConfig.from_env())
+    pool_config = GraphClientConfig.from_env()
+    pool_config.transport = _EMULATOR.transport()
+    configure_graph_client(pool_config)
+    return _EMULATOR
+
+
+def graph_emulator() -> GraphEmulator | None:
+    """Emulador instalado en este proceso (None si se habla con Graph real)."""
+    return _EMULATOR
+
+
+def emulating() -> bool:
+    return _EMULATOR is not None
+
+
+def emulator_requested() -> bool:
+    """GRAPH_EMULATOR=1 en el entorno (equivalente a --emulator)."""
+    return os.environ.get("GRAPH_EMULATOR", "").strip().lower() in ("1", "true", "yes", "si", "sí")
+
+
+def __getattr__(name: str) -> Any:
+    # `uvicorn graph_emulator:app` crea el emulador sólo al pedir la app
+    if name == "app":
+        return GraphEmulator(EmulatorConfig.from_env()).asgi
+    raise AttributeError(name)
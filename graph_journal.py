@@ -0,0 +1,223 @@
+"""
+graph_journal.py — Diario de operaciones para reanudar importaciones y entornos interrumpidos.
+
+Cada ejecución con escrituras (planner_import.py --mode full/tasks, create_environment.py)
+anota en un JSONL de sólo anexar cada operación Graph antes de lanzarla ("planned") y al
+terminarla con los IDs devueltos ("done"). Cada línea se escribe con flush + fsync, así
+que un corte de red, un Ctrl-C, un token caducado o un --deadline vencido dejan en disco
+todo lo ya creado:
+
+  {"type": "run", "kind": "full", "source": "plan.csv", "sha256": "…", "params": {…}}
+  {"type": "planned", "op": "task:340", "t": 1760…}
+  {"type": "done", "op": "task:340", "result": {"id": "AAMk…"}, "t": 1760…}
+
+  python planner_import.py --csv plan.csv --resume journals/20261017-101500-full-plan.jsonl
+
+Al reanudar se comprueba que el CSV es el mismo (SHA-256) y cada operación con "done"
+devuelve su resultado sin llamar a Graph. Una operación "planned" sin "done" quedó a
+medias: la llamada pudo llegar a Graph o no. Quien la lanza decide cómo localizarla
+(p. ej. buscar la tarea por título en el bucket) antes de repetirla, para no duplicar.
+
+Activación (por defecto activo en ejecuciones reales, nunca en --dry-run):
+  GRAPH_JOURNAL=0                   no escribe diario
+  GRAPH_JOURNAL_DIR=<dir>           carpeta de los diarios (default: journals/)
+  --resume <diario> / GRAPH_RESUME  continúa un diario existente
+
+FUTURO MCP: task_tools.py (importaciones reanudables)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+DEFAULT_JOURNAL_DIR = Path("journals")
+
+
+class JournalMismatch(ValueError):
+    """El diario de --resume es de otra ejecución (otro modo u otro CSV)."""
+
+
+@dataclass
+class JournalConfig:
+    enabled: bool = True
+    directory: Path = field(default_factory=lambda: DEFAULT_JOURNAL_DIR)
+    resume: Path | None = None
+
+    @classmethod
+    def from_env(cls) -> JournalConfig:
+        directory = os.environ.get("GRAPH_JOURNAL_DIR", "").strip()
+        resume = os.environ.get("GRAPH_RESUME", "").strip()
+        return cls(
+            enabled=os.environ.get("GRAPH_JOURNAL", "1").strip().lower() not in ("0", "false", "no"),
+            directory=Path(directory) if directory else DEFAULT_JOURNAL_DIR,
+            resume=Path(resume) if resume else None,
+        )
+
+
+def file_sha256(path: Path) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+class OperationJournal:
+    """Operaciones planeadas y completadas de una ejecución; path None = sin diario."""
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path
+        self.runs: list[dict[str, Any]] = []
+        self._results: dict[str, dict[str, Any]] = {}
+        self._pending: set[str] = set()      # "planned" sin "done"
+        self._fh = None
+        if path is not None and path.exists():
+            self._load(path)
+
+    def _load(self, path: Path) -> None:
+        with path.open(encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue   # última línea a medio escribir al cortarse el proceso
+                kind, op = entry.get("type"), entry.get("op", "")
+                if kind == "run":
+                    self.runs.append(entry)
+                elif kind == "planned" and op not in self._results:
+                    self._pending.add(op)
+                elif kind == "done":
+                    self._results[op] = entry.get("result") or {}
+                    self._pending.discard(op)
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    @property
+    def completed(self) -> int:
+        return len(self._results)
+
+    def result(self, op: str) -> dict[str, Any] | None:
+        """Resultado guardado de `op` si ya se completó (None si no)."""
+        return self._results.get(op)
+
+    def uncertain(self, op: str) -> bool:
+        """True si `op` se lanzó en una ejecución anterior y no consta que terminara."""
+        return op in self._pending
+
+    def uncertain_ops(self, prefix: str = "") -> list[str]:
+        return sorted(op for op in self._pending if op.startswith(prefix))
+
+    def _append(self, entry: dict[str, Any]) -> None:
+        if self.path is None:
+            return
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = self.path.open("a", encoding="utf-8")
+        self._fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def start_run(self, kind: str, source: Path, **params: Any) -> None:
+        """Anota la cabecera de la ejecución. Al reanudar, exige mismo modo y mismo CSV."""
+        sha = file_sha256(source)
+        if self.runs:
+            first = self.runs[0]
+            if first.get("kind") != kind or first.get("sha256") != sha:
+                raise JournalMismatch(
+                    f"El diario {self.path} es de '--mode {first.get('kind')}' con "
+                    f"'{first.get('source')}'; no coincide con '--mode {kind}' y '{source}' "
+                    "(¿otro CSV o CSV modificado?)"
+                )
+        entry = {"type": "run", "kind": kind, "source": str(source), "sha256": sha,
+                 "params": params, "started": datetime.now().isoformat(timespec="seconds")}
+        self.runs.append(entry)
+        self._append(entry)
+
+    def planned(self, op: str) -> None:
+        self._pending.add(op)
+        self._append({"type": "planned", "op": op, "t": round(time.time(), 3)})
+
+    def done(self, op: str, result: dict[str, Any]) -> None:
+        self._results[op] = result
+        self._pending.discard(op)
+        self._append({"type": "done", "op": op, "result": result, "t": round(time.time(), 3)})
+
+    async def step(
+        self,
+        op: str,
+        create: Callable[[], Awaitable[dict[str, Any]]],
+        find: Callable[[], Awaitable[dict[str, Any] | None]] | None = None,
+        keep: tuple[str, ...] = ("id",),
+    ) -> dict[str, Any]:
+        """Ejecuta create() una sola vez a lo largo de las reanudaciones.
+
+        Si `op` ya consta como hecha devuelve lo guardado (sólo las claves `keep`). Si
+        quedó a medias y find() encuentra el recurso en Graph, se adopta sin crearlo otra vez.
+        """
+        stored = self.result(op)
+        if stored is not None:
+            return stored
+        if find is not None and self.uncertain(op):
+            found = await find()
+            if found is not None:
+                self.done(op, {k: found.get(k) for k in keep})
+                return found
+        self.planned(op)
+        created = await create()
+        self.done(op, {k: created.get(k) for k in keep})
+        return created
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+_CONFIG: JournalConfig | None = None
+_ACTIVE: OperationJournal | None = None
+
+
+def journal_config() -> JournalConfig:
+    """Configuración de proceso (GRAPH_JOURNAL / GRAPH_JOURNAL_DIR / GRAPH_RESUME la primera vez)."""
+    global _CONFIG
+    if _CONFIG is None:
+        _CONFIG = JournalConfig.from_env()
+    return _CONFIG
+
+
+def configure_journal(config: JournalConfig) -> JournalConfig:
+    """Reemplaza la configuración de proceso (p. ej. desde --resume)."""
+    global _CONFIG
+    _CONFIG = config
+    return _CONFIG
+
+
+def open_journal(kind: str, source: Path, **params: Any) -> OperationJournal:
+    """Diario de esta ejecución: el de --resume o uno nuevo en la carpeta de diarios.
+    Lanza JournalMismatch si el de --resume es de otro modo u otro CSV."""
+    global _ACTIVE
+    config = journal_config()
+    if config.resume is not None:
+        if not config.resume.exists():
+            raise JournalMismatch(f"No existe el diario para reanudar: {config.resume}")
+        path: Path | None = config.resume
+    elif config.enabled:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = config.directory / f"{stamp}-{kind}-{Path(source).stem}.jsonl"
+    else:
+        path = None
+    journal = OperationJournal(path)
+    journal.start_run(kind, source, **params)
+    _ACTIVE = journal
+    return journal
+
+
+def resume_hint() -> str:
+    """Texto para los mensajes de error: cómo continuar la ejecución interrumpida."""
+    if _ACTIVE is None or _ACTIVE.path is None:
+        return ""
+    return f"\n  Para continuar donde se quedó: --resume {_ACTIVE.path}"
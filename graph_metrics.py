@@ -0,0 +1,260 @@
+"""
+graph_metrics.py — Métricas de las llamadas a Microsoft Graph por endpoint.
+
+graph_client.send_with_retry() registra aquí cada intento, agrupado por plantilla de
+endpoint (los IDs se sustituyen por {id}: GET /planner/tasks/{id}/details):
+
+  - número de llamadas e intentos, códigos de estado y errores de red;
+  - histograma de latencia (sólo la petición, sin la espera del throttle);
+  - espera en cola (semáforo del servicio + espaciado del throttle);
+  - bytes enviados y recibidos;
+  - reintentos y tiempo total esperado por Retry-After / backoff.
+
+Al final de cada ejecución (run_with_graph_client) se imprime un resumen y, si se pidió,
+se escribe un archivo con todas las métricas:
+
+  python planner_import.py --metrics-file reports/metrics.json ...
+  GRAPH_METRICS_FILE=reports/metrics.prom                 formato texto de Prometheus
+
+La extensión decide el formato: .json → JSON; cualquier otra → Prometheus.
+
+FUTURO MCP: graph/client.py → GraphAPIClient.metrics
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+# Límites superiores (s) de los cubos del histograma de latencia; el último es +Inf
+LATENCY_BUCKETS: tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Segmentos de ruta que son nombres de recurso/propiedad de Graph (planner, tasks,
+# details, sendMail, $batch…). El resto (GUIDs, IDs de Planner, emails) son IDs.
+_KEYWORD_SEGMENT = re.compile(r"[$A-Za-z][A-Za-z.]{0,23}")
+
+
+def normalize_endpoint(endpoint: str) -> str:
+    """Plantilla del endpoint: sin query string y con los IDs sustituidos por {id}."""
+    path = endpoint.split("?", 1)[0]
+    suffix = ""
+    if ":" in path:
+        # Direccionamiento por ruta de SharePoint: /drive/root:/Carpeta/x.docx:/content
+        path, _, rest = path.partition(":")
+        tail = rest.rsplit(":", 1)[1] if ":" in rest else ""
+        suffix = ":{path}" + (f":{tail}" if tail else "")
+    segments = [
+        seg if not seg or _KEYWORD_SEGMENT.fullmatch(seg) else "{id}"
+        for seg in path.split("/")
+    ]
+    return "/".join(segments) + suffix
+
+
+def metric_key(label: str) -> str:
+    """Clave de métricas para una etiqueta "MÉTODO /endpoint" de send_with_retry()."""
+    method, _, endpoint = label.partition(" ")
+    if not endpoint.startswith("/"):
+        return label
+    return f"{method} {normalize_endpoint(endpoint)}"
+
+
+@dataclass
+class EndpointStats:
+    calls: int = 0
+    attempts: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    latency_buckets: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    latency_sum: float = 0.0
+    latency_max: float = 0.0
+    queue_wait: float = 0.0
+    bytes_out: int = 0
+    bytes_in: int = 0
+    retries: int = 0
+    retry_wait: float = 0.0
+
+    def observe_latency(self, seconds: float) -> None:
+        self.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.latency_sum += seconds
+        self.latency_max = max(self.latency_max, seconds)
+
+    def latency_quantile(self, q: float) -> float:
+        """Cuantil aproximado: límite superior del cubo que lo contiene."""
+        total = sum(self.latency_buckets)
+        if not total:
+            return 0.0
+        rank, seen = q * total, 0
+        for bound, count in zip((*LATENCY_BUCKETS, self.latency_max), self.latency_buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.latency_max)
+        return self.latency_max
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items(), key=str)},
+            "latency": {
+                "sum": round(self.latency_sum, 6),
+                "max": round(self.latency_max, 6),
+                "p50": self.latency_quantile(0.5),
+                "p95": self.latency_quantile(0.95),
+                "buckets": dict(zip([*map(str, LATENCY_BUCKETS), "+Inf"], self.latency_buckets)),
+            },
+            "queue_wait": round(self.queue_wait, 6),
+            "bytes_out": self.bytes_out,
+            "bytes_in": self.bytes_in,
+            "retries": self.retries,
+            "retry_wait": round(self.retry_wait, 6),
+        }
+
+
+class MetricsRegistry:
+    """Estadísticas por "MÉTODO /plantilla" de todas las llamadas del proceso."""
+
+    def __init__(self) -> None:
+        self.endpoints: dict[str, EndpointStats] = {}
+
+    def stats(self, label: str) -> EndpointStats:
+        key = metric_key(label)
+        stats = self.endpoints.get(key)
+        if stats is None:
+            stats = self.endpoints[key] = EndpointStats()
+        return stats
+
+    def record_call(self, label: str) -> None:
+        self.stats(label).calls += 1
+
+    def record_attempt(
+        self,
+        label: str,
+        outcome: int | str,
+        latency: float,
+        *,
+        queue_wait: float = 0.0,
+        bytes_out: int = 0,
+        bytes_in: int = 0,
+    ) -> None:
+        """Un intento: `outcome` es el status HTTP o el nombre de la excepción."""
+        stats = self.stats(label)
+        stats.attempts += 1
+        stats.statuses[outcome] += 1
+        stats.observe_latency(latency)
+        stats.queue_wait += queue_wait
+        stats.bytes_out += bytes_out
+        stats.bytes_in += bytes_in
+
+    def record_retry(self, label: str, wait: float) -> None:
+        stats = self.stats(label)
+        stats.retries += 1
+        stats.retry_wait += wait
+
+    # ── Exportación ───────────────────────────────────────────────────────────
+
+    def to_json(self) -> dict[str, Any]:
+        return {key: stats.as_dict() for key, stats in sorted(self.endpoints.items())}
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# TYPE graph_calls_total counter",
+            "# TYPE graph_attempts_total counter",
+            "# TYPE graph_request_duration_seconds histogram",
+            "# TYPE graph_queue_wait_seconds_total counter",
+            "# TYPE graph_bytes_out_total counter",
+            "# TYPE graph_bytes_in_total counter",
+            "# TYPE graph_retries_total counter",
+            "# TYPE graph_retry_wait_seconds_total counter",
+        ]
+        for key, s in sorted(self.endpoints.items()):
+            method, _, endpoint = key.partition(" ")
+            labels = f'method="{method}",endpoint="{_escape(endpoint)}"'
+            lines.append(f"graph_calls_total{{{labels}}} {s.calls}")
+            for outcome, count in sorted(s.statuses.items(), key=str):
+                lines.append(f'graph_attempts_total{{{labels},status="{outcome}"}} {count}')
+            cumulative = 0
+            for bound, count in zip([*map(str, LATENCY_BUCKETS), "+Inf"], s.latency_buckets):
+                cumulative += count
+                lines.append(f'graph_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"graph_request_duration_seconds_sum{{{labels}}} {s.latency_sum:.6f}")
+            lines.append(f"graph_request_duration_seconds_count{{{labels}}} {s.attempts}")
+            lines.append(f"graph_queue_wait_seconds_total{{{labels}}} {s.queue_wait:.6f}")
+            lines.append(f"graph_bytes_out_total{{{labels}}} {s.bytes_out}")
+            lines.append(f"graph_bytes_in_total{{{labels}}} {s.bytes_in}")
+            lines.append(f"graph_retries_total{{{labels}}} {s.retries}")
+            lines.append(f"graph_retry_wait_seconds_total{{{labels}}} {s.retry_wait:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path) -> None:
+        """Escribe las métricas en JSON (.json) o en formato texto de Prometheus."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix.lower() == ".json":
+            path.write_text(json.dumps(self.to_json(), indent=2), encoding="utf-8")
+        else:
+            path.write_text(self.to_prometheus(), encoding="utf-8")
+
+    def summary(self, limit: int = 15) -> str:
+        """Tabla de los endpoints que más tiempo consumieron (latencia + colas + esperas)."""
+        rows = sorted(
+            self.endpoints.items(),
+            key=lambda kv: kv[1].latency_sum + kv[1].queue_wait + kv[1].retry_wait,
+            reverse=True,
+        )
+        total_calls = sum(s.calls for s in self.endpoints.values())
+        total_retries = sum(s.retries for s in self.endpoints.values())
+        total_wait = sum(s.retry_wait for s in self.endpoints.values())
+        lines = [
+            f"--- Métricas Graph: {total_calls} llamadas, {total_retries} reintentos, "
+            f"{total_wait:.1f}s esperando Retry-After/backoff ---",
+            f"  {'Endpoint':<52} {'Llam.':>6} {'p50':>6} {'p95':>6} {'Cola':>7} "
+            f"{'Reint.':>6} {'Espera':>7} {'KB in':>8}",
+        ]
+        for key, s in rows[:limit]:
+            lines.append(
+                f"  {key[:52]:<52} {s.calls:>6} {s.latency_quantile(0.5):>5.2f}s "
+                f"{s.latency_quantile(0.95):>5.2f}s {s.queue_wait:>6.1f}s {s.retries:>6} "
+                f"{s.retry_wait:>6.1f}s {s.bytes_in / 1024:>8.1f}"
+            )
+        if len(rows) > limit:
+            lines.append(f"  ... y {len(rows) - limit} endpoints más")
+        return "\n".join(lines)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+_METRICS: MetricsRegistry | None = None
+_OUTPUT: Path | None = None
+
+
+def graph_metrics() -> MetricsRegistry:
+    """Registro de métricas de proceso."""
+    global _METRICS
+    if _METRICS is None:
+        _METRICS = MetricsRegistry()
+    return _METRICS
+
+
+def configure_metrics(output: Path | None) -> None:
+    """Archivo donde report_metrics() vuelca las métricas (p. ej. desde --metrics-file)."""
+    global _OUTPUT
+    _OUTPUT = output
+
+
+def report_metrics() -> None:
+    """Imprime el resumen y escribe el archivo de métricas (si se configuró). Fin de ejecución."""
+    metrics = graph_metrics()
+    if not metrics.endpoints:
+        return
+    print()
+    print(metrics.summary())
+    env_output = os.environ.get("GRAPH_METRICS_FILE", "").strip()
+    output = _OUTPUT or (Path(env_output) if env_output else None)
+    if output is not None:
+        metrics.write(output)
+        print(f"  Métricas guardadas en {output}")
@@ -22,7 +22,9 @@ async def _planner_summary() -> None:
             return
 
         sys.path.insert(0, str(mcp_path))
+        sys.path.insert(0, str(Path(__file__).parent.parent))
         from dotenv import load_dotenv
+        from graph_auth import cached_token
         from src.auth.microsoft import MicrosoftAuthManager
         from src.config import Settings
 
@@ -34,7 +36,8 @@ async def _planner_summary() -> None:
             client_id=settings.azure_client_id,
             client_secret=settings.azure_client_secret,
         )
-        token = auth.get_token()
+        # Caché en disco compartida con los CLI: sin viaje a AAD si hay token vigente
+        token = cached_token(auth, settings.azure_tenant_id, settings.azure_client_id)
         group_id = os.environ.get("PLANNER_GROUP_ID", "198b4a0a-39c7-4521-a546-6a008e3a254a")
 
         async with httpx.AsyncClient(timeout=10.0) as client:
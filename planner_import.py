@@ -10,6 +10,7 @@ Uso:
   python planner_import.py [--dry-run]
   python planner_import.py --csv <ruta> --group-id <guid>
   python planner_import.py --mode tasks --csv <ruta>
+  python planner_import.py --mode sync --csv <ruta> [--dry-run]
   python planner_import.py --mode buckets --csv <ruta>
   python planner_import.py --mode plan --csv <ruta> --group-id <guid>
   python planner_import.py --mode list [--filter <texto>]
@@ -20,17 +21,20 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import contextlib
+import contextvars
 import csv
 import os
 import re
 import sys
 import uuid
 import webbrowser
-from dataclasses import dataclass, field
+from collections import Counter
+from dataclasses import dataclass, field, replace
 from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Any
-from urllib.parse import urlparse
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator
+from urllib.parse import quote, urlparse
 
 import httpx
 from dotenv import load_dotenv
@@ -50,12 +54,50 @@ load_dotenv(MCP_PATH / ".env")
 from src.auth.microsoft import MicrosoftAuthManager  # noqa: E402
 from src.config import Settings  # noqa: E402
 
+from graph_auth import AsyncTokenProvider, TokenLike, resolve_token, token_identity  # noqa: E402
+from graph_batch import BatchConfig, configure_batching, graph_batcher  # noqa: E402
+from graph_cache import CacheConfig, configure_cache, response_cache, response_etag  # noqa: E402
+from graph_client import (  # noqa: E402
+    THROTTLE_STATUS,
+    Priority,
+    classify_workload,
+    default_priority,
+    is_idempotent,
+    request_priority,
+    run_with_graph_client,
+    send_with_retry,
+    shared_graph_client,
+    single_flight,
+)
+from graph_cassette import CassetteConfig, configure_cassette  # noqa: E402
+from graph_deadline import (  # noqa: E402
+    DeadlineConfig,
+    DeadlineExceeded,
+    configure_deadlines,
+    deadline_config,
+    parse_duration,
+    start_phase,
+    within,
+)
+from graph_directory import DirectoryConfig, configure_directory_cache, directory_cache  # noqa: E402
+from graph_emulator import emulator_requested, install_emulator  # noqa: E402
+from graph_journal import (  # noqa: E402
+    JournalMismatch,
+    OperationJournal,
+    configure_journal,
+    journal_config,
+    open_journal,
+    resume_hint,
+)
+from graph_metrics import configure_metrics  # noqa: E402
+
 # ── Constantes ────────────────────────────────────────────────────────────────
 GROUP_ID = "198b4a0a-39c7-4521-a546-6a008e3a254a"
 # ASSIGNEE_GUID anterior (ahora resuelto dinámicamente desde AssignedToEmail del CSV):
 # ASSIGNEE_GUID = "eed15e14-17d2-46fb-ac5f-d415b6e9db1f"
 CSV_PATH = Path(r"C:\Users\dmorales\OneDrive - Cosemar\PM\Definicion plan control y gestión de proyectos\Docs\Borradores_proyectos_tareas\Planner_Imp_PROJ1.csv")
-GRAPH_BASE = "https://graph.microsoft.com/v1.0"
+# GRAPH_BASE=http://127.0.0.1:8765/v1.0 apunta al emulador local (graph_emulator)
+GRAPH_BASE = os.environ.get("GRAPH_BASE", "").strip().rstrip("/") or "https://graph.microsoft.com/v1.0"
 SHAREPOINT_SITE_URL = "https://cosemar.sharepoint.com/sites/Gestioncontrolproyectos"
 
 CHECKLIST_TITLE_MAX = 100  # límite Planner — ítems más largos causan 400
@@ -80,12 +122,36 @@ BUCKET_ORDER: dict[str, int] = {
 # Se construye en runtime por configure_plan_labels(): {"TI": "category1", ...}
 LABEL_MAP: dict[str, str] = {}
 
+# Categorías del plan que se está importando (plan_labels()); None = LABEL_MAP. Cada plan
+# de un CSV con varios PlanName se importa en su propia tarea asyncio con su propio mapa.
+_PLAN_LABELS: contextvars.ContextVar[dict[str, str] | None] = contextvars.ContextVar("plan_labels", default=None)
+
 # Cache de resolución GUID → email (para modo email-report)
 _GUID_TO_EMAIL_CACHE: dict[str, str | None] = {}
 
 # Cache de resolución GUID → displayName (para reportes HTML)
 _GUID_TO_NAME_CACHE: dict[str, str | None] = {}
 
+# POST /planner/tasks con "details" (descripción + checklist) en el mismo cuerpo: 1 llamada
+# por tarea en lugar de POST → GET details → PATCH details. GRAPH_INLINE_DETAILS=0 fuerza
+# las 3 llamadas; create_task_full() lo desactiva solo si Graph rechaza el cuerpo con details.
+INLINE_TASK_DETAILS: bool = os.environ.get("GRAPH_INLINE_DETAILS", "").strip().lower() not in ("0", "false", "no")
+# True en cuanto una tarea creada con details en línea los conserva (ver create_task_full)
+_INLINE_DETAILS_VERIFIED: bool = False
+
+# Tareas que se crean a la vez en los modos full/tasks (create_tasks_pipeline). El ritmo
+# real lo ponen los presupuestos por servicio de graph_client; esto solo acota cuántas
+# tareas hay en vuelo. GRAPH_IMPORT_WORKERS / --workers; 1 = secuencial.
+IMPORT_WORKERS: int = int(os.environ.get("GRAPH_IMPORT_WORKERS", "").strip() or 16)
+
+# Emails por consulta GET /users?$filter=mail in (…) or userPrincipalName in (…) en
+# resolve_emails_bulk(). Graph admite hasta 15 expresiones por $filter de directorio y
+# cada email cuenta dos veces (mail y UPN).
+USER_FILTER_CHUNK = 7
+
+# GUIDs por llamada POST /directoryObjects/getByIds en resolve_guids_bulk() (máximo de Graph).
+DIRECTORY_IDS_CHUNK = 1000
+
 
 # ── Transformaciones ──────────────────────────────────────────────────────────
 
@@ -148,13 +214,28 @@ def build_checklist(items_str: str) -> tuple[dict[str, Any], list[str]]:
     return result, warnings
 
 
+@contextlib.contextmanager
+def plan_labels(label_map: dict[str, str]) -> Iterator[None]:
+    """Categorías (etiqueta → categoryN) con las que parse_labels() etiqueta las tareas
+    creadas dentro del bloque (y en las tareas asyncio lanzadas desde él)."""
+    reset = _PLAN_LABELS.set(label_map)
+    try:
+        yield
+    finally:
+        _PLAN_LABELS.reset(reset)
+
+
 def parse_labels(labels_str: str) -> dict[str, bool]:
-    """'TI;PM' → {'category1': True, 'category2': True} según LABEL_MAP"""
+    """'TI;PM' → {'category1': True, 'category2': True} según el plan activo (plan_labels)
+    o, fuera de él, LABEL_MAP"""
+    label_map = _PLAN_LABELS.get()
+    if label_map is None:
+        label_map = LABEL_MAP
     applied: dict[str, bool] = {}
     for label in labels_str.split(";"):
         label = label.strip()
-        if label and label in LABEL_MAP:
-            applied[LABEL_MAP[label]] = True
+        if label and label in label_map:
+            applied[label_map[label]] = True
     return applied
 
 
@@ -798,6 +879,17 @@ def extract_ordered_unique(tasks: list[dict], key: str) -> list[str]:
     return seen
 
 
+def csv_labels(tasks: list[dict[str, Any]]) -> list[str]:
+    """Etiquetas distintas de la columna Labels ("TI;PM"), en orden de aparición."""
+    return extract_ordered_unique(
+        [{"labels_raw": lbl}
+         for t in tasks
+         for lbl in t["labels_raw"].split(";")
+         if lbl.strip()],
+        "labels_raw",
+    )
+
+
 def parse_csv_tasks(path: Path) -> tuple[list[dict[str, Any]], list[str]]:
     """Modo tasks: requiere columnas PlanID y BucketID."""
     tasks: list[dict[str, Any]] = []
@@ -891,44 +983,197 @@ async def graph_request(
     client: httpx.AsyncClient,
     method: str,
     endpoint: str,
-    token: str,
+    token: TokenLike,
     *,
     json: Any = None,
     etag: str | None = None,
+    priority: Priority | None = None,
 ) -> Any:
-    """Wrapper con retry para 429 y raise_for_status.
+    """Wrapper con retry (graph_client.RetryPolicy) y raise_for_status.
+    `client` es normalmente el pool compartido de graph_client.shared_graph_client().
+    Cada intento pasa por el presupuesto de su servicio (classify_workload: planner,
+    users, threads, mail, drive, teams): concurrencia máxima y ThrottleController AIMD
+    propios; un 429/503 recorta el ritmo y pausa sólo ese servicio. En métodos
+    idempotentes, 502/504, timeouts y cortes de red se reintentan con backoff + jitter.
+    Con batching activo (--batch / GRAPH_BATCH=1) las llamadas concurrentes viajan
+    juntas en POST /$batch; la respuesta de cada ítem se procesa aquí igual que una directa.
+    `token` puede ser el string o un graph_auth.AsyncTokenProvider; con proveedor el token
+    se resuelve en cada intento y un 401 lo invalida y reintenta una vez.
+    Los GET concurrentes con la misma URL y el mismo token comparten una única llamada
+    (graph_client.SingleFlight) y reciben el mismo objeto ya parseado: no mutarlo.
+    `priority` (graph_client.Priority) ordena la cola del workload; por defecto la del
+    bloque request_priority() activo o, si no hay, CRITICAL para escrituras e INTERACTIVE
+    para lecturas. Un GET compartido viaja con la prioridad de quien lo lanzó primero.
     FUTURO MCP: patrón idéntico a GraphAPIClient._make_request()
     """
+    if priority is None:
+        priority = default_priority(method)
+    if method == "GET":
+        key = (token_identity(await resolve_token(token)), method, endpoint)
+        return await single_flight().do(
+            key, lambda: _graph_request(client, method, endpoint, token, json=json, etag=etag, priority=priority),
+        )
+    return await _graph_request(client, method, endpoint, token, json=json, etag=etag, priority=priority)
+
+
+async def _graph_request(
+    client: httpx.AsyncClient,
+    method: str,
+    endpoint: str,
+    token: TokenLike,
+    *,
+    json: Any = None,
+    etag: str | None = None,
+    priority: Priority = Priority.INTERACTIVE,
+) -> Any:
     headers: dict[str, str] = {
-        "Authorization": f"Bearer {token}",
         "Content-Type": "application/json",
         "Accept": "application/json",
     }
     if etag:
         headers["If-Match"] = etag
 
-    for attempt in range(3):
-        resp = await client.request(
+    # GET condicional: con copia en caché se pide sólo si cambió (304 → copia local)
+    cache = response_cache()
+    cache_key: str | None = None
+    cached = None
+    if cache.enabled and method == "GET":
+        cache_key = cache.key(token_identity(await resolve_token(token)), endpoint)
+        cached = cache.lookup(cache_key)
+        if cached is not None:
+            headers["If-None-Match"] = cached.etag
+
+    batcher = graph_batcher()
+    batched = batcher.is_batchable(method, endpoint)
+
+    async def _send() -> httpx.Response:
+        # El token se resuelve en cada intento: un reintento tras una pausa larga
+        # usa el token ya refrescado por el AsyncTokenProvider
+        attempt_headers = {"Authorization": f"Bearer {await resolve_token(token)}", **headers}
+        if batched:
+            # El batcher reserva un hueco del throttle por ítem al vaciar la cola
+            return await batcher.send(client, method, GRAPH_BASE, endpoint, attempt_headers, json)
+        return await client.request(
             method,
             f"{GRAPH_BASE}{endpoint}",
-            headers=headers,
+            headers=attempt_headers,
             json=json,
         )
-        if resp.status_code == 429:
-            wait = int(resp.headers.get("Retry-After", 60))
-            print(f"      [throttle] esperando {wait}s...")
-            await asyncio.sleep(wait)
-            continue
-        if resp.status_code == 204:
-            return None
-        resp.raise_for_status()
-        return resp.json()
 
-    raise RuntimeError(f"Máximo de reintentos para {method} {endpoint}")
+    async def _send_with_retry() -> httpx.Response:
+        return await send_with_retry(
+            _send, f"{method} {endpoint}",
+            idempotent=is_idempotent(method, headers),
+            workload=classify_workload(endpoint),
+            acquire=not batched,
+            priority=priority,
+        )
+
+    resp = await _send_with_retry()
+    if resp.status_code == 401 and isinstance(token, AsyncTokenProvider):
+        # Token revocado o caducado antes de tiempo: se pide uno nuevo y se reintenta una vez
+        token.invalidate()
+        resp = await _send_with_retry()
+    if resp.status_code in THROTTLE_STATUS:
+        raise RuntimeError(f"Máximo de reintentos para {method} {endpoint}")
+    if resp.status_code == 304 and cached is not None:
+        cache.touch(cache_key)
+        return cached.body
+    if resp.status_code == 204:
+        return None
+    resp.raise_for_status()
+    data = resp.json()
+    if cache_key is not None:
+        new_etag = response_etag(resp.headers, data)
+        if new_etag:
+            cache.store(cache_key, new_etag, data)
+    return data
+
+
+def with_query(endpoint: str, **params: Any) -> str:
+    """Añade parámetros OData ($top, $select…) al endpoint sin pisar los que ya trae.
+    Los valores None se omiten: with_query("/x", top=100, select=None) → "/x?$top=100".
+    """
+    present = {part.split("=", 1)[0] for part in urlparse(endpoint).query.split("&") if part}
+    extra = [
+        f"${name}={value}" for name, value in params.items()
+        if value is not None and f"${name}" not in present
+    ]
+    if not extra:
+        return endpoint
+    return endpoint + ("&" if "?" in endpoint else "?") + "&".join(extra)
+
+
+async def graph_paginate_pages(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    token: TokenLike,
+    *,
+    top: int | None = None,
+    select: str | None = None,
+    prefetch: bool = False,
+) -> AsyncIterator[list[dict[str, Any]]]:
+    """Async generator: cada página `value` de una colección de Graph, siguiendo @odata.nextLink.
+
+    `top` y `select` se inyectan en la primera petición (nextLink ya los arrastra).
+    Con `prefetch=True` la página siguiente se pide mientras el llamador procesa la
+    actual; si el llamador deja de iterar, la petición adelantada se cancela.
+    FUTURO MCP: graph/client.py → GraphAPIClient.paginate()
+    """
+    next_endpoint = with_query(endpoint, top=top, select=select)
+    pending: asyncio.Task | None = None
+    try:
+        data = await graph_request(client, "GET", next_endpoint, token)
+        while True:
+            next_link: str = data.get("@odata.nextLink", "")
+            next_endpoint = next_link.replace(GRAPH_BASE, "") if next_link else ""
+            if prefetch and next_endpoint:
+                pending = asyncio.create_task(graph_request(client, "GET", next_endpoint, token))
+            yield data.get("value", [])
+            if not next_endpoint:
+                return
+            if pending is not None:
+                data, pending = await pending, None
+            else:
+                data = await graph_request(client, "GET", next_endpoint, token)
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+
+
+async def graph_paginate(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    token: TokenLike,
+    **kwargs: Any,
+) -> AsyncIterator[dict[str, Any]]:
+    """Como graph_paginate_pages() pero ítem a ítem."""
+    async for page in graph_paginate_pages(client, endpoint, token, **kwargs):
+        for item in page:
+            yield item
+
+
+# Esperas (s) ante 404 al leer un recurso recién creado: Planner replica con retraso
+REPLICATION_RETRY_DELAYS: tuple[float, ...] = (0.5, 1.0, 2.0, 4.0)
+
+
+async def get_after_create(client: httpx.AsyncClient, endpoint: str, token: TokenLike) -> Any:
+    """GET de un recurso recién creado, reintentando 404 mientras Planner replica.
+    Sustituye a la pausa fija de 2s tras create_plan(): sólo espera cuando hace falta.
+    """
+    for delay in REPLICATION_RETRY_DELAYS:
+        try:
+            return await graph_request(client, "GET", endpoint, token)
+        except httpx.HTTPStatusError as exc:
+            if exc.response.status_code != 404:
+                raise
+        print(f"      [replicación] 404 en {endpoint} — reintento en {delay:g}s")
+        await asyncio.sleep(delay)
+    return await graph_request(client, "GET", endpoint, token)
 
 
 async def create_plan(
-    client: httpx.AsyncClient, token: str, group_id: str, title: str
+    client: httpx.AsyncClient, token: TokenLike, group_id: str, title: str
 ) -> dict[str, Any]:
     """POST /planner/plans → FUTURO MCP: GraphAPIClient.create_plan()"""
     return await graph_request(
@@ -938,12 +1183,14 @@ async def create_plan(
 
 
 async def configure_plan_labels(
-    client: httpx.AsyncClient, token: str, plan_id: str, labels: list[str]
-) -> None:
+    client: httpx.AsyncClient, token: TokenLike, plan_id: str, labels: list[str]
+) -> dict[str, str]:
     """Define categorías del plan y construye LABEL_MAP global.
+    Devuelve además el mapa de este plan, para activarlo con plan_labels() al importar
+    varios planes a la vez (LABEL_MAP queda con las etiquetas de todos).
     FUTURO MCP: GraphAPIClient.patch_plan_details()
     """
-    details = await graph_request(client, "GET", f"/planner/plans/{plan_id}/details", token)
+    details = await get_after_create(client, f"/planner/plans/{plan_id}/details", token)
     etag = details["@odata.etag"]
     category_descriptions = {f"category{i + 1}": lbl for i, lbl in enumerate(labels)}
     await graph_request(
@@ -951,13 +1198,14 @@ async def configure_plan_labels(
         json={"categoryDescriptions": category_descriptions},
         etag=etag,
     )
-    for i, lbl in enumerate(labels):
-        LABEL_MAP[lbl] = f"category{i + 1}"
+    label_map = {lbl: f"category{i + 1}" for i, lbl in enumerate(labels)}
+    LABEL_MAP.update(label_map)
+    return label_map
 
 
 async def create_bucket(
     client: httpx.AsyncClient,
-    token: str,
+    token: TokenLike,
     plan_id: str,
     name: str,
     order_hint: str = " !",
@@ -969,64 +1217,192 @@ async def create_bucket(
     )
 
 
+# ── Proyecciones $select por uso ──────────────────────────────────────────────
+# Campos que cada flujo lee de verdad; el resto del payload (orderHint, previewType,
+# appliedCategories, createdBy…) sólo cuesta bytes, decodificación JSON y memoria.
+# Sólo propiedades v1.0 existentes: Graph responde 400 a un $select desconocido
+# (p. ej. lastModifiedDateTime o commentCount en plannerTask, ver diagnose_missing_fields.py).
+SELECT_PROFILES: dict[str, dict[str, tuple[str, ...]]] = {
+    # Tabla de terminal y KPIs de --mode report (+ hilo de comentarios para --comments)
+    "report": {
+        "plan": ("id", "title", "createdDateTime"),
+        "bucket": ("id", "name"),
+        "task": (
+            "id", "title", "bucketId", "assignments", "percentComplete",
+            "dueDateTime", "priority", "conversationThreadId",
+        ),
+    },
+    # HTML de --mode email-report
+    "email-report": {
+        "plan": ("id", "title", "createdDateTime"),
+        "bucket": ("id", "name"),
+        "task": ("id", "title", "bucketId", "assignments", "percentComplete", "dueDateTime", "priority"),
+    },
+    # Columnas del CSV de --export
+    "export": {
+        "plan": ("id", "title"),
+        "bucket": ("id", "name"),
+        "task": (
+            "id", "title", "bucketId", "assignments", "percentComplete",
+            "dueDateTime", "createdDateTime",
+        ),
+    },
+    # Comparación CSV ↔ Planner (--mode sync): todo lo que el import escribe en la tarea,
+    # más los contadores que dicen si hace falta leer sus details
+    "diff": {
+        "plan": ("id", "title"),
+        "bucket": ("id", "name", "orderHint"),
+        "task": (
+            "id", "title", "bucketId", "assignments", "percentComplete", "priority",
+            "startDateTime", "dueDateTime", "appliedCategories",
+            "hasDescription", "checklistItemCount",
+        ),
+    },
+}
+
+
+def select_for(resource: str, *profiles: str | None) -> str | None:
+    """Valor de $select para `resource` ("plan", "bucket", "task") uniendo los perfiles dados.
+    Sin perfiles → None (payload completo, como antes).
+    """
+    fields: dict[str, None] = {}
+    for profile in profiles:
+        if profile is None:
+            continue
+        if profile not in SELECT_PROFILES:
+            raise ValueError(f"Perfil $select desconocido: {profile!r}")
+        fields.update(dict.fromkeys(SELECT_PROFILES[profile][resource]))
+    return ",".join(fields) or None
+
+
 async def list_plans(
-    client: httpx.AsyncClient, token: str, group_id: str
+    client: httpx.AsyncClient, token: TokenLike, group_id: str, *profiles: str,
 ) -> list[dict[str, Any]]:
-    """GET /groups/{groupId}/planner/plans con paginación @odata.nextLink.
+    """GET /groups/{groupId}/planner/plans con paginación @odata.nextLink (graph_paginate).
     Devuelve lista de dicts con al menos: id, title, createdDateTime, @odata.etag
+    `profiles` (p. ej. "report") limita los campos con $select (ver SELECT_PROFILES).
     """
-    plans: list[dict[str, Any]] = []
-    endpoint: str = f"/groups/{group_id}/planner/plans"
-    while endpoint:
-        data = await graph_request(client, "GET", endpoint, token)
-        plans.extend(data.get("value", []))
-        next_link: str = data.get("@odata.nextLink", "")
-        endpoint = next_link.replace(GRAPH_BASE, "") if next_link else ""
-    return plans
+    return [
+        p async for p in graph_paginate(
+            client, f"/groups/{group_id}/planner/plans", token, select=select_for("plan", *profiles),
+        )
+    ]
 
 
 async def list_buckets(
     client: httpx.AsyncClient,
-    token: str,
+    token: TokenLike,
     plan_id: str,
+    *profiles: str,
 ) -> list[dict[str, Any]]:
-    """GET /planner/plans/{id}/buckets con paginación @odata.nextLink.
+    """GET /planner/plans/{id}/buckets con paginación @odata.nextLink (graph_paginate).
     Devuelve lista de dicts con al menos: id, name
     """
-    buckets: list[dict[str, Any]] = []
-    endpoint: str = f"/planner/plans/{plan_id}/buckets"
-    while endpoint:
-        data = await graph_request(client, "GET", endpoint, token)
-        buckets.extend(data.get("value", []))
-        next_link: str = data.get("@odata.nextLink", "")
-        endpoint = next_link.replace(GRAPH_BASE, "") if next_link else ""
-    return buckets
+    return [
+        b async for b in graph_paginate(
+            client, f"/planner/plans/{plan_id}/buckets", token, select=select_for("bucket", *profiles),
+        )
+    ]
 
 
 async def list_tasks(
     client: httpx.AsyncClient,
-    token: str,
+    token: TokenLike,
     plan_id: str,
+    *profiles: str,
+    expand_details: bool = False,
 ) -> list[dict[str, Any]]:
     """GET /planner/plans/{id}/tasks con paginación @odata.nextLink.
     Por defecto, Microsoft Graph devuelve: id, title, bucketId, percentComplete, assignments,
     dueDateTime, createdDateTime, completedDateTime, priority.
-    Nota: commentCount y conversationThreadId no están disponibles en este endpoint —
-    se obtienen en get_task_details() si es necesario.
+    Nota: commentCount no existe en plannerTask. conversationThreadId sólo llega si se
+    pide con $select (perfil "report"); si no, hay que pedir la tarea individual.
+    `profiles` limita los campos con $select (ver SELECT_PROFILES); sin perfiles, payload completo.
+    La página siguiente se pide mientras se procesa la actual (prefetch). Para recorrer
+    planes muy grandes sin acumularlos, usar graph_paginate() directamente.
+    `expand_details` añade $expand=details: cada tarea trae su "details" (descripción,
+    checklist y su propio @odata.etag) sin un GET por tarea.
     """
-    tasks: list[dict[str, Any]] = []
-    endpoint: str = f"/planner/plans/{plan_id}/tasks"
-    while endpoint:
-        data = await graph_request(client, "GET", endpoint, token)
-        tasks.extend(data.get("value", []))
-        next_link: str = data.get("@odata.nextLink", "")
-        endpoint = next_link.replace(GRAPH_BASE, "") if next_link else ""
-    return tasks
+    endpoint = f"/planner/plans/{plan_id}/tasks"
+    if expand_details:
+        endpoint = with_query(endpoint, expand="details")
+    return [
+        t async for t in graph_paginate(
+            client, endpoint, token,
+            select=select_for("task", *profiles), prefetch=True,
+        )
+    ]
+
+
+# Planes siguientes cuyo listado se pide por adelantado mientras se procesa el actual
+PLAN_LISTING_LOOKAHEAD = 1
+
+_Listing = tuple[list[dict[str, Any]], list[dict[str, Any]]]
+
+
+class PlanListings:
+    """plan_id → tarea con (buckets, tasks), lanzada al pedirla junto con las de los
+    PLAN_LISTING_LOOKAHEAD planes siguientes. Así nunca hay en memoria ni en vuelo más
+    que unos pocos listados, elija el usuario 2 planes o 200."""
+
+    def __init__(
+        self, load: Callable[[str], Awaitable[_Listing]], plan_ids: list[str], lookahead: int,
+    ) -> None:
+        self._load = load
+        self._order = plan_ids
+        self._position = {pid: i for i, pid in enumerate(plan_ids)}
+        self._lookahead = lookahead
+        self._tasks: dict[str, asyncio.Task[_Listing]] = {}
+
+    def start(self, index: int) -> None:
+        """Lanza los listados del plan `index` y de los `lookahead` siguientes que falten."""
+        with request_priority(Priority.INTERACTIVE):
+            for pid in self._order[index:index + 1 + self._lookahead]:
+                if pid not in self._tasks:
+                    self._tasks[pid] = asyncio.create_task(self._load(pid))
+
+    def __getitem__(self, plan_id: str) -> asyncio.Task[_Listing]:
+        self.start(self._position[plan_id])
+        return self._tasks[plan_id]
+
+    def values(self) -> Iterable[asyncio.Task[_Listing]]:
+        return self._tasks.values()
+
+
+def start_plan_listings(
+    client: httpx.AsyncClient,
+    token: TokenLike,
+    plans: list[dict[str, Any]],
+    *profiles: str,
+) -> PlanListings:
+    """Lanza ya, con prioridad INTERACTIVE, list_buckets + list_tasks del primer plan y de
+    los PLAN_LISTING_LOOKAHEAD siguientes; el resto se pide a medida que se avanza.
+
+    Los reportes recorren los planes en orden y enriquecen cada uno con cientos de
+    lecturas BACKGROUND; así el listado del plan siguiente no queda en cola detrás de
+    ellas. Devuelve plan_id → tarea con (buckets, tasks). Cancelar las pendientes con
+    cancel_plan_listings() al salir.
+    """
+    async def _load(plan_id: str) -> _Listing:
+        buckets = await list_buckets(client, token, plan_id, *profiles)
+        return buckets, await list_tasks(client, token, plan_id, *profiles)
+
+    listings = PlanListings(_load, [p["id"] for p in plans], PLAN_LISTING_LOOKAHEAD)
+    listings.start(0)
+    return listings
+
+
+def cancel_plan_listings(listings: PlanListings) -> None:
+    for task in listings.values():
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()   # marcar como recuperada: el error ya se reportó o no interesa
 
 
 async def get_task_details(
     client: httpx.AsyncClient,
-    token: str,
+    token: TokenLike,
     task_id: str,
 ) -> dict[str, Any]:
     """GET /planner/tasks/{id}/details para extraer descripción y checklist.
@@ -1037,7 +1413,7 @@ async def get_task_details(
 
 async def get_last_comment(
     client: httpx.AsyncClient,
-    token: str,
+    token: TokenLike,
     group_id: str,
     thread_id: str,
 ) -> dict[str, str]:
@@ -1069,7 +1445,7 @@ async def get_last_comment(
 
 
 async def delete_plan(
-    client: httpx.AsyncClient, token: str, plan_id: str
+    client: httpx.AsyncClient, token: TokenLike, plan_id: str
 ) -> None:
     """GET /planner/plans/{id} para obtener ETag → DELETE /planner/plans/{id}.
     graph_request() ya maneja 429 y raise_for_status.
@@ -1083,7 +1459,7 @@ async def delete_plan(
 
 async def send_mail_report(
     client: httpx.AsyncClient,
-    token: str,
+    token: TokenLike,
     to_emails: list[str],
     subject: str,
     html_body: str,
@@ -1122,7 +1498,7 @@ async def send_mail_report(
 
 async def get_site_id(
     client: httpx.AsyncClient,
-    token: str,
+    token: TokenLike,
     site_url: str,
 ) -> str:
     """GET /sites/{hostname}:/{site_path} → devuelve el site ID."""
@@ -1137,7 +1513,7 @@ async def get_site_id(
 
 async def list_site_drive_items(
     client: httpx.AsyncClient,
-    token: str,
+    token: TokenLike,
     site_id: str,
     folder_path: str = "",
 ) -> list[dict[str, Any]]:
@@ -1148,17 +1524,14 @@ async def list_site_drive_items(
     """
     select = "name,size,file,folder,webUrl,lastModifiedDateTime,createdBy"
     if folder_path:
-        endpoint = f"/sites/{site_id}/drive/root:/{folder_path}:/children?$select={select}&$top=100"
+        endpoint = f"/sites/{site_id}/drive/root:/{folder_path}:/children"
     else:
-        endpoint = f"/sites/{site_id}/drive/root/children?$select={select}&$top=100"
-
-    items: list[dict[str, Any]] = []
-    while endpoint:
-        data = await graph_request(client, "GET", endpoint, token)
-        items.extend(data.get("value", []))
-        next_link: str = data.get("@odata.nextLink", "")
-        endpoint = next_link.replace(GRAPH_BASE, "") if next_link else ""
-    return items
+        endpoint = f"/sites/{site_id}/drive/root/children"
+    return [
+        item async for item in graph_paginate(
+            client, endpoint, token, top=100, select=select, prefetch=True,
+        )
+    ]
 
 
 def _print_plans_table(plans: list[dict[str, Any]]) -> None:
@@ -1171,6 +1544,12 @@ def _print_plans_table(plans: list[dict[str, Any]]) -> None:
     print()
 
 
+def _print_enrichment_skipped(plan_title: str, skipped: Counter[str]) -> None:
+    """Avisa qué datos de enriquecimiento faltan en el plan por plazo agotado."""
+    detail = ", ".join(f"{what}: {n} tarea(s)" for what, n in skipped.items() if n)
+    print(f"  [plazo] '{plan_title}': enriquecimiento incompleto por plazo agotado — sin {detail}")
+
+
 def _print_docs_table(items: list[dict[str, Any]], filter_text: str = "") -> None:
     """Imprime tabla de DriveItems (archivos/carpetas) de SharePoint."""
     if filter_text:
@@ -1186,83 +1565,252 @@ def _print_docs_table(items: list[dict[str, Any]], filter_text: str = "") -> Non
         print(f"  {i:<4} {tipo:<7} {name:<50} {modified:<12} {size:>10}")
 
 
+async def _directory_tenant(token: TokenLike) -> str:
+    """Tenant del token: clave de la caché de directorio ("" si está desactivada)."""
+    if not directory_cache().enabled:
+        return ""
+    return token_identity(await resolve_token(token)).split(":", 1)[0]
+
+
+def _not_found(exc: BaseException) -> bool:
+    """404 de /users: el usuario no existe (se guarda como negativo en graph_directory)."""
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 404
+
+
 async def resolve_email_to_guid(
     client: httpx.AsyncClient,
-    token: str,
+    token: TokenLike,
     email: str,
     cache: dict[str, str | None],
 ) -> str | None:
-    """GET /users/{email} → extrae 'id'. Caché en memoria por sesión.
+    """GET /users/{email} → extrae 'id'. Caché en memoria por sesión y, con
+    --directory-cache, en disco entre ejecuciones (graph_directory).
     Devuelve None si el email no existe o la API falla (warning impreso).
     """
     if email in cache:
         return cache[email]
+    tenant = await _directory_tenant(token)
+    found, stored = directory_cache().get(tenant, "guid", email)
+    if found:
+        cache[email] = stored
+        return stored
     try:
-        data = await graph_request(client, "GET", f"/users/{email}", token)
+        data = await graph_request(client, "GET", f"/users/{email}?$select=id", token)
         guid: str = data["id"]
         cache[email] = guid
+        directory_cache().put(tenant, "guid", email, guid)
         return guid
+    except DeadlineExceeded:
+        raise
     except Exception as exc:
         print(f"      [WARN] No se pudo resolver '{email}': {exc}")
         cache[email] = None
+        if _not_found(exc):
+            directory_cache().put(tenant, "guid", email, None)
         return None
 
 
+async def resolve_emails_bulk(
+    client: httpx.AsyncClient,
+    token: TokenLike,
+    emails: Iterable[str],
+    cache: dict[str, str | None],
+) -> dict[str, str | None]:
+    """Resuelve a GUID todos los emails de una vez, antes de crear nada.
+
+    GET /users?$filter=mail in (…) or userPrincipalName in (…) por bloques de
+    USER_FILTER_CHUNK, en paralelo. Rellena `cache` (el de resolve_email_to_guid), también
+    con None para los que no existen, así la creación de tareas ya no consulta usuarios.
+    Si la consulta de un bloque falla (400 al filtro, otro error HTTP o de red), ese bloque
+    se resuelve email a email.
+    Con --directory-cache sólo se consultan los que no están en disco, y lo encontrado
+    (también los inexistentes y el mail de cada GUID) se guarda para la próxima ejecución.
+    Devuelve {email: GUID o None} de los emails pedidos.
+    """
+    wanted = extract_ordered_unique([{"email": e} for e in emails if e], "email")
+    directory = directory_cache()
+    tenant = await _directory_tenant(token)
+    pending: list[str] = []
+    for e in wanted:
+        if e in cache:
+            continue
+        found, stored = directory.get(tenant, "guid", e)
+        if found:
+            cache[e] = stored
+        else:
+            pending.append(e)
+
+    async def _chunk(chunk: list[str]) -> None:
+        values = ",".join("'" + e.replace("'", "''") + "'" for e in chunk)
+        query = quote(f"mail in ({values}) or userPrincipalName in ({values})", safe="'(),@")
+        try:
+            users = [
+                u async for u in graph_paginate(
+                    client, f"/users?$filter={query}", token, select="id,mail,userPrincipalName",
+                )
+            ]
+        except (httpx.HTTPStatusError, httpx.RequestError) as exc:
+            # Filtro rechazado (400), sin permiso para filtrar o fallo de red tras los
+            # reintentos: ese bloque se resuelve email a email (que avisa y sigue)
+            print(f"      [WARN] Búsqueda de usuarios por bloque falló ({exc}) — se resuelven uno a uno")
+            await asyncio.gather(*(resolve_email_to_guid(client, token, e, cache) for e in chunk))
+            return
+        found: dict[str, str] = {}
+        for user in users:
+            for key in (user.get("mail"), user.get("userPrincipalName")):
+                if key:
+                    found.setdefault(key.lower(), user["id"])
+        for e in chunk:
+            cache[e] = found.get(e.lower())
+        directory.put_many(tenant, "guid", {e: cache[e] for e in chunk})
+        directory.put_many(tenant, "mail", {
+            u["id"]: u.get("mail") or u.get("userPrincipalName") for u in users
+        })
+
+    await asyncio.gather(*(
+        _chunk(pending[i:i + USER_FILTER_CHUNK]) for i in range(0, len(pending), USER_FILTER_CHUNK)
+    ))
+    return {e: cache[e] for e in wanted}
+
+
+async def prefetch_assignees(
+    client: httpx.AsyncClient,
+    token: TokenLike,
+    emails: Iterable[str],
+    cache: dict[str, str | None],
+) -> dict[str, str | None]:
+    """resolve_emails_bulk() + aviso de los emails que no existen en el directorio."""
+    resolved = await resolve_emails_bulk(client, token, emails, cache)
+    missing = [e for e, guid in resolved.items() if guid is None]
+    print(f"      Asignados: {len(resolved) - len(missing)}/{len(resolved)} emails resueltos")
+    if missing:
+        print(f"      [WARN] {len(missing)} emails no existen en el directorio — quedarán sin asignar:")
+        for e in missing:
+            print(f"        - {e}")
+    return resolved
+
+
 async def resolve_guid_to_email(
-    client: httpx.AsyncClient, token: str, guid: str
+    client: httpx.AsyncClient, token: TokenLike, guid: str
 ) -> str | None:
-    """Resuelve GUID de usuario Azure AD a email. Usa cache global.
+    """Resuelve GUID de usuario Azure AD a email. Usa cache global y, con
+    --directory-cache, la caché en disco (graph_directory).
     Retorna None si falla.
     Permiso requerido: User.Read.All
     """
     if guid in _GUID_TO_EMAIL_CACHE:
         return _GUID_TO_EMAIL_CACHE[guid]
+    tenant = await _directory_tenant(token)
+    found, email = directory_cache().get(tenant, "mail", guid)
+    if found:
+        _GUID_TO_EMAIL_CACHE[guid] = email
+        return email
     try:
         data = await graph_request(client, "GET", f"/users/{guid}?$select=mail,userPrincipalName", token)
         email = data.get("mail") or data.get("userPrincipalName")
-    except (httpx.HTTPStatusError, httpx.RequestError):
+        directory_cache().put(tenant, "mail", guid, email)
+    except (httpx.HTTPStatusError, httpx.RequestError) as exc:
         email = None
+        if _not_found(exc):
+            directory_cache().put(tenant, "mail", guid, None)
     _GUID_TO_EMAIL_CACHE[guid] = email
     return email
 
 
 async def resolve_guid_to_display_name(
-    client: httpx.AsyncClient, token: str, guid: str
+    client: httpx.AsyncClient, token: TokenLike, guid: str
 ) -> str | None:
-    """Resuelve GUID de usuario Azure AD a nombre legible. Usa caché global.
+    """Resuelve GUID de usuario Azure AD a nombre legible. Usa caché global y, con
+    --directory-cache, la caché en disco (graph_directory).
     Retorna None si falla.
     Permiso requerido: User.Read.All
     """
     if guid in _GUID_TO_NAME_CACHE:
         return _GUID_TO_NAME_CACHE[guid]
+    tenant = await _directory_tenant(token)
+    found, name = directory_cache().get(tenant, "name", guid)
+    if found:
+        _GUID_TO_NAME_CACHE[guid] = name
+        return name
     try:
         data = await graph_request(
             client, "GET", f"/users/{guid}?$select=displayName,givenName,surname", token
         )
-        name = (
-            data.get("displayName")
-            or f"{data.get('givenName', '')} {data.get('surname', '')}".strip()
-            or None
-        )
-    except (httpx.HTTPStatusError, httpx.RequestError):
+        name = _user_display_name(data)
+        directory_cache().put(tenant, "name", guid, name)
+    except (httpx.HTTPStatusError, httpx.RequestError) as exc:
         name = None
+        if _not_found(exc):
+            directory_cache().put(tenant, "name", guid, None)
     _GUID_TO_NAME_CACHE[guid] = name
     return name
 
 
-async def create_task_full(
-    client: httpx.AsyncClient,
-    token: str,
-    plan_id: str,
-    bucket_id: str,
-    task: dict[str, Any],
-    assignee_guid: str | None,
-) -> str:
-    """Crea tarea + PATCH details en secuencia.
-    FUTURO MCP: tool create_task ampliado en server.py
-    3 llamadas: POST /tasks → GET /tasks/{id}/details → PATCH /tasks/{id}/details
+def _user_display_name(user: dict[str, Any]) -> str | None:
+    return (
+        user.get("displayName")
+        or f"{user.get('givenName', '')} {user.get('surname', '')}".strip()
+        or None
+    )
+
+
+async def resolve_guids_bulk(
+    client: httpx.AsyncClient, token: TokenLike, guids: Iterable[str]
+) -> None:
+    """Resuelve de una vez email y nombre de todos los GUIDs de usuario.
+
+    POST /directoryObjects/getByIds por bloques de DIRECTORY_IDS_CHUNK (1 llamada por
+    plan en un reporte normal) y rellena _GUID_TO_EMAIL_CACHE y _GUID_TO_NAME_CACHE, así
+    resolve_guid_to_email() y resolve_guid_to_display_name() ya no llaman a Graph. Un GUID
+    que no vuelve en la respuesta no existe y se guarda como None. Si la llamada falla, ese
+    bloque queda sin resolver y cada GUID se consulta después por separado.
+    Con --directory-cache sólo se piden los que faltan en disco, y lo obtenido se guarda.
+    Permiso requerido: User.Read.All (o Directory.Read.All)
     """
-    # 1. Crear tarea base
+    directory = directory_cache()
+    tenant = await _directory_tenant(token)
+    pending: list[str] = []
+    for guid in dict.fromkeys(g for g in guids if g):
+        if guid in _GUID_TO_EMAIL_CACHE and guid in _GUID_TO_NAME_CACHE:
+            continue
+        found_mail, email = directory.get(tenant, "mail", guid)
+        found_name, name = directory.get(tenant, "name", guid)
+        if found_mail and found_name:
+            _GUID_TO_EMAIL_CACHE[guid] = email
+            _GUID_TO_NAME_CACHE[guid] = name
+        else:
+            pending.append(guid)
+
+    async def _chunk(chunk: list[str]) -> None:
+        try:
+            data = await graph_request(
+                client, "POST", "/directoryObjects/getByIds", token,
+                json={"ids": chunk, "types": ["user"]},
+            )
+        except (httpx.HTTPStatusError, httpx.RequestError) as exc:
+            print(f"      [WARN] getByIds falló ({exc}); se resuelve usuario a usuario")
+            return
+        users = {u["id"]: u for u in (data or {}).get("value", []) if u.get("id")}
+        emails: dict[str, str | None] = {}
+        names: dict[str, str | None] = {}
+        for guid in chunk:
+            user = users.get(guid)
+            emails[guid] = (user.get("mail") or user.get("userPrincipalName")) if user else None
+            names[guid] = _user_display_name(user) if user else None
+        _GUID_TO_EMAIL_CACHE.update(emails)
+        _GUID_TO_NAME_CACHE.update(names)
+        directory.put_many(tenant, "mail", emails)
+        directory.put_many(tenant, "name", names)
+
+    await asyncio.gather(*(
+        _chunk(pending[i:i + DIRECTORY_IDS_CHUNK]) for i in range(0, len(pending), DIRECTORY_IDS_CHUNK)
+    ))
+
+
+def task_payload(
+    task: dict[str, Any], plan_id: str, bucket_id: str, assignee_guid: str | None,
+) -> dict[str, Any]:
+    """Cuerpo de POST /planner/tasks para una fila del CSV (sin details)."""
     payload: dict[str, Any] = {
         "planId": plan_id,
         "bucketId": bucket_id,
@@ -1284,15 +1832,12 @@ async def create_task_full(
     labels = parse_labels(task["labels_raw"])
     if labels:
         payload["appliedCategories"] = labels
+    return payload
 
-    created = await graph_request(client, "POST", "/planner/tasks", token, json=payload)
-    task_id: str = created["id"]
 
-    # 2. GET /details para obtener su ETag (distinto al ETag de la tarea)
-    details = await graph_request(client, "GET", f"/planner/tasks/{task_id}/details", token)
-    details_etag: str = details["@odata.etag"]
-
-    # 3. PATCH /details con descripción y checklist
+def task_details_body(task: dict[str, Any]) -> dict[str, Any]:
+    """Descripción y checklist de una fila del CSV ({} si no tiene ninguno).
+    Imprime los avisos de ítems de checklist truncados."""
     body: dict[str, Any] = {}
     if task["description"]:
         body["description"] = task["description"]
@@ -1301,16 +1846,89 @@ async def create_task_full(
         print(w)
     if checklist:
         body["checklist"] = checklist
+    return body
 
-    if body:
-        await graph_request(
-            client, "PATCH", f"/planner/tasks/{task_id}/details", token,
-            json=body, etag=details_etag,
-        )
 
+async def _inline_details_kept(
+    client: httpx.AsyncClient, token: TokenLike, created: dict[str, Any], body: dict[str, Any],
+) -> bool:
+    """¿Guardó Graph los details enviados en el POST? Compara hasDescription/checklistItemCount
+    de la respuesta y, si no vienen, lee una vez los details de la tarea."""
+    want_description = bool(body.get("description"))
+    want_items = len(body.get("checklist") or {})
+    if "hasDescription" in created and "checklistItemCount" in created:
+        return (bool(created["hasDescription"]) == want_description
+                and created["checklistItemCount"] == want_items)
+    details = await get_after_create(client, f"/planner/tasks/{created['id']}/details", token)
+    return (bool(details.get("description")) == want_description
+            and len(details.get("checklist") or {}) == want_items)
+
+
+async def create_task_full(
+    client: httpx.AsyncClient,
+    token: TokenLike,
+    plan_id: str,
+    bucket_id: str,
+    task: dict[str, Any],
+    assignee_guid: str | None,
+) -> str:
+    """Crea la tarea con descripción y checklist.
+    FUTURO MCP: tool create_task ampliado en server.py
+    1 llamada: POST /tasks con "details" en el cuerpo (INLINE_TASK_DETAILS).
+    3 llamadas (camino clásico, o si Graph rechaza o descarta los details):
+      POST /tasks → GET /tasks/{id}/details → PATCH /tasks/{id}/details
+    Sin descripción ni checklist basta el POST. Hasta que una tarea confirma que Graph
+    guardó los details en línea, cada POST con details se comprueba (_inline_details_kept).
+    """
+    global INLINE_TASK_DETAILS, _INLINE_DETAILS_VERIFIED
+
+    payload = task_payload(task, plan_id, bucket_id, assignee_guid)
+    body = task_details_body(task)
+
+    # 1. Crear tarea (con details en línea si se puede)
+    if body and INLINE_TASK_DETAILS:
+        try:
+            created = await graph_request(
+                client, "POST", "/planner/tasks", token, json={**payload, "details": body},
+            )
+        except httpx.HTTPStatusError as exc:
+            if exc.response.status_code != 400:
+                raise
+            # 400: la tarea no se creó. Si sin details sí entra, el problema eran los details
+            created = await graph_request(client, "POST", "/planner/tasks", token, json=payload)
+            INLINE_TASK_DETAILS = False
+            print("      [WARN] Graph rechazó 'details' en POST /planner/tasks — se usa POST + PATCH details")
+        else:
+            if _INLINE_DETAILS_VERIFIED or await _inline_details_kept(client, token, created, body):
+                _INLINE_DETAILS_VERIFIED = True
+                return created["id"]
+            # Graph aceptó el cuerpo pero descartó los details: se completan con PATCH
+            INLINE_TASK_DETAILS = False
+            print("      [WARN] Graph ignoró 'details' en POST /planner/tasks — se usa POST + PATCH details")
+    else:
+        created = await graph_request(client, "POST", "/planner/tasks", token, json=payload)
+    task_id: str = created["id"]
+    if not body:
+        return task_id
+
+    # 2. GET /details para obtener su ETag (distinto al ETag de la tarea)
+    details = await get_after_create(client, f"/planner/tasks/{task_id}/details", token)
+    details_etag: str = details["@odata.etag"]
+
+    # 3. PATCH /details con descripción y checklist
+    await graph_request(
+        client, "PATCH", f"/planner/tasks/{task_id}/details", token,
+        json=body, etag=details_etag,
+    )
     return task_id
 
 
+def estimate_task_calls(tasks: list[dict[str, Any]]) -> int:
+    """Llamadas Graph de create_task_full() para `tasks` (sin contar resolución de emails)."""
+    with_details = sum(1 for t in tasks if t["description"] or t["checklist_raw"].strip(" ;"))
+    return len(tasks) + (0 if INLINE_TASK_DETAILS else 2 * with_details)
+
+
 async def run_list(group_id: str, filter_text: str = "") -> None:
     """Modo list: muestra tabla de planes; no realiza ninguna acción."""
     settings = Settings()
@@ -1319,8 +1937,10 @@ async def run_list(group_id: str, filter_text: str = "") -> None:
         client_id=settings.azure_client_id,
         client_secret=settings.azure_client_secret,
     )
-    token = auth.get_token()
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    token = AsyncTokenProvider.from_auth_manager(
+        auth, tenant_id=settings.azure_tenant_id, client_id=settings.azure_client_id,
+    )
+    async with shared_graph_client() as client:
         plans = await list_plans(client, token, group_id)
     if filter_text:
         plans = [p for p in plans if filter_text.lower() in p["title"].lower()]
@@ -1347,9 +1967,11 @@ async def run_delete(
         client_id=settings.azure_client_id,
         client_secret=settings.azure_client_secret,
     )
-    token = auth.get_token()
+    token = AsyncTokenProvider.from_auth_manager(
+        auth, tenant_id=settings.azure_tenant_id, client_id=settings.azure_client_id,
+    )
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    async with shared_graph_client() as client:
         plans = await list_plans(client, token, group_id)
         if filter_text:
             plans = [p for p in plans if filter_text.lower() in p["title"].lower()]
@@ -1395,7 +2017,8 @@ async def run_delete(
                 await delete_plan(client, token, p["id"])
                 result["deleted"].append(p["id"])
                 print("✓")
-                await asyncio.sleep(0.5)
+            except DeadlineExceeded:
+                raise
             except Exception as exc:
                 result["errors"].append(f"'{p['title']}': {exc}")
                 print(f"✗ {exc}")
@@ -1414,6 +2037,12 @@ class ImportResult:
     guids_resolved: int = 0
     guids_failed: list[str] = field(default_factory=list)
     tasks_unassigned: int = 0
+    tasks_resumed: int = 0          # ya creadas según el diario de --resume
+    tasks_updated: int = 0          # --mode sync: tareas con PATCH
+    tasks_deleted: int = 0          # --mode sync: tareas eliminadas
+    tasks_unchanged: int = 0        # --mode sync: tareas que ya coincidían con el CSV
+    journal: str = ""               # ruta del diario de operaciones
+    plans: dict[str, str] = field(default_factory=dict)   # --mode full con varios PlanName: nombre → plan_id
     # Campos dry-run (poblados desde CSV, sin llamada a la API)
     dry_run: bool = False
     plan_name: str = ""
@@ -1421,31 +2050,269 @@ class ImportResult:
     tasks_total: int = 0
 
 
+@dataclass
+class _TaskOutcome:
+    """Resultado de una fila del CSV en create_tasks_pipeline(), aplicado en orden."""
+    email: str = ""
+    assignee_guid: str | None = None
+    task_id: str | None = None
+    error: str = ""
+    resumed: bool = False
+
+
+async def find_named(
+    items: Awaitable[list[dict[str, Any]]], key: str, value: str,
+) -> dict[str, Any] | None:
+    """Último elemento de `items` con item[key] == value (para adoptar recursos a medias)."""
+    matches = [item for item in await items if item.get(key) == value]
+    return matches[-1] if matches else None
+
+
+async def adopt_unfinished_tasks(
+    client: httpx.AsyncClient,
+    token: TokenLike,
+    journal: OperationJournal,
+    tasks: list[dict[str, Any]],
+    placement: Callable[[dict[str, Any]], tuple[str, str]],
+    op_prefix: str = "",
+) -> int:
+    """Tareas que una ejecución anterior lanzó sin llegar a anotar como hechas: si ya existen
+    en Graph (mismo plan, bucket y título, y no anotadas para otra fila) se anotan como
+    hechas en lugar de crearlas otra vez. Una llamada list_tasks por plan afectado.
+    """
+    unfinished = [(i, t) for i, t in enumerate(tasks, 1) if journal.uncertain(f"{op_prefix}task:{i}")]
+    if not unfinished:
+        return 0
+    known = {
+        stored["id"]
+        for i in range(1, len(tasks) + 1)
+        if (stored := journal.result(f"{op_prefix}task:{i}")) is not None
+    }
+    existing: dict[tuple[str, str], list[str]] = {}
+    for plan_id in extract_ordered_unique([{"plan_id": placement(t)[0]} for _, t in unfinished], "plan_id"):
+        for t in await list_tasks(client, token, plan_id):
+            if t["id"] not in known:
+                existing.setdefault((t.get("bucketId", ""), t.get("title", "")), []).append(t["id"])
+    adopted = 0
+    for i, task in unfinished:
+        ids = existing.get((placement(task)[1], task["title"]))
+        if ids:
+            journal.done(f"{op_prefix}task:{i}", {"id": ids.pop(0)})
+            adopted += 1
+    if adopted:
+        print(f"      [diario] {adopted} tareas a medias ya existían en Graph — no se repiten")
+    return adopted
+
+
+async def create_tasks_pipeline(
+    client: httpx.AsyncClient,
+    token: TokenLike,
+    tasks: list[dict[str, Any]],
+    result: ImportResult,
+    placement: Callable[[dict[str, Any]], tuple[str, str]],
+    workers: int | None = None,
+    journal: OperationJournal | None = None,
+    op_prefix: str = "",
+    guid_cache: dict[str, str | None] | None = None,
+    tag: str = "",
+) -> None:
+    """Crea `tasks` con un pool acotado de workers: mientras una tarea resuelve su asignado,
+    otras hacen su POST o escriben sus details. `placement(task)` → (plan_id, bucket_id).
+    El progreso, task_ids y errors salen en el orden del CSV aunque las tareas terminen
+    desordenadas; un error en una tarea no detiene las demás (DeadlineExceeded sí).
+    Con `journal`, cada fila es la operación f"{op_prefix}task:{n}": las ya hechas no se
+    vuelven a crear (ver adopt_unfinished_tasks() para las que quedaron a medias).
+    `guid_cache` (email → GUID) ya rellenado por prefetch_assignees() evita consultar
+    usuarios durante la creación; sin él, cada email se resuelve la primera vez que aparece.
+    `tag` precede cada línea de progreso (p. ej. "[Plan A] " al importar varios planes a la vez).
+    FUTURO MCP: task_tools.py → TaskTools.import_tasks()
+    """
+    total = len(tasks)
+    if guid_cache is None:
+        guid_cache = {}                      # email → GUID, compartido por los workers
+    pending = iter(enumerate(tasks, 1))      # cada worker toma la siguiente fila libre
+    finished: dict[int, _TaskOutcome] = {}
+    next_index = 1
+
+    def _flush() -> None:
+        nonlocal next_index
+        while next_index in finished:
+            outcome = finished.pop(next_index)
+            if outcome.resumed:
+                result.tasks_resumed += 1
+                result.task_ids.append(outcome.task_id)
+                print(f"      {tag}[{next_index:02d}/{total}] = {tasks[next_index - 1]['title']} (ya creada)")
+                next_index += 1
+                continue
+            if not outcome.email:
+                result.tasks_unassigned += 1
+            elif outcome.assignee_guid is not None:
+                result.guids_resolved += 1
+            else:
+                result.guids_failed.append(outcome.email)
+            if outcome.error:
+                result.errors.append(outcome.error)
+                print(f"      {tag}{outcome.error}")
+            else:
+                result.task_ids.append(outcome.task_id)
+                print(f"      {tag}[{next_index:02d}/{total}] ✓ {tasks[next_index - 1]['title']}")
+            next_index += 1
+
+    async def _worker() -> None:
+        for i, task in pending:
+            op = f"{op_prefix}task:{i}"
+            stored = journal.result(op) if journal is not None else None
+            if stored is not None:
+                finished[i] = _TaskOutcome(task_id=stored["id"], resumed=True)
+                _flush()
+                continue
+            outcome = _TaskOutcome(email=task.get("assignee_email", ""))
+            try:
+                if outcome.email:
+                    outcome.assignee_guid = await resolve_email_to_guid(
+                        client, token, outcome.email, guid_cache
+                    )
+                plan_id, bucket_id = placement(task)
+                if journal is not None:
+                    journal.planned(op)
+                outcome.task_id = await create_task_full(
+                    client, token, plan_id, bucket_id, task, outcome.assignee_guid
+                )
+                if journal is not None:
+                    journal.done(op, {"id": outcome.task_id})
+            except DeadlineExceeded:
+                raise
+            except Exception as exc:
+                outcome.error = f"[{i:02d}/{total}] ✗ '{task['title']}': {exc}"
+            finished[i] = outcome
+            _flush()
+
+    size = max(1, min(workers or IMPORT_WORKERS, total))
+    running = [asyncio.create_task(_worker()) for _ in range(size)]
+    try:
+        await asyncio.gather(*running)
+    finally:
+        for worker in running:
+            worker.cancel()
+
+
+def _print_journal(journal: OperationJournal, result: ImportResult) -> None:
+    if journal.path is None:
+        return
+    result.journal = str(journal.path)
+    if journal.completed:
+        print(f"Diario   : {journal.path} — reanudando, {journal.completed} operaciones ya hechas")
+    else:
+        print(f"Diario   : {journal.path}")
+
+
+async def import_plan_unit(
+    client: httpx.AsyncClient,
+    token: TokenLike,
+    group_id: str,
+    plan_name: str,
+    tasks: list[dict[str, Any]],
+    result: ImportResult,
+    journal: OperationJournal,
+    workers: int | None = None,
+    guid_cache: dict[str, str | None] | None = None,
+    op_prefix: str = "",
+    tag: str = "",
+) -> None:
+    """Pasos 1-4 de --mode full para un plan: plan, labels, buckets y tareas.
+    Las tareas usan las categorías de su plan (plan_labels), así varias unidades pueden
+    correr a la vez sin pisarse LABEL_MAP. Con varios planes, `op_prefix` separa sus operaciones en el diario y `tag`
+    identifica sus líneas de progreso.
+    """
+    buckets_ordered = extract_ordered_unique(tasks, "bucket_name")
+    labels = csv_labels(tasks)
+
+    def placement(t: dict[str, Any]) -> tuple[str, str]:
+        return result.plan_id, result.bucket_ids[t["bucket_name"]]
+
+    # 1. Plan
+    print(f"{tag}[1/4] Creando plan...")
+    plan = await journal.step(
+        f"{op_prefix}plan",
+        lambda: create_plan(client, token, group_id, plan_name),
+        find=lambda: find_named(list_plans(client, token, group_id), "title", plan_name),
+    )
+    result.plan_id = plan["id"]
+    print(f"      {tag}plan_id: {result.plan_id}")
+
+    # 2. Labels (idempotente: se repite al reanudar para reconstruir el mapa de categorías)
+    print(f"{tag}[2/4] Configurando labels {labels}...")
+    label_map = await configure_plan_labels(client, token, result.plan_id, labels)
+    print(f"      {tag}{label_map}")
+
+    # 3. Buckets
+    print(f"{tag}[3/4] Creando {len(buckets_ordered)} buckets...")
+    for bucket_name in buckets_ordered:
+        bucket = await journal.step(
+            f"{op_prefix}bucket:{bucket_name}",
+            lambda: create_bucket(client, token, result.plan_id, bucket_name),
+            find=lambda: find_named(list_buckets(client, token, result.plan_id), "name", bucket_name),
+        )
+        result.bucket_ids[bucket_name] = bucket["id"]
+        print(f"      {tag}✓ '{bucket_name}'")
+
+    # 4. Tareas
+    print(f"{tag}[4/4] Creando {len(tasks)} tareas...")
+    await adopt_unfinished_tasks(client, token, journal, tasks, placement, op_prefix)
+    with plan_labels(label_map):
+        await create_tasks_pipeline(
+            client, token, tasks, result, placement, workers, journal, op_prefix,
+            guid_cache=guid_cache, tag=tag,
+        )
+
+
+def _merge_plan_result(result: ImportResult, plan_name: str, unit: ImportResult) -> None:
+    """Suma al total de la importación el resultado de un plan (CSV con varios PlanName)."""
+    result.plans[plan_name] = unit.plan_id
+    result.bucket_ids.update({f"{plan_name}/{b}": bid for b, bid in unit.bucket_ids.items()})
+    result.task_ids.extend(unit.task_ids)
+    result.errors.extend(unit.errors)
+    result.guids_resolved += unit.guids_resolved
+    result.guids_failed.extend(unit.guids_failed)
+    result.tasks_unassigned += unit.tasks_unassigned
+    result.tasks_resumed += unit.tasks_resumed
+
+
 async def run_import_full(
     csv_path: Path,
     group_id: str,
     dry_run: bool = False,
+    workers: int | None = None,
 ) -> ImportResult:
-    """Orquestador principal.
+    """Orquestador principal. Cada PlanName distinto del CSV es un plan propio (plan,
+    labels, buckets y tareas); si hay varios se importan a la vez, cada uno como una
+    unidad independiente: el ritmo lo ponen los presupuestos por servicio de graph_client
+    y un error en un plan no detiene los demás (DeadlineExceeded sí).
     FUTURO MCP: task_tools.py → TaskTools.import_plan_from_csv()
     """
     result = ImportResult()
     tasks, date_warnings = parse_csv(csv_path)
-    plan_name: str = tasks[0]["plan_name"]
-    buckets_ordered = extract_ordered_unique(tasks, "bucket_name")
-    all_labels = extract_ordered_unique(
-        [{"labels_raw": lbl}
-         for t in tasks
-         for lbl in t["labels_raw"].split(";")
-         if lbl.strip()],
-        "labels_raw",
-    )
+    plans: dict[str, list[dict[str, Any]]] = {
+        name: [t for t in tasks if t["plan_name"] == name]
+        for name in extract_ordered_unique(tasks, "plan_name")
+    }
+    multi = len(plans) > 1
+    buckets_total = sum(len(extract_ordered_unique(rows, "bucket_name")) for rows in plans.values())
+    all_labels = csv_labels(tasks)
 
-    total_calls = 1 + 1 + len(buckets_ordered) + len(tasks) * 3
-    print(f"Plan     : '{plan_name}'")
+    total_calls = sum(
+        2 + len(extract_ordered_unique(rows, "bucket_name")) + estimate_task_calls(rows)
+        for rows in plans.values()
+    )
+    if multi:
+        print(f"Planes   : {len(plans)}")
+        for name, rows in plans.items():
+            print(f"  '{name}': {len(extract_ordered_unique(rows, 'bucket_name'))} buckets, {len(rows)} tareas")
+    else:
+        print(f"Plan     : '{tasks[0]['plan_name']}'")
     print(f"Group    : {group_id}")
     print(f"Labels   : {all_labels}")
-    print(f"Buckets  : {len(buckets_ordered)}")
+    print(f"Buckets  : {buckets_total}")
     print(f"Tareas   : {len(tasks)}")
     print(f"Llamadas : ~{total_calls}")
 
@@ -1456,75 +2323,73 @@ async def run_import_full(
     print()
     if dry_run:
         result.dry_run = True
-        result.plan_name = plan_name
-        result.buckets_total = len(buckets_ordered)
+        result.plan_name = "" if multi else tasks[0]["plan_name"]
+        result.plans = {name: "" for name in plans} if multi else {}
+        result.buckets_total = buckets_total
         result.tasks_total = len(tasks)
         print("[DRY RUN] Sin cambios en Planner.")
-        for b in buckets_ordered:
-            bucket_tasks = [t for t in tasks if t["bucket_name"] == b]
-            print(f"  Bucket '{b}' -> {len(bucket_tasks)} tareas")
+        for name, rows in plans.items():
+            indent = "    " if multi else "  "
+            if multi:
+                print(f"  Plan '{name}'")
+            for b in extract_ordered_unique(rows, "bucket_name"):
+                bucket_tasks = [t for t in rows if t["bucket_name"] == b]
+                print(f"{indent}Bucket '{b}' -> {len(bucket_tasks)} tareas")
         return result
 
+    journal = open_journal("full", csv_path, group_id=group_id)
+    _print_journal(journal, result)
+
     settings = Settings()
     auth = MicrosoftAuthManager(
         tenant_id=settings.azure_tenant_id,
         client_id=settings.azure_client_id,
         client_secret=settings.azure_client_secret,
     )
-    token = auth.get_token()
-
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        # 1. Plan
-        print("[1/4] Creando plan...")
-        plan = await create_plan(client, token, group_id, plan_name)
-        result.plan_id = plan["id"]
-        print(f"      plan_id: {result.plan_id}")
-        await asyncio.sleep(2)
+    token = AsyncTokenProvider.from_auth_manager(
+        auth, tenant_id=settings.azure_tenant_id, client_id=settings.azure_client_id,
+    )
 
-        # 2. Labels
-        print(f"[2/4] Configurando labels {all_labels}...")
-        await configure_plan_labels(client, token, result.plan_id, all_labels)
-        print(f"      {LABEL_MAP}")
+    try:
+        async with shared_graph_client() as client:
+            # 0. Asignados: todos de una vez, avisando de los inexistentes antes de escribir nada
+            print("Resolviendo asignados...")
+            guid_cache: dict[str, str | None] = {}
+            await prefetch_assignees(client, token, (t["assignee_email"] for t in tasks), guid_cache)
+
+            if not multi:
+                plan_name, rows = next(iter(plans.items()))
+                await import_plan_unit(
+                    client, token, group_id, plan_name, rows, result, journal, workers, guid_cache,
+                )
+                return result
 
-        # 3. Buckets
-        print(f"[3/4] Creando {len(buckets_ordered)} buckets...")
-        for bucket_name in buckets_ordered:
-            bucket = await create_bucket(client, token, result.plan_id, bucket_name)
-            result.bucket_ids[bucket_name] = bucket["id"]
-            print(f"      ✓ '{bucket_name}'")
-            await asyncio.sleep(0.5)
+            # Varios planes: una unidad concurrente por plan (diario con prefijo "<plan>/")
+            units = {name: ImportResult(plan_name=name) for name in plans}
 
-        # 4. Tareas
-        # Caché de resolución email → GUID (compartido por todas las tareas)
-        guid_cache: dict[str, str | None] = {}
+            async def _unit(name: str) -> None:
+                try:
+                    await import_plan_unit(
+                        client, token, group_id, name, plans[name], units[name], journal,
+                        workers, guid_cache, op_prefix=f"{name}/", tag=f"[{name}] ",
+                    )
+                except DeadlineExceeded:
+                    raise
+                except Exception as exc:
+                    units[name].errors.append(f"Plan '{name}': {exc}")
+                    print(f"  ✗ Plan '{name}': {exc}")
 
-        print(f"[4/4] Creando {len(tasks)} tareas (3 llamadas c/u)...")
-        for i, task in enumerate(tasks, 1):
+            running = [asyncio.create_task(_unit(name)) for name in plans]
             try:
-                # Resolver email → GUID
-                email = task.get("assignee_email", "")
-                if email:
-                    assignee_guid = await resolve_email_to_guid(client, token, email, guid_cache)
-                    if assignee_guid is not None:
-                        result.guids_resolved += 1
-                    else:
-                        result.guids_failed.append(email)
-                else:
-                    assignee_guid = None
-                    result.tasks_unassigned += 1
-
-                bucket_id = result.bucket_ids[task["bucket_name"]]
-                task_id = await create_task_full(
-                    client, token, result.plan_id, bucket_id, task, assignee_guid
-                )
-                result.task_ids.append(task_id)
-                print(f"      [{i:02d}/{len(tasks)}] ✓ {task['title']}")
-                await asyncio.sleep(0.3)
-            except Exception as exc:
-                msg = f"[{i:02d}/{len(tasks)}] ✗ '{task['title']}': {exc}"
-                result.errors.append(msg)
-                print(f"      {msg}")
-
+                await asyncio.gather(*running)
+            finally:
+                for unit in running:
+                    unit.cancel()
+    finally:
+        journal.close()
+
+    for name, unit in units.items():
+        _merge_plan_result(result, name, unit)
     return result
 
 
@@ -1556,14 +2421,15 @@ async def run_import_plan(
         client_id=settings.azure_client_id,
         client_secret=settings.azure_client_secret,
     )
-    token = auth.get_token()
+    token = AsyncTokenProvider.from_auth_manager(
+        auth, tenant_id=settings.azure_tenant_id, client_id=settings.azure_client_id,
+    )
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    async with shared_graph_client() as client:
         print("[1/2] Creando plan...")
         plan = await create_plan(client, token, group_id, plan_name)
         result.plan_id = plan["id"]
         print(f"      plan_id: {result.plan_id}")
-        await asyncio.sleep(2)
 
         print(f"[2/2] Configurando labels {labels}...")
         await configure_plan_labels(client, token, result.plan_id, labels)
@@ -1607,15 +2473,16 @@ async def run_import_buckets(
         client_id=settings.azure_client_id,
         client_secret=settings.azure_client_secret,
     )
-    token = auth.get_token()
+    token = AsyncTokenProvider.from_auth_manager(
+        auth, tenant_id=settings.azure_tenant_id, client_id=settings.azure_client_id,
+    )
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    async with shared_graph_client() as client:
         print(f"[1/1] Creando {len(bucket_names)} buckets...")
         for bucket_name in bucket_names:
             bucket = await create_bucket(client, token, plan_id, bucket_name)
             result.bucket_ids[bucket_name] = bucket["id"]
             print(f"      ✓ '{bucket_name}'")
-            await asyncio.sleep(0.5)
 
     return result
 
@@ -1623,6 +2490,7 @@ async def run_import_buckets(
 async def run_import_tasks(
     csv_path: Path,
     dry_run: bool = False,
+    workers: int | None = None,
 ) -> ImportResult:
     """Modo tasks: agrega tareas a plan/bucket existentes (PlanID/BucketID desde CSV).
     LIMITACIÓN: LABEL_MAP vacío en este modo — labels del CSV no se aplican.
@@ -1631,7 +2499,7 @@ async def run_import_tasks(
     tasks, date_warnings = parse_csv_tasks(csv_path)
 
     print(f"Tareas   : {len(tasks)}")
-    print(f"Llamadas : ~{len(tasks) * 3}")
+    print(f"Llamadas : ~{estimate_task_calls(tasks)}")
 
     if not confirm_date_warnings(date_warnings, dry_run):
         print("Importación cancelada por el usuario.")
@@ -1646,41 +2514,440 @@ async def run_import_tasks(
             print(f"  PlanID={t['plan_id']} BucketID={t['bucket_id']} -> '{t['title']}'")
         return result
 
+    journal = open_journal("tasks", csv_path)
+    _print_journal(journal, result)
+
     settings = Settings()
     auth = MicrosoftAuthManager(
         tenant_id=settings.azure_tenant_id,
         client_id=settings.azure_client_id,
         client_secret=settings.azure_client_secret,
     )
-    token = auth.get_token()
+    token = AsyncTokenProvider.from_auth_manager(
+        auth, tenant_id=settings.azure_tenant_id, client_id=settings.azure_client_id,
+    )
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    async with shared_graph_client() as client:
+        print("Resolviendo asignados...")
         guid_cache: dict[str, str | None] = {}
+        await prefetch_assignees(client, token, (t["assignee_email"] for t in tasks), guid_cache)
 
-        print(f"[1/1] Creando {len(tasks)} tareas (3 llamadas c/u)...")
-        for i, task in enumerate(tasks, 1):
-            try:
-                email = task.get("assignee_email", "")
-                if email:
-                    assignee_guid = await resolve_email_to_guid(client, token, email, guid_cache)
-                    if assignee_guid is not None:
-                        result.guids_resolved += 1
-                    else:
-                        result.guids_failed.append(email)
-                else:
-                    assignee_guid = None
-                    result.tasks_unassigned += 1
+        print(f"[1/1] Creando {len(tasks)} tareas...")
+        def placement(t: dict[str, Any]) -> tuple[str, str]:
+            return t["plan_id"], t["bucket_id"]
 
-                task_id = await create_task_full(
-                    client, token, task["plan_id"], task["bucket_id"], task, assignee_guid
-                )
-                result.task_ids.append(task_id)
-                print(f"      [{i:02d}/{len(tasks)}] ✓ {task['title']}")
-                await asyncio.sleep(0.3)
-            except Exception as exc:
-                msg = f"[{i:02d}/{len(tasks)}] ✗ '{task['title']}': {exc}"
-                result.errors.append(msg)
-                print(f"      {msg}")
+        await adopt_unfinished_tasks(client, token, journal, tasks, placement)
+        await create_tasks_pipeline(
+            client, token, tasks, result, placement, workers, journal, guid_cache=guid_cache,
+        )
+
+    journal.close()
+    return result
+
+
+# ── Sincronización CSV → plan existente (--mode sync) ─────────────────────────
+
+# Máximo de categorías (etiquetas) de un plan en Graph v1.0: category1…category25
+PLAN_CATEGORY_MAX = 25
+
+
+@dataclass
+class TaskChange:
+    """Una diferencia entre el CSV y el plan: crear, actualizar o eliminar una tarea."""
+    action: str                  # "create" | "update" | "delete"
+    title: str
+    row: int = 0                 # fila del CSV (1 = primera tarea); 0 en "delete"
+    task_id: str = ""
+    etag: str = ""
+    details_etag: str = ""
+    task_patch: dict[str, Any] = field(default_factory=dict)
+    details_patch: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def calls(self) -> int:
+        return 1 if self.action == "delete" else bool(self.task_patch) + bool(self.details_patch)
+
+
+async def sync_plan_labels(
+    client: httpx.AsyncClient,
+    token: TokenLike,
+    plan_id: str,
+    labels: list[str],
+    apply: bool = True,
+) -> list[str]:
+    """Construye LABEL_MAP con las categorías que ya tiene el plan y asigna a las etiquetas
+    nuevas del CSV la siguiente categoryN libre. Nunca renombra ni borra categorías; el
+    PATCH de plan details sólo se hace si hay etiquetas nuevas (y `apply`).
+    Devuelve las etiquetas añadidas.
+    """
+    details = await graph_request(client, "GET", f"/planner/plans/{plan_id}/details", token)
+    current: dict[str, str] = details.get("categoryDescriptions") or {}
+    LABEL_MAP.clear()
+    for category, name in current.items():
+        if name:
+            LABEL_MAP.setdefault(name, category)
+    free = (
+        f"category{i}" for i in range(1, PLAN_CATEGORY_MAX + 1)
+        if not current.get(f"category{i}")
+    )
+    added: dict[str, str] = {}
+    for label in labels:
+        if label in LABEL_MAP:
+            continue
+        category = next(free, None)
+        if category is None:
+            print(f"      [WARN] El plan ya tiene {PLAN_CATEGORY_MAX} etiquetas — '{label}' no se aplica")
+            continue
+        added[category] = label
+        LABEL_MAP[label] = category
+    if added and apply:
+        await graph_request(
+            client, "PATCH", f"/planner/plans/{plan_id}/details", token,
+            json={"categoryDescriptions": added}, etag=details["@odata.etag"],
+        )
+    return list(added.values())
+
+
+def match_tasks(
+    tasks: list[dict[str, Any]],
+    bucket_ids: dict[str, str],
+    existing: list[dict[str, Any]],
+) -> tuple[dict[int, dict[str, Any]], list[dict[str, Any]]]:
+    """Empareja las filas del CSV con las tareas del plan.
+
+    Clave: (bucket, título). Una fila sin pareja en su bucket se empareja por título si en
+    el plan queda exactamente una tarea libre con ese título y una sola fila que la busca
+    (la tarea cambió de bucket). Devuelve {fila: tarea} y las tareas que no están en el CSV.
+    """
+    by_key: dict[tuple[str, str], list[dict[str, Any]]] = {}
+    for t in existing:
+        by_key.setdefault((t.get("bucketId") or "", t.get("title", "")), []).append(t)
+    matched: dict[int, dict[str, Any]] = {}
+    for i, row in enumerate(tasks, 1):
+        candidates = by_key.get((bucket_ids.get(row["bucket_name"], ""), row["title"]))
+        if candidates:
+            matched[i] = candidates.pop(0)
+
+    used = {t["id"] for t in matched.values()}
+    free_by_title: dict[str, list[dict[str, Any]]] = {}
+    for t in existing:
+        if t["id"] not in used:
+            free_by_title.setdefault(t.get("title", ""), []).append(t)
+    wanted = Counter(row["title"] for i, row in enumerate(tasks, 1) if i not in matched)
+    for i, row in enumerate(tasks, 1):
+        free = free_by_title.get(row["title"], [])
+        if i not in matched and len(free) == 1 and wanted[row["title"]] == 1:
+            matched[i] = free.pop()
+
+    used = {t["id"] for t in matched.values()}
+    return matched, [t for t in existing if t["id"] not in used]
+
+
+def diff_task(
+    existing: dict[str, Any],
+    details: dict[str, Any] | None,
+    desired: dict[str, Any],
+    desired_details: dict[str, Any],
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """(PATCH de la tarea, PATCH de sus details) que llevan `existing` a lo que pide el CSV.
+
+    `desired` / `desired_details` salen de task_payload() / task_details_body(). Sin
+    asignado resuelto en el CSV no se tocan las asignaciones. Los ítems de checklist que
+    siguen en el CSV conservan su id y su estado marcado; los que ya no están se borran
+    (null). `details` None = no hace falta compararlos.
+    """
+    patch: dict[str, Any] = {}
+    for key in ("bucketId", "priority", "percentComplete"):
+        if existing.get(key) != desired[key]:
+            patch[key] = desired[key]
+    for key in ("startDateTime", "dueDateTime"):
+        if (existing.get(key) or "")[:10] != (desired.get(key) or "")[:10]:
+            patch[key] = desired.get(key)
+    if "assignments" in desired:
+        current = set(existing.get("assignments") or {})
+        wanted = set(desired["assignments"])
+        if current != wanted:
+            patch["assignments"] = {
+                **{uid: desired["assignments"][uid] for uid in wanted - current},
+                **{uid: None for uid in current - wanted},
+            }
+    current_labels = {c for c, on in (existing.get("appliedCategories") or {}).items() if on}
+    wanted_labels = set(desired.get("appliedCategories", {}))
+    if current_labels != wanted_labels:
+        patch["appliedCategories"] = {
+            **{c: True for c in wanted_labels - current_labels},
+            **{c: False for c in current_labels - wanted_labels},
+        }
+
+    details_patch: dict[str, Any] = {}
+    if details is not None:
+        description = desired_details.get("description", "")
+        if (details.get("description") or "") != description:
+            details_patch["description"] = description
+        current_items: dict[str, Any] = details.get("checklist") or {}
+        wanted_items: dict[str, Any] = desired_details.get("checklist", {})
+        missing = Counter(item["title"] for item in wanted_items.values())
+        checklist: dict[str, Any] = {}
+        for item_id, item in current_items.items():
+            if missing[item.get("title", "")] > 0:
+                missing[item.get("title", "")] -= 1
+            else:
+                checklist[item_id] = None
+        for item_id, item in wanted_items.items():
+            if missing[item["title"]] > 0:
+                missing[item["title"]] -= 1
+                checklist[item_id] = item
+        if checklist:
+            details_patch["checklist"] = checklist
+    return patch, details_patch
+
+
+def _needs_details(task: dict[str, Any], desired_details: dict[str, Any]) -> bool:
+    """Hay que comparar details si el CSV trae descripción/checklist o Planner los tiene
+    (sin los contadores en el listado, se asume que sí)."""
+    return bool(
+        desired_details
+        or task.get("hasDescription", True)
+        or task.get("checklistItemCount", 1)
+    )
+
+
+async def list_tasks_for_sync(
+    client: httpx.AsyncClient, token: TokenLike, plan_id: str,
+) -> list[dict[str, Any]]:
+    """Tareas del plan con sus details en línea ($expand=details); si Graph rechaza el
+    $expand (400), el listado normal y los details se piden luego sólo donde hagan falta."""
+    try:
+        return await list_tasks(client, token, plan_id, "diff", expand_details=True)
+    except httpx.HTTPStatusError as exc:
+        if exc.response.status_code != 400:
+            raise
+        print("      [WARN] Graph rechazó $expand=details — se leerán los details tarea a tarea")
+        return await list_tasks(client, token, plan_id, "diff")
+
+
+def _print_changes(changes: list[TaskChange], unchanged: int, new_buckets: list[str]) -> None:
+    counts = Counter(c.action for c in changes)
+    print(
+        f"      {counts['create']} nuevas, {counts['update']} con cambios, "
+        f"{counts['delete']} a eliminar, {unchanged} sin cambios"
+    )
+    for name in new_buckets:
+        print(f"      + bucket '{name}'")
+    for change in changes:
+        if change.action == "create":
+            print(f"      + [{change.row:02d}] {change.title}")
+        elif change.action == "update":
+            fields = ", ".join([*change.task_patch, *change.details_patch])
+            print(f"      ~ [{change.row:02d}] {change.title}: {fields}")
+        else:
+            print(f"      - {change.title}")
+
+
+def _new_bucket_ref(name: str) -> str:
+    """bucketId provisional de un bucket que sync crea en el paso 3 (se sustituye al crearlo)."""
+    return f"<nuevo:{name}>"
+
+
+async def _apply_change(
+    client: httpx.AsyncClient, token: TokenLike, change: TaskChange,
+) -> None:
+    endpoint = f"/planner/tasks/{change.task_id}"
+    if change.action == "delete":
+        await graph_request(client, "DELETE", endpoint, token, etag=change.etag)
+        return
+    # La tarea primero: su ETag cambia también al escribir los details
+    if change.task_patch:
+        await graph_request(client, "PATCH", endpoint, token, json=change.task_patch, etag=change.etag)
+    if change.details_patch:
+        await graph_request(
+            client, "PATCH", f"{endpoint}/details", token,
+            json=change.details_patch, etag=change.details_etag,
+        )
+
+
+async def run_sync(
+    csv_path: Path,
+    group_id: str,
+    dry_run: bool = False,
+    workers: int | None = None,
+) -> ImportResult:
+    """Modo sync: aplica el CSV (formato de --mode full) a un plan ya importado.
+
+    El CSV debe ser de un solo PlanName (ValueError si trae varios, antes de llamar a Graph).
+    Lee el plan una vez (buckets, tareas con details y etiquetas), empareja filas y tareas
+    por bucket + título (match_tasks) y sólo escribe lo que difiere: crea las filas nuevas,
+    PATCH con el ETag leído en las tareas cambiadas y DELETE de las que ya no están en el
+    CSV (previa confirmación). Repetirlo sin cambios en el CSV no escribe nada.
+    FUTURO MCP: task_tools.py → TaskTools.sync_plan_from_csv()
+    """
+    result = ImportResult()
+    tasks, date_warnings = parse_csv(csv_path)
+    plan_names = extract_ordered_unique(tasks, "plan_name")
+    if len(plan_names) > 1:
+        raise ValueError(
+            f"El CSV trae {len(plan_names)} planes ({', '.join(repr(n) for n in plan_names)}); "
+            "--mode sync aplica un solo plan — separar el CSV por PlanName"
+        )
+    plan_name: str = plan_names[0]
+    buckets_ordered = extract_ordered_unique(tasks, "bucket_name")
+    all_labels = csv_labels(tasks)
+    full_calls = 1 + 1 + len(buckets_ordered) + estimate_task_calls(tasks)
+
+    print(f"Plan     : '{plan_name}'")
+    print(f"Group    : {group_id}")
+    print(f"Tareas   : {len(tasks)} en el CSV")
+
+    if not confirm_date_warnings(date_warnings, dry_run):
+        print("Sincronización cancelada por el usuario.")
+        return result
+
+    settings = Settings()
+    auth = MicrosoftAuthManager(
+        tenant_id=settings.azure_tenant_id,
+        client_id=settings.azure_client_id,
+        client_secret=settings.azure_client_secret,
+    )
+    token = AsyncTokenProvider.from_auth_manager(
+        auth, tenant_id=settings.azure_tenant_id, client_id=settings.azure_client_id,
+    )
+
+    print()
+    async with shared_graph_client() as client:
+        # 1. Leer el plan: buckets, tareas (con details) y etiquetas, en paralelo
+        print("[1/3] Leyendo el plan...")
+        plans = [p for p in await list_plans(client, token, group_id, "diff") if p["title"] == plan_name]
+        if not plans:
+            raise ValueError(f"No existe el plan '{plan_name}' en el grupo — importarlo con --mode full")
+        if len(plans) > 1:
+            ids = ", ".join(p["id"] for p in plans)
+            raise ValueError(f"Hay {len(plans)} planes '{plan_name}' en el grupo ({ids}); sync necesita uno solo")
+        result.plan_id = plan_id = plans[0]["id"]
+        buckets, existing, new_labels = await asyncio.gather(
+            list_buckets(client, token, plan_id, "diff"),
+            list_tasks_for_sync(client, token, plan_id),
+            sync_plan_labels(client, token, plan_id, all_labels, apply=not dry_run),
+        )
+        result.bucket_ids = {b["name"]: b["id"] for b in buckets}
+        new_buckets = [name for name in buckets_ordered if name not in result.bucket_ids]
+        print(f"      plan_id: {plan_id} — {len(buckets)} buckets, {len(existing)} tareas")
+        if new_labels:
+            print(f"      Etiquetas nuevas: {new_labels}")
+
+        # 2. Emparejar y calcular diferencias
+        print("[2/3] Comparando con el CSV...")
+        matched, leftover = match_tasks(tasks, result.bucket_ids, existing)
+        guid_cache: dict[str, str | None] = {}
+        await prefetch_assignees(client, token, (t["assignee_email"] for t in tasks), guid_cache)
+
+        desired_details = {i: task_details_body(tasks[i - 1]) for i in matched}
+        missing_details = [
+            i for i, t in matched.items()
+            if "details" not in t and _needs_details(t, desired_details[i])
+        ]
+        fetched = await asyncio.gather(
+            *(get_task_details(client, token, matched[i]["id"]) for i in missing_details)
+        )
+        details_by_row = {
+            **{i: t["details"] for i, t in matched.items() if "details" in t},
+            **dict(zip(missing_details, fetched)),
+        }
+
+        changes: list[TaskChange] = []
+        for i, row in enumerate(tasks, 1):
+            task = matched.get(i)
+            if task is None:
+                changes.append(TaskChange("create", row["title"], row=i))
+                continue
+            bucket_id = result.bucket_ids.get(row["bucket_name"], _new_bucket_ref(row["bucket_name"]))
+            desired = task_payload(row, plan_id, bucket_id, guid_cache.get(row["assignee_email"]))
+            details = details_by_row.get(i)
+            task_patch, details_patch = diff_task(task, details, desired, desired_details[i])
+            if not task_patch and not details_patch:
+                result.tasks_unchanged += 1
+                continue
+            changes.append(TaskChange(
+                "update", row["title"], row=i, task_id=task["id"],
+                etag=task.get("@odata.etag", ""),
+                details_etag=(details or {}).get("@odata.etag", ""),
+                task_patch=task_patch, details_patch=details_patch,
+            ))
+        changes += [
+            TaskChange("delete", t.get("title", ""), task_id=t["id"], etag=t.get("@odata.etag", ""))
+            for t in leftover
+        ]
+        _print_changes(changes, result.tasks_unchanged, new_buckets)
+
+        creates = [tasks[c.row - 1] for c in changes if c.action == "create"]
+        writes = (
+            len(new_buckets) + (1 if new_labels else 0) + estimate_task_calls(creates)
+            + sum(c.calls for c in changes if c.action != "create")
+        )
+        print(f"Llamadas : ~{writes} escrituras (una importación completa serían ~{full_calls})")
+
+        if dry_run:
+            result.dry_run = True
+            result.plan_name = plan_name
+            result.buckets_total = len(buckets_ordered)
+            result.tasks_total = len(tasks)
+            print("\n[DRY RUN] Sin cambios en Planner.")
+            return result
+        if not changes and not new_buckets:
+            print("\nEl plan ya coincide con el CSV — nada que escribir.")
+            return result
+
+        deletes = [c for c in changes if c.action == "delete"]
+        if deletes:
+            confirm = input(
+                f"\n  ¿Eliminar {len(deletes)} tareas del plan que no están en el CSV? (s/N): "
+            ).strip().lower()
+            if confirm != "s":
+                print("  Se conservan.")
+                changes = [c for c in changes if c.action != "delete"]
+
+        # 3. Escribir sólo las diferencias
+        print("[3/3] Aplicando cambios...")
+        created_refs: dict[str, str] = {}
+        for bucket_name in new_buckets:
+            bucket = await create_bucket(client, token, plan_id, bucket_name)
+            result.bucket_ids[bucket_name] = bucket["id"]
+            created_refs[_new_bucket_ref(bucket_name)] = bucket["id"]
+            print(f"      ✓ bucket '{bucket_name}'")
+        # Las tareas que se mueven a un bucket nuevo llevaban su marcador en el PATCH
+        for change in changes:
+            ref = change.task_patch.get("bucketId")
+            if ref in created_refs:
+                change.task_patch["bucketId"] = created_refs[ref]
+
+        pending = [c for c in changes if c.action != "create"]
+        outcomes = await asyncio.gather(
+            *(_apply_change(client, token, c) for c in pending), return_exceptions=True,
+        )
+        for change, outcome in zip(pending, outcomes):
+            if isinstance(outcome, DeadlineExceeded):
+                raise outcome
+            mark = "~" if change.action == "update" else "-"
+            if isinstance(outcome, BaseException):
+                if isinstance(outcome, httpx.HTTPStatusError) and outcome.response.status_code == 412:
+                    reason = "modificada en Planner durante la sincronización (412) — volver a ejecutar"
+                else:
+                    reason = str(outcome)
+                result.errors.append(f"{mark} '{change.title}': {reason}")
+                print(f"      ✗ {mark} {change.title}: {reason}")
+                continue
+            if change.action == "update":
+                result.tasks_updated += 1
+            else:
+                result.tasks_deleted += 1
+            print(f"      ✓ {mark} {change.title}")
+
+        if creates:
+            def placement(t: dict[str, Any]) -> tuple[str, str]:
+                return plan_id, result.bucket_ids[t["bucket_name"]]
+
+            await create_tasks_pipeline(
+                client, token, creates, result, placement, workers, guid_cache=guid_cache,
+            )
 
     return result
 
@@ -1697,9 +2964,11 @@ async def run_sp_list(
         client_id=settings.azure_client_id,
         client_secret=settings.azure_client_secret,
     )
-    token = auth.get_token()
+    token = AsyncTokenProvider.from_auth_manager(
+        auth, tenant_id=settings.azure_tenant_id, client_id=settings.azure_client_id,
+    )
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    async with shared_graph_client() as client:
         print(f"Sitio  : {site_url}")
         print(f"Carpeta: {folder_path or '(raíz)'}\n")
         site_id = await get_site_id(client, token, site_url)
@@ -1743,11 +3012,16 @@ async def run_report(
         client_id=settings.azure_client_id,
         client_secret=settings.azure_client_secret,
     )
-    token = auth.get_token()
+    token = AsyncTokenProvider.from_auth_manager(
+        auth, tenant_id=settings.azure_tenant_id, client_id=settings.azure_client_id,
+    )
+
+    # Sólo los campos que imprime la tabla (y el CSV, si se exporta)
+    profiles = ("report", "export") if export_csv else ("report",)
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    async with shared_graph_client() as client:
         # 1. Listar planes
-        plans = await list_plans(client, token, group_id)
+        plans = await list_plans(client, token, group_id, *profiles)
         if filter_text:
             plans = [p for p in plans if filter_text.lower() in p["title"].lower()]
 
@@ -1774,105 +3048,121 @@ async def run_report(
         # 3. Procesar cada plan
         all_rows: list[dict[str, Any]] = []
 
-        for plan in selected:
-            plan_id = plan["id"]
-            plan_title = plan["title"]
+        listings = start_plan_listings(client, token, selected, *profiles)
+        try:
+            for plan in selected:
+                plan_id = plan["id"]
+                plan_title = plan["title"]
 
-            try:
-                # Obtener buckets y tasks
-                buckets = await list_buckets(client, token, plan_id)
-                buckets_dict = {b["id"]: b["name"] for b in buckets}
+                try:
+                    # Buckets y tasks (pedidos por adelantado, con prioridad INTERACTIVE)
+                    buckets, tasks = await listings[plan_id]
+                    buckets_dict = {b["id"]: b["name"] for b in buckets}
 
-                tasks = await list_tasks(client, token, plan_id)
+                    # Presupuesto de enriquecimiento del plan (--enrichment-budget): al agotarse,
+                    # el plan se presenta sin los datos que falten
+                    enrichment = start_phase("enrichment")
+                    skipped: Counter[str] = Counter()
 
-                # Pre-fetch checklist paralelo si se solicita (con semáforo para respetar rate limit)
-                checklist_map: dict[str, tuple[int, int]] = {}  # task_id → (done, total)
-                if fetch_checklist:
-                    sem = asyncio.Semaphore(5)
+                    # Pre-fetch checklist paralelo si se solicita (concurrencia del workload planner, en segundo plano)
+                    checklist_map: dict[str, tuple[int, int]] = {}  # task_id → (done, total)
+                    if fetch_checklist:
 
-                    async def _fetch_one_checklist(task_id: str) -> tuple[str, int, int]:
-                        async with sem:
+                        async def _fetch_one_checklist(task_id: str) -> tuple[str, int, int]:
                             try:
                                 details = await get_task_details(client, token, task_id)
                                 cl = details.get("checklist", {})
                                 total = len(cl)
                                 done = sum(1 for v in cl.values() if v.get("isChecked", False))
-                                await asyncio.sleep(0.1)
                                 return task_id, done, total
                             except (httpx.HTTPStatusError, httpx.RequestError):
                                 return task_id, 0, 0
+                            except DeadlineExceeded:
+                                skipped["checklist"] += 1
+                                return task_id, 0, 0
 
-                    results = await asyncio.gather(
-                        *[_fetch_one_checklist(t.get("id", "")) for t in tasks]
-                    )
-                    checklist_map = {tid: (done, total) for tid, done, total in results}
-
-                # Enriquecer tareas con comentario si --comments fue solicitado
-                enriched_tasks = []
-                for task in tasks:
-                    task_id = task.get("id", "")
-                    thread_id = ""
-                    comment = {"text": "", "date": ""}
-
-                    if fetch_comments and task_id:
-                        try:
-                            # Obtener conversationThreadId de /planner/tasks/{id}
-                            task_details = await graph_request(
-                                client, "GET", f"/planner/tasks/{task_id}", token
+                        with request_priority(Priority.BACKGROUND), within(enrichment):
+                            results = await asyncio.gather(
+                                *[_fetch_one_checklist(t.get("id", "")) for t in tasks]
                             )
-                            thread_id = task_details.get("conversationThreadId") or ""
-                            if thread_id:
-                                comment = await get_last_comment(client, token, group_id, thread_id)
-                                await asyncio.sleep(0.5)  # rate-limit: threads/posts tiene límite propio
-                        except (httpx.HTTPStatusError, httpx.RequestError):
-                            # Si falla obtener detalles, continuar sin comentario
-                            pass
-
-                    cl_done, cl_total = checklist_map.get(task_id, (0, 0))
-
-                    enriched_tasks.append({
-                        **task,
-                        "LastCommentText": comment["text"],
-                        "LastCommentDate": comment["date"],
-                        "CommentCount": task.get("commentCount", 0),
-                        "ChecklistDone": cl_done,
-                        "ChecklistTotal": cl_total,
-                        "priority": task.get("priority", 5),
-                    })
-
-                # Imprimir tabla para este plan
-                _print_report_table(plan_title, buckets_dict, enriched_tasks, show_comments=fetch_comments, show_checklist=fetch_checklist)
-                _print_kpi_block(plan_title, buckets_dict, enriched_tasks, show_comments=fetch_comments)
-
-                # Preparar filas para exportación
-                for task in enriched_tasks:
-                    bucket_id = task.get("bucketId", "")
-                    bucket_name = buckets_dict.get(bucket_id, "")
-                    assignments = task.get("assignments", {})
-                    assignee_ids = ", ".join(assignments.keys())
-
-                    row = {
-                        "PlanID": plan_id,
-                        "PlanTitle": plan_title,
-                        "BucketID": bucket_id,
-                        "BucketName": bucket_name,
-                        "TaskID": task.get("id", ""),
-                        "TaskTitle": task.get("title", ""),
-                        "Assignee": assignee_ids,
-                        "Status": _derive_task_status(task.get("percentComplete", 0)),
-                        "PercentComplete": task.get("percentComplete", 0),
-                        "DueDate": task.get("dueDateTime", "")[:10] if task.get("dueDateTime") else "",
-                        "CreatedDate": task.get("createdDateTime", "")[:10] if task.get("createdDateTime") else "",
-                        "ChecklistDone": task.get("ChecklistDone", 0),
-                        "ChecklistTotal": task.get("ChecklistTotal", 0),
-                    }
-                    all_rows.append(row)
+                        checklist_map = {tid: (done, total) for tid, done, total in results}
 
-                await asyncio.sleep(0.3)
-            except httpx.HTTPStatusError as exc:
-                print(f"  ✗ Error Graph al procesar '{plan_title}': {exc.response.status_code}")
-            except httpx.RequestError as exc:
-                print(f"  ✗ Error de red al procesar '{plan_title}': {exc}")
+                    # Enriquecer tareas con comentario si --comments fue solicitado
+                    enriched_tasks = []
+                    for task in tasks:
+                        task_id = task.get("id", "")
+                        thread_id = ""
+                        comment = {"text": "", "date": ""}
+
+                        if fetch_comments and task_id and not skipped["comments"]:
+                            try:
+                                with request_priority(Priority.BACKGROUND), within(enrichment):
+                                    if "conversationThreadId" in task:
+                                        # Ya viene en el listado (perfil "report")
+                                        thread_id = task["conversationThreadId"] or ""
+                                    else:
+                                        # Obtener conversationThreadId de /planner/tasks/{id}
+                                        task_details = await graph_request(
+                                            client, "GET", f"/planner/tasks/{task_id}", token
+                                        )
+                                        thread_id = task_details.get("conversationThreadId") or ""
+                                    if thread_id:
+                                        comment = await get_last_comment(client, token, group_id, thread_id)
+                            except (httpx.HTTPStatusError, httpx.RequestError):
+                                # Si falla obtener detalles, continuar sin comentario
+                                pass
+                            except DeadlineExceeded:
+                                # Sin presupuesto: ésta y las tareas restantes del plan van sin comentario
+                                skipped["comments"] = len(tasks) - len(enriched_tasks)
+
+                        cl_done, cl_total = checklist_map.get(task_id, (0, 0))
+
+                        enriched_tasks.append({
+                            **task,
+                            "LastCommentText": comment["text"],
+                            "LastCommentDate": comment["date"],
+                            "CommentCount": task.get("commentCount", 0),
+                            "ChecklistDone": cl_done,
+                            "ChecklistTotal": cl_total,
+                            "priority": task.get("priority", 5),
+                        })
+
+                    if skipped:
+                        _print_enrichment_skipped(plan_title, skipped)
+
+                    # Imprimir tabla para este plan
+                    _print_report_table(plan_title, buckets_dict, enriched_tasks, show_comments=fetch_comments, show_checklist=fetch_checklist)
+                    _print_kpi_block(plan_title, buckets_dict, enriched_tasks, show_comments=fetch_comments)
+
+                    # Preparar filas para exportación
+                    for task in enriched_tasks:
+                        bucket_id = task.get("bucketId", "")
+                        bucket_name = buckets_dict.get(bucket_id, "")
+                        assignments = task.get("assignments", {})
+                        assignee_ids = ", ".join(assignments.keys())
+
+                        row = {
+                            "PlanID": plan_id,
+                            "PlanTitle": plan_title,
+                            "BucketID": bucket_id,
+                            "BucketName": bucket_name,
+                            "TaskID": task.get("id", ""),
+                            "TaskTitle": task.get("title", ""),
+                            "Assignee": assignee_ids,
+                            "Status": _derive_task_status(task.get("percentComplete", 0)),
+                            "PercentComplete": task.get("percentComplete", 0),
+                            "DueDate": task.get("dueDateTime", "")[:10] if task.get("dueDateTime") else "",
+                            "CreatedDate": task.get("createdDateTime", "")[:10] if task.get("createdDateTime") else "",
+                            "ChecklistDone": task.get("ChecklistDone", 0),
+                            "ChecklistTotal": task.get("ChecklistTotal", 0),
+                        }
+                        all_rows.append(row)
+                except httpx.HTTPStatusError as exc:
+                    print(f"  ✗ Error Graph al procesar '{plan_title}': {exc.response.status_code}")
+                except httpx.RequestError as exc:
+                    print(f"  ✗ Error de red al procesar '{plan_title}': {exc}")
+        finally:
+            cancel_plan_listings(listings)
 
         # 4. Exportar si se solicita
         if export_csv and all_rows:
@@ -1923,7 +3213,7 @@ async def run_email_report(
 
     Notes:
         - Realiza pre-fetch paralelo de commentCount para todas las tareas (GET /planner/tasks/{id}?$select=commentCount).
-          Usa semáforo 5 + sleep(0.2) para respetar rate limits. Sin este pre-fetch, commentCount siempre sería 0.
+          Concurrencia y ritmo los regula el presupuesto del workload planner. Sin este pre-fetch, commentCount siempre sería 0.
     """
     settings = Settings()
     auth = MicrosoftAuthManager(
@@ -1931,11 +3221,13 @@ async def run_email_report(
         client_id=settings.azure_client_id,
         client_secret=settings.azure_client_secret,
     )
-    token = auth.get_token()
+    token = AsyncTokenProvider.from_auth_manager(
+        auth, tenant_id=settings.azure_tenant_id, client_id=settings.azure_client_id,
+    )
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    async with shared_graph_client() as client:
         # 1. Listar planes
-        plans = await list_plans(client, token, group_id)
+        plans = await list_plans(client, token, group_id, "email-report")
         if filter_text:
             plans = [p for p in plans if filter_text.lower() in p["title"].lower()]
 
@@ -1960,50 +3252,53 @@ async def run_email_report(
             return
 
         # 3. Procesar cada plan
-        for plan in selected:
-            plan_id = plan["id"]
-            plan_title = plan["title"]
+        listings = start_plan_listings(client, token, selected, "email-report")
+        try:
+            for plan in selected:
+                plan_id = plan["id"]
+                plan_title = plan["title"]
 
-            try:
-                # Obtener buckets y tasks
-                buckets = await list_buckets(client, token, plan_id)
-                buckets_dict = {b["id"]: b["name"] for b in buckets}
+                try:
+                    # Buckets y tasks (pedidos por adelantado, con prioridad INTERACTIVE)
+                    buckets, tasks = await listings[plan_id]
+                    buckets_dict = {b["id"]: b["name"] for b in buckets}
 
-                tasks = await list_tasks(client, token, plan_id)
+                    if not tasks:
+                        print(f"  ⚠  {plan_title}: sin tareas.")
+                        continue
 
-                if not tasks:
-                    print(f"  ⚠  {plan_title}: sin tareas.")
-                    await asyncio.sleep(0.3)
-                    continue
+                    # Presupuesto de enriquecimiento del plan (--enrichment-budget): al agotarse,
+                    # el plan se presenta sin los datos que falten
+                    enrichment = start_phase("enrichment")
+                    skipped: Counter[str] = Counter()
 
-                # Pre-fetch checklist paralelo si se solicita (con semáforo para respetar rate limit)
-                checklist_map: dict[str, tuple[int, int]] = {}  # task_id → (done, total)
-                if fetch_checklist:
-                    sem = asyncio.Semaphore(5)
+                    # Pre-fetch checklist paralelo si se solicita (concurrencia del workload planner, en segundo plano)
+                    checklist_map: dict[str, tuple[int, int]] = {}  # task_id → (done, total)
+                    if fetch_checklist:
 
-                    async def _fetch_one_checklist(task_id: str) -> tuple[str, int, int]:
-                        async with sem:
+                        async def _fetch_one_checklist(task_id: str) -> tuple[str, int, int]:
                             try:
                                 details = await get_task_details(client, token, task_id)
                                 cl = details.get("checklist", {})
                                 total = len(cl)
                                 done = sum(1 for v in cl.values() if v.get("isChecked", False))
-                                await asyncio.sleep(0.1)
                                 return task_id, done, total
                             except (httpx.HTTPStatusError, httpx.RequestError):
                                 return task_id, 0, 0
+                            except DeadlineExceeded:
+                                skipped["checklist"] += 1
+                                return task_id, 0, 0
 
-                    results = await asyncio.gather(
-                        *[_fetch_one_checklist(t.get("id", "")) for t in tasks]
-                    )
-                    checklist_map = {tid: (done, total) for tid, done, total in results}
+                        with request_priority(Priority.BACKGROUND), within(enrichment):
+                            results = await asyncio.gather(
+                                *[_fetch_one_checklist(t.get("id", "")) for t in tasks]
+                            )
+                        checklist_map = {tid: (done, total) for tid, done, total in results}
 
-                # Fix 3: Pre-fetch paralelo de commentCount (GET /planner/tasks/{id}?$select=commentCount)
-                comment_count_map: dict[str, int] = {}
-                sem_cc = asyncio.Semaphore(5)
+                    # Fix 3: Pre-fetch paralelo de commentCount (GET /planner/tasks/{id}?$select=commentCount)
+                    comment_count_map: dict[str, int] = {}
 
-                async def _fetch_comment_count(task_id: str) -> tuple[str, int]:
-                    async with sem_cc:
+                    async def _fetch_comment_count(task_id: str) -> tuple[str, int]:
                         try:
                             t = await graph_request(
                                 client,
@@ -2011,116 +3306,122 @@ async def run_email_report(
                                 f"/planner/tasks/{task_id}?$select=commentCount",
                                 token,
                             )
-                            await asyncio.sleep(0.2)
                             return task_id, t.get("commentCount", 0)
                         except (httpx.HTTPStatusError, httpx.RequestError):
                             return task_id, 0
+                        except DeadlineExceeded:
+                            skipped["commentCount"] += 1
+                            return task_id, 0
 
-                cc_results = await asyncio.gather(
-                    *[_fetch_comment_count(t.get("id", "")) for t in tasks]
-                )
-                comment_count_map = {tid: cc for tid, cc in cc_results}
-
-                # Pre-fetch paralelo de nombres de asignados
-                all_guids: set[str] = {
-                    g for t in tasks for g in t.get("assignments", {}).keys()
-                }
-                names_map: dict[str, str] = {}
-                if all_guids:
-                    sem_names = asyncio.Semaphore(5)
-
-                    async def _fetch_one_name(guid: str) -> tuple[str, str | None]:
-                        async with sem_names:
-                            name = await resolve_guid_to_display_name(client, token, guid)
-                            await asyncio.sleep(0.1)
+                    with request_priority(Priority.BACKGROUND), within(enrichment):
+                        cc_results = await asyncio.gather(
+                            *[_fetch_comment_count(t.get("id", "")) for t in tasks]
+                        )
+                    comment_count_map = {tid: cc for tid, cc in cc_results}
+
+                    # Nombres y emails de los asignados: una llamada getByIds para todo el plan
+                    all_guids: set[str] = {
+                        g for t in tasks for g in t.get("assignments", {}).keys()
+                    }
+                    names_map: dict[str, str] = {}
+                    if all_guids:
+                        try:
+                            with request_priority(Priority.BACKGROUND), within(enrichment):
+                                await resolve_guids_bulk(client, token, all_guids)
+                        except DeadlineExceeded:
+                            pass   # los que falten se cuentan abajo como "nombres"
+
+                        # Sólo lo que getByIds no resolvió (caídas) va usuario a usuario
+                        async def _fetch_one_name(guid: str) -> tuple[str, str | None]:
+                            try:
+                                name = await resolve_guid_to_display_name(client, token, guid)
+                            except DeadlineExceeded:
+                                skipped["nombres"] += 1
+                                return guid, None
                             return guid, name
 
-                    name_results = await asyncio.gather(
-                        *[_fetch_one_name(g) for g in all_guids]
-                    )
-                    names_map = {g: n for g, n in name_results if n is not None}
-
-                # Enriquecer tareas (igual que en run_report)
-                enriched_tasks = []
-                for task in tasks:
-                    task_id = task.get("id", "")
-                    cl_done, cl_total = checklist_map.get(task_id, (0, 0))
-
-                    assignments = task.get("assignments", {})
-                    assignee_names = [
-                        names_map.get(g, g[:12]) for g in assignments.keys()
-                    ]
-                    assignee_display = ", ".join(assignee_names)[:40] if assignee_names else "(sin asignar)"
-
-                    enriched_tasks.append({
-                        **task,
-                        "CommentCount": comment_count_map.get(task_id, 0),  # Fix 3: usar pre-fetch en lugar de campo lista
-                        "ChecklistDone": cl_done,
-                        "ChecklistTotal": cl_total,
-                        "priority": task.get("priority", 5),
-                        "AssigneeDisplay": assignee_display,
-                    })
-
-                # Generar HTML (para preview o envío)
-                report_date = date.today().strftime("%d-%m-%Y")
-
-                # Calcular tareas que vencen en los próximos 7 días
-                today = date.today()
-                proximas_7d = sum(
-                    1 for t in enriched_tasks
-                    if t.get("dueDateTime")
-                    and t.get("percentComplete", 0) < 100
-                    and today <= datetime.fromisoformat(
-                        t["dueDateTime"].replace("Z", "+00:00")
-                    ).date() <= today + timedelta(days=7)
-                )
+                        with request_priority(Priority.BACKGROUND), within(enrichment):
+                            name_results = await asyncio.gather(
+                                *[_fetch_one_name(g) for g in all_guids]
+                            )
+                        names_map = {g: n for g, n in name_results if n is not None}
 
-                html = build_report_html(plan_title, buckets_dict, enriched_tasks, report_date, proximas_7d)
-                subject = f"[Planner] Reporte de gestión — {plan_title} ({report_date})"
-
-                # Preview mode: guardar HTML y abrir en navegador (sin enviar correo)
-                if preview:
-                    slug = re.sub(r"[^\w\-]", "_", plan_title.lower())[:40]
-                    out_path = Path("reports") / f"preview_{slug}.html"
-                    out_path.parent.mkdir(exist_ok=True)
-                    out_path.write_text(html, encoding="utf-8")
-                    print(f"  [preview] HTML guardado: {out_path}")
-                    webbrowser.open(out_path.resolve().as_uri())
-                    await asyncio.sleep(0.3)
-                    continue
-
-                # Resolver destinatarios (bypass si to_override activo)
-                if to_override:
-                    to_emails = [to_override]
-                else:
-                    # Resolver GUIDs → emails (con cache global)
-                    assignee_guids: set[str] = set()
-                    for task in enriched_tasks:
-                        assignments = task.get("assignments", {})
-                        assignee_guids.update(assignments.keys())
+                    if skipped:
+                        _print_enrichment_skipped(plan_title, skipped)
 
-                    to_emails: list[str] = []
-                    for guid in assignee_guids:
-                        email = await resolve_guid_to_email(client, token, guid)
-                        if email:
-                            to_emails.append(email)
+                    # Enriquecer tareas (igual que en run_report)
+                    enriched_tasks = []
+                    for task in tasks:
+                        task_id = task.get("id", "")
+                        cl_done, cl_total = checklist_map.get(task_id, (0, 0))
 
-                    if not to_emails:
-                        print(f"  ⚠  {plan_title}: sin asignados con email. Correo no enviado.")
-                        await asyncio.sleep(0.3)
-                        continue
+                        assignments = task.get("assignments", {})
+                        assignee_names = [
+                            names_map.get(g, g[:12]) for g in assignments.keys()
+                        ]
+                        assignee_display = ", ".join(assignee_names)[:40] if assignee_names else "(sin asignar)"
+
+                        enriched_tasks.append({
+                            **task,
+                            "CommentCount": comment_count_map.get(task_id, 0),  # Fix 3: usar pre-fetch en lugar de campo lista
+                            "ChecklistDone": cl_done,
+                            "ChecklistTotal": cl_total,
+                            "priority": task.get("priority", 5),
+                            "AssigneeDisplay": assignee_display,
+                        })
+
+                    # Generar HTML (para preview o envío)
+                    report_date = date.today().strftime("%d-%m-%Y")
+
+                    # Calcular tareas que vencen en los próximos 7 días
+                    today = date.today()
+                    proximas_7d = sum(
+                        1 for t in enriched_tasks
+                        if t.get("dueDateTime")
+                        and t.get("percentComplete", 0) < 100
+                        and today <= datetime.fromisoformat(
+                            t["dueDateTime"].replace("Z", "+00:00")
+                        ).date() <= today + timedelta(days=7)
+                    )
 
-                # Enviar correo (modo normal o to_override)
-                await send_mail_report(client, token, to_emails, subject, html)
-                print(f"  ✉  {plan_title}: correo enviado a {len(to_emails)} destinatario(s).")
+                    html = build_report_html(plan_title, buckets_dict, enriched_tasks, report_date, proximas_7d)
+                    subject = f"[Planner] Reporte de gestión — {plan_title} ({report_date})"
+
+                    # Preview mode: guardar HTML y abrir en navegador (sin enviar correo)
+                    if preview:
+                        slug = re.sub(r"[^\w\-]", "_", plan_title.lower())[:40]
+                        out_path = Path("reports") / f"preview_{slug}.html"
+                        out_path.parent.mkdir(exist_ok=True)
+                        out_path.write_text(html, encoding="utf-8")
+                        print(f"  [preview] HTML guardado: {out_path}")
+                        webbrowser.open(out_path.resolve().as_uri())
+                        continue
 
-                await asyncio.sleep(0.3)
-            except httpx.HTTPStatusError as exc:
-                print(f"  ✗ Error Graph al procesar '{plan_title}': {exc.response.status_code}")
-            except httpx.RequestError as exc:
-                print(f"  ✗ Error de red al procesar '{plan_title}': {exc}")
-            except ValueError as exc:
-                print(f"  ✗ Error de validación en '{plan_title}': {exc}")
+                    # Resolver destinatarios (bypass si to_override activo)
+                    if to_override:
+                        to_emails = [to_override]
+                    else:
+                        # Resolver GUIDs → emails (ya en la caché global por resolve_guids_bulk)
+                        emails = await asyncio.gather(
+                            *[resolve_guid_to_email(client, token, g) for g in sorted(all_guids)]
+                        )
+                        to_emails: list[str] = [e for e in emails if e]
+
+                        if not to_emails:
+                            print(f"  ⚠  {plan_title}: sin asignados con email. Correo no enviado.")
+                            continue
+
+                    # Enviar correo (modo normal o to_override)
+                    await send_mail_report(client, token, to_emails, subject, html)
+                    print(f"  ✉  {plan_title}: correo enviado a {len(to_emails)} destinatario(s).")
+                except httpx.HTTPStatusError as exc:
+                    print(f"  ✗ Error Graph al procesar '{plan_title}': {exc.response.status_code}")
+                except httpx.RequestError as exc:
+                    print(f"  ✗ Error de red al procesar '{plan_title}': {exc}")
+                except ValueError as exc:
+                    print(f"  ✗ Error de validación en '{plan_title}': {exc}")
+        finally:
+            cancel_plan_listings(listings)
 
 
 # ── Entry point ───────────────────────────────────────────────────────────────
@@ -2133,9 +3434,9 @@ def main() -> None:
     parser.add_argument("--dry-run", action="store_true", help="Simula sin llamar a la API")
     parser.add_argument(
         "--mode",
-        choices=["full", "plan", "buckets", "tasks", "list", "delete", "sp-list", "report", "email-report"],
+        choices=["full", "plan", "buckets", "tasks", "sync", "list", "delete", "sp-list", "report", "email-report"],
         default="full",
-        help="Modo: full (default), plan, buckets, tasks, list, delete, sp-list, report o email-report",
+        help="Modo: full (default), plan, buckets, tasks, sync, list, delete, sp-list, report o email-report",
     )
     parser.add_argument(
         "--filter", dest="filter_text", default="", help="Filtrar por título/nombre (modos list/delete/sp-list/report)"
@@ -2174,10 +3475,90 @@ def main() -> None:
         metavar="EMAIL",
         help="email-report: enviar sólo a este email (bypass de asignados).",
     )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Agrupa llamadas concurrentes en POST /$batch (equivale a GRAPH_BATCH=1).",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Caché en disco de lecturas con GET condicional (If-None-Match; equivale a GRAPH_CACHE=1).",
+    )
+    parser.add_argument(
+        "--directory-cache",
+        action="store_true",
+        help="Guarda en disco email ↔ GUID ↔ nombre entre ejecuciones, con TTL (equivale a GRAPH_DIRECTORY_CACHE=1).",
+    )
+    parser.add_argument(
+        "--metrics-file", type=Path, default=None, metavar="RUTA",
+        help="Guarda métricas de Graph por endpoint al terminar (.json o texto Prometheus; equivale a GRAPH_METRICS_FILE).",
+    )
+    parser.add_argument(
+        "--deadline", type=parse_duration, default=None, metavar="DURACIÓN",
+        help="Plazo total de la ejecución, p. ej. 15m o 1h30m (equivale a GRAPH_DEADLINE).",
+    )
+    parser.add_argument(
+        "--enrichment-budget", type=parse_duration, default=None, metavar="DURACIÓN",
+        help="Modos report/email-report: tiempo máximo de enriquecimiento por plan; al agotarse "
+             "se omiten checklist, comentarios y nombres pendientes (equivale a GRAPH_ENRICHMENT_BUDGET).",
+    )
+    parser.add_argument(
+        "--resume", type=Path, default=None, metavar="DIARIO",
+        help="Modos full/tasks: continúa una importación interrumpida desde su diario "
+             "(journals/*.jsonl); lo ya creado no se repite (equivale a GRAPH_RESUME).",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, metavar="N",
+        help=f"Modos full/tasks/sync: tareas creadas a la vez (default {IMPORT_WORKERS}; 1 = secuencial; "
+             "equivale a GRAPH_IMPORT_WORKERS).",
+    )
+    parser.add_argument(
+        "--emulator", action="store_true",
+        help="Habla con el emulador local de Graph en memoria, sin tenant ni token (equivale a GRAPH_EMULATOR=1).",
+    )
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument(
+        "--record", type=Path, default=None, metavar="DIR",
+        help="Graba todo el tráfico con Graph en DIR/cassette.jsonl.gz (equivale a GRAPH_RECORD).",
+    )
+    cassette.add_argument(
+        "--replay", type=Path, default=None, metavar="DIR",
+        help="Reproduce un cassette grabado con --record, sin red ni token (equivale a GRAPH_REPLAY).",
+    )
+    parser.add_argument(
+        "--replay-speed", type=float, default=None, metavar="X",
+        help="Con --replay: divide la latencia grabada por X (0 = sin esperas; equivale a GRAPH_REPLAY_SPEED).",
+    )
     args = parser.parse_args()
+    if args.emulator or emulator_requested():
+        install_emulator()
+    if args.record:
+        configure_cassette(CassetteConfig(mode="record", directory=args.record))
+    elif args.replay:
+        speed = args.replay_speed if args.replay_speed is not None else CassetteConfig.from_env().speed
+        configure_cassette(CassetteConfig(mode="replay", directory=args.replay, speed=speed))
+    if args.batch:
+        configure_batching(BatchConfig(enabled=True, window=BatchConfig.from_env().window))
+    if args.cache:
+        configure_cache(replace(CacheConfig.from_env(), enabled=True))
+    if args.directory_cache:
+        configure_directory_cache(replace(DirectoryConfig.from_env(), enabled=True))
+    if args.metrics_file:
+        configure_metrics(args.metrics_file)
+    if args.resume:
+        configure_journal(replace(journal_config(), resume=args.resume))
+    if args.deadline is not None or args.enrichment_budget is not None:
+        base = deadline_config()
+        phases = dict(base.phases)
+        if args.enrichment_budget is not None:
+            phases["enrichment"] = args.enrichment_budget
+        configure_deadlines(DeadlineConfig(
+            run=args.deadline if args.deadline is not None else base.run, phases=phases,
+        ))
 
     if args.mode == "report":
-        asyncio.run(run_report(
+        run_with_graph_client(run_report(
             args.group_id,
             args.filter_text or "",
             args.export,
@@ -2187,7 +3568,7 @@ def main() -> None:
         return
 
     if args.mode == "email-report":
-        asyncio.run(run_email_report(
+        run_with_graph_client(run_email_report(
             args.group_id,
             args.filter_text or "",
             preview=args.preview,
@@ -2197,15 +3578,15 @@ def main() -> None:
         return
 
     if args.mode == "list":
-        asyncio.run(run_list(args.group_id, args.filter_text))
+        run_with_graph_client(run_list(args.group_id, args.filter_text))
         return
 
     if args.mode == "sp-list":
-        asyncio.run(run_sp_list(args.site_url, args.folder, args.filter_text))
+        run_with_graph_client(run_sp_list(args.site_url, args.folder, args.filter_text))
         return
 
     if args.mode == "delete":
-        res = asyncio.run(run_delete(args.group_id, args.filter_text, args.dry_run))
+        res = run_with_graph_client(run_delete(args.group_id, args.filter_text, args.dry_run))
         print(f"\nEliminados : {len(res['deleted'])}")
         if res["errors"]:
             for e in res["errors"]:
@@ -2213,13 +3594,15 @@ def main() -> None:
         return
 
     if args.mode == "full":
-        result = asyncio.run(run_import_full(args.csv, args.group_id, args.dry_run))
+        result = run_with_graph_client(run_import_full(args.csv, args.group_id, args.dry_run, args.workers))
     elif args.mode == "plan":
-        result = asyncio.run(run_import_plan(args.csv, args.group_id, args.dry_run))
+        result = run_with_graph_client(run_import_plan(args.csv, args.group_id, args.dry_run))
     elif args.mode == "buckets":
-        result = asyncio.run(run_import_buckets(args.csv, args.dry_run))
+        result = run_with_graph_client(run_import_buckets(args.csv, args.dry_run))
     elif args.mode == "tasks":
-        result = asyncio.run(run_import_tasks(args.csv, args.dry_run))
+        result = run_with_graph_client(run_import_tasks(args.csv, args.dry_run, args.workers))
+    elif args.mode == "sync":
+        result = run_with_graph_client(run_sync(args.csv, args.group_id, args.dry_run, args.workers))
 
     print()
     print("── RESUMEN ──────────────────────────────")
@@ -2227,12 +3610,21 @@ def main() -> None:
         print("Modo      : Simulación — sin cambios en Planner")
         if result.plan_name:
             print(f"Plan      : '{result.plan_name}'")
+        if result.plans:
+            print(f"Planes    : {len(result.plans)}")
         if result.buckets_total:
             print(f"Buckets   : {result.buckets_total}")
         if result.tasks_total:
             print(f"Tareas    : {result.tasks_total}")
+        if args.mode == "sync":
+            print(f"Sin cambio: {result.tasks_unchanged}")
     else:
-        print(f"Plan ID   : {result.plan_id or '(sin ID)'}")
+        if result.plans:
+            print(f"Planes    : {len(result.plans)}")
+            for name, plan_id in result.plans.items():
+                print(f"  '{name}': {plan_id or '(sin ID)'}")
+        else:
+            print(f"Plan ID   : {result.plan_id or '(sin ID)'}")
         print(f"Buckets   : {len(result.bucket_ids)}")
         print(f"Tareas OK : {len(result.task_ids)}")
         print(f"GUIDs OK  : {result.guids_resolved}")
@@ -2240,12 +3632,27 @@ def main() -> None:
             print(f"GUIDs FAIL: {len(result.guids_failed)} — {result.guids_failed}")
         if result.tasks_unassigned:
             print(f"Sin asignar: {result.tasks_unassigned}")
+        if result.tasks_resumed:
+            print(f"Reanudadas: {result.tasks_resumed} (ya creadas en una ejecución anterior)")
+        if args.mode == "sync":
+            print(f"Actualiz. : {result.tasks_updated}")
+            print(f"Eliminadas: {result.tasks_deleted}")
+            print(f"Sin cambio: {result.tasks_unchanged}")
         if result.errors:
             print(f"Errores   : {len(result.errors)}")
             for e in result.errors:
                 print(f"  {e}")
+        if result.journal:
+            print(f"Diario    : {result.journal}")
     print("─────────────────────────────────────────")
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except JournalMismatch as exc:
+        sys.exit(f"[ERROR] {exc}")
+    except DeadlineExceeded as exc:
+        sys.exit(f"[ERROR] {exc}{resume_hint()}")
+    except KeyboardInterrupt:
+        sys.exit(f"\n[INTERRUMPIDO]{resume_hint()}")
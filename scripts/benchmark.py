@@ -0,0 +1,422 @@
+#!/usr/bin/env python
+"""Benchmark de extremo a extremo: importación, reportes y creación de entornos.
+
+Genera CSVs sintéticos (buckets, etiquetas, checklists y responsables variados) y ejecuta
+los orquestadores contra el emulador de Graph (graph_emulator) con un perfil fijo de
+latencia y throttling. Cada caso (escenario × tamaño) corre en un subproceso propio para
+que el pico de memoria y el estado global no se mezclen entre casos.
+
+Escenarios: import-full, import-tasks, report, email-report, create-environment
+
+Uso:
+  python scripts/benchmark.py                                   # 100 y 1000 tareas
+  python scripts/benchmark.py --sizes 100,1000,20000 --latency-ms 80 --rates planner=20
+  python scripts/benchmark.py --scenarios report --compare benchmarks/20260301-a1b2c3d.json
+
+Resultado: tabla por consola y JSON en benchmarks/<fecha>-<commit>.json con, por caso,
+tareas/s, llamadas Graph por tarea, p50/p95 por fase (plantilla de endpoint, medido en
+graph_request: incluye colas, throttle y reintentos) y pico de RSS.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+SCENARIOS = ("import-full", "import-tasks", "report", "email-report", "create-environment")
+GROUP_ID = "00000000-0000-4000-8000-00000000bench"
+RESULT_MARK = "BENCH_RESULT "
+
+LABELS = ("TI", "PM", "Finanzas", "Legal", "Compras", "Calidad", "RRHH", "Riesgo")
+PRIORITIES = ("urgent", "important", "medium", "low", "none")
+FULL_HEADER = [
+    "PlanName", "BucketName", "TaskTitle", "TaskDescription", "AssignedToEmail", "StartDate",
+    "DueDate", "Priority", "PercentComplete", "ChecklistItems", "Labels",
+]
+
+
+# ── Datos sintéticos ──────────────────────────────────────────────────────────
+
+def _shape(n_tasks: int) -> tuple[int, int]:
+    """(buckets, responsables) para un plan de n_tasks tareas."""
+    return max(3, min(60, n_tasks // 40)), max(3, min(400, n_tasks // 25))
+
+
+def synthetic_tasks(n_tasks: int, seed: int = 0) -> list[dict[str, str]]:
+    """Filas de CSV con la columna PlanName fija y el resto variado y reproducible."""
+    rng = random.Random(seed)
+    n_buckets, n_people = _shape(n_tasks)
+    start = date(2026, 1, 5)
+    rows = []
+    for i in range(n_tasks):
+        begin = start + timedelta(days=rng.randint(0, 300))
+        checklist = ";".join(f"Paso {k + 1}" for k in range(rng.choice((0, 0, 1, 3, 5, 8))))
+        labels = ";".join(rng.sample(LABELS, rng.choice((0, 1, 1, 2, 3))))
+        rows.append({
+            "PlanName": f"Benchmark {n_tasks}",
+            "BucketName": f"Bucket {rng.randrange(n_buckets) + 1:02d}",
+            "TaskTitle": f"Tarea {i + 1:05d}",
+            "TaskDescription": rng.choice(("", "", f"Descripción de la tarea {i + 1}. " * rng.randint(1, 6))),
+            "AssignedToEmail": rng.choice(("", f"persona{rng.randrange(n_people) + 1:03d}@contoso.com")),
+            "StartDate": begin.strftime("%d%m%Y"),
+            "DueDate": (begin + timedelta(days=rng.randint(1, 60))).strftime("%d%m%Y"),
+            "Priority": rng.choice(PRIORITIES),
+            "PercentComplete": str(rng.choice((0, 0, 25, 50, 100))),
+            "ChecklistItems": checklist,
+            "Labels": labels,
+        })
+    return rows
+
+
+def write_csv(path: Path, header: list[str], rows: list[dict[str, str]]) -> Path:
+    with path.open("w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=header, delimiter=";")
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+# ── Sembrado directo del emulador (fuera del tiempo medido) ───────────────────
+
+async def _seed_plan(
+    emulator: Any, rows: list[dict[str, str]], with_tasks: bool = True,
+) -> tuple[str, dict[str, str]]:
+    """Crea en el emulador el plan, buckets y (con with_tasks) tareas de `rows`, detalles y
+    responsables incluidos, sin latencia: fuera del tiempo medido."""
+    import httpx
+
+    from planner_import import GRAPH_BASE, PRIORITY_MAP
+
+    latency, jitter = emulator.config.latency, emulator.config.jitter
+    emulator.config.latency = emulator.config.jitter = 0.0
+    try:
+        async with httpx.AsyncClient(transport=emulator.transport(), base_url=GRAPH_BASE) as client:
+            async def post(path: str, body: dict[str, Any]) -> dict[str, Any]:
+                resp = await client.post(f"{GRAPH_BASE}{path}", json=body)
+                resp.raise_for_status()
+                return resp.json()
+
+            plan = await post("/planner/plans", {"owner": GROUP_ID, "title": rows[0]["PlanName"]})
+            details = emulator.plan_details[plan["id"]]
+            details["categoryDescriptions"] = {f"category{i + 1}": lbl for i, lbl in enumerate(LABELS)}
+            buckets: dict[str, str] = {}
+            for name in sorted({r["BucketName"] for r in rows}):
+                buckets[name] = (await post("/planner/buckets", {"planId": plan["id"], "name": name}))["id"]
+            if with_tasks:
+                for chunk in range(0, len(rows), 500):
+                    await asyncio.gather(*[
+                        post("/planner/tasks", _seed_task(emulator, plan["id"], buckets, row, PRIORITY_MAP))
+                        for row in rows[chunk:chunk + 500]
+                    ])
+            return plan["id"], buckets
+    finally:
+        emulator.config.latency, emulator.config.jitter = latency, jitter
+
+
+def _seed_task(
+    emulator: Any, plan_id: str, buckets: dict[str, str], row: dict[str, str], priority_map: dict[str, int],
+) -> dict[str, Any]:
+    due = datetime.strptime(row["DueDate"], "%d%m%Y")
+    body: dict[str, Any] = {
+        "planId": plan_id,
+        "bucketId": buckets[row["BucketName"]],
+        "title": row["TaskTitle"],
+        "priority": priority_map.get(row["Priority"], 5),
+        "percentComplete": int(row["PercentComplete"]),
+        "dueDateTime": due.strftime("%Y-%m-%dT00:00:00Z"),
+        "appliedCategories": {
+            f"category{LABELS.index(lbl) + 1}": True for lbl in filter(None, row["Labels"].split(";"))
+        },
+        "details": {
+            "description": row["TaskDescription"],
+            "checklist": {
+                f"{k:04d}": {"@odata.type": "#microsoft.graph.plannerChecklistItem", "title": t, "isChecked": False}
+                for k, t in enumerate(filter(None, row["ChecklistItems"].split(";")))
+            },
+        },
+    }
+    if row["AssignedToEmail"]:
+        guid = emulator.add_user(row["AssignedToEmail"])["id"]
+        body["assignments"] = {guid: {"@odata.type": "#microsoft.graph.plannerAssignment", "orderHint": " !"}}
+    return body
+
+
+# ── Medición ──────────────────────────────────────────────────────────────────
+
+class PhaseTimer:
+    """Envuelve graph_request/graph_request_bytes y mide cada llamada lógica por plantilla."""
+
+    def __init__(self) -> None:
+        self.samples: dict[str, list[float]] = {}
+
+    def wrap(self, fn: Any) -> Any:
+        from graph_metrics import metric_key
+
+        async def timed(client: Any, method: str, endpoint: str, *args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return await fn(client, method, endpoint, *args, **kwargs)
+            finally:
+                key = metric_key(f"{method} {endpoint}")
+                self.samples.setdefault(key, []).append(time.perf_counter() - started)
+
+        return timed
+
+    def phases(self) -> dict[str, dict[str, float]]:
+        result = {}
+        for key, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            result[key] = {
+                "count": len(ordered),
+                "p50_ms": round(_quantile(ordered, 0.50) * 1000, 2),
+                "p95_ms": round(_quantile(ordered, 0.95) * 1000, 2),
+                "total_s": round(sum(ordered), 3),
+            }
+        return result
+
+
+def _quantile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))]
+
+
+def peak_rss_mb() -> float | None:
+    """Pico de memoria residente del proceso (None si la plataforma no lo expone)."""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil  # opcional en Windows
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / 1024 / 1024, 1)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024   # bytes en macOS, KB en Linux
+    return round(peak / divisor, 1)
+
+
+# ── Un caso (subproceso) ──────────────────────────────────────────────────────
+
+def run_case(scenario: str, size: int, profile: dict[str, Any], seed: int) -> dict[str, Any]:
+    import create_environment
+    import graph_metrics
+    import planner_import
+    from graph_client import run_with_graph_client
+    from graph_emulator import EmulatorConfig, install_emulator
+    from graph_journal import JournalConfig, configure_journal
+
+    emulator = install_emulator(EmulatorConfig(
+        latency=profile["latency_ms"] / 1000,
+        jitter=profile["jitter_ms"] / 1000,
+        rates=profile["rates"],
+        seed=seed,
+    ))
+    workdir = Path(tempfile.mkdtemp(prefix="planner-bench-"))
+    configure_journal(replace(JournalConfig.from_env(), directory=workdir / "journals"))  # diario incluido en la medida
+    rows = synthetic_tasks(size, seed)
+    timer = PhaseTimer()
+
+    if scenario == "import-full":
+        csv_path = write_csv(workdir / "plan.csv", FULL_HEADER, rows)
+        job = lambda: planner_import.run_import_full(csv_path, GROUP_ID, dry_run=False)  # noqa: E731
+    elif scenario == "import-tasks":
+        plan_id, buckets = asyncio.run(_seed_plan(emulator, rows, with_tasks=False))
+        task_rows = [
+            {"PlanID": plan_id, "BucketID": buckets[r["BucketName"]], **{k: r[k] for k in FULL_HEADER[2:]}}
+            for r in rows
+        ]
+        csv_path = write_csv(workdir / "tasks.csv", ["PlanID", "BucketID", *FULL_HEADER[2:]], task_rows)
+        job = lambda: planner_import.run_import_tasks(csv_path, dry_run=False)  # noqa: E731
+    elif scenario == "report":
+        asyncio.run(_seed_plan(emulator, rows))
+        job = lambda: planner_import.run_report(  # noqa: E731
+            GROUP_ID, "", export_csv=workdir / "report.csv", fetch_checklist=True,
+        )
+    elif scenario == "email-report":
+        asyncio.run(_seed_plan(emulator, rows))
+        job = lambda: planner_import.run_email_report(GROUP_ID, "", fetch_checklist=True)  # noqa: E731
+    elif scenario == "create-environment":
+        per_project = max(1, min(size, 500))
+        projects = []
+        for p in range(max(1, size // per_project)):
+            plan_rows = [{**r, "PlanName": f"Proyecto {p + 1}"} for r in rows[p * per_project:(p + 1) * per_project]]
+            plan_csv = write_csv(workdir / f"plan_{p + 1}.csv", FULL_HEADER, plan_rows)
+            projects.append({
+                "ProjectID": f"PRJ-BENCH-{p + 1:03d}", "ProjectName": f"Proyecto {p + 1}",
+                "PMEmail": "pm@contoso.com", "LiderEmail": "lider@contoso.com",
+                "StartDate": "05-01-2026", "PlannerCSV": str(plan_csv),
+            })
+        header = ["ProjectID", "ProjectName", "PMEmail", "LiderEmail", "StartDate", "PlannerCSV"]
+        csv_path = write_csv(workdir / "proyectos.csv", header, projects)
+        create_environment.PROJECT_CONFIG_PATH = workdir / "project_config.json"
+        create_environment.CHANNEL_PROPAGATION_WAIT = 0.0
+        job = lambda: create_environment.run_create_environment(csv_path, GROUP_ID, dry_run=False)  # noqa: E731
+    else:
+        raise ValueError(f"Escenario desconocido: {scenario}")
+
+    graph_metrics._METRICS = None
+    baseline_requests, baseline_throttled = emulator.requests, emulator.throttled
+    patches = [
+        patch.object(planner_import, "graph_request", timer.wrap(planner_import.graph_request)),
+        patch.object(create_environment, "graph_request", timer.wrap(create_environment.graph_request)),
+        patch.object(create_environment, "graph_request_bytes", timer.wrap(create_environment.graph_request_bytes)),
+        patch("builtins.input", return_value="todos"),
+    ]
+    with contextlib.ExitStack() as stack:
+        for p in patches:
+            stack.enter_context(p)
+        stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+        started = time.perf_counter()
+        run_with_graph_client(job())
+        wall = time.perf_counter() - started
+
+    endpoints = graph_metrics.graph_metrics().endpoints.values()
+    calls = sum(s.calls for s in endpoints)
+    return {
+        "scenario": scenario,
+        "tasks": size,
+        "wall_s": round(wall, 3),
+        "tasks_per_s": round(size / wall, 2) if wall else None,
+        "graph_calls": calls,
+        "calls_per_task": round(calls / size, 3),
+        "http_requests": emulator.requests - baseline_requests,
+        "retries": sum(s.retries for s in endpoints),
+        "throttled": emulator.throttled - baseline_throttled,
+        "phases": timer.phases(),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+# ── Orquestación de casos ─────────────────────────────────────────────────────
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _parse_rates(raw: str) -> dict[str, float]:
+    rates = {}
+    for part in filter(None, (p.strip() for p in raw.split(","))):
+        name, _, value = part.rpartition("=")
+        rates[name or "*"] = float(value)
+    return rates
+
+
+def _spawn(scenario: str, size: int, args: argparse.Namespace) -> dict[str, Any]:
+    cmd = [
+        sys.executable, __file__, "--case", f"{scenario}:{size}",
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+        "--rates", args.rates, "--seed", str(args.seed),
+    ]
+    proc = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8")
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_MARK):
+            return json.loads(line[len(RESULT_MARK):])
+    tail = (proc.stderr or proc.stdout).strip().splitlines()[-5:]
+    return {"scenario": scenario, "tasks": size, "error": " | ".join(tail) or f"exit {proc.returncode}"}
+
+
+def _print_table(results: list[dict[str, Any]], previous: dict[tuple[str, int], dict[str, Any]]) -> None:
+    print(f"\n  {'Escenario':<20} {'Tareas':>7} {'Tiempo':>8} {'Tareas/s':>9} {'Llam./t':>8} "
+          f"{'Reint.':>6} {'RSS MB':>7} {'Δ t/s':>7}")
+    for r in results:
+        if "error" in r:
+            print(f"  {r['scenario']:<20} {r['tasks']:>7}  ERROR: {r['error']}")
+            continue
+        before = previous.get((r["scenario"], r["tasks"]), {}).get("tasks_per_s")
+        delta = f"{(r['tasks_per_s'] / before - 1) * 100:+.0f}%" if before else "-"
+        print(f"  {r['scenario']:<20} {r['tasks']:>7} {r['wall_s']:>7.1f}s {r['tasks_per_s']:>9.1f} "
+              f"{r['calls_per_task']:>8.2f} {r['retries']:>6} {r['peak_rss_mb'] or 0:>7.0f} {delta:>7}")
+        slowest = sorted(r["phases"].items(), key=lambda kv: kv[1]["total_s"], reverse=True)[:3]
+        for key, phase in slowest:
+            print(f"      {key[:48]:<48} n={phase['count']:<6} p50={phase['p50_ms']:.0f}ms p95={phase['p95_ms']:.0f}ms")
+
+
+def main() -> None:
+    sys.stdout.reconfigure(encoding="utf-8")  # type: ignore[attr-defined]
+    parser = argparse.ArgumentParser(description="Benchmark de importación, reportes y entornos contra el emulador")
+    parser.add_argument("--sizes", default="100,1000", help="Tamaños en tareas, separados por coma (100–20000)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Subconjunto de: {', '.join(SCENARIOS)}")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latencia emulada por petición")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Variación aleatoria de la latencia")
+    parser.add_argument("--rates", default="", help="Límite de peticiones/s por servicio: 'planner=20,users=50' o '20'")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla de los datos y del emulador")
+    parser.add_argument("--output", type=Path, default=None, help="JSON de resultados (default: benchmarks/<fecha>-<commit>.json)")
+    parser.add_argument("--compare", type=Path, default=None, help="JSON anterior para mostrar la variación de tareas/s")
+    parser.add_argument("--case", default=None, help=argparse.SUPPRESS)   # uso interno: un caso por subproceso
+    args = parser.parse_args()
+
+    profile = {
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "rates": _parse_rates(args.rates),
+    }
+
+    if args.case:
+        scenario, _, size = args.case.partition(":")
+        result = run_case(scenario, int(size), profile, args.seed)
+        print(RESULT_MARK + json.dumps(result, ensure_ascii=False))
+        return
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"escenarios desconocidos: {', '.join(sorted(unknown))}")
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    previous: dict[tuple[str, int], dict[str, Any]] = {}
+    if args.compare:
+        for r in json.loads(args.compare.read_text(encoding="utf-8")).get("results", []):
+            previous[(r["scenario"], r["tasks"])] = r
+
+    commit = _git_commit()
+    results = []
+    for scenario in scenarios:
+        for size in sizes:
+            print(f"  → {scenario} × {size} tareas...", flush=True)
+            results.append(_spawn(scenario, size, args))
+
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "profile": profile,
+        "seed": args.seed,
+        "results": results,
+    }
+    output = args.output or ROOT / "benchmarks" / f"{datetime.now():%Y%m%d-%H%M%S}-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    _print_table(results, previous)
+    print(f"\n  Resultados guardados en {output}")
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("GRAPH_EMULATOR", "1")
+    main()
@@ -22,6 +22,7 @@ load_dotenv(env_file)
 # Agregar parent dir al path para importar planner_import
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from graph_auth import cached_token
 from src.auth.microsoft import MicrosoftAuthManager
 from src.config import Settings
 
@@ -44,7 +45,7 @@ async def find_plan_group(plan_id: str) -> str:
         client_id=settings.azure_client_id,
         client_secret=settings.azure_client_secret,
     )
-    token = auth.get_token()
+    token = cached_token(auth, settings.azure_tenant_id, settings.azure_client_id)
 
     async with httpx.AsyncClient(timeout=30.0) as client:
         response = await client.get(
@@ -33,6 +33,15 @@ def _register_stubs() -> None:
 
 
 _register_stubs()
+import graph_batch  # noqa: E402
+import graph_cache  # noqa: E402
+import graph_cassette  # noqa: E402
+import graph_client  # noqa: E402
+import graph_deadline  # noqa: E402
+import graph_directory  # noqa: E402
+import graph_emulator  # noqa: E402
+import graph_journal  # noqa: E402
+import graph_metrics  # noqa: E402
 import planner_import  # noqa: E402
 
 FIXTURES_DIR = Path(__file__).parent / "fixtures"
@@ -88,6 +97,137 @@ def reset_guid_to_name_cache():
     planner_import._GUID_TO_NAME_CACHE.update(original)
 
 
+@pytest.fixture(autouse=True)
+def reset_inline_details(monkeypatch):
+    """create_task_full() desactiva INLINE_TASK_DETAILS si Graph lo rechaza — restaurar entre tests."""
+    monkeypatch.setattr(planner_import, "INLINE_TASK_DETAILS", True)
+    monkeypatch.setattr(planner_import, "_INLINE_DETAILS_VERIFIED", False)
+
+
+@pytest.fixture(autouse=True)
+def reset_graph_client():
+    """El pool Graph compartido es global (y ligado a un loop) — descartarlo entre tests."""
+    graph_client._SHARED_CLIENT = None
+    yield
+    graph_client._SHARED_CLIENT = None
+
+
+@pytest.fixture(autouse=True)
+def reset_throttle():
+    """Los ThrottleController por workload son de proceso — ritmo y pausas no deben filtrarse entre tests."""
+    graph_client._WORKLOADS = None
+    yield
+    graph_client._WORKLOADS = None
+
+
+@pytest.fixture(autouse=True)
+def reset_retry_policy():
+    """RetryPolicy de proceso sin esperas ni reintentos por excepción de red.
+
+    Los reintentos por status se ejercitan sin dormir de verdad; los tests que cubren
+    timeouts/cortes de red configuran su propia política con configure_retry().
+    """
+    graph_client._RETRY_POLICY = graph_client.RetryPolicy(
+        base_delay=0.0, max_delay=0.0, retry_exceptions=(),
+    )
+    yield
+    graph_client._RETRY_POLICY = None
+
+
+@pytest.fixture(autouse=True)
+def reset_single_flight():
+    """El mapa de GET en vuelo es de proceso — ninguna tarea pendiente pasa de un test a otro."""
+    graph_client._SINGLE_FLIGHT = None
+    yield
+    graph_client._SINGLE_FLIGHT = None
+
+
+@pytest.fixture(autouse=True)
+def reset_batcher():
+    """El GraphBatcher es de proceso — la cola y la activación no deben filtrarse entre tests."""
+    graph_batch._BATCHER = None
+    yield
+    graph_batch._BATCHER = None
+
+
+@pytest.fixture(autouse=True)
+def reset_response_cache(monkeypatch):
+    """La caché de respuestas es de proceso y está desactivada salvo que el test la configure."""
+    monkeypatch.delenv("GRAPH_CACHE", raising=False)
+    graph_cache._CACHE = None
+    yield
+    graph_cache._CACHE = None
+
+
+@pytest.fixture(autouse=True)
+def reset_directory_cache(monkeypatch):
+    """La caché de directorio en disco es de proceso y está desactivada salvo que el test la configure."""
+    monkeypatch.delenv("GRAPH_DIRECTORY_CACHE", raising=False)
+    graph_directory._DIRECTORY = None
+    yield
+    if graph_directory._DIRECTORY is not None:
+        graph_directory._DIRECTORY.close()
+    graph_directory._DIRECTORY = None
+
+
+@pytest.fixture(autouse=True)
+def reset_cassette(monkeypatch):
+    """Sin grabación ni reproducción salvo que el test configure un cassette."""
+    monkeypatch.delenv("GRAPH_RECORD", raising=False)
+    monkeypatch.delenv("GRAPH_REPLAY", raising=False)
+    graph_cassette._SESSION = None
+    yield
+    graph_cassette._SESSION = None
+
+
+@pytest.fixture(autouse=True)
+def reset_emulator(monkeypatch):
+    """Ningún test habla con el emulador salvo que lo instale."""
+    monkeypatch.delenv("GRAPH_EMULATOR", raising=False)
+    graph_emulator._EMULATOR = None
+    yield
+    graph_emulator._EMULATOR = None
+
+
+@pytest.fixture(autouse=True)
+def reset_deadlines(monkeypatch):
+    """Sin plazos de ejecución ni de fase salvo que el test los configure."""
+    monkeypatch.delenv("GRAPH_DEADLINE", raising=False)
+    monkeypatch.delenv("GRAPH_ENRICHMENT_BUDGET", raising=False)
+    graph_deadline._CONFIG = None
+    yield
+    graph_deadline._CONFIG = None
+
+
+@pytest.fixture(autouse=True)
+def reset_journal(monkeypatch, tmp_path):
+    """Los diarios de operaciones van al tmp del test, nunca a journals/ del repo."""
+    monkeypatch.delenv("GRAPH_JOURNAL", raising=False)
+    monkeypatch.delenv("GRAPH_RESUME", raising=False)
+    monkeypatch.setenv("GRAPH_JOURNAL_DIR", str(tmp_path / "journals"))
+    graph_journal._CONFIG = None
+    graph_journal._ACTIVE = None
+    yield
+    graph_journal._CONFIG = None
+    graph_journal._ACTIVE = None
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    """Las métricas de Graph son de proceso — cada test empieza con el registro vacío."""
+    graph_metrics._METRICS = None
+    graph_metrics._OUTPUT = None
+    yield
+    graph_metrics._METRICS = None
+    graph_metrics._OUTPUT = None
+
+
+@pytest.fixture(autouse=True)
+def no_disk_token_cache(monkeypatch):
+    """Los tests nunca leen ni escriben la caché de tokens real del usuario."""
+    monkeypatch.setenv("GRAPH_TOKEN_CACHE", "0")
+
+
 @pytest.fixture
 def fake_token() -> str:
     return "test-bearer-token"
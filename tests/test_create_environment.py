@@ -122,7 +122,8 @@ class TestGraphRequestBytes:
             result = await graph_request_bytes(client, "PUT", "/test", fake_token, data=b"x")
 
         assert result == {"id": "ok"}
-        mock_sleep.assert_called_once_with(1)
+        mock_sleep.assert_called_once()
+        assert mock_sleep.call_args.args[0] == pytest.approx(1, abs=0.05)
 
     async def test_raise_on_4xx(self, fake_token):
         client = await _make_client([_make_response(403)])
@@ -352,6 +353,7 @@ class TestRunCreateEnvironment409:
             "create_environment.graph_request": AsyncMock(return_value={"id": "root-id"}),
             "create_environment.ensure_help_dir": AsyncMock(return_value="help-id"),
             "create_environment.resolve_email_to_guid": AsyncMock(return_value="guid-123"),
+            "create_environment.prefetch_assignees": AsyncMock(return_value={}),
             "create_environment.create_team_channel": AsyncMock(
                 return_value={"id": "ch-id", "webUrl": ""}
             ),
@@ -389,6 +391,7 @@ class TestRunCreateEnvironment409:
              patch("create_environment.graph_request", patches["create_environment.graph_request"]), \
              patch("create_environment.ensure_help_dir", patches["create_environment.ensure_help_dir"]), \
              patch("create_environment.resolve_email_to_guid", patches["create_environment.resolve_email_to_guid"]), \
+             patch("create_environment.prefetch_assignees", patches["create_environment.prefetch_assignees"]), \
              patch("create_environment.create_team_channel", patches["create_environment.create_team_channel"]), \
              patch("create_environment.add_channel_member", patches["create_environment.add_channel_member"]), \
              patch("create_environment.add_team_member", patches["create_environment.add_team_member"]), \
@@ -420,6 +423,7 @@ class TestRunCreateEnvironment409:
              patch("create_environment.graph_request", patches["create_environment.graph_request"]), \
              patch("create_environment.ensure_help_dir", patches["create_environment.ensure_help_dir"]), \
              patch("create_environment.resolve_email_to_guid", patches["create_environment.resolve_email_to_guid"]), \
+             patch("create_environment.prefetch_assignees", patches["create_environment.prefetch_assignees"]), \
              patch("create_environment.create_team_channel", patches["create_environment.create_team_channel"]), \
              patch("create_environment.create_plan", patches["create_environment.create_plan"]) as mock_plan, \
              patch("asyncio.sleep", patches["asyncio.sleep"]):
@@ -440,6 +444,7 @@ class TestRunCreateEnvironment409:
              patch("create_environment.graph_request", patches["create_environment.graph_request"]), \
              patch("create_environment.ensure_help_dir", patches["create_environment.ensure_help_dir"]), \
              patch("create_environment.resolve_email_to_guid", patches["create_environment.resolve_email_to_guid"]), \
+             patch("create_environment.prefetch_assignees", patches["create_environment.prefetch_assignees"]), \
              patch("create_environment.create_team_channel", patches["create_environment.create_team_channel"]), \
              patch("create_environment.add_channel_member", patches["create_environment.add_channel_member"]), \
              patch("create_environment.add_team_member", patches["create_environment.add_team_member"]), \
@@ -476,6 +481,7 @@ class TestRunCreateEnvironment409:
              patch("create_environment.graph_request", patches["create_environment.graph_request"]), \
              patch("create_environment.ensure_help_dir", patches["create_environment.ensure_help_dir"]), \
              patch("create_environment.resolve_email_to_guid", patches["create_environment.resolve_email_to_guid"]), \
+             patch("create_environment.prefetch_assignees", patches["create_environment.prefetch_assignees"]), \
              patch("create_environment.create_team_channel", patches["create_environment.create_team_channel"]), \
              patch("create_environment.add_channel_member", patches["create_environment.add_channel_member"]), \
              patch("create_environment.add_team_member", patches["create_environment.add_team_member"]), \
@@ -505,6 +511,7 @@ class TestRunCreateEnvironment409:
              patch("create_environment.graph_request", patches["create_environment.graph_request"]), \
              patch("create_environment.ensure_help_dir", patches["create_environment.ensure_help_dir"]), \
              patch("create_environment.resolve_email_to_guid", patches["create_environment.resolve_email_to_guid"]), \
+             patch("create_environment.prefetch_assignees", patches["create_environment.prefetch_assignees"]), \
              patch("create_environment.create_team_channel", patches["create_environment.create_team_channel"]), \
              patch("create_environment.add_channel_member", patches["create_environment.add_channel_member"]), \
              patch("create_environment.add_team_member", patches["create_environment.add_team_member"]), \
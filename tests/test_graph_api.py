@@ -1,8 +1,9 @@
 """Tests de graph_request, list_plans, delete_plan, create_plan, create_bucket,
-resolve_email_to_guid, create_task_full, get_task_details, _print_report_table,
+resolve_email_to_guid, resolve_emails_bulk, create_task_full, get_task_details, _print_report_table,
 run_report — sin red real."""
 from __future__ import annotations
 
+import asyncio
 from datetime import date, timedelta
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, call, patch
@@ -10,6 +11,7 @@ from unittest.mock import AsyncMock, MagicMock, call, patch
 import httpx
 import pytest
 
+import graph_client
 import planner_import
 from planner_import import (
     GRAPH_BASE,
@@ -29,9 +31,13 @@ from planner_import import (
     list_plans,
     list_tasks,
     resolve_email_to_guid,
+    resolve_emails_bulk,
+    resolve_guid_to_display_name,
     resolve_guid_to_email,
+    resolve_guids_bulk,
     run_report,
     send_mail_report,
+    start_plan_listings,
 )
 
 
@@ -124,7 +130,8 @@ class TestGraphRequestRetry:
             result = await graph_request(client, "GET", "/planner/plans", fake_token)
 
         assert result == {"value": "ok"}
-        mock_sleep.assert_called_once_with(1)
+        mock_sleep.assert_called_once()
+        assert mock_sleep.call_args.args[0] == pytest.approx(1, abs=0.05)
 
     async def test_uses_retry_after_header(self, fake_token):
         resp_429 = _make_response(429, headers={"Retry-After": "42"})
@@ -134,9 +141,10 @@ class TestGraphRequestRetry:
         with patch.object(planner_import.asyncio, "sleep", new_callable=AsyncMock) as mock_sleep:
             await graph_request(client, "GET", "/planner/plans", fake_token)
 
-        mock_sleep.assert_called_once_with(42)
+        mock_sleep.assert_called_once()
+        assert mock_sleep.call_args.args[0] == pytest.approx(42, abs=0.05)
 
-    async def test_no_retry_after_sleeps_60(self, fake_token):
+    async def test_no_retry_after_uses_default_pause(self, fake_token):
         resp_429 = _make_response(429)
         resp_200 = _make_response(200, {})
         client = await _make_client([resp_429, resp_200])
@@ -144,9 +152,37 @@ class TestGraphRequestRetry:
         with patch.object(planner_import.asyncio, "sleep", new_callable=AsyncMock) as mock_sleep:
             await graph_request(client, "GET", "/planner/plans", fake_token)
 
-        mock_sleep.assert_called_once_with(60)
+        mock_sleep.assert_called_once()
+        default_pause = graph_client.ThrottleConfig().default_pause
+        assert mock_sleep.call_args.args[0] == pytest.approx(default_pause, abs=0.05)
+
+    async def test_503_with_retry_after_is_retried(self, fake_token):
+        resp_503 = _make_response(503, headers={"Retry-After": "2"})
+        resp_200 = _make_response(200, {"ok": True})
+        client = await _make_client([resp_503, resp_200])
+
+        with patch.object(planner_import.asyncio, "sleep", new_callable=AsyncMock):
+            result = await graph_request(client, "GET", "/planner/plans", fake_token)
+
+        assert result == {"ok": True}
+        assert client.request.call_count == 2
+
+    async def test_429_cuts_global_rate(self, fake_token):
+        throttle = graph_client.throttle_controller("planner")
+        rate_before = throttle.rate
+        client = await _make_client([
+            _make_response(429, headers={"Retry-After": "1"}),
+            _make_response(200, {}),
+        ])
+
+        with patch.object(planner_import.asyncio, "sleep", new_callable=AsyncMock):
+            await graph_request(client, "GET", "/planner/plans", fake_token)
+
+        assert throttle.rate < rate_before
+        assert throttle.throttled_count == 1
 
     async def test_three_consecutive_429_raises_runtime_error(self, fake_token):
+        graph_client.configure_retry(graph_client.RetryPolicy(max_attempts=3))
         resp_429 = _make_response(429, headers={"Retry-After": "1"})
         client = await _make_client([resp_429, resp_429, resp_429])
 
@@ -155,6 +191,7 @@ class TestGraphRequestRetry:
                 await graph_request(client, "GET", "/planner/plans", fake_token)
 
     async def test_three_429_client_called_three_times(self, fake_token):
+        graph_client.configure_retry(graph_client.RetryPolicy(max_attempts=3))
         resp_429 = _make_response(429, headers={"Retry-After": "1"})
         client = await _make_client([resp_429, resp_429, resp_429])
 
@@ -165,6 +202,59 @@ class TestGraphRequestRetry:
         assert client.request.call_count == 3
 
 
+    async def test_get_502_retried(self, fake_token):
+        client = await _make_client([_make_response(502), _make_response(200, {"ok": 1})])
+        result = await graph_request(client, "GET", "/planner/plans/p", fake_token)
+        assert result == {"ok": 1}
+        assert client.request.call_count == 2
+
+    async def test_post_502_not_retried(self, fake_token):
+        """Un POST /planner/tasks podría haberse creado: no se repite ante 502."""
+        client = await _make_client([_make_response(502), _make_response(201, {"id": "dup"})])
+        with pytest.raises(httpx.HTTPStatusError):
+            await graph_request(client, "POST", "/planner/tasks", fake_token, json={})
+        assert client.request.call_count == 1
+
+    async def test_4xx_does_not_raise_rate(self, fake_token):
+        throttle = graph_client.throttle_controller("planner")
+        rate_before = throttle.rate
+        client = await _make_client([_make_response(404)])
+        with pytest.raises(httpx.HTTPStatusError):
+            await graph_request(client, "GET", "/planner/plans/nope", fake_token)
+        assert throttle.rate == rate_before
+
+
+# ── get_after_create (retraso de replicación) ─────────────────────────────────
+
+class TestGetAfterCreate:
+    async def test_404_then_200_retries(self, fake_token):
+        client = await _make_client([_make_response(404), _make_response(200, {"@odata.etag": "e"})])
+        with patch.object(planner_import.asyncio, "sleep", new_callable=AsyncMock) as mock_sleep:
+            result = await planner_import.get_after_create(client, "/planner/plans/p/details", fake_token)
+        assert result == {"@odata.etag": "e"}
+        mock_sleep.assert_called_once_with(planner_import.REPLICATION_RETRY_DELAYS[0])
+
+    async def test_first_try_no_sleep(self, fake_token):
+        client = await _make_client([_make_response(200, {"ok": 1})])
+        with patch.object(planner_import.asyncio, "sleep", new_callable=AsyncMock) as mock_sleep:
+            await planner_import.get_after_create(client, "/planner/plans/p/details", fake_token)
+        mock_sleep.assert_not_called()
+
+    async def test_persistent_404_raises_after_bounded_retries(self, fake_token):
+        attempts = len(planner_import.REPLICATION_RETRY_DELAYS) + 1
+        client = await _make_client([_make_response(404)] * attempts)
+        with patch.object(planner_import.asyncio, "sleep", new_callable=AsyncMock):
+            with pytest.raises(httpx.HTTPStatusError):
+                await planner_import.get_after_create(client, "/planner/plans/p/details", fake_token)
+        assert client.request.call_count == attempts
+
+    async def test_other_errors_not_retried(self, fake_token):
+        client = await _make_client([_make_response(403)])
+        with pytest.raises(httpx.HTTPStatusError):
+            await planner_import.get_after_create(client, "/planner/plans/p/details", fake_token)
+        assert client.request.call_count == 1
+
+
 # ── list_plans ────────────────────────────────────────────────────────────────
 
 class TestListPlans:
@@ -201,6 +291,78 @@ class TestListPlans:
         assert "planner/plans" in url
 
 
+# ── graph_paginate ────────────────────────────────────────────────────────────
+
+def _pages(n: int) -> list:
+    """n respuestas encadenadas por @odata.nextLink, con un ítem cada una."""
+    return [
+        _make_response(200, {
+            "value": [{"id": f"i{i}"}],
+            **({"@odata.nextLink": f"{GRAPH_BASE}/things?$skiptoken={i + 1}"} if i < n - 1 else {}),
+        })
+        for i in range(n)
+    ]
+
+
+class TestGraphPaginate:
+    async def test_yields_items_across_pages(self, fake_token):
+        client = await _make_client(_pages(3))
+        items = [it async for it in planner_import.graph_paginate(client, "/things", fake_token)]
+        assert items == [{"id": "i0"}, {"id": "i1"}, {"id": "i2"}]
+        urls = [c.args[1] for c in client.request.call_args_list]
+        assert urls[1] == f"{GRAPH_BASE}/things?$skiptoken=1"
+
+    async def test_top_and_select_injected_once(self, fake_token):
+        client = await _make_client(_pages(2))
+        pages = [
+            p async for p in planner_import.graph_paginate_pages(
+                client, "/things", fake_token, top=50, select="id,title",
+            )
+        ]
+        assert len(pages) == 2
+        urls = [c.args[1] for c in client.request.call_args_list]
+        assert urls[0] == f"{GRAPH_BASE}/things?$top=50&$select=id,title"
+        assert urls[1] == f"{GRAPH_BASE}/things?$skiptoken=1"
+
+    def test_with_query_keeps_existing_params(self):
+        assert planner_import.with_query("/x?$top=5", top=100, select="id") == "/x?$top=5&$select=id"
+        assert planner_import.with_query("/x", top=None) == "/x"
+
+    async def test_prefetch_requests_next_page_before_consumer_resumes(self, fake_token):
+        client = await _make_client(_pages(2))
+        gen = planner_import.graph_paginate_pages(client, "/things", fake_token, prefetch=True)
+        first = await gen.__anext__()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert first == [{"id": "i0"}]
+        assert client.request.call_count == 2   # la página 2 ya está en vuelo
+        assert await gen.__anext__() == [{"id": "i1"}]
+        await gen.aclose()
+
+    async def test_early_exit_cancels_prefetch(self, fake_token):
+        started, cancelled = asyncio.Event(), asyncio.Event()
+        first_page = _pages(2)[0]
+
+        async def _request(method, url, **kwargs):
+            if "skiptoken" not in url:
+                return first_page
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        client = MagicMock(spec=httpx.AsyncClient)
+        client.request = AsyncMock(side_effect=_request)
+        gen = planner_import.graph_paginate_pages(client, "/things", fake_token, prefetch=True)
+        await gen.__anext__()
+        await started.wait()
+        await gen.aclose()
+        await asyncio.sleep(0)
+        assert cancelled.is_set()
+
+
 # ── delete_plan ───────────────────────────────────────────────────────────────
 
 class TestDeletePlan:
@@ -308,6 +470,114 @@ class TestResolveEmailToGuid:
         assert client.request.call_count == 0
 
 
+class TestResolveEmailsBulk:
+    @staticmethod
+    def _directory(known: dict[str, str]):
+        """client.request que responde a /users?$filter con los usuarios de `known` pedidos."""
+        async def _request(method, url, **kwargs):
+            if "$filter=" not in url:
+                return _make_response(404)
+            users = [
+                {"id": guid, "mail": email.upper(), "userPrincipalName": email}
+                for email, guid in known.items() if f"'{email}'" in url
+            ]
+            return _make_response(200, {"value": users})
+        return _request
+
+    async def test_one_filter_query_for_several_emails(self, fake_token):
+        client = MagicMock(spec=httpx.AsyncClient)
+        client.request = AsyncMock(side_effect=self._directory({"a@test.com": "g-a", "b@test.com": "g-b"}))
+        cache: dict = {}
+        result = await resolve_emails_bulk(
+            client, fake_token, ["a@test.com", "", "b@test.com", "nadie@test.com", "a@test.com"], cache,
+        )
+        assert result == {"a@test.com": "g-a", "b@test.com": "g-b", "nadie@test.com": None}
+        assert cache == result
+        assert client.request.call_count == 1
+        url = client.request.call_args.args[1]
+        assert "mail%20in%20('a@test.com','b@test.com','nadie@test.com')" in url
+        assert "$select=id,mail,userPrincipalName" in url
+
+    async def test_chunks_and_cache_hits(self, fake_token):
+        emails = [f"u{i}@test.com" for i in range(16)]
+        client = MagicMock(spec=httpx.AsyncClient)
+        client.request = AsyncMock(side_effect=self._directory({e: f"g{i}" for i, e in enumerate(emails)}))
+        cache: dict = {"u0@test.com": "cached", "u1@test.com": None}
+        result = await resolve_emails_bulk(client, fake_token, emails, cache)
+        assert client.request.call_count == 2       # 14 pendientes / 7 por consulta
+        assert result["u0@test.com"] == "cached" and result["u1@test.com"] is None
+        assert result["u15@test.com"] == "g15"
+
+    async def test_rejected_filter_falls_back_to_single_lookups(self, fake_token):
+        async def _request(method, url, **kwargs):
+            if "$filter=" in url:
+                return _make_response(400)
+            return _make_response(200, {"id": "g-" + url.rsplit("/", 1)[1].split("@")[0]})
+
+        client = MagicMock(spec=httpx.AsyncClient)
+        client.request = AsyncMock(side_effect=_request)
+        result = await resolve_emails_bulk(client, fake_token, ["a@test.com", "b@test.com"], {})
+        assert result == {"a@test.com": "g-a", "b@test.com": "g-b"}
+        assert client.request.call_count == 3
+
+    @pytest.mark.parametrize("failure", [
+        _make_response(403),
+        httpx.ConnectError("sin red"),
+    ])
+    async def test_any_chunk_failure_falls_back_to_single_lookups(self, fake_token, failure):
+        async def _request(method, url, **kwargs):
+            if "$filter=" in url:
+                if isinstance(failure, Exception):
+                    raise failure
+                return failure
+            return _make_response(200, {"id": "g-" + url.rsplit("/", 1)[1].split("@")[0]})
+
+        client = MagicMock(spec=httpx.AsyncClient)
+        client.request = AsyncMock(side_effect=_request)
+        with patch.object(graph_client.asyncio, "sleep", new_callable=AsyncMock):
+            result = await resolve_emails_bulk(client, fake_token, ["a@test.com", "b@test.com"], {})
+        assert result == {"a@test.com": "g-a", "b@test.com": "g-b"}
+
+
+class TestResolveGuidsBulk:
+    async def test_one_call_fills_both_caches(self, fake_token):
+        client = MagicMock(spec=httpx.AsyncClient)
+        client.request = AsyncMock(return_value=_make_response(200, {"value": [
+            {"id": "g-ana", "mail": "ana@test.com", "displayName": "Ana Pérez"},
+            {"id": "g-luis", "mail": None, "userPrincipalName": "luis@test.com",
+             "givenName": "Luis", "surname": "Gómez"},
+        ]}))
+        await resolve_guids_bulk(client, fake_token, ["g-ana", "g-luis", "g-baja", "g-ana"])
+        assert client.request.call_count == 1
+        method, url = client.request.call_args.args
+        assert (method, url) == ("POST", f"{GRAPH_BASE}/directoryObjects/getByIds")
+        assert client.request.call_args.kwargs["json"] == {"ids": ["g-ana", "g-luis", "g-baja"], "types": ["user"]}
+
+        assert await resolve_guid_to_email(client, fake_token, "g-luis") == "luis@test.com"
+        assert await resolve_guid_to_display_name(client, fake_token, "g-luis") == "Luis Gómez"
+        assert await resolve_guid_to_display_name(client, fake_token, "g-ana") == "Ana Pérez"
+        assert await resolve_guid_to_email(client, fake_token, "g-baja") is None
+        await resolve_guids_bulk(client, fake_token, ["g-ana"])
+        assert client.request.call_count == 1
+
+    async def test_chunks_of_1000(self, fake_token, monkeypatch):
+        monkeypatch.setattr(planner_import, "DIRECTORY_IDS_CHUNK", 2)
+        client = MagicMock(spec=httpx.AsyncClient)
+        client.request = AsyncMock(return_value=_make_response(200, {"value": []}))
+        await resolve_guids_bulk(client, fake_token, ["g1", "g2", "g3"])
+        bodies = [c.kwargs["json"]["ids"] for c in client.request.call_args_list]
+        assert sorted(bodies) == [["g1", "g2"], ["g3"]]
+
+    async def test_failure_leaves_guids_for_single_lookups(self, fake_token):
+        client = MagicMock(spec=httpx.AsyncClient)
+        client.request = AsyncMock(side_effect=[
+            _make_response(403), _make_response(200, {"mail": "ana@test.com"}),
+        ])
+        await resolve_guids_bulk(client, fake_token, ["g-ana"])
+        assert "g-ana" not in planner_import._GUID_TO_EMAIL_CACHE
+        assert await resolve_guid_to_email(client, fake_token, "g-ana") == "ana@test.com"
+
+
 # ── create_task_full ──────────────────────────────────────────────────────────
 
 class TestCreateTaskFull:
@@ -324,6 +594,98 @@ class TestCreateTaskFull:
             "assignee_email": "",
         }
 
+    async def test_single_call_with_inline_details(self, fake_token):
+        client = await _make_client([
+            _make_response(201, {"id": "task-001", "hasDescription": True, "checklistItemCount": 2}),
+        ])
+
+        task_id = await create_task_full(
+            client, fake_token, "plan-x", "bucket-y", self._base_task(), None
+        )
+        assert task_id == "task-001"
+        assert client.request.call_count == 1
+        details = client.request.call_args_list[0][1]["json"]["details"]
+        assert details["description"] == "Una descripción"
+        assert [i["title"] for i in details["checklist"].values()] == ["Item A", "Item B"]
+
+    async def test_no_details_key_without_description_or_checklist(self, fake_token):
+        client = await _make_client([_make_response(201, {"id": "task-001"})])
+
+        task = self._base_task()
+        task["description"] = ""
+        task["checklist_raw"] = ""
+        await create_task_full(client, fake_token, "plan-x", "bucket-y", task, None)
+        assert client.request.call_count == 1
+        assert "details" not in client.request.call_args_list[0][1]["json"]
+
+    async def test_inline_rejected_falls_back_and_disables(self, fake_token):
+        client = await _make_client([
+            _make_response(400, {"error": {"code": "BadRequest"}}),
+            _make_response(201, {"id": "task-001"}),
+            _make_response(200, {"@odata.etag": 'W/"e"'}),
+            _make_response(204),
+        ])
+
+        task_id = await create_task_full(
+            client, fake_token, "plan-x", "bucket-y", self._base_task(), None
+        )
+        assert task_id == "task-001"
+        assert client.request.call_count == 4
+        assert "details" not in client.request.call_args_list[1][1]["json"]
+        assert planner_import.INLINE_TASK_DETAILS is False
+
+    async def test_inline_checked_once_with_get_when_counters_missing(self, fake_token):
+        client = await _make_client([
+            _make_response(201, {"id": "task-001"}),
+            _make_response(200, {"description": "Una descripción", "checklist": {"a": {}, "b": {}}}),
+            _make_response(201, {"id": "task-002"}),
+        ])
+
+        await create_task_full(client, fake_token, "plan-x", "bucket-y", self._base_task(), None)
+        await create_task_full(client, fake_token, "plan-x", "bucket-y", self._base_task(), None)
+        methods = [c[0][0] for c in client.request.call_args_list]
+        assert methods == ["POST", "GET", "POST"]
+        assert planner_import.INLINE_TASK_DETAILS is True
+
+    async def test_inline_dropped_repairs_task_and_disables(self, fake_token):
+        client = await _make_client([
+            _make_response(201, {"id": "task-001", "hasDescription": False, "checklistItemCount": 0}),
+            _make_response(200, {"@odata.etag": 'W/"e"'}),
+            _make_response(204),
+        ])
+
+        task_id = await create_task_full(
+            client, fake_token, "plan-x", "bucket-y", self._base_task(), None
+        )
+        assert task_id == "task-001"
+        patch = client.request.call_args_list[2]
+        assert patch[0][0] == "PATCH"
+        assert patch[1]["json"]["description"] == "Una descripción"
+        assert planner_import.INLINE_TASK_DETAILS is False
+
+    async def test_400_without_details_is_not_blamed_on_inline(self, fake_token):
+        client = await _make_client([_make_response(400), _make_response(400)])
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await create_task_full(client, fake_token, "plan-x", "bucket-y", self._base_task(), None)
+        assert planner_import.INLINE_TASK_DETAILS is True
+
+    async def test_estimate_task_calls(self, monkeypatch):
+        tasks = [self._base_task(), {**self._base_task(), "description": "", "checklist_raw": ""}]
+        assert planner_import.estimate_task_calls(tasks) == 2
+        monkeypatch.setattr(planner_import, "INLINE_TASK_DETAILS", False)
+        assert planner_import.estimate_task_calls(tasks) == 4
+
+
+class TestCreateTaskFullClassic:
+    """Camino de 3 llamadas (GRAPH_INLINE_DETAILS=0 o details rechazado por Graph)."""
+
+    @pytest.fixture(autouse=True)
+    def classic(self, monkeypatch):
+        monkeypatch.setattr(planner_import, "INLINE_TASK_DETAILS", False)
+
+    _base_task = TestCreateTaskFull._base_task
+
     async def test_three_calls_with_description_and_checklist(self, fake_token):
         post_resp = _make_response(201, {"id": "task-001"})
         get_resp = _make_response(200, {"@odata.etag": 'W/"det-etag"'})
@@ -361,10 +723,10 @@ class TestCreateTaskFull:
         post_call_kwargs = client.request.call_args_list[0][1]
         assert "guid-assignee-001" in post_call_kwargs["json"]["assignments"]
 
-    async def test_two_calls_when_no_description_no_checklist(self, fake_token):
+    async def test_one_call_when_no_description_no_checklist(self, fake_token):
+        """Sin nada que parchear no hace falta el GET de details."""
         post_resp = _make_response(201, {"id": "task-001"})
-        get_resp = _make_response(200, {"@odata.etag": 'W/"e"'})
-        client = await _make_client([post_resp, get_resp])
+        client = await _make_client([post_resp])
 
         task = self._base_task()
         task["description"] = ""
@@ -372,7 +734,7 @@ class TestCreateTaskFull:
         await create_task_full(
             client, fake_token, "plan-x", "bucket-y", task, None
         )
-        assert client.request.call_count == 2
+        assert client.request.call_count == 1
 
     async def test_returns_task_id(self, fake_token):
         post_resp = _make_response(201, {"id": "returned-task-id"})
@@ -526,6 +888,78 @@ class TestListTasks:
         assert "conversationThreadId" not in result[0]
 
 
+# ── start_plan_listings ───────────────────────────────────────────────────────
+
+class TestPlanListings:
+    @pytest.fixture
+    def loaded(self, monkeypatch) -> list[str]:
+        loaded: list[str] = []
+
+        async def _buckets(client, token, plan_id, *profiles):
+            loaded.append(plan_id)
+            return [{"id": f"b-{plan_id}"}]
+
+        async def _tasks(client, token, plan_id, *profiles):
+            return [{"id": f"t-{plan_id}"}]
+
+        monkeypatch.setattr(planner_import, "list_buckets", _buckets)
+        monkeypatch.setattr(planner_import, "list_tasks", _tasks)
+        return loaded
+
+    async def test_only_lookahead_plans_in_flight(self, fake_token, loaded):
+        plans = [{"id": f"p{i}"} for i in range(6)]
+        listings = start_plan_listings(MagicMock(), fake_token, plans)
+        await asyncio.sleep(0)
+        assert loaded == ["p0", "p1"]           # el primero y PLAN_LISTING_LOOKAHEAD=1 más
+
+        for plan in plans[:3]:
+            buckets, tasks = await listings[plan["id"]]
+            assert tasks == [{"id": f"t-{plan['id']}"}]
+        await asyncio.sleep(0)
+        assert loaded == ["p0", "p1", "p2", "p3"]
+        planner_import.cancel_plan_listings(listings)
+
+    async def test_no_plans(self, fake_token, loaded):
+        listings = start_plan_listings(MagicMock(), fake_token, [])
+        await asyncio.sleep(0)
+        assert loaded == []
+        planner_import.cancel_plan_listings(listings)
+
+
+# ── Perfiles $select ──────────────────────────────────────────────────────────
+
+class TestSelectProfiles:
+    def test_union_keeps_order_without_duplicates(self):
+        fields = planner_import.select_for("task", "report", "export").split(",")
+        assert fields[:3] == ["id", "title", "bucketId"]
+        assert len(fields) == len(set(fields))
+        assert "createdDateTime" in fields   # aporta export
+
+    def test_no_profile_means_full_payload(self):
+        assert planner_import.select_for("task") is None
+
+    def test_unknown_profile_raises(self):
+        with pytest.raises(ValueError, match="desconocido"):
+            planner_import.select_for("task", "informe")
+
+    @pytest.mark.parametrize("profile", sorted(planner_import.SELECT_PROFILES))
+    def test_no_properties_missing_from_planner_task(self, profile):
+        """lastModifiedDateTime/commentCount no existen en plannerTask: Graph devolvería 400."""
+        fields = planner_import.SELECT_PROFILES[profile]["task"]
+        assert "lastModifiedDateTime" not in fields
+        assert "commentCount" not in fields
+
+    async def test_list_tasks_applies_profile(self, fake_token):
+        client = await _make_client([_make_response(200, {"value": []})])
+        await list_tasks(client, fake_token, "plan-123", "email-report")
+        url: str = client.request.call_args.args[1]
+        assert url.endswith("/planner/plans/plan-123/tasks?$select=" + planner_import.select_for("task", "email-report"))
+
+    async def test_resolve_email_selects_only_id(self, fake_token):
+        client = await _make_client([_make_response(200, {"id": "g"})])
+        await resolve_email_to_guid(client, fake_token, "a@b.com", {})
+        assert client.request.call_args.args[1].endswith("/users/a@b.com?$select=id")
+
 # ── _derive_task_status ────────────────────────────────────────────────────────
 
 class TestDeriveTaskStatus:
@@ -696,6 +1130,30 @@ class TestRunReport:
                     assert mock_buckets.call_count == 2
                     assert mock_tasks.call_count == 2
 
+    async def test_listados_no_esperan_al_enriquecimiento(self, mock_auth, monkeypatch, capsys):
+        """El listado del plan 2 se pide antes de terminar el checklist (BACKGROUND) del plan 1."""
+        plans = [{"id": "p1", "title": "Plan 1"}, {"id": "p2", "title": "Plan 2"}]
+        events: list[str] = []
+
+        async def _tasks(client, token, plan_id, *profiles):
+            events.append(f"tasks {plan_id}")
+            return [{"id": f"{plan_id}-t{i}", "bucketId": "b1"} for i in range(3)]
+
+        async def _details(client, token, task_id):
+            assert planner_import.default_priority("GET") is planner_import.Priority.BACKGROUND
+            await asyncio.sleep(0.01)
+            events.append(f"details {task_id}")
+            return {"checklist": {}}
+
+        with patch.object(planner_import, "list_plans", new_callable=AsyncMock, return_value=plans):
+            with patch.object(planner_import, "list_buckets", new_callable=AsyncMock, return_value=[]):
+                with patch.object(planner_import, "list_tasks", side_effect=_tasks):
+                    with patch.object(planner_import, "get_task_details", side_effect=_details):
+                        monkeypatch.setattr("builtins.input", lambda _: "todos")
+                        await planner_import.run_report("group-id", fetch_checklist=True)
+
+        assert events.index("tasks p2") < events.index("details p1-t0")
+
     async def test_seleccion_numerica(self, mock_auth, monkeypatch, capsys):
         """Input '1' → procesa solo el primer plan de la lista."""
         plans = [
@@ -980,6 +1438,23 @@ class TestRunReportComments:
 
                             assert mock_comment.call_count == 2
 
+    async def test_thread_id_from_listing_skips_task_get(self, mock_auth, monkeypatch):
+        """Con el perfil "report" el listado trae conversationThreadId: sin GET por tarea."""
+        tasks = [{"id": "t1", "title": "T", "bucketId": "b1", "assignments": {},
+                  "percentComplete": 0, "conversationThreadId": "thread-1"}]
+        with patch.object(planner_import, "list_plans", new=AsyncMock(return_value=[{"id": "p1", "title": "P"}])), \
+             patch.object(planner_import, "list_buckets", new=AsyncMock(return_value=[])) as mock_buckets, \
+             patch.object(planner_import, "list_tasks", new=AsyncMock(return_value=tasks)) as mock_tasks, \
+             patch.object(planner_import, "get_last_comment", new_callable=AsyncMock) as mock_comment, \
+             patch.object(planner_import, "graph_request", new_callable=AsyncMock) as mock_graph:
+            mock_comment.return_value = {"text": "c", "date": "2026-03-14"}
+            monkeypatch.setattr("builtins.input", lambda _: "1")
+            await planner_import.run_report("group-id", fetch_comments=True)
+        mock_graph.assert_not_called()
+        assert mock_comment.call_args.args[3] == "thread-1"
+        assert mock_tasks.call_args.args[3:] == ("report",)
+        assert mock_buckets.call_args.args[3:] == ("report",)
+
     async def test_no_comments_flag_skips_calls(self, mock_auth, monkeypatch):
         """Sin fetch_comments (default), get_last_comment NO se llama."""
         plans = [{"id": "p1", "title": "Plan 1"}]
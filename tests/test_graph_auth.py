@@ -0,0 +1,312 @@
+"""Tests de graph_auth: AsyncTokenProvider (caché, refresco proactivo, 401) — sin red real."""
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+import graph_auth
+from graph_auth import (
+    AsyncTokenProvider,
+    CachedTokenFetch,
+    DiskTokenCache,
+    _read_or_create_key,
+    resolve_token,
+    token_expiry,
+    token_fetcher,
+    token_identity,
+)
+from planner_import import graph_request
+
+
+def _b64(data: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+
+
+def _jwt(exp: float) -> str:
+    return f"{_b64({'alg': 'none'})}.{_b64({'exp': exp})}.firma"
+
+
+class _Clock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _Fetcher:
+    """fetch() síncrono que devuelve tok1, tok2… y registra el hilo donde corre."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.threads: list[int] = []
+
+    def __call__(self) -> str:
+        self.calls += 1
+        self.threads.append(threading.get_ident())
+        return f"tok{self.calls}"
+
+
+# ── token_expiry ──────────────────────────────────────────────────────────────
+
+class TestTokenExpiry:
+    def test_reads_exp_claim(self):
+        assert token_expiry(_jwt(1234567890)) == 1234567890.0
+
+    @pytest.mark.parametrize("token", ["opaco", "a.b", "a.!!!.c", f"{_b64({})}.{_b64({'iat': 1})}.x"])
+    def test_not_a_jwt_returns_none(self, token):
+        assert token_expiry(token) is None
+
+
+class TestTokenIdentity:
+    def test_stable_across_renewals(self):
+        first = f"{_b64({})}.{_b64({'tid': 't', 'appid': 'app', 'exp': 1})}.a"
+        renewed = f"{_b64({})}.{_b64({'tid': 't', 'appid': 'app', 'exp': 2})}.b"
+        assert token_identity(first) == token_identity(renewed) == "t:app"
+
+    def test_opaque_token_hashed(self):
+        assert token_identity("opaco") != token_identity("otro")
+        assert "opaco" not in token_identity("opaco")
+
+
+# ── AsyncTokenProvider ────────────────────────────────────────────────────────
+
+class TestAsyncTokenProvider:
+    async def test_token_cached_until_margin(self):
+        fetch, clock = _Fetcher(), _Clock()
+        provider = AsyncTokenProvider(fetch, refresh_margin=60, default_lifetime=600, clock=clock)
+        assert await provider.get() == "tok1"
+        clock.now += 500
+        assert await provider.get() == "tok1"
+        assert fetch.calls == 1
+
+    async def test_fetch_runs_off_the_event_loop(self):
+        fetch = _Fetcher()
+        provider = AsyncTokenProvider(fetch)
+        await provider.get()
+        assert fetch.threads and threading.get_ident() not in fetch.threads
+
+    async def test_concurrent_gets_share_one_fetch(self):
+        fetch = _Fetcher()
+        provider = AsyncTokenProvider(fetch)
+        tokens = await asyncio.gather(*[provider.get() for _ in range(20)])
+        assert tokens == ["tok1"] * 20
+        assert fetch.calls == 1
+
+    async def test_refresh_in_background_within_margin(self):
+        fetch, clock = _Fetcher(), _Clock()
+        provider = AsyncTokenProvider(fetch, refresh_margin=60, default_lifetime=600, clock=clock)
+        await provider.get()
+        clock.now += 570   # dentro del margen, aún válido
+        assert await provider.get() == "tok1"   # no espera al refresco
+        await provider._refresh
+        assert await provider.get() == "tok2"
+        assert provider.refresh_count == 2
+
+    async def test_expired_token_waits_for_new_one(self):
+        fetch, clock = _Fetcher(), _Clock()
+        provider = AsyncTokenProvider(fetch, default_lifetime=600, clock=clock)
+        await provider.get()
+        clock.now += 601
+        assert await provider.get() == "tok2"
+
+    async def test_expiry_taken_from_jwt(self):
+        clock = _Clock()
+        token = _jwt(clock.now + 100)
+        fetch = MagicMock(return_value=token)
+        provider = AsyncTokenProvider(fetch, refresh_margin=10, default_lifetime=10_000, clock=clock)
+        await provider.get()
+        clock.now += 101
+        await provider.get()
+        assert fetch.call_count == 2
+
+    async def test_invalidate_forces_fetch(self):
+        fetch = _Fetcher()
+        provider = AsyncTokenProvider(fetch)
+        await provider.get()
+        provider.invalidate()
+        assert await provider.get() == "tok2"
+
+    async def test_fetch_error_propagates_and_next_call_retries(self):
+        fetch = MagicMock(side_effect=[RuntimeError("AADSTS"), "tok"])
+        provider = AsyncTokenProvider(fetch)
+        with pytest.raises(RuntimeError, match="AADSTS"):
+            await provider.get()
+        assert await provider.get() == "tok"
+
+    async def test_from_auth_manager(self):
+        auth = MagicMock()
+        auth.get_token.return_value = "tok-msal"
+        assert await AsyncTokenProvider.from_auth_manager(auth).get() == "tok-msal"
+
+    async def test_resolve_token_accepts_string(self):
+        assert await resolve_token("plain") == "plain"
+        assert await resolve_token(AsyncTokenProvider(lambda: "p")) == "p"
+
+
+# ── Integración con graph_request ─────────────────────────────────────────────
+
+    def test_import_does_not_load_http_stack(self):
+        """hooks/session-start.py sólo necesita el token: graph_auth no arrastra graph_client."""
+        code = (
+            "import sys, graph_auth; "
+            "print(','.join(m for m in ('graph_client', 'graph_cassette', 'graph_emulator') if m in sys.modules))"
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", code], cwd=Path(__file__).parent.parent,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        assert out == ""
+
+class TestGraphRequestWithProvider:
+    async def test_bearer_from_provider(self):
+        client = MagicMock(spec=httpx.AsyncClient)
+        client.request = AsyncMock(return_value=httpx.Response(
+            200, json={"ok": True}, request=httpx.Request("GET", "https://x"),
+        ))
+        result = await graph_request(client, "GET", "/me", AsyncTokenProvider(lambda: "tok-a"))
+        assert result == {"ok": True}
+        assert client.request.call_args.kwargs["headers"]["Authorization"] == "Bearer tok-a"
+
+    async def test_401_invalidates_and_retries_once(self):
+        fetch = _Fetcher()
+        req = httpx.Request("GET", "https://x")
+        client = MagicMock(spec=httpx.AsyncClient)
+        client.request = AsyncMock(side_effect=[
+            httpx.Response(401, request=req),
+            httpx.Response(200, json={"ok": True}, request=req),
+        ])
+        result = await graph_request(client, "GET", "/me", AsyncTokenProvider(fetch))
+        assert result == {"ok": True}
+        auths = [c.kwargs["headers"]["Authorization"] for c in client.request.call_args_list]
+        assert auths == ["Bearer tok1", "Bearer tok2"]
+
+    async def test_401_with_plain_token_raises(self):
+        client = MagicMock(spec=httpx.AsyncClient)
+        client.request = AsyncMock(return_value=httpx.Response(
+            401, request=httpx.Request("GET", "https://x"),
+        ))
+        with pytest.raises(httpx.HTTPStatusError):
+            await graph_request(client, "GET", "/me", "tok")
+        assert client.request.call_count == 1
+
+
+# ── DiskTokenCache ────────────────────────────────────────────────────────────
+
+class _XorCipher:
+    """Cifrado trivial para tests: basta con que el token no quede en claro."""
+
+    def encrypt(self, data: bytes) -> bytes:
+        return bytes(b ^ 0x5A for b in data)
+
+    def decrypt(self, data: bytes) -> bytes:
+        return bytes(b ^ 0x5A for b in data)
+
+
+@pytest.fixture
+def disk_cache(tmp_path):
+    clock = _Clock()
+    return DiskTokenCache(tmp_path, _XorCipher(), min_validity=60, clock=clock), clock
+
+
+class _FakeFernet:
+    """Sustituye a cryptography.fernet.Fernet: claves aleatorias y rechazo de la vacía."""
+
+    @staticmethod
+    def generate_key() -> bytes:
+        return base64.urlsafe_b64encode(os.urandom(32))
+
+    def __call__(self, key: bytes):
+        if not key:
+            raise ValueError("Fernet key must be 32 url-safe base64-encoded bytes.")
+        return MagicMock()
+
+
+class TestDiskTokenCache:
+    def test_roundtrip_encrypted(self, disk_cache):
+        cache, clock = disk_cache
+        token = _jwt(clock.now + 3600)
+        cache.store("tenant", "client", token)
+        assert cache.load("tenant", "client") == token
+        assert token.encode() not in cache.path("tenant", "client").read_bytes()
+
+    def test_keyed_by_tenant_client_scope(self, disk_cache):
+        cache, clock = disk_cache
+        cache.store("t1", "c1", _jwt(clock.now + 3600))
+        assert cache.load("t2", "c1") is None
+        assert cache.load("t1", "c2") is None
+        assert cache.load("t1", "c1", scope="https://otro/.default") is None
+
+    def test_near_expiry_not_reused(self, disk_cache):
+        cache, clock = disk_cache
+        cache.store("t", "c", _jwt(clock.now + 100))
+        clock.now += 41   # quedan 59 s < min_validity
+        assert cache.load("t", "c") is None
+
+    def test_get_or_fetch_shared_between_instances(self, disk_cache, tmp_path):
+        cache, clock = disk_cache
+        other_process = DiskTokenCache(tmp_path, _XorCipher(), min_validity=60, clock=clock)
+        fetch = MagicMock(return_value=_jwt(clock.now + 3600))
+        first = cache.get_or_fetch("t", "c", fetch)
+        assert other_process.get_or_fetch("t", "c", fetch) == first
+        assert fetch.call_count == 1
+
+    def test_corrupt_file_is_a_miss(self, disk_cache):
+        cache, clock = disk_cache
+        path = cache.path("t", "c")
+        path.write_bytes(b"basura")
+        fetch = MagicMock(return_value=_jwt(clock.now + 3600))
+        assert cache.get_or_fetch("t", "c", fetch) == fetch.return_value
+        assert cache.load("t", "c") == fetch.return_value
+
+    def test_from_env_disabled(self, monkeypatch):
+        monkeypatch.setenv("GRAPH_TOKEN_CACHE", "0")
+        assert DiskTokenCache.from_env() is None
+        auth = MagicMock()
+        assert token_fetcher(auth, "t", "c") is auth.get_token
+
+    def test_key_creation_race_yields_one_key(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(graph_auth, "Fernet", _FakeFernet(), raising=False)
+        key_path = tmp_path / "cache" / "key"
+        barrier = threading.Barrier(8)
+        seen: list[bytes] = []
+
+        def create():
+            barrier.wait()
+            seen.append(_read_or_create_key(key_path))
+
+        threads = [threading.Thread(target=create) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert set(seen) == {key_path.read_bytes()}
+        assert [p.name for p in key_path.parent.iterdir()] == ["key"]   # sin temporales
+
+    def test_unreadable_key_means_no_cache(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(graph_auth, "Fernet", _FakeFernet(), raising=False)
+        monkeypatch.setattr(graph_auth, "FERNET_AVAILABLE", True)
+        monkeypatch.setattr(graph_auth.sys, "platform", "linux")
+        monkeypatch.setenv("GRAPH_TOKEN_CACHE_DIR", str(tmp_path))
+        (tmp_path / "key").write_bytes(b"")   # otro proceso la dejó vacía
+        assert DiskTokenCache.from_env() is None
+
+    async def test_provider_invalidate_discards_disk_copy(self, disk_cache):
+        cache, clock = disk_cache
+        tokens = iter([_jwt(clock.now + 3600), _jwt(clock.now + 7200)])
+        fetch = CachedTokenFetch(lambda: next(tokens), cache, "t", "c")
+        provider = AsyncTokenProvider(fetch, clock=clock)
+        first = await provider.get()
+        provider.invalidate()
+        assert await provider.get() != first
+        assert cache.load("t", "c") != first
@@ -0,0 +1,259 @@
+"""Tests de graph_batch: micro-batching de graph_request() sobre POST /$batch — sin red real."""
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+import graph_batch
+from graph_batch import BatchConfig, GraphBatcher, configure_batching, graph_batcher
+from graph_client import (
+    DEFAULT_WORKLOAD,
+    Priority,
+    ThrottleConfig,
+    WorkloadLimits,
+    configure_throttle,
+    configure_workloads,
+    request_priority,
+)
+from planner_import import GRAPH_BASE, graph_request
+
+
+def _batch_client(handler) -> MagicMock:
+    """Cliente mock: `handler(items)` devuelve la lista `responses` de cada POST /$batch."""
+    client = MagicMock(spec=httpx.AsyncClient)
+
+    async def _request(method, url, headers=None, json=None):
+        if url.endswith("/$batch"):
+            return httpx.Response(
+                200,
+                json={"responses": handler(json["requests"])},
+                request=httpx.Request(method, url),
+            )
+        return httpx.Response(200, json={"direct": url}, request=httpx.Request(method, url))
+
+    client.request = AsyncMock(side_effect=_request)
+    return client
+
+
+def _ok(items):
+    return [{"id": it["id"], "status": 200, "body": {"url": it["url"]}} for it in items]
+
+
+def _batch_calls(client: MagicMock) -> list:
+    return [c for c in client.request.call_args_list if c.args[1].endswith("/$batch")]
+
+
+@pytest.fixture
+def batching():
+    return configure_batching(BatchConfig(enabled=True, window=0.0))
+
+
+def _wide_workloads(concurrency: int = 64) -> None:
+    """Cupos de sobra en todos los workloads: los lotes sólo los limita BATCH_MAX_REQUESTS."""
+    configure_workloads({
+        name: WorkloadLimits(concurrency, ThrottleConfig())
+        for name in ("planner", "users", "threads", "mail", "drive", "teams", DEFAULT_WORKLOAD)
+    })
+
+
+# ── BatchConfig ───────────────────────────────────────────────────────────────
+
+class TestBatchConfig:
+    def test_disabled_by_default(self, monkeypatch):
+        monkeypatch.delenv("GRAPH_BATCH", raising=False)
+        assert BatchConfig.from_env().enabled is False
+        assert graph_batcher().is_batchable("GET", "/me") is False
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("GRAPH_BATCH", "1")
+        monkeypatch.setenv("GRAPH_BATCH_WINDOW_MS", "25")
+        cfg = BatchConfig.from_env()
+        assert cfg.enabled is True
+        assert cfg.window == pytest.approx(0.025)
+
+    def test_batch_endpoint_itself_not_batchable(self):
+        b = GraphBatcher(BatchConfig(enabled=True))
+        assert b.is_batchable("GET", "/planner/plans/p1") is True
+        assert b.is_batchable("POST", "/$batch") is False
+
+
+# ── GraphBatcher vía graph_request ────────────────────────────────────────────
+
+class TestGraphRequestBatching:
+    async def test_concurrent_calls_share_one_batch(self, batching):
+        client = _batch_client(_ok)
+        results = await asyncio.gather(*[
+            graph_request(client, "GET", f"/planner/tasks/t{i}", "tok") for i in range(5)
+        ])
+        assert [r["url"] for r in results] == [f"/planner/tasks/t{i}" for i in range(5)]
+        batch_calls = _batch_calls(client)
+        assert len(batch_calls) == 1
+        assert client.request.call_count == 1
+        assert batch_calls[0].kwargs["headers"]["Authorization"] == "Bearer tok"
+
+    async def test_splits_at_twenty(self, batching):
+        _wide_workloads()
+        client = _batch_client(_ok)
+        with patch("graph_client.asyncio.sleep", new_callable=AsyncMock):
+            await asyncio.gather(*[
+                graph_request(client, "GET", f"/users/u{i}", "tok") for i in range(45)
+            ])
+        sizes = [len(c.kwargs["json"]["requests"]) for c in _batch_calls(client)]
+        assert sorted(sizes, reverse=True) == [20, 20, 5]
+
+    async def test_single_call_goes_direct(self, batching):
+        client = _batch_client(_ok)
+        result = await graph_request(client, "GET", "/me", "tok")
+        assert result == {"direct": f"{GRAPH_BASE}/me"}
+        assert _batch_calls(client) == []
+
+    async def test_body_and_if_match_travel_per_item(self, batching):
+        client = _batch_client(
+            lambda items: [{"id": it["id"], "status": 204} for it in items]
+        )
+        results = await asyncio.gather(
+            graph_request(client, "PATCH", "/planner/tasks/a/details", "tok",
+                          json={"description": "x"}, etag='W/"1"'),
+            graph_request(client, "DELETE", "/planner/plans/b", "tok", etag='W/"2"'),
+        )
+        assert results == [None, None]
+        entries = _batch_calls(client)[0].kwargs["json"]["requests"]
+        patch_entry = next(e for e in entries if e["method"] == "PATCH")
+        delete_entry = next(e for e in entries if e["method"] == "DELETE")
+        assert patch_entry["body"] == {"description": "x"}
+        assert patch_entry["headers"] == {"Content-Type": "application/json", "If-Match": 'W/"1"'}
+        assert "body" not in delete_entry
+        assert delete_entry["headers"] == {"If-Match": 'W/"2"'}
+        assert "Authorization" not in patch_entry["headers"]
+
+    async def test_item_error_raises_only_for_that_caller(self, batching):
+        def _handler(items):
+            return [
+                {"id": it["id"], "status": 404 if it["url"].endswith("missing") else 200,
+                 "body": {"ok": True}}
+                for it in items
+            ]
+        client = _batch_client(_handler)
+        results = await asyncio.gather(
+            graph_request(client, "GET", "/groups/ok", "tok"),
+            graph_request(client, "GET", "/groups/missing", "tok"),
+            return_exceptions=True,
+        )
+        assert results[0] == {"ok": True}
+        assert isinstance(results[1], httpx.HTTPStatusError)
+        assert results[1].response.status_code == 404
+
+    async def test_item_429_retried_with_its_retry_after(self, batching):
+        seen: dict[str, int] = {}
+
+        def _handler(items):
+            out = []
+            for it in items:
+                seen[it["url"]] = seen.get(it["url"], 0) + 1
+                if it["url"] == "/users/slow" and seen[it["url"]] == 1:
+                    out.append({"id": it["id"], "status": 429, "headers": {"Retry-After": "2"}})
+                else:
+                    out.append({"id": it["id"], "status": 200, "body": {"url": it["url"]}})
+            return out
+
+        client = _batch_client(_handler)
+        with patch("graph_client.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            results = await asyncio.gather(
+                graph_request(client, "GET", "/users/fast", "tok"),
+                graph_request(client, "GET", "/users/slow", "tok"),
+            )
+        # El reintento viaja solo, así que sale directo (sin envoltorio /$batch)
+        assert results == [{"url": "/users/fast"}, {"direct": f"{GRAPH_BASE}/users/slow"}]
+        assert seen == {"/users/fast": 1, "/users/slow": 1}
+        assert any(c.args[0] == pytest.approx(2, abs=0.05) for c in mock_sleep.call_args_list)
+
+    async def test_transport_error_propagates_to_all(self, batching):
+        client = MagicMock(spec=httpx.AsyncClient)
+        client.request = AsyncMock(side_effect=httpx.ConnectError("caído"))
+        results = await asyncio.gather(
+            graph_request(client, "GET", "/a", "tok"),
+            graph_request(client, "GET", "/b", "tok"),
+            return_exceptions=True,
+        )
+        assert all(isinstance(r, httpx.ConnectError) for r in results)
+
+    async def test_different_tokens_not_mixed(self, batching):
+        client = _batch_client(_ok)
+        await asyncio.gather(
+            graph_request(client, "GET", "/a", "tok1"),
+            graph_request(client, "GET", "/b", "tok1"),
+            graph_request(client, "GET", "/c", "tok2"),
+            graph_request(client, "GET", "/d", "tok2"),
+        )
+        auths = sorted(c.kwargs["headers"]["Authorization"] for c in _batch_calls(client))
+        assert auths == ["Bearer tok1", "Bearer tok2"]
+
+    async def test_counters(self, batching):
+        client = _batch_client(_ok)
+        await asyncio.gather(*[graph_request(client, "GET", f"/x{i}", "tok") for i in range(3)])
+        assert graph_batch.graph_batcher().batches_sent == 1
+        assert graph_batch.graph_batcher().items_sent == 3
+
+    async def test_real_throttle_still_fills_batches(self):
+        """Con el throttle real (sin mockear sleep) las peticiones se agrupan igual."""
+        configure_batching(BatchConfig(enabled=True, window=0.01))
+        _wide_workloads()
+        configure_throttle(ThrottleConfig(initial_rate=200, burst=10))
+        client = _batch_client(_ok)
+        await asyncio.gather(*[
+            graph_request(client, "GET", f"/planner/tasks/t{i}", "tok") for i in range(60)
+        ])
+        sizes = [len(c.kwargs["json"]["requests"]) for c in _batch_calls(client)]
+        assert sizes == [20, 20, 20]
+        assert client.request.call_count == 3
+
+    async def test_flush_tasks_are_referenced_until_done(self, batching):
+        client = _batch_client(_ok)
+        pending = asyncio.gather(*[graph_request(client, "GET", f"/x{i}", "tok") for i in range(2)])
+        await asyncio.sleep(0)
+        assert graph_batcher()._tasks
+        await pending
+        await asyncio.sleep(0)
+        assert not graph_batcher()._tasks
+
+    async def test_items_take_workload_slots(self, batching):
+        configure_workloads({"planner": WorkloadLimits(4, ThrottleConfig()), DEFAULT_WORKLOAD: WorkloadLimits(4)})
+        client = _batch_client(_ok)
+        await asyncio.gather(*[graph_request(client, "GET", f"/planner/tasks/t{i}", "tok") for i in range(10)])
+        sizes = [len(c.kwargs["json"]["requests"]) for c in _batch_calls(client)]
+        assert max(sizes) <= 4 and sum(sizes) + client.request.call_count - len(sizes) == 10
+
+    async def test_background_waits_behind_interactive(self, batching):
+        configure_workloads({"planner": WorkloadLimits(1, ThrottleConfig()), DEFAULT_WORKLOAD: WorkloadLimits(1)})
+        client = _batch_client(_ok)
+        with request_priority(Priority.BACKGROUND):
+            background = [
+                asyncio.ensure_future(graph_request(client, "GET", f"/planner/tasks/b{i}", "tok")) for i in range(3)
+            ]
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(graph_request(client, "GET", "/planner/tasks/i", "tok"))
+        await asyncio.gather(*background, interactive)
+        urls = [c.args[1].rsplit("/", 1)[1] for c in client.request.call_args_list]
+        assert urls.index("i") < urls.index("b2")
+
+    async def test_cancelled_flush_fails_waiting_callers(self, batching):
+        started = asyncio.Event()
+
+        async def _hang(*args, **kwargs):
+            started.set()
+            await asyncio.Event().wait()
+
+        client = MagicMock(spec=httpx.AsyncClient)
+        client.request = AsyncMock(side_effect=_hang)
+        calls = asyncio.gather(
+            graph_request(client, "GET", "/a", "tok"), graph_request(client, "GET", "/b", "tok"),
+            return_exceptions=True,
+        )
+        await started.wait()
+        for task in list(graph_batcher()._tasks):
+            task.cancel()
+        results = await asyncio.wait_for(calls, 1)
+        assert all(isinstance(r, asyncio.CancelledError) for r in results)
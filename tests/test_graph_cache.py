@@ -0,0 +1,116 @@
+"""Tests de graph_cache: GET condicional con ETag/If-None-Match y expulsión LRU — sin red real."""
+from __future__ import annotations
+
+import os
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+from graph_cache import CacheConfig, ResponseCache, configure_cache, response_cache
+from planner_import import graph_request
+
+
+def _client(*responses: httpx.Response) -> MagicMock:
+    client = MagicMock(spec=httpx.AsyncClient)
+    client.request = AsyncMock(side_effect=list(responses))
+    return client
+
+
+def _ok(body: dict, etag: str | None = None) -> httpx.Response:
+    headers = {"ETag": etag} if etag else {}
+    return httpx.Response(200, json=body, headers=headers, request=httpx.Request("GET", "https://x"))
+
+
+def _not_modified() -> httpx.Response:
+    return httpx.Response(304, request=httpx.Request("GET", "https://x"))
+
+
+@pytest.fixture
+def cache(tmp_path) -> ResponseCache:
+    return configure_cache(CacheConfig(enabled=True, directory=tmp_path))
+
+
+class TestCacheConfig:
+    def test_disabled_by_default(self):
+        assert response_cache().enabled is False
+
+    def test_from_env(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("GRAPH_CACHE", "1")
+        monkeypatch.setenv("GRAPH_CACHE_DIR", str(tmp_path))
+        monkeypatch.setenv("GRAPH_CACHE_MAX_MB", "2")
+        cfg = CacheConfig.from_env()
+        assert (cfg.enabled, cfg.directory, cfg.max_bytes) == (True, tmp_path, 2 * 1024 * 1024)
+
+
+class TestConditionalGet:
+    async def test_304_served_from_cache(self, cache):
+        body = {"id": "t1", "@odata.etag": 'W/"1"', "description": "x"}
+        client = _client(_ok(body), _not_modified())
+        first = await graph_request(client, "GET", "/planner/tasks/t1/details", "tok")
+        second = await graph_request(client, "GET", "/planner/tasks/t1/details", "tok")
+        assert first == second == body
+        assert "If-None-Match" not in client.request.call_args_list[0].kwargs["headers"]
+        assert client.request.call_args_list[1].kwargs["headers"]["If-None-Match"] == 'W/"1"'
+        assert cache.hits == 1
+
+    async def test_200_replaces_cached_copy(self, cache):
+        client = _client(
+            _ok({"id": "t1", "@odata.etag": 'W/"1"', "title": "viejo"}),
+            _ok({"id": "t1", "@odata.etag": 'W/"2"', "title": "nuevo"}),
+            _not_modified(),
+        )
+        await graph_request(client, "GET", "/planner/tasks/t1", "tok")
+        assert (await graph_request(client, "GET", "/planner/tasks/t1", "tok"))["title"] == "nuevo"
+        assert (await graph_request(client, "GET", "/planner/tasks/t1", "tok"))["title"] == "nuevo"
+        assert client.request.call_args_list[2].kwargs["headers"]["If-None-Match"] == 'W/"2"'
+
+    async def test_header_etag_used_when_body_has_none(self, cache):
+        client = _client(_ok({"value": [1]}, etag='"abc"'), _not_modified())
+        await graph_request(client, "GET", "/sites/s/drive/root", "tok")
+        assert await graph_request(client, "GET", "/sites/s/drive/root", "tok") == {"value": [1]}
+
+    async def test_without_etag_not_cached(self, cache):
+        client = _client(_ok({"value": []}), _ok({"value": []}))
+        await graph_request(client, "GET", "/planner/plans/p/tasks", "tok")
+        await graph_request(client, "GET", "/planner/plans/p/tasks", "tok")
+        assert "If-None-Match" not in client.request.call_args_list[1].kwargs["headers"]
+
+    async def test_different_tokens_do_not_share_entries(self, cache):
+        client = _client(_ok({"id": "a", "@odata.etag": 'W/"1"'}), _ok({"id": "a", "@odata.etag": 'W/"1"'}))
+        await graph_request(client, "GET", "/planner/tasks/a", "tok-tenant-1")
+        await graph_request(client, "GET", "/planner/tasks/a", "tok-tenant-2")
+        assert "If-None-Match" not in client.request.call_args_list[1].kwargs["headers"]
+
+    async def test_writes_bypass_cache(self, cache):
+        client = _client(httpx.Response(204, request=httpx.Request("PATCH", "https://x")))
+        await graph_request(client, "PATCH", "/planner/tasks/a", "tok", json={}, etag='W/"1"')
+        assert not any(cache.config.directory.iterdir())
+
+
+class TestEviction:
+    def test_lru_by_entries(self, tmp_path):
+        cache = ResponseCache(CacheConfig(enabled=True, directory=tmp_path, max_entries=2))
+        for i, name in enumerate(["a", "b"]):
+            cache.store(name, f'"{name}"', {"n": name})
+            os.utime(tmp_path / f"{name}.json", (1000 + i, 1000 + i))
+        cache._index = None   # recargar fechas de acceso del disco
+        cache.touch("a")      # "a" pasa a ser la más reciente
+        cache.store("c", '"c"', {"n": "c"})
+        assert cache.lookup("a") is not None
+        assert cache.lookup("b") is None
+        assert cache.evictions == 1
+
+    def test_size_bound(self, tmp_path):
+        cache = ResponseCache(CacheConfig(enabled=True, directory=tmp_path, max_bytes=200))
+        for i in range(5):
+            cache.store(f"k{i}", '"e"', {"pad": "x" * 60})
+        total = sum(p.stat().st_size for p in tmp_path.glob("*.json"))
+        assert total <= 200
+        assert cache.lookup("k4") is not None
+
+    def test_corrupt_entry_is_a_miss(self, tmp_path):
+        cache = ResponseCache(CacheConfig(enabled=True, directory=tmp_path))
+        (tmp_path / "k.json").write_text("{roto", encoding="utf-8")
+        assert cache.lookup("k") is None
+        assert not (tmp_path / "k.json").exists()
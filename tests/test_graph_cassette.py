@@ -0,0 +1,112 @@
+"""Tests de graph_cassette: grabación en el transporte y reproducción determinista."""
+from __future__ import annotations
+
+import gzip
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from graph_auth import AsyncTokenProvider
+from graph_cassette import (
+    Cassette,
+    CassetteConfig,
+    CassetteMiss,
+    RecordingTransport,
+    ReplayTransport,
+    configure_cassette,
+)
+from graph_client import shared_graph_client
+from planner_import import GRAPH_BASE, graph_request
+
+
+def _graph(request: httpx.Request) -> httpx.Response:
+    if request.url.path.endswith("/slow"):
+        return httpx.Response(429, headers={"Retry-After": "2"}, json={"error": {"code": "TooManyRequests"}})
+    if request.url.path.endswith("/bin"):
+        return httpx.Response(200, content=b"\x00\xff\x10", headers={"Content-Type": "application/octet-stream"})
+    return httpx.Response(200, json={"path": request.url.path}, headers={"ETag": 'W/"1"'})
+
+
+async def _record(tmp_path, *requests: tuple[str, str, dict | None]) -> Cassette:
+    cassette = Cassette(tmp_path)
+    transport = RecordingTransport(httpx.MockTransport(_graph), cassette)
+    async with httpx.AsyncClient(transport=transport) as client:
+        for method, path, body in requests:
+            await client.request(method, f"{GRAPH_BASE}{path}", json=body, headers={"Authorization": "Bearer x"})
+    return cassette
+
+
+class TestRecording:
+    async def test_writes_compact_cassette_without_auth(self, tmp_path):
+        await _record(tmp_path, ("GET", "/me", None), ("POST", "/planner/tasks", {"title": "a"}))
+        lines = gzip.open(tmp_path / "cassette.jsonl.gz", "rt", encoding="utf-8").read().splitlines()
+        entries = [json.loads(line) for line in lines]
+        assert [(e["method"], e["status"]) for e in entries] == [("GET", 200), ("POST", 200)]
+        assert entries[0]["headers"] == {"etag": 'W/"1"', "content-type": "application/json"}
+        assert entries[1]["req"]
+        assert "Bearer" not in "".join(lines)
+
+    async def test_binary_body_roundtrip(self, tmp_path):
+        await _record(tmp_path, ("GET", "/drive/bin", None))
+        loaded = Cassette.load(tmp_path)
+        assert loaded.interactions[0].body == b"\x00\xff\x10"
+
+
+class TestReplay:
+    async def test_same_responses_in_order(self, tmp_path):
+        await _record(tmp_path, ("GET", "/a", None), ("GET", "/a", None), ("GET", "/b", None))
+        transport = ReplayTransport(Cassette.load(tmp_path), speed=0)
+        async with httpx.AsyncClient(transport=transport) as client:
+            resp = await client.get(f"{GRAPH_BASE}/b")
+            assert resp.json() == {"path": "/v1.0/b"}
+            assert resp.headers["ETag"] == 'W/"1"'
+            await client.get(f"{GRAPH_BASE}/a")
+            await client.get(f"{GRAPH_BASE}/a")
+            with pytest.raises(CassetteMiss):
+                await client.get(f"{GRAPH_BASE}/a")
+
+    async def test_body_mismatch_falls_back_to_method_and_url(self, tmp_path):
+        await _record(tmp_path, ("POST", "/planner/tasks", {"title": "a", "due": "2026-01-01"}))
+        transport = ReplayTransport(Cassette.load(tmp_path), speed=0)
+        async with httpx.AsyncClient(transport=transport) as client:
+            resp = await client.post(f"{GRAPH_BASE}/planner/tasks", json={"title": "a", "due": "2026-02-02"})
+        assert resp.status_code == 200
+
+    async def test_latency_scaled_by_speed(self, tmp_path):
+        cassette = await _record(tmp_path, ("GET", "/a", None))
+        cassette.interactions[0].elapsed = 0.8
+        with patch("graph_cassette.asyncio.sleep", new_callable=AsyncMock) as sleep:
+            async with httpx.AsyncClient(transport=ReplayTransport(cassette, speed=4)) as client:
+                await client.get(f"{GRAPH_BASE}/a")
+        sleep.assert_awaited_once_with(pytest.approx(0.2))
+
+    async def test_graph_request_replays_throttling(self, tmp_path):
+        await _record(tmp_path, ("GET", "/slow", None), ("GET", "/ok", None))
+        cassette = Cassette.load(tmp_path)
+        cassette.interactions[1].url = f"{GRAPH_BASE}/slow"   # 429 y después 200 en /slow
+        cassette.save()
+        configure_cassette(CassetteConfig(mode="replay", directory=tmp_path, speed=0))
+        auth = MagicMock()
+        token = AsyncTokenProvider.from_auth_manager(auth, tenant_id="t", client_id="c")
+        with patch("graph_client.asyncio.sleep", new_callable=AsyncMock) as sleep:
+            async with shared_graph_client() as client:
+                data = await graph_request(client, "GET", "/slow", token)
+        assert data == {"path": "/v1.0/ok"}
+        assert sleep.await_args.args[0] == pytest.approx(2, abs=0.1)   # Retry-After grabado
+        auth.get_token.assert_not_called()
+
+
+class TestCassetteConfig:
+    def test_from_env(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("GRAPH_REPLAY", str(tmp_path))
+        monkeypatch.setenv("GRAPH_REPLAY_SPEED", "10")
+        cfg = CassetteConfig.from_env()
+        assert (cfg.mode, cfg.directory, cfg.speed) == ("replay", tmp_path, 10.0)
+
+    def test_record_and_replay_exclusive(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("GRAPH_RECORD", str(tmp_path))
+        monkeypatch.setenv("GRAPH_REPLAY", str(tmp_path))
+        with pytest.raises(ValueError):
+            CassetteConfig.from_env()
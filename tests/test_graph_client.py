@@ -0,0 +1,673 @@
+"""Tests de graph_client: pool compartido, límites, timeouts y ThrottleController — sin red real."""
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+import graph_client
+from graph_client import (
+    GraphClient,
+    GraphClientConfig,
+    Priority,
+    PrioritySemaphore,
+    RetryPolicy,
+    ThrottleConfig,
+    ThrottleController,
+    WorkloadLimits,
+    classify_workload,
+    configure_workloads,
+    workload_limits_from_env,
+    workload_registry,
+    aclose_graph_client,
+    configure_graph_client,
+    configure_retry,
+    configure_throttle,
+    default_priority,
+    is_idempotent,
+    parse_retry_after,
+    request_priority,
+    send_with_retry,
+    run_with_graph_client,
+    shared_graph_client,
+    single_flight,
+    throttle_controller,
+)
+from planner_import import graph_request
+from tests.conftest import make_async_client_ctx
+
+
+# ── GraphClientConfig ─────────────────────────────────────────────────────────
+
+class TestGraphClientConfig:
+    def test_timeouts_split(self):
+        cfg = GraphClientConfig(connect_timeout=3, read_timeout=40, write_timeout=20, pool_timeout=5)
+        t = cfg.timeout()
+        assert (t.connect, t.read, t.write, t.pool) == (3, 40, 20, 5)
+
+    def test_limits_forwarded(self):
+        cfg = GraphClientConfig(max_connections=10, max_keepalive_connections=4, keepalive_expiry=12)
+        lim = cfg.limits()
+        assert lim.max_connections == 10
+        assert lim.max_keepalive_connections == 4
+        assert lim.keepalive_expiry == 12
+
+    def test_http2_requires_h2(self, monkeypatch):
+        monkeypatch.setattr(graph_client, "HTTP2_AVAILABLE", False)
+        assert GraphClientConfig(http2=True).client_kwargs()["http2"] is False
+        monkeypatch.setattr(graph_client, "HTTP2_AVAILABLE", True)
+        assert GraphClientConfig(http2=True).client_kwargs()["http2"] is True
+        assert GraphClientConfig(http2=False).client_kwargs()["http2"] is False
+
+    def test_from_env_overrides(self, monkeypatch):
+        monkeypatch.setenv("GRAPH_MAX_CONNECTIONS", "7")
+        monkeypatch.setenv("GRAPH_READ_TIMEOUT", "12.5")
+        monkeypatch.setenv("GRAPH_HTTP2", "0")
+        cfg = GraphClientConfig.from_env()
+        assert cfg.max_connections == 7
+        assert cfg.read_timeout == 12.5
+        assert cfg.http2 is False
+
+    def test_from_env_empty_uses_defaults(self, monkeypatch):
+        monkeypatch.delenv("GRAPH_MAX_CONNECTIONS", raising=False)
+        assert GraphClientConfig.from_env().max_connections == GraphClientConfig().max_connections
+
+
+# ── GraphClient ───────────────────────────────────────────────────────────────
+
+class TestGraphClient:
+    async def test_pool_reused_across_context_managers(self):
+        mock_client = MagicMock()
+        ctor = MagicMock(return_value=make_async_client_ctx(mock_client))
+        gc = GraphClient(GraphClientConfig())
+        with patch("graph_client.httpx.AsyncClient", ctor):
+            async with gc as c1:
+                pass
+            async with gc as c2:
+                pass
+        assert c1 is c2 is mock_client
+        ctor.assert_called_once()
+
+    async def test_exit_does_not_close_pool(self):
+        ctx = make_async_client_ctx(MagicMock())
+        gc = GraphClient(GraphClientConfig())
+        with patch("graph_client.httpx.AsyncClient", return_value=ctx):
+            async with gc:
+                pass
+        ctx.__aexit__.assert_not_called()
+
+    async def test_aclose_closes_pool(self):
+        ctx = make_async_client_ctx(MagicMock())
+        gc = GraphClient(GraphClientConfig())
+        with patch("graph_client.httpx.AsyncClient", return_value=ctx):
+            await gc.get()
+            await gc.aclose()
+        ctx.__aexit__.assert_awaited_once()
+
+    def test_new_loop_opens_new_pool(self):
+        ctor = MagicMock(side_effect=lambda **kw: make_async_client_ctx(MagicMock()))
+        gc = GraphClient(GraphClientConfig())
+        with patch("graph_client.httpx.AsyncClient", ctor):
+            asyncio.run(gc.get())
+            asyncio.run(gc.get())
+        assert ctor.call_count == 2
+
+    async def test_client_kwargs_passed_to_httpx(self):
+        ctor = MagicMock(return_value=make_async_client_ctx(MagicMock()))
+        cfg = GraphClientConfig(max_connections=3, read_timeout=9)
+        with patch("graph_client.httpx.AsyncClient", ctor):
+            await GraphClient(cfg).get()
+        _, kwargs = ctor.call_args
+        assert kwargs["limits"].max_connections == 3
+        assert kwargs["timeout"].read == 9
+
+    async def test_real_client_is_httpx_async_client(self):
+        gc = GraphClient(GraphClientConfig(http2=False))
+        client = await gc.get()
+        assert isinstance(client, httpx.AsyncClient)
+        await gc.aclose()
+        assert client.is_closed
+
+
+# ── Singleton de proceso ──────────────────────────────────────────────────────
+
+class TestSharedGraphClient:
+    def test_shared_is_singleton(self):
+        assert shared_graph_client() is shared_graph_client()
+
+    def test_configure_replaces_singleton(self):
+        first = shared_graph_client()
+        cfg = GraphClientConfig(max_connections=2)
+        second = configure_graph_client(cfg)
+        assert second is not first
+        assert shared_graph_client().config is cfg
+
+    def test_run_with_graph_client_closes_pool(self):
+        ctx = make_async_client_ctx(MagicMock())
+
+        async def _work() -> str:
+            async with shared_graph_client():
+                return "ok"
+
+        with patch("graph_client.httpx.AsyncClient", return_value=ctx):
+            assert run_with_graph_client(_work()) == "ok"
+        ctx.__aexit__.assert_awaited_once()
+
+    async def test_aclose_without_pool_is_noop(self):
+        await aclose_graph_client()
+
+
+# ── parse_retry_after ─────────────────────────────────────────────────────────
+
+class TestParseRetryAfter:
+    def test_integer_seconds(self):
+        assert parse_retry_after("42") == 42
+
+    def test_decimal_seconds(self):
+        assert parse_retry_after("1.5") == 1.5
+
+    def test_missing_returns_none(self):
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("") is None
+
+    def test_garbage_returns_none(self):
+        assert parse_retry_after("pronto") is None
+
+    def test_http_date_in_past_is_zero(self):
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+
+
+# ── ThrottleController (AIMD) ─────────────────────────────────────────────────
+
+class TestThrottleController:
+    async def test_burst_does_not_sleep(self):
+        tc = ThrottleController(ThrottleConfig(initial_rate=5, burst=5))
+        with patch("graph_client.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            for _ in range(5):
+                await tc.acquire()
+        mock_sleep.assert_not_called()
+
+    async def test_beyond_burst_spaces_requests(self):
+        tc = ThrottleController(ThrottleConfig(initial_rate=10, burst=1))
+        with patch("graph_client.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            await tc.acquire()
+            await tc.acquire()
+        mock_sleep.assert_called_once()
+        assert mock_sleep.call_args.args[0] == pytest.approx(0.1, abs=0.01)
+
+    def test_slow_start_until_first_throttle(self):
+        tc = ThrottleController(ThrottleConfig(initial_rate=5, decrease_cooldown=0))
+        for _ in range(5):
+            tc.on_success()
+        assert tc.rate == 10
+        tc.on_throttled(1)
+        tc.on_success()
+        assert tc.rate == pytest.approx(5.2)
+
+    def test_additive_increase_capped(self):
+        tc = ThrottleController(ThrottleConfig(initial_rate=5, max_rate=6, additive_increase=1, slow_start=False))
+        tc.on_success()
+        assert tc.rate == pytest.approx(5.2)
+        for _ in range(100):
+            tc.on_success()
+        assert tc.rate == 6
+
+    def test_multiplicative_decrease_floored(self):
+        tc = ThrottleController(ThrottleConfig(initial_rate=4, min_rate=1, decrease_cooldown=0))
+        tc.on_throttled(1)
+        assert tc.rate == 2
+        tc.on_throttled(1)
+        tc.on_throttled(1)
+        assert tc.rate == 1
+
+    def test_concurrent_429_burst_cuts_once(self):
+        tc = ThrottleController(ThrottleConfig(initial_rate=8, decrease_cooldown=60))
+        for _ in range(5):
+            tc.on_throttled(1)
+        assert tc.rate == 4
+        assert tc.throttled_count == 5
+
+    def test_missing_retry_after_uses_default_pause(self):
+        tc = ThrottleController(ThrottleConfig(default_pause=7))
+        assert tc.on_throttled(None) == 7
+        assert tc.paused_for == pytest.approx(7, abs=0.05)
+
+    async def test_pause_applies_to_every_caller(self):
+        tc = ThrottleController(ThrottleConfig(initial_rate=100, burst=100))
+        tc.on_throttled(3)
+        with patch("graph_client.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            await asyncio.gather(tc.acquire(), tc.acquire(), tc.acquire())
+        assert mock_sleep.call_count == 3
+        for c in mock_sleep.call_args_list:
+            assert c.args[0] == pytest.approx(3, abs=0.05)
+
+    async def test_new_pause_while_waiting_is_respected(self):
+        tc = ThrottleController(ThrottleConfig(initial_rate=10, burst=1))
+        await tc.acquire()
+        delays: list[float] = []
+
+        async def _sleep(delay: float) -> None:
+            delays.append(delay)
+            if len(delays) == 1:
+                tc.on_throttled(4)   # otro coroutine recibe 429 mientras esperamos
+
+        with patch("graph_client.asyncio.sleep", side_effect=_sleep):
+            await tc.acquire()
+        assert len(delays) == 2
+        assert delays[1] == pytest.approx(4, abs=0.05)
+
+    def test_singleton_and_configure(self):
+        assert throttle_controller() is throttle_controller()
+        cfg = ThrottleConfig(initial_rate=1)
+        assert configure_throttle(cfg) is throttle_controller()
+        assert throttle_controller().rate == 1
+
+
+# ── Presupuestos por workload ─────────────────────────────────────────────────
+
+class TestWorkloads:
+    @pytest.mark.parametrize("endpoint,expected", [
+        ("/planner/tasks/t1/details", "planner"),
+        ("/groups/g1/planner/plans", "planner"),
+        ("/groups/g1/threads/th1/posts?$top=1", "threads"),
+        ("/users/ana@x.com", "users"),
+        ("/users/abc?$select=mail", "users"),
+        ("/me/sendMail", "mail"),
+        ("/directoryObjects/getByIds", "users"),
+        ("/sites/s1/drive/root:/a:/children", "drive"),
+        ("/teams/t1/channels", "teams"),
+        ("/groups/g1", "graph"),
+    ])
+    def test_classify(self, endpoint, expected):
+        assert classify_workload(endpoint) == expected
+
+    def test_each_workload_has_own_throttle(self):
+        planner, users = throttle_controller("planner"), throttle_controller("users")
+        assert planner is not users
+        planner.on_throttled(30)
+        assert planner.paused_for > 0
+        assert users.paused_for == 0
+
+    def test_env_overrides(self, monkeypatch):
+        monkeypatch.setenv("GRAPH_USERS_CONCURRENCY", "3")
+        monkeypatch.setenv("GRAPH_PLANNER_RATE", "7")
+        limits = workload_limits_from_env()
+        assert limits["users"].concurrency == 3
+        assert limits["planner"].throttle.initial_rate == 7
+
+    def test_configure_throttle_for_all_workloads(self):
+        cfg = ThrottleConfig(initial_rate=123)
+        configure_throttle(cfg)
+        assert throttle_controller("planner").rate == 123
+        assert throttle_controller("mail").rate == 123
+
+    async def test_concurrency_limit_per_workload(self):
+        configure_workloads({
+            "planner": WorkloadLimits(2, ThrottleConfig(initial_rate=1000, burst=1000)),
+            "users": WorkloadLimits(5, ThrottleConfig(initial_rate=1000, burst=1000)),
+            "graph": WorkloadLimits(1),
+        })
+        in_flight = {"planner": 0, "users": 0}
+        peak = {"planner": 0, "users": 0}
+
+        def _sender(workload: str):
+            async def _send() -> httpx.Response:
+                in_flight[workload] += 1
+                peak[workload] = max(peak[workload], in_flight[workload])
+                await asyncio.sleep(0.01)
+                in_flight[workload] -= 1
+                return _resp(200)
+            return _send
+
+        await asyncio.gather(*[
+            send_with_retry(_sender(w), "GET /x", idempotent=True, workload=w)
+            for w in ["planner"] * 6 + ["users"] * 6
+        ])
+        assert peak == {"planner": 2, "users": 5}
+
+    def test_semaphores_recreated_per_loop(self):
+        async def _get():
+            return workload_registry().semaphore("planner")
+
+        assert asyncio.run(_get()) is not asyncio.run(_get())
+
+
+# ── RetryPolicy ───────────────────────────────────────────────────────────────
+
+def _resp(status: int, headers: dict | None = None) -> httpx.Response:
+    return httpx.Response(status, headers=headers, request=httpx.Request("GET", "https://g/x"))
+
+
+class TestRetryPolicy:
+    def test_backoff_within_bounds(self):
+        policy = RetryPolicy(base_delay=0.5, max_delay=4)
+        prev = 0.5
+        for _ in range(50):
+            delay = policy.backoff(prev)
+            assert 0.5 <= delay <= min(4, prev * 3)
+            prev = delay
+
+    def test_backoff_capped_by_max_delay(self):
+        policy = RetryPolicy(base_delay=10, max_delay=12)
+        assert all(policy.backoff(100) <= 12 for _ in range(20))
+
+    def test_max_attempts_must_be_positive(self):
+        with pytest.raises(ValueError, match="max_attempts"):
+            RetryPolicy(max_attempts=0)
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("GRAPH_RETRY_MAX_ATTEMPTS", "4")
+        monkeypatch.setenv("GRAPH_RETRY_BUDGET", "90")
+        monkeypatch.setenv("GRAPH_RETRY_BASE_DELAY", "0.2")
+        monkeypatch.setenv("GRAPH_RETRY_MAX_DELAY", "8")
+        policy = RetryPolicy.from_env()
+        assert (policy.max_attempts, policy.budget, policy.base_delay, policy.max_delay) == (4, 90, 0.2, 8)
+
+    def test_from_env_rejects_zero_attempts(self, monkeypatch):
+        monkeypatch.setenv("GRAPH_RETRY_MAX_ATTEMPTS", "0")
+        with pytest.raises(ValueError):
+            RetryPolicy.from_env()
+
+    def test_is_idempotent(self):
+        assert is_idempotent("GET")
+        assert is_idempotent("delete")
+        assert is_idempotent("PUT")
+        assert not is_idempotent("POST")
+        assert not is_idempotent("PATCH")
+        assert is_idempotent("PATCH", {"If-Match": 'W/"1"'})
+
+
+class TestSendWithRetry:
+    @pytest.fixture(autouse=True)
+    def _policy(self):
+        self.policy = configure_retry(RetryPolicy(max_attempts=4, base_delay=0.1, max_delay=1))
+
+    async def _run(self, outcomes: list, *, idempotent: bool = True):
+        send = AsyncMock(side_effect=outcomes)
+        with patch("graph_client.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            try:
+                result = await send_with_retry(send, "GET /x", idempotent=idempotent)
+            finally:
+                self.send, self.sleep = send, mock_sleep
+        return result
+
+    async def test_502_then_200_retried_with_backoff(self):
+        resp = await self._run([_resp(502), _resp(504), _resp(200)])
+        assert resp.status_code == 200
+        assert self.send.call_count == 3
+        assert self.policy.retries == {"502": 1, "504": 1}
+        delays = [c.args[0] for c in self.sleep.call_args_list]
+        assert len(delays) == 2 and all(0.1 <= d <= 1 for d in delays)
+
+    async def test_retry_after_overrides_backoff_on_5xx(self):
+        await self._run([_resp(502, {"Retry-After": "3"}), _resp(200)])
+        assert self.sleep.call_args.args[0] == 3
+
+    async def test_timeout_retried_for_idempotent(self):
+        resp = await self._run([httpx.ReadTimeout("lento"), _resp(200)])
+        assert resp.status_code == 200
+        assert self.policy.retries["ReadTimeout"] == 1
+
+    async def test_post_not_retried_on_timeout_or_5xx(self):
+        with pytest.raises(httpx.ReadTimeout):
+            await self._run([httpx.ReadTimeout("lento"), _resp(200)], idempotent=False)
+        assert self.send.call_count == 1
+        resp = await self._run([_resp(502), _resp(200)], idempotent=False)
+        assert resp.status_code == 502
+        assert self.send.call_count == 1
+
+    async def test_post_retried_on_connect_error_and_429(self):
+        resp = await self._run(
+            [httpx.ConnectError("caído"), _resp(429, {"Retry-After": "0"}), _resp(201)],
+            idempotent=False,
+        )
+        assert resp.status_code == 201
+        assert self.send.call_count == 3
+
+    async def test_non_retryable_exception_propagates(self):
+        with pytest.raises(ValueError):
+            await self._run([ValueError("bug")])
+        assert self.send.call_count == 1
+
+    async def test_exhausted_returns_last_response_and_counts(self):
+        resp = await self._run([_resp(502)] * 4)
+        assert resp.status_code == 502
+        assert self.send.call_count == 4
+        assert self.policy.exhausted == 1
+
+    async def test_exhausted_on_exception_reraises(self):
+        with pytest.raises(httpx.ConnectError):
+            await self._run([httpx.ConnectError("caído")] * 4)
+        assert self.policy.exhausted == 1
+
+    async def test_budget_stops_before_long_wait(self):
+        configure_retry(RetryPolicy(max_attempts=5, budget=10))
+        self.policy = graph_client.retry_policy()
+        resp = await self._run([_resp(502, {"Retry-After": "60"}), _resp(200)])
+        assert resp.status_code == 502
+        assert self.send.call_count == 1
+        assert self.policy.exhausted == 1
+        self.sleep.assert_not_called()
+
+
+# ── SingleFlight ──────────────────────────────────────────────────────────────
+
+class TestSingleFlight:
+    async def test_concurrent_calls_share_one_execution(self):
+        release = asyncio.Event()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"id": "u1"}
+
+        sf = graph_client.SingleFlight()
+        pending = [asyncio.create_task(sf.do("k", fetch)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert len(sf) == 1
+        release.set()
+        results = await asyncio.gather(*pending)
+        assert calls == 1
+        assert all(r is results[0] for r in results)
+        assert (sf.calls, sf.shared, len(sf)) == (5, 4, 0)
+
+    async def test_key_released_after_completion(self):
+        sf = graph_client.SingleFlight()
+        fetch = AsyncMock(side_effect=[1, 2])
+        assert await sf.do("k", fetch) == 1
+        assert await sf.do("k", fetch) == 2
+
+    async def test_error_reaches_every_waiter(self):
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            raise httpx.ConnectError("caído")
+
+        sf = graph_client.SingleFlight()
+        pending = [asyncio.create_task(sf.do("k", fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        assert all(isinstance(r, httpx.ConnectError) for r in results)
+        assert len(sf) == 0
+
+    async def test_cancelled_follower_does_not_cancel_call(self):
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "ok"
+
+        sf = graph_client.SingleFlight()
+        leader = asyncio.create_task(sf.do("k", fetch))
+        follower = asyncio.create_task(sf.do("k", fetch))
+        await asyncio.sleep(0)
+        follower.cancel()
+        release.set()
+        assert await leader == "ok"
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+
+    async def test_cancelled_leader_hands_over(self):
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                await asyncio.sleep(10)
+            return "ok"
+
+        sf = graph_client.SingleFlight()
+        leader = asyncio.create_task(sf.do("k", fetch))
+        follower = asyncio.create_task(sf.do("k", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await follower == "ok"
+        assert leader.cancelled()
+        assert calls == 2
+
+
+class TestGraphRequestSingleFlight:
+    def _client(self) -> MagicMock:
+        release = asyncio.Event()
+        self.release = release
+
+        async def request(method, url, **kwargs):
+            await release.wait()
+            return httpx.Response(200, json={"url": url}, request=httpx.Request(method, url))
+
+        client = MagicMock(spec=httpx.AsyncClient)
+        client.request = AsyncMock(side_effect=request)
+        return client
+
+    async def _gather(self, *calls):
+        pending = [asyncio.create_task(c) for c in calls]
+        await asyncio.sleep(0.01)
+        self.release.set()
+        return await asyncio.gather(*pending)
+
+    async def test_identical_gets_coalesced(self):
+        client = self._client()
+        results = await self._gather(*[graph_request(client, "GET", "/users/g1", "tok") for _ in range(4)])
+        assert client.request.call_count == 1
+        assert all(r is results[0] for r in results)
+        assert single_flight().shared == 3
+
+    async def test_different_url_or_token_not_coalesced(self):
+        client = self._client()
+        await self._gather(
+            graph_request(client, "GET", "/users/g1", "tok-a"),
+            graph_request(client, "GET", "/users/g2", "tok-a"),
+            graph_request(client, "GET", "/users/g1", "tok-b"),
+        )
+        assert client.request.call_count == 3
+
+    async def test_writes_never_coalesced(self):
+        client = self._client()
+        await self._gather(*[
+            graph_request(client, "PATCH", "/planner/tasks/t1", "tok", json={}, etag='W/"1"')
+            for _ in range(2)
+        ])
+        assert client.request.call_count == 2
+        assert single_flight().calls == 0
+
+
+# ── Prioridades ───────────────────────────────────────────────────────────────
+
+class TestPrioritySemaphore:
+    async def _queue(self, sem: PrioritySemaphore, order: list[str], name: str, priority: Priority) -> None:
+        async with sem.slot(priority):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    async def test_free_slots_granted_immediately(self):
+        sem = PrioritySemaphore(2)
+        await sem.acquire(Priority.BACKGROUND)
+        await sem.acquire(Priority.BACKGROUND)
+        assert sem.locked()
+        sem.release()
+        assert not sem.locked()
+
+    async def test_waiters_served_by_priority_then_fifo(self):
+        sem = PrioritySemaphore(1)
+        order: list[str] = []
+        await sem.acquire()
+        pending = [
+            asyncio.create_task(self._queue(sem, order, name, priority))
+            for name, priority in [
+                ("bg1", Priority.BACKGROUND), ("bg2", Priority.BACKGROUND),
+                ("int1", Priority.INTERACTIVE), ("crit", Priority.CRITICAL), ("int2", Priority.INTERACTIVE),
+            ]
+        ]
+        await asyncio.sleep(0)
+        assert sem.waiting == 5
+        sem.release()
+        await asyncio.gather(*pending)
+        assert order == ["crit", "int1", "int2", "bg1", "bg2"]
+
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        sem = PrioritySemaphore(1)
+        await sem.acquire()
+        waiter = asyncio.create_task(sem.acquire(Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        assert sem.waiting == 0
+        sem.release()
+        await asyncio.wait_for(sem.acquire(), 1)
+
+    async def test_cancelled_after_grant_passes_slot_on(self):
+        sem = PrioritySemaphore(1)
+        await sem.acquire()
+        first = asyncio.create_task(sem.acquire(Priority.CRITICAL))
+        second = asyncio.create_task(sem.acquire(Priority.BACKGROUND))
+        await asyncio.sleep(0)
+        sem.release()          # cupo asignado a `first`...
+        first.cancel()         # ...que se cancela antes de reanudarse
+        await asyncio.wait_for(second, 1)
+        assert sem.locked() and sem.waiting == 0
+
+
+class TestRequestPriority:
+    def test_default_by_method(self):
+        assert default_priority("GET") is Priority.INTERACTIVE
+        assert default_priority("POST") is Priority.CRITICAL
+        assert default_priority("patch") is Priority.CRITICAL
+
+    async def test_context_overrides_and_is_inherited_by_tasks(self):
+        async def _seen() -> Priority:
+            return default_priority("GET")
+
+        with request_priority(Priority.BACKGROUND):
+            assert default_priority("POST") is Priority.BACKGROUND
+            inner = await asyncio.gather(_seen(), _seen())
+        assert inner == [Priority.BACKGROUND, Priority.BACKGROUND]
+        assert default_priority("GET") is Priority.INTERACTIVE
+
+    async def test_interactive_request_overtakes_queued_background(self):
+        configure_workloads({"planner": WorkloadLimits(1, ThrottleConfig(initial_rate=1000, burst=1000)),
+                             "graph": WorkloadLimits(1)})
+        order: list[str] = []
+
+        async def request(method, url, **kwargs):
+            order.append(url.rsplit("/", 1)[-1])
+            await asyncio.sleep(0.005)
+            return httpx.Response(200, json={}, request=httpx.Request(method, url))
+
+        client = MagicMock(spec=httpx.AsyncClient)
+        client.request = AsyncMock(side_effect=request)
+        with request_priority(Priority.BACKGROUND):
+            background = [
+                asyncio.create_task(graph_request(client, "GET", f"/planner/tasks/bg{i}/details", "tok"))
+                for i in range(5)
+            ]
+        await asyncio.sleep(0.001)
+        await graph_request(client, "GET", "/planner/plans/p2/buckets", "tok")
+        await asyncio.gather(*background)
+        assert order.index("buckets") <= 1
@@ -0,0 +1,148 @@
+"""Tests de graph_deadline: plazos de ejecución y de fase a través de graph_request()."""
+from __future__ import annotations
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import planner_import
+from graph_client import run_with_graph_client, send_with_retry, shared_graph_client
+from graph_deadline import (
+    Deadline,
+    DeadlineConfig,
+    DeadlineExceeded,
+    check_deadline,
+    configure_deadlines,
+    deadline_config,
+    deadline_scope,
+    parse_duration,
+    run_within_deadline,
+    start_phase,
+    time_left,
+    within,
+)
+from graph_emulator import EmulatorConfig, install_emulator
+
+GROUP = "198b4a0a-39c7-4521-a546-6a008e3a254a"
+
+
+def _resp(status: int, headers: dict | None = None) -> httpx.Response:
+    return httpx.Response(status, headers=headers, request=httpx.Request("GET", "https://g/x"))
+
+
+class TestParseDuration:
+    @pytest.mark.parametrize("text, seconds", [
+        ("15m", 900), ("90s", 90), ("1h30m", 5400), ("500ms", 0.5), ("45", 45), ("1.5h", 5400),
+    ])
+    def test_valid(self, text, seconds):
+        assert parse_duration(text) == pytest.approx(seconds)
+
+    @pytest.mark.parametrize("text", ["", "m", "15x", "diez"])
+    def test_invalid(self, text):
+        with pytest.raises(ValueError):
+            parse_duration(text)
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("GRAPH_DEADLINE", "15m")
+        monkeypatch.setenv("GRAPH_ENRICHMENT_BUDGET", "30s")
+        config = deadline_config()
+        assert config.run == 900 and config.phases == {"enrichment": 30}
+
+
+class TestScopes:
+    def test_no_deadline_by_default(self):
+        assert time_left() is None
+        check_deadline(10_000)   # sin plazo nunca falla
+
+    def test_nested_scope_only_shortens(self):
+        with deadline_scope(10, "ejecución"):
+            with deadline_scope(60, "fase") as inner:
+                assert inner.label == "ejecución"
+                assert time_left() <= 10
+            with deadline_scope(1, "fase") as inner:
+                assert inner.label == "fase"
+        assert time_left() is None
+
+    def test_wait_that_does_not_fit_fails_immediately(self):
+        with deadline_scope(5, "ejecución"):
+            check_deadline(1)
+            with pytest.raises(DeadlineExceeded, match="no cabe"):
+                check_deadline(600, "pausa de throttling")
+
+    def test_same_phase_deadline_shared_across_blocks(self):
+        configure_deadlines(DeadlineConfig(phases={"enrichment": 5}))
+        phase = start_phase("enrichment")
+        assert start_phase("otra") is None
+        with within(phase):
+            first = time_left()
+        with within(phase):
+            assert time_left() <= first
+
+    async def test_run_within_deadline_cancels(self):
+        with deadline_scope(0.05, "fase"):
+            with pytest.raises(DeadlineExceeded, match="fase"):
+                await run_within_deadline(asyncio.sleep(5))
+
+    async def test_expired_deadline_does_not_start_coroutine(self):
+        started = []
+
+        async def _work():
+            started.append(True)
+
+        with within(Deadline(time.monotonic() - 1, "ejecución")):
+            with pytest.raises(DeadlineExceeded):
+                await run_within_deadline(_work())
+        assert not started
+
+
+class TestSendWithRetry:
+    async def test_long_retry_after_fails_fast(self):
+        calls = []
+
+        async def _send() -> httpx.Response:
+            calls.append(1)
+            return _resp(429, {"Retry-After": "600"})
+
+        started = time.monotonic()
+        with deadline_scope(5, "ejecución"):
+            with pytest.raises(DeadlineExceeded, match="no cabe"):
+                await send_with_retry(_send, "GET /users/x", idempotent=True, workload="users")
+        assert len(calls) == 1
+        assert time.monotonic() - started < 1
+
+    async def test_slow_attempt_cancelled_at_deadline(self):
+        async def _send() -> httpx.Response:
+            await asyncio.sleep(5)
+            return _resp(200)
+
+        with deadline_scope(0.05, "enrichment"):
+            with pytest.raises(DeadlineExceeded, match="enrichment"):
+                await send_with_retry(_send, "GET /planner/tasks/t1/details", idempotent=True, workload="planner")
+
+    def test_run_deadline_cancels_whole_run(self):
+        configure_deadlines(DeadlineConfig(run=0.05))
+        with pytest.raises(DeadlineExceeded, match="ejecución"):
+            run_with_graph_client(asyncio.sleep(5))
+
+
+class TestReportDegradation:
+    async def test_checklist_skipped_when_budget_runs_out(self, mock_auth, monkeypatch, capsys):
+        emulator = install_emulator(EmulatorConfig())
+        async with shared_graph_client() as client:
+            plan = await planner_import.create_plan(client, "tok", GROUP, "Plan plazo")
+            bucket = await planner_import.create_bucket(client, "tok", plan["id"], "Backlog")
+            for i in range(20):
+                await planner_import.graph_request(client, "POST", "/planner/tasks", "tok", json={
+                    "planId": plan["id"], "bucketId": bucket["id"], "title": f"T{i}",
+                })
+        emulator.config.latency = 0.05
+        configure_deadlines(DeadlineConfig(phases={"enrichment": 0.08}))
+        monkeypatch.setattr("builtins.input", lambda _: "todos")
+
+        await planner_import.run_report(GROUP, fetch_checklist=True)
+
+        out = capsys.readouterr().out
+        assert "[plazo] 'Plan plazo'" in out and "checklist" in out
+        assert "T19" in out          # la tabla se imprime igualmente
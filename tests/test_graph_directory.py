@@ -0,0 +1,111 @@
+"""Tests de graph_directory: caché persistente email ↔ GUID ↔ nombre con TTL."""
+from __future__ import annotations
+
+import os
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+import graph_directory
+import planner_import
+from graph_client import shared_graph_client
+from graph_directory import DirectoryCache, DirectoryConfig, configure_directory_cache, directory_cache
+from graph_emulator import EmulatorConfig, install_emulator
+from planner_import import (
+    resolve_email_to_guid,
+    resolve_emails_bulk,
+    resolve_guid_to_display_name,
+    resolve_guid_to_email,
+    resolve_guids_bulk,
+)
+
+
+@pytest.fixture
+def directory(tmp_path) -> DirectoryCache:
+    return configure_directory_cache(DirectoryConfig(enabled=True, path=tmp_path / "directory.sqlite"))
+
+
+def _new_run() -> None:
+    """Lo que se pierde al terminar el proceso: las cachés en memoria."""
+    planner_import._GUID_TO_EMAIL_CACHE.clear()
+    planner_import._GUID_TO_NAME_CACHE.clear()
+
+
+class TestDirectoryCache:
+    def test_roundtrip_negative_and_tenants(self, directory):
+        directory.put_many("t1", "guid", {"Ana@Contoso.com": "g-ana", "nadie@contoso.com": None})
+        assert directory.get("t1", "guid", "ana@contoso.com") == (True, "g-ana")
+        assert directory.get("t1", "guid", "nadie@contoso.com") == (True, None)
+        assert directory.get("t2", "guid", "ana@contoso.com") == (False, None)
+        assert directory.get("t1", "name", "ana@contoso.com") == (False, None)
+        assert os.stat(directory.config.path).st_mode & 0o777 == 0o600
+
+    def test_entries_expire(self, directory, monkeypatch):
+        directory.config.negative_ttl = 60
+        directory.put("t", "guid", "ana@contoso.com", "g-ana")
+        directory.put("t", "guid", "nadie@contoso.com", None)
+        later = time.time() + 3600
+        monkeypatch.setattr(graph_directory.time, "time", lambda: later)
+        assert directory.get("t", "guid", "ana@contoso.com") == (True, "g-ana")
+        assert directory.get("t", "guid", "nadie@contoso.com") == (False, None)
+
+    def test_disabled_by_default(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("GRAPH_DIRECTORY_CACHE_PATH", str(tmp_path / "d.sqlite"))
+        cache = directory_cache()
+        cache.put("t", "guid", "ana@contoso.com", "g-ana")
+        assert cache.get("t", "guid", "ana@contoso.com") == (False, None)
+        assert not (tmp_path / "d.sqlite").exists()
+
+    def test_ttl_from_env(self, monkeypatch):
+        monkeypatch.setenv("GRAPH_DIRECTORY_TTL", "24h")
+        monkeypatch.setenv("GRAPH_DIRECTORY_NEGATIVE_TTL", "30m")
+        config = DirectoryConfig.from_env()
+        assert (config.ttl, config.negative_ttl) == (86400, 1800)
+
+
+class TestResolversAcrossRuns:
+    async def test_second_run_makes_no_user_calls(self, directory, mock_auth):
+        emulator = install_emulator(EmulatorConfig())
+        ana = emulator.add_user("ana@contoso.com", "Ana Pérez")
+        async with shared_graph_client() as client:
+            assert await resolve_emails_bulk(client, "tok", ["ana@contoso.com", "sin-arroba"], {}) == {
+                "ana@contoso.com": ana["id"], "sin-arroba": None,
+            }
+            assert await resolve_guid_to_display_name(client, "tok", ana["id"]) == "Ana Pérez"
+            calls = emulator.requests
+
+            _new_run()
+            assert await resolve_email_to_guid(client, "tok", "ana@contoso.com", {}) == ana["id"]
+            assert await resolve_email_to_guid(client, "tok", "sin-arroba", {}) is None
+            assert await resolve_guid_to_email(client, "tok", ana["id"]) == "ana@contoso.com"
+            assert await resolve_guid_to_display_name(client, "tok", ana["id"]) == "Ana Pérez"
+        assert emulator.requests == calls
+        assert directory.hits == 4
+
+    async def test_get_by_ids_is_persisted(self, directory, mock_auth):
+        emulator = install_emulator(EmulatorConfig())
+        ana = emulator.add_user("ana@contoso.com", "Ana Pérez")
+        async with shared_graph_client() as client:
+            await resolve_guids_bulk(client, "tok", [ana["id"], "g-baja"])
+            _new_run()
+            await resolve_guids_bulk(client, "tok", [ana["id"], "g-baja"])
+            assert await resolve_guid_to_display_name(client, "tok", ana["id"]) == "Ana Pérez"
+            assert await resolve_guid_to_email(client, "tok", "g-baja") is None
+        assert emulator.requests == 1
+
+    async def test_transient_errors_are_not_persisted(self, directory, fake_token):
+        resp = MagicMock(spec=httpx.Response)
+        resp.status_code = 403
+        resp.headers = httpx.Headers({})
+        resp.raise_for_status.side_effect = httpx.HTTPStatusError("403", request=MagicMock(), response=resp)
+        client = MagicMock(spec=httpx.AsyncClient)
+        client.request = AsyncMock(return_value=resp)
+
+        assert await resolve_guid_to_email(client, fake_token, "g-1") is None
+        assert await resolve_email_to_guid(client, fake_token, "ana@contoso.com", {}) is None
+        assert directory.hits == 0 and directory.misses == 2
+        _new_run()
+        await resolve_guid_to_email(client, fake_token, "g-1")
+        assert directory.misses == 3
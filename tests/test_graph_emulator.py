@@ -0,0 +1,412 @@
+"""Tests de graph_emulator: semántica de Graph emulada y orquestadores contra el emulador."""
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+import planner_import
+from graph_auth import AsyncTokenProvider
+from graph_batch import BatchConfig, configure_batching
+from graph_client import shared_graph_client
+from graph_emulator import EMULATOR_TOKEN, EmulatorConfig, GraphEmulator, install_emulator
+from planner_import import (
+    GRAPH_BASE,
+    create_bucket,
+    create_plan,
+    create_task_full,
+    graph_request,
+    list_tasks,
+    run_email_report,
+    run_import_full,
+    run_sync,
+)
+
+GROUP = "198b4a0a-39c7-4521-a546-6a008e3a254a"
+
+
+def _task(title: str, **extra) -> dict:
+    return {
+        "title": title, "priority": 5, "percent_complete": 0, "start_date": None,
+        "due_date": None, "labels_raw": "", "description": "", "checklist_raw": "", **extra,
+    }
+
+
+@pytest.fixture
+def emulator() -> GraphEmulator:
+    return install_emulator(EmulatorConfig(page_size=3))
+
+
+class TestPlanner:
+    async def test_plan_bucket_task_roundtrip(self, emulator):
+        async with shared_graph_client() as client:
+            plan = await create_plan(client, "tok", GROUP, "Plan E")
+            bucket = await create_bucket(client, "tok", plan["id"], "B1")
+            task_id = await create_task_full(
+                client, "tok", plan["id"], bucket["id"],
+                _task("T1", description="hola", checklist_raw="a;b"), None,
+            )
+            details = await graph_request(client, "GET", f"/planner/tasks/{task_id}/details", "tok")
+        assert details["description"] == "hola"
+        assert len(details["checklist"]) == 2
+        assert emulator.tasks[task_id]["checklistItemCount"] == 2
+
+    async def test_pagination_follows_next_link(self, emulator):
+        async with shared_graph_client() as client:
+            plan = await create_plan(client, "tok", GROUP, "Plan P")
+            bucket = await create_bucket(client, "tok", plan["id"], "B")
+            for i in range(7):
+                await graph_request(client, "POST", "/planner/tasks", "tok",
+                                    json={"planId": plan["id"], "bucketId": bucket["id"], "title": f"T{i}"})
+            tasks = await list_tasks(client, "tok", plan["id"])
+        assert sorted(t["title"] for t in tasks) == [f"T{i}" for i in range(7)]
+
+    async def test_stale_if_match_is_412(self, emulator):
+        async with shared_graph_client() as client:
+            plan = await create_plan(client, "tok", GROUP, "Plan X")
+            details = await graph_request(client, "GET", f"/planner/plans/{plan['id']}/details", "tok")
+            etag = details["@odata.etag"]
+            await graph_request(client, "PATCH", f"/planner/plans/{plan['id']}/details", "tok",
+                                json={"categoryDescriptions": {"category1": "A"}}, etag=etag)
+            with pytest.raises(httpx.HTTPStatusError) as exc:
+                await graph_request(client, "PATCH", f"/planner/plans/{plan['id']}/details", "tok",
+                                    json={"categoryDescriptions": {"category2": "B"}}, etag=etag)
+        assert exc.value.response.status_code == 412
+
+    async def test_if_none_match_is_304(self, emulator):
+        async with shared_graph_client() as client:
+            plan = await create_plan(client, "tok", GROUP, "Plan C")
+            resp = await client.get(
+                f"{GRAPH_BASE}/planner/plans/{plan['id']}",
+                headers={"If-None-Match": plan["@odata.etag"]},
+            )
+        assert resp.status_code == 304
+
+    async def test_replication_lag_returns_404_until_visible(self):
+        now = [0.0]
+        emulator = GraphEmulator(EmulatorConfig(replication_lag=1.0), clock=lambda: now[0])
+        async with httpx.AsyncClient(transport=emulator.transport()) as client:
+            created = (await client.post(f"{GRAPH_BASE}/planner/plans", json={"owner": GROUP, "title": "R"})).json()
+            assert (await client.get(f"{GRAPH_BASE}/planner/plans/{created['id']}")).status_code == 404
+            now[0] = 1.5
+            assert (await client.get(f"{GRAPH_BASE}/planner/plans/{created['id']}")).status_code == 200
+
+
+class TestTeamsAndDrive:
+    async def test_duplicate_channel_is_409(self, emulator):
+        async with shared_graph_client() as client:
+            await graph_request(client, "POST", f"/teams/{GROUP}/channels", "tok", json={"displayName": "P1"})
+            with pytest.raises(httpx.HTTPStatusError) as exc:
+                await graph_request(client, "POST", f"/teams/{GROUP}/channels", "tok", json={"displayName": "P1"})
+        assert exc.value.response.status_code == 409
+
+    async def test_folder_conflict_and_upload(self, emulator):
+        async with shared_graph_client() as client:
+            site = await graph_request(client, "GET", "/sites/contoso.sharepoint.com:/sites/pm", "tok")
+            root = await graph_request(client, "GET", f"/sites/{site['id']}/drive/root", "tok")
+            body = {"name": "P1", "folder": {}, "@microsoft.graph.conflictBehavior": "fail"}
+            folder = await graph_request(client, "POST", f"/sites/{site['id']}/drive/items/{root['id']}/children",
+                                         "tok", json=body)
+            with pytest.raises(httpx.HTTPStatusError) as exc:
+                await graph_request(client, "POST", f"/sites/{site['id']}/drive/items/{root['id']}/children",
+                                    "tok", json=body)
+            uploaded = await client.put(
+                f"{GRAPH_BASE}/sites/{site['id']}/drive/items/{folder['id']}:/ficha.docx:/content",
+                content=b"PK\x03\x04", headers={"Content-Type": "application/octet-stream"},
+            )
+            found = await graph_request(client, "GET", f"/sites/{site['id']}/drive/root:/P1", "tok")
+        assert exc.value.response.status_code == 409
+        assert uploaded.status_code == 201 and uploaded.json()["size"] == 4
+        assert found["id"] == folder["id"]
+
+
+class TestThrottling:
+    async def test_rate_limit_429_with_retry_after(self):
+        now = [0.0]
+        emulator = GraphEmulator(EmulatorConfig(rates={"users": 2}), clock=lambda: now[0])
+        async with httpx.AsyncClient(transport=emulator.transport()) as client:
+            statuses = [(await client.get(f"{GRAPH_BASE}/users/a@x.com")).status_code for _ in range(2)]
+            limited = await client.get(f"{GRAPH_BASE}/users/a@x.com")
+            other = await client.get(f"{GRAPH_BASE}/planner/plans/none")
+        assert statuses == [200, 200]
+        assert limited.status_code == 429 and limited.headers["Retry-After"] == "1"
+        assert other.status_code == 404            # el cupo es por servicio
+        assert emulator.throttled == 1
+
+    async def test_client_retries_through_injected_429(self):
+        install_emulator(EmulatorConfig(inject_429=0.5, seed=3))
+        with patch("graph_client.asyncio.sleep", new_callable=AsyncMock):
+            async with shared_graph_client() as client:
+                results = await asyncio.gather(*[
+                    graph_request(client, "GET", f"/users/u{i}@x.com", "tok") for i in range(10)
+                ])
+        assert all(r["mail"] == f"u{i}@x.com" for i, r in enumerate(results))
+
+
+class TestBatchAndAsgi:
+    async def test_batch_items_dispatched(self, emulator):
+        configure_batching(BatchConfig(enabled=True, window=0.01))
+        async with shared_graph_client() as client:
+            users = await asyncio.gather(*[
+                graph_request(client, "GET", f"/users/b{i}@x.com?$select=id", "tok") for i in range(5)
+            ])
+        assert all(set(u) == {"id"} for u in users)
+
+    async def test_asgi_app(self):
+        emulator = GraphEmulator()
+        transport = httpx.ASGITransport(app=emulator.asgi)
+        async with httpx.AsyncClient(transport=transport, base_url="http://127.0.0.1:8765") as client:
+            resp = await client.post("/v1.0/planner/plans", json={"owner": GROUP, "title": "A"})
+        assert resp.status_code == 201
+        assert resp.json()["title"] == "A"
+
+
+class TestOrchestrators:
+    async def test_run_import_full_against_emulator(self, fixture_full_csv, mock_auth, monkeypatch):
+        emulator = install_emulator(EmulatorConfig())
+        monkeypatch.setattr(planner_import, "LABEL_MAP", {})
+        result = await run_import_full(fixture_full_csv, GROUP, dry_run=False)
+        assert not result.errors
+        assert len(emulator.plans) == 1
+        assert len(emulator.tasks) == len(result.task_ids) > 0
+        mock_auth.get_token.assert_not_called()
+
+    async def test_assignees_resolved_before_first_write(self, tmp_path, mock_auth, capsys):
+        emulator = install_emulator(EmulatorConfig())
+        csv_path = tmp_path / "plan.csv"
+        csv_path.write_text(
+            "PlanName;BucketName;TaskTitle;TaskDescription;AssignedToEmail;StartDate;DueDate;Priority;PercentComplete;ChecklistItems;Labels\n"
+            + "".join(f"Plan;B;T{i};;{email};;;medium;0;;\n" for i, email in enumerate(
+                ["ana@contoso.com", "luis@contoso.com", "sin-arroba", "ana@contoso.com"]
+            )),
+            encoding="utf-8",
+        )
+        paths: list[str] = []
+        dispatch = emulator.dispatch
+        emulator.dispatch = lambda req: paths.append(f"{req.method} {req.path}") or dispatch(req)
+
+        result = await run_import_full(csv_path, GROUP)
+
+        assert [p for p in paths if "/users" in p] == ["GET /users"]
+        assert paths.index("GET /users") < paths.index("POST /planner/plans")
+        assert result.guids_resolved == 3 and result.guids_failed == ["sin-arroba"]
+        out = capsys.readouterr().out
+        assert out.index("- sin-arroba") < out.index("[1/4]")
+
+    async def test_multi_plan_csv_imports_each_plan_concurrently(self, tmp_path, mock_auth):
+        emulator = install_emulator(EmulatorConfig(latency=0.002))
+        csv_path = tmp_path / "cartera.csv"
+        rows = [
+            f"{plan};{bucket};T{i};;{email};;;medium;0;;{labels}\n"
+            for plan, labels, email in [("Plan A", '"TI;PM"', "ana@contoso.com"), ("Plan B", "PM", "luis@contoso.com")]
+            for i, bucket in enumerate(["Inicio", "Inicio", "Cierre"])
+        ]
+        csv_path.write_text(
+            "PlanName;BucketName;TaskTitle;TaskDescription;AssignedToEmail;StartDate;DueDate;Priority;PercentComplete;ChecklistItems;Labels\n"
+            + "".join(rows[0::3] + rows[1::3] + rows[2::3]),     # filas de los dos planes mezcladas
+            encoding="utf-8",
+        )
+        paths: list[str] = []
+        dispatch = emulator.dispatch
+        emulator.dispatch = lambda req: paths.append(f"{req.method} {req.path}") or dispatch(req)
+
+        result = await run_import_full(csv_path, GROUP)
+
+        assert not result.errors and len(result.task_ids) == 6
+        assert [p for p in paths if "/users" in p] == ["GET /users"]
+        assert paths.count("POST /planner/plans") == 2
+        # El segundo plan se crea antes de que el primero termine sus tareas
+        assert paths.index("POST /planner/plans", paths.index("POST /planner/plans") + 1) < paths.index("POST /planner/tasks")
+        titles = {plan["id"]: plan["title"] for plan in emulator.plans.values()}
+        assert result.plans == {title: plan_id for plan_id, title in titles.items()}
+        assert set(result.bucket_ids) == {"Plan A/Inicio", "Plan A/Cierre", "Plan B/Inicio", "Plan B/Cierre"}
+        by_plan: dict[str, list[dict]] = {}
+        for task in emulator.tasks.values():
+            by_plan.setdefault(titles[task["planId"]], []).append(task)
+        assert sorted(t["title"] for t in by_plan["Plan A"]) == ["T0", "T1", "T2"]
+        # "PM" es category2 en el plan A y category1 en el B
+        assert {tuple(t["appliedCategories"]) for t in by_plan["Plan A"]} == {("category1", "category2")}
+        assert {tuple(t["appliedCategories"]) for t in by_plan["Plan B"]} == {("category1",)}
+        descriptions = {titles[pid]: d["categoryDescriptions"] for pid, d in emulator.plan_details.items()}
+        assert descriptions["Plan B"] == {"category1": "PM"}
+
+    async def test_failing_plan_does_not_stop_the_others(self, tmp_path, mock_auth):
+        emulator = install_emulator(EmulatorConfig())
+        csv_path = tmp_path / "cartera.csv"
+        csv_path.write_text(
+            "PlanName;BucketName;TaskTitle;TaskDescription;AssignedToEmail;StartDate;DueDate;Priority;PercentComplete;ChecklistItems;Labels\n"
+            + "".join(f"Plan {p};B;T{i};;;;;medium;0;;\n" for p in "AB" for i in range(3)),
+            encoding="utf-8",
+        )
+        real = planner_import.create_plan
+
+        async def _create_plan(client, token, group_id, title):
+            if title == "Plan A":
+                raise RuntimeError("Máximo de reintentos para POST /planner/plans")
+            return await real(client, token, group_id, title)
+
+        with patch("planner_import.create_plan", side_effect=_create_plan), \
+             patch.object(planner_import.OperationJournal, "close", autospec=True) as close:
+            result = await run_import_full(csv_path, GROUP)
+
+        assert result.errors == ["Plan 'Plan A': Máximo de reintentos para POST /planner/plans"]
+        assert [p["title"] for p in emulator.plans.values()] == ["Plan B"]
+        assert len(result.task_ids) == len(emulator.tasks) == 3
+        close.assert_called_once()
+
+    async def test_email_report_resolves_assignees_in_one_call(self, tmp_path, mock_auth, monkeypatch):
+        emulator = install_emulator(EmulatorConfig())
+        csv_path = tmp_path / "plan.csv"
+        csv_path.write_text(
+            "PlanName;BucketName;TaskTitle;TaskDescription;AssignedToEmail;StartDate;DueDate;Priority;PercentComplete;ChecklistItems;Labels\n"
+            + "".join(f"Plan;B;T{i};;{email};;;medium;0;;\n" for i, email in enumerate(
+                ["ana@contoso.com", "luis@contoso.com", "ana@contoso.com"]
+            )),
+            encoding="utf-8",
+        )
+        await run_import_full(csv_path, GROUP)
+        planner_import._GUID_TO_EMAIL_CACHE.clear()
+        paths: list[str] = []
+        dispatch = emulator.dispatch
+        emulator.dispatch = lambda req: paths.append(f"{req.method} {req.path}") or dispatch(req)
+        monkeypatch.setattr("builtins.input", lambda _: "todos")
+
+        await run_email_report(GROUP)
+
+        assert [p for p in paths if "/users" in p or "/directoryObjects" in p] == ["POST /directoryObjects/getByIds"]
+        recipients = [r["emailAddress"]["address"] for r in emulator.sent_mail[0]["message"]["toRecipients"]]
+        assert sorted(recipients) == ["ana@contoso.com", "luis@contoso.com"]
+
+    def test_token_provider_offline(self):
+        install_emulator(EmulatorConfig())
+        provider = AsyncTokenProvider.from_auth_manager(object())
+        assert asyncio.run(provider.get()) == EMULATOR_TOKEN
+
+
+class TestSyncMode:
+    ROWS = [
+        ("Backlog", "Tarea A", "Desc A", "01022026", "medium", "0", "Paso 1;Paso 2", "TI"),
+        ("Backlog", "Tarea B", "", "05022026", "urgent", "50", "", "PM"),
+        ("Hecho", "Tarea C", "Desc C", "", "low", "100", "", ""),
+    ]
+
+    @staticmethod
+    def _write(path, rows):
+        header = "PlanName;BucketName;TaskTitle;TaskDescription;AssignedToEmail;StartDate;DueDate;Priority;PercentComplete;ChecklistItems;Labels"
+        lines = [header] + [
+            f'Plan Sync;{b};{t};{d};ana@contoso.com;01012026;{due};{p};{pc};"{cl}";{lb}'
+            for b, t, d, due, p, pc, cl, lb in rows
+        ]
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return path
+
+    @staticmethod
+    def _writes(emulator):
+        """Registra método y ruta de cada escritura que recibe el emulador."""
+        seen: list[tuple[str, str]] = []
+        dispatch = emulator.dispatch
+
+        def _dispatch(req):
+            if req.method != "GET":
+                seen.append((req.method, req.path))
+            return dispatch(req)
+
+        emulator.dispatch = _dispatch
+        return seen
+
+    async def _imported(self, tmp_path):
+        emulator = install_emulator(EmulatorConfig(page_size=2))
+        csv_path = self._write(tmp_path / "plan.csv", self.ROWS)
+        await run_import_full(csv_path, GROUP)
+        return emulator, csv_path
+
+    async def test_unchanged_csv_only_reads(self, tmp_path, mock_auth):
+        emulator, csv_path = await self._imported(tmp_path)
+        writes = self._writes(emulator)
+
+        result = await run_sync(csv_path, GROUP)
+
+        assert writes == []
+        assert result.tasks_unchanged == 3 and not result.errors
+
+    async def test_only_changed_rows_are_written(self, tmp_path, mock_auth, monkeypatch):
+        emulator, csv_path = await self._imported(tmp_path)
+        rows = list(self.ROWS)
+        rows[0] = ("Backlog", "Tarea A", "Desc A", "15022026", "medium", "0", "Paso 1;Paso 2", "TI")
+        rows[2] = ("Backlog", "Tarea D", "", "", "low", "0", "", "")      # C fuera, D nueva
+        self._write(csv_path, rows)
+        monkeypatch.setattr("builtins.input", lambda _: "s")
+        writes = self._writes(emulator)
+
+        result = await run_sync(csv_path, GROUP)
+
+        assert sorted(m for m, _ in writes) == ["DELETE", "PATCH", "POST"]
+        assert (result.tasks_updated, result.tasks_deleted, len(result.task_ids)) == (1, 1, 1)
+        by_title = {t["title"]: t for t in emulator.tasks.values()}
+        assert sorted(by_title) == ["Tarea A", "Tarea B", "Tarea D"]
+        assert by_title["Tarea A"]["dueDateTime"] == "2026-02-15T00:00:00Z"
+
+    async def test_bucket_move_and_checklist_keep_state(self, tmp_path, mock_auth):
+        emulator, csv_path = await self._imported(tmp_path)
+        task_id = next(t for t, v in emulator.tasks.items() if v["title"] == "Tarea A")
+        checklist = emulator.task_details[task_id]["checklist"]
+        first = next(i for i, item in checklist.items() if item["title"] == "Paso 1")
+        checklist[first]["isChecked"] = True
+        rows = list(self.ROWS)
+        rows[0] = ("Hecho", "Tarea A", "Desc A", "01022026", "medium", "0", "Paso 1;Paso 3", "TI")
+        self._write(csv_path, rows)
+        writes = self._writes(emulator)
+
+        result = await run_sync(csv_path, GROUP)
+
+        assert writes == [("PATCH", f"/planner/tasks/{task_id}"), ("PATCH", f"/planner/tasks/{task_id}/details")]
+        assert result.tasks_updated == 1 and not result.task_ids
+        hecho = next(b for b, v in emulator.buckets.items() if v["name"] == "Hecho")
+        assert emulator.tasks[task_id]["bucketId"] == hecho
+        items = {item["title"]: item["isChecked"] for item in emulator.task_details[task_id]["checklist"].values()}
+        assert items == {"Paso 1": True, "Paso 3": False}
+
+    async def test_move_to_new_bucket_uses_created_id(self, tmp_path, mock_auth):
+        emulator, csv_path = await self._imported(tmp_path)
+        task_id = next(t for t, v in emulator.tasks.items() if v["title"] == "Tarea A")
+        rows = list(self.ROWS)
+        rows[0] = ("Nuevo", *self.ROWS[0][1:])
+        self._write(csv_path, rows)
+
+        result = await run_sync(csv_path, GROUP)
+
+        assert not result.errors and result.tasks_updated == 1
+        nuevo = next(b for b, v in emulator.buckets.items() if v["name"] == "Nuevo")
+        assert emulator.tasks[task_id]["bucketId"] == nuevo == result.bucket_ids["Nuevo"]
+
+    async def test_dry_run_and_declined_deletes_write_nothing(self, tmp_path, mock_auth, monkeypatch, capsys):
+        emulator, csv_path = await self._imported(tmp_path)
+        self._write(csv_path, self.ROWS[:2])
+        writes = self._writes(emulator)
+
+        result = await run_sync(csv_path, GROUP, dry_run=True)
+        assert result.dry_run and "- Tarea C" in capsys.readouterr().out
+
+        monkeypatch.setattr("builtins.input", lambda _: "n")
+        result = await run_sync(csv_path, GROUP)
+        assert writes == [] and result.tasks_deleted == 0
+        assert len(emulator.tasks) == 3
+
+    async def test_multi_plan_csv_is_rejected(self, tmp_path, mock_auth):
+        emulator, csv_path = await self._imported(tmp_path)
+        csv_path.write_text(
+            csv_path.read_text(encoding="utf-8")
+            + "Otro Plan;Backlog;Tarea X;;;01012026;;medium;0;;\n",
+            encoding="utf-8",
+        )
+        writes = self._writes(emulator)
+        with pytest.raises(ValueError, match="un solo plan"):
+            await run_sync(csv_path, GROUP)
+        assert writes == []
+
+    async def test_missing_plan_points_to_full_mode(self, tmp_path, mock_auth):
+        install_emulator(EmulatorConfig())
+        with pytest.raises(ValueError, match="--mode full"):
+            await run_sync(self._write(tmp_path / "plan.csv", self.ROWS), GROUP)
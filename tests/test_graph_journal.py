@@ -0,0 +1,182 @@
+"""Tests de graph_journal: diario de operaciones y reanudación de importaciones y entornos."""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+import create_environment
+import planner_import
+from graph_deadline import DeadlineExceeded
+from graph_emulator import EmulatorConfig, install_emulator
+from graph_journal import (
+    JournalConfig,
+    JournalMismatch,
+    OperationJournal,
+    configure_journal,
+    open_journal,
+    resume_hint,
+)
+from planner_import import run_import_full
+
+GROUP = "198b4a0a-39c7-4521-a546-6a008e3a254a"
+HEADER = "PlanName;BucketName;TaskTitle;TaskDescription;AssignedToEmail;StartDate;DueDate;Priority;PercentComplete;ChecklistItems;Labels"
+
+
+def _plan_csv(path: Path, rows: int = 10) -> Path:
+    lines = [HEADER] + [
+        f"Plan Diario;Bucket {i % 2};Tarea {i:02d};Desc {i};u{i % 3}@contoso.com;01022026;28022026;medium;0;;"
+        for i in range(1, rows + 1)
+    ]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def _crash_after(n: int, *, after_post: bool):
+    """create_task_full que corta la ejecución en la llamada n (antes o después del POST)."""
+    real = planner_import.create_task_full
+    calls = 0
+
+    async def _create(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        if calls == n and not after_post:
+            raise DeadlineExceeded("Plazo de ejecución agotado")
+        task_id = await real(*args, **kwargs)
+        if calls == n:
+            raise DeadlineExceeded("Plazo de ejecución agotado")
+        return task_id
+
+    return _create
+
+
+class TestOperationJournal:
+    def test_roundtrip_and_torn_last_line(self, tmp_path):
+        csv_path = _plan_csv(tmp_path / "plan.csv")
+        journal = OperationJournal(tmp_path / "j.jsonl")
+        journal.start_run("full", csv_path)
+        journal.planned("plan")
+        journal.done("plan", {"id": "p1"})
+        journal.planned("task:1")
+        journal.close()
+        with (tmp_path / "j.jsonl").open("a", encoding="utf-8") as fh:
+            fh.write('{"type": "done", "op": "task:1", "resu')   # corte a mitad de línea
+
+        reloaded = OperationJournal(tmp_path / "j.jsonl")
+        assert reloaded.result("plan") == {"id": "p1"}
+        assert reloaded.result("task:1") is None and reloaded.uncertain("task:1")
+        assert reloaded.uncertain_ops("task:") == ["task:1"]
+
+    def test_resume_with_other_csv_is_rejected(self, tmp_path):
+        csv_path = _plan_csv(tmp_path / "plan.csv")
+        journal = open_journal("full", csv_path)
+        journal.close()
+        _plan_csv(csv_path, rows=11)
+        configure_journal(JournalConfig(resume=journal.path))
+        with pytest.raises(JournalMismatch, match="CSV modificado"):
+            open_journal("full", csv_path)
+
+    def test_disabled_writes_nothing(self, tmp_path):
+        configure_journal(JournalConfig(enabled=False, directory=tmp_path / "journals"))
+        journal = open_journal("full", _plan_csv(tmp_path / "plan.csv"))
+        journal.done("plan", {"id": "p1"})
+        assert journal.path is None and not (tmp_path / "journals").exists()
+        assert resume_hint() == ""
+
+    async def test_step_runs_create_once_and_adopts_unfinished(self, tmp_path):
+        path = tmp_path / "j.jsonl"
+        journal = OperationJournal(path)
+        create = AsyncMock(return_value={"id": "b1", "name": "B"})
+        assert (await journal.step("bucket:B", create))["id"] == "b1"
+        assert (await journal.step("bucket:B", create))["id"] == "b1"
+        assert create.await_count == 1
+
+        journal.planned("bucket:C")
+        journal.close()
+        resumed = OperationJournal(path)
+        find = AsyncMock(return_value={"id": "c1", "name": "C"})
+        create_c = AsyncMock()
+        assert (await resumed.step("bucket:C", create_c, find=find))["id"] == "c1"
+        create_c.assert_not_awaited()
+        lines = [json.loads(ln) for ln in path.read_text(encoding="utf-8").splitlines()]
+        assert lines[-1] == {"type": "done", "op": "bucket:C", "result": {"id": "c1"}, "t": lines[-1]["t"]}
+
+
+class TestResumeImport:
+    @pytest.mark.parametrize("after_post", [False, True])
+    async def test_resume_finishes_without_duplicates(self, tmp_path, mock_auth, capsys, after_post):
+        emulator = install_emulator(EmulatorConfig())
+        csv_path = _plan_csv(tmp_path / "plan.csv")
+
+        with patch("planner_import.create_task_full", side_effect=_crash_after(4, after_post=after_post)):
+            with pytest.raises(DeadlineExceeded):
+                await run_import_full(csv_path, GROUP, workers=1)
+        assert "--resume" in resume_hint()
+        journal_path = next((tmp_path / "journals").glob("*-full-plan.jsonl"))
+        assert len(emulator.tasks) == (4 if after_post else 3)
+
+        configure_journal(JournalConfig(resume=journal_path))
+        result = await run_import_full(csv_path, GROUP)
+
+        assert not result.errors
+        assert len(emulator.plans) == 1 and len(emulator.buckets) == 2
+        titles = sorted(t["title"] for t in emulator.tasks.values())
+        assert titles == [f"Tarea {i:02d}" for i in range(1, 11)]
+        assert result.tasks_resumed == (4 if after_post else 3)
+        assert len(result.task_ids) == 10
+        out = capsys.readouterr().out
+        assert "[01/10] = Tarea 01 (ya creada)" in out
+        if after_post:
+            assert "1 tareas a medias ya existían" in out
+
+
+    async def test_resume_multi_plan_csv(self, tmp_path, mock_auth):
+        emulator = install_emulator(EmulatorConfig())
+        csv_path = _plan_csv(tmp_path / "cartera.csv", rows=8)
+        text = csv_path.read_text(encoding="utf-8").splitlines()
+        text[5:] = [line.replace("Plan Diario", "Plan Semanal") for line in text[5:]]
+        csv_path.write_text("\n".join(text) + "\n", encoding="utf-8")
+
+        with patch("planner_import.create_task_full", side_effect=_crash_after(5, after_post=True)):
+            with pytest.raises(DeadlineExceeded):
+                await run_import_full(csv_path, GROUP, workers=1)
+        journal_path = next((tmp_path / "journals").glob("*-full-cartera.jsonl"))
+        ops = {json.loads(ln).get("op") for ln in journal_path.read_text(encoding="utf-8").splitlines()}
+        assert {"Plan Diario/plan", "Plan Semanal/plan"} <= ops
+
+        configure_journal(JournalConfig(resume=journal_path))
+        result = await run_import_full(csv_path, GROUP)
+
+        assert not result.errors and len(result.task_ids) == 8
+        assert sorted(p["title"] for p in emulator.plans.values()) == ["Plan Diario", "Plan Semanal"]
+        assert sorted(t["title"] for t in emulator.tasks.values()) == [f"Tarea {i:02d}" for i in range(1, 9)]
+
+
+class TestResumeEnvironment:
+    async def test_completed_steps_are_skipped(self, tmp_path, mock_auth, monkeypatch):
+        emulator = install_emulator(EmulatorConfig())
+        plan_csv = _plan_csv(tmp_path / "plan.csv", rows=4)
+        projects = tmp_path / "proyectos.csv"
+        projects.write_text(
+            "ProjectID;ProjectName;PMEmail;LiderEmail;StartDate;PlannerCSV\n"
+            f"PRJ-J-001;Proyecto Diario;pm@contoso.com;lider@contoso.com;01-03-2026;{plan_csv}\n",
+            encoding="utf-8",
+        )
+        monkeypatch.setattr(create_environment, "PROJECT_CONFIG_PATH", tmp_path / "project_config.json")
+        monkeypatch.setattr(create_environment, "CHANNEL_PROPAGATION_WAIT", 0.0)
+
+        with patch("create_environment.upload_file", AsyncMock(side_effect=DeadlineExceeded("Plazo"))):
+            with pytest.raises(DeadlineExceeded):
+                await create_environment.run_create_environment(projects, GROUP)
+        journal_path = next((tmp_path / "journals").glob("*-environment-proyectos.jsonl"))
+
+        configure_journal(JournalConfig(resume=journal_path))
+        create_channel = AsyncMock(side_effect=AssertionError("canal ya creado"))
+        with patch("create_environment.create_team_channel", create_channel):
+            config = await create_environment.run_create_environment(projects, GROUP)
+
+        assert len(emulator.plans) == 1 and len(emulator.tasks) == 4
+        entry = config["PRJ-J-001"]
+        assert entry["task_count"] == 4 and entry["folder_id"] and len(entry["subfolder_ids"]) == 5
@@ -0,0 +1,144 @@
+"""Tests de graph_metrics: plantillas de endpoint, registro por intento y exportación."""
+from __future__ import annotations
+
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from graph_client import RetryPolicy, configure_retry, send_with_retry
+from graph_metrics import (
+    MetricsRegistry,
+    configure_metrics,
+    graph_metrics,
+    normalize_endpoint,
+    report_metrics,
+)
+from planner_import import graph_request
+
+
+def _resp(status: int, body: bytes = b"", headers: dict | None = None) -> httpx.Response:
+    return httpx.Response(
+        status, content=body, headers=headers or {},
+        request=httpx.Request("POST", "https://graph/x", content=b"12345"),
+    )
+
+
+# ── normalize_endpoint ────────────────────────────────────────────────────────
+
+class TestNormalizeEndpoint:
+    @pytest.mark.parametrize("endpoint,expected", [
+        ("/planner/tasks/AbC-dEf_123456789012345678/details", "/planner/tasks/{id}/details"),
+        ("/planner/plans/U_9Ox1FJ10misOuS7zgrJmUADhvP/buckets", "/planner/plans/{id}/buckets"),
+        ("/groups/198b4a0a-39c7-4521-a546-6a008e3a254a/planner/plans",
+         "/groups/{id}/planner/plans"),
+        ("/users/ana@contoso.com?$select=id", "/users/{id}"),
+        ("/me/sendMail", "/me/sendMail"),
+        ("/$batch", "/$batch"),
+        ("/sites/contoso.sharepoint.com,abc,def/drive/root:/Proyectos/x.docx:/content",
+         "/sites/{id}/drive/root:{path}:/content"),
+        ("/drives/b!xyz/root:/_AYUDA_PM", "/drives/{id}/root:{path}"),
+    ])
+    def test_templates(self, endpoint, expected):
+        assert normalize_endpoint(endpoint) == expected
+
+
+# ── MetricsRegistry ───────────────────────────────────────────────────────────
+
+class TestMetricsRegistry:
+    def test_same_template_aggregates(self):
+        m = MetricsRegistry()
+        m.record_call("GET /planner/tasks/AAAAAAAAAAAAAAAAAAAAAAAAAAAA/details")
+        m.record_call("GET /planner/tasks/BBBBBBBBBBBBBBBBBBBBBBBBBBBB/details")
+        assert list(m.endpoints) == ["GET /planner/tasks/{id}/details"]
+        assert m.endpoints["GET /planner/tasks/{id}/details"].calls == 2
+
+    def test_histogram_and_quantiles(self):
+        m = MetricsRegistry()
+        for latency in (0.01, 0.02, 0.03, 0.2, 3.0):
+            m.record_attempt("GET /me", 200, latency)
+        s = m.endpoints["GET /me"]
+        assert sum(s.latency_buckets) == 5
+        assert s.latency_quantile(0.5) == 0.05
+        assert s.latency_quantile(0.95) == 3.0
+        assert s.latency_max == 3.0
+
+    def test_json_export(self, tmp_path):
+        m = MetricsRegistry()
+        m.record_call("GET /me")
+        m.record_attempt("GET /me", 429, 0.1, bytes_in=10)
+        m.record_retry("GET /me", 2.0)
+        path = tmp_path / "m.json"
+        m.write(path)
+        data = json.loads(path.read_text(encoding="utf-8"))
+        assert data["GET /me"]["statuses"] == {"429": 1}
+        assert data["GET /me"]["retry_wait"] == 2.0
+        assert data["GET /me"]["bytes_in"] == 10
+
+    def test_prometheus_export(self, tmp_path):
+        m = MetricsRegistry()
+        m.record_call("GET /me")
+        m.record_attempt("GET /me", 200, 0.3)
+        path = tmp_path / "m.prom"
+        m.write(path)
+        text = path.read_text(encoding="utf-8")
+        assert 'graph_calls_total{method="GET",endpoint="/me"} 1' in text
+        assert 'graph_request_duration_seconds_bucket{method="GET",endpoint="/me",le="0.25"} 0' in text
+        assert 'graph_request_duration_seconds_bucket{method="GET",endpoint="/me",le="0.5"} 1' in text
+        assert 'graph_request_duration_seconds_bucket{method="GET",endpoint="/me",le="+Inf"} 1' in text
+
+
+# ── Instrumentación de send_with_retry / graph_request ───────────────────────
+
+class TestInstrumentation:
+    async def test_attempts_bytes_and_retry_wait(self):
+        send = AsyncMock(side_effect=[
+            _resp(429, headers={"Retry-After": "3"}),
+            _resp(200, body=b'{"ok": 1}'),
+        ])
+        with patch("graph_client.asyncio.sleep", new_callable=AsyncMock):
+            resp = await send_with_retry(send, "POST /planner/tasks", idempotent=False, workload="planner")
+        assert resp.status_code == 200
+        s = graph_metrics().endpoints["POST /planner/tasks"]
+        assert (s.calls, s.attempts, s.retries) == (1, 2, 1)
+        assert s.statuses == {429: 1, 200: 1}
+        assert s.retry_wait == pytest.approx(3.0)
+        assert s.bytes_out == 10
+        assert s.bytes_in == len(b'{"ok": 1}')
+
+    async def test_network_error_counted_by_name(self):
+        configure_retry(RetryPolicy(max_attempts=2, base_delay=0.0, max_delay=0.0))
+        send = AsyncMock(side_effect=[httpx.ReadTimeout("lento"), _resp(200)])
+        await send_with_retry(send, "GET /me", idempotent=True)
+        assert graph_metrics().endpoints["GET /me"].statuses == {"ReadTimeout": 1, 200: 1}
+
+    async def test_graph_request_records_template(self):
+        client = MagicMock(spec=httpx.AsyncClient)
+        client.request = AsyncMock(return_value=httpx.Response(
+            200, json={"id": "x"}, request=httpx.Request("GET", "https://x"),
+        ))
+        await graph_request(client, "GET", "/planner/plans/U_9Ox1FJ10misOuS7zgrJmUADhvP", "tok")
+        assert "GET /planner/plans/{id}" in graph_metrics().endpoints
+
+
+class TestReportMetrics:
+    def test_silent_without_calls(self, capsys):
+        report_metrics()
+        assert capsys.readouterr().out == ""
+
+    def test_prints_summary_and_writes_file(self, tmp_path, capsys):
+        graph_metrics().record_call("GET /me")
+        graph_metrics().record_attempt("GET /me", 200, 0.1)
+        configure_metrics(tmp_path / "out.json")
+        report_metrics()
+        out = capsys.readouterr().out
+        assert "Métricas Graph: 1 llamadas" in out
+        assert "GET /me" in out
+        assert (tmp_path / "out.json").exists()
+
+    def test_env_output(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("GRAPH_METRICS_FILE", str(tmp_path / "env.prom"))
+        graph_metrics().record_call("GET /me")
+        report_metrics()
+        assert "graph_calls_total" in (tmp_path / "env.prom").read_text(encoding="utf-8")
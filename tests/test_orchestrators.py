@@ -1,12 +1,16 @@
-"""Tests de orquestadores: run_list, run_delete, run_import_* — dry_run sin API."""
+"""Tests de orquestadores: run_list, run_delete, run_import_* — dry_run sin API; create_tasks_pipeline."""
 from __future__ import annotations
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
 import planner_import
+from graph_deadline import DeadlineExceeded
 from planner_import import (
+    ImportResult,
+    create_tasks_pipeline,
     run_delete,
     run_import_buckets,
     run_import_full,
@@ -267,3 +271,77 @@ class TestRunImportTasksDryRun:
 
         out = capsys.readouterr().out
         assert "aaa11111-0000-0000-0000-000000000001" in out
+
+
+# ── create_tasks_pipeline ─────────────────────────────────────────────────────
+
+def _pipeline_task(title: str, email: str = "") -> dict:
+    return {"title": title, "assignee_email": email, "plan_id": "plan-1", "bucket_id": "bucket-1"}
+
+
+class TestCreateTasksPipeline:
+    async def test_overlaps_tasks_and_keeps_csv_order(self, capsys):
+        tasks = [_pipeline_task(f"T{i}") for i in range(1, 9)]
+        in_flight, peak = 0, 0
+
+        async def fake_create(client, token, plan_id, bucket_id, task, guid):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            # las primeras tardan más: terminan desordenadas
+            await asyncio.sleep(0.01 * (9 - int(task["title"][1:])))
+            in_flight -= 1
+            return f"id-{task['title']}"
+
+        result = ImportResult()
+        with patch("planner_import.create_task_full", side_effect=fake_create):
+            await create_tasks_pipeline(
+                MagicMock(), "tok", tasks, result, lambda t: (t["plan_id"], t["bucket_id"]), workers=3,
+            )
+
+        assert peak == 3
+        assert result.task_ids == [f"id-T{i}" for i in range(1, 9)]
+        lines = [ln.strip() for ln in capsys.readouterr().out.splitlines()]
+        assert lines == [f"[{i:02d}/8] ✓ T{i}" for i in range(1, 9)]
+        assert result.tasks_unassigned == 8
+
+    async def test_error_in_one_task_does_not_stop_the_rest(self):
+        tasks = [_pipeline_task("Buena", "a@x.com"), _pipeline_task("Mala", "b@x.com"), _pipeline_task("Otra")]
+
+        async def fake_create(client, token, plan_id, bucket_id, task, guid):
+            if task["title"] == "Mala":
+                raise RuntimeError("400 Bad Request")
+            return f"id-{task['title']}"
+
+        async def fake_resolve(client, token, email, cache):
+            return None if email == "b@x.com" else "guid-a"
+
+        result = ImportResult()
+        with (
+            patch("planner_import.create_task_full", side_effect=fake_create),
+            patch("planner_import.resolve_email_to_guid", side_effect=fake_resolve),
+        ):
+            await create_tasks_pipeline(MagicMock(), "tok", tasks, result, lambda t: ("p", "b"))
+
+        assert result.task_ids == ["id-Buena", "id-Otra"]
+        assert result.errors == ["[02/3] ✗ 'Mala': 400 Bad Request"]
+        assert result.guids_resolved == 1 and result.guids_failed == ["b@x.com"]
+        assert result.tasks_unassigned == 1
+
+    async def test_deadline_cancels_pending_workers(self):
+        tasks = [_pipeline_task(f"T{i}") for i in range(1, 6)]
+        started = []
+
+        async def fake_create(client, token, plan_id, bucket_id, task, guid):
+            started.append(task["title"])
+            if task["title"] == "T1":
+                raise DeadlineExceeded("Plazo de ejecución agotado")
+            await asyncio.sleep(5)
+            return "id"
+
+        with patch("planner_import.create_task_full", side_effect=fake_create):
+            with pytest.raises(DeadlineExceeded):
+                await create_tasks_pipeline(
+                    MagicMock(), "tok", tasks, ImportResult(), lambda t: ("p", "b"), workers=2,
+                )
+        assert len(started) == 2
@@ -14,6 +14,7 @@ import argparse
 import asyncio
 import json
 import sys
+from dataclasses import replace
 from pathlib import Path
 from typing import Any
 
@@ -24,6 +25,9 @@ if str(PROJECT_ROOT) not in sys.path:
 
 import httpx  # noqa: E402
 
+from graph_auth import AsyncTokenProvider, TokenLike  # noqa: E402
+from graph_cache import CacheConfig, configure_cache  # noqa: E402
+
 import planner_import  # noqa: F401, E402 — activa dotenv + auth setup al importar
 from planner_import import (  # noqa: E402
     MicrosoftAuthManager,
@@ -53,7 +57,7 @@ DEFAULT_CONFIG_PATH = Path("project_config.json")
 
 async def verify_project(
     client: httpx.AsyncClient,
-    token: str,
+    token: TokenLike,
     project_id: str,
     entry: dict[str, Any],
     site_id: str,
@@ -241,7 +245,9 @@ async def _run(config_path: Path, project_id_filter: str | None) -> int:
     total_checks = 0
 
     async with httpx.AsyncClient(timeout=30.0) as client:
-        token = auth.get_token()
+        token = AsyncTokenProvider.from_auth_manager(
+            auth, tenant_id=settings.azure_tenant_id, client_id=settings.azure_client_id,
+        )
 
         print("Obteniendo site_id de SharePoint...")
         site_id = await get_site_id(client, token, SHAREPOINT_SITE_URL)
@@ -281,7 +287,14 @@ def main() -> None:
         default=None,
         help="Verificar solo un proyecto específico por ProjectID",
     )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Caché en disco de lecturas con GET condicional (equivale a GRAPH_CACHE=1)",
+    )
     args = parser.parse_args()
+    if args.cache:
+        configure_cache(replace(CacheConfig.from_env(), enabled=True))
 
     exit_code = asyncio.run(_run(args.config, args.project_id))
     sys.exit(exit_code)